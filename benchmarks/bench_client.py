@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Benchmark de DianSimpleClient contra el emulador local de la DIAN.
+
+Levanta un DianEmulator en un puerto libre y envia documentos con
+SendBillAsync desde varios hilos, verificando cada ZipKey con
+verify_status_with_retry. Reporta documentos por segundo, percentiles de
+latencia del envio y del ciclo completo, y los contadores del emulador
+(fallas simuladas, reintentos implicitos, firmas rechazadas).
+
+Uso:
+    PYTHONPATH=. python benchmarks/bench_client.py
+    PYTHONPATH=. python benchmarks/bench_client.py --docs 500 --jobs 16
+    PYTHONPATH=. python benchmarks/bench_client.py --latency 0.2 --error-rate 0.05
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from facho.fe.client import DianSimpleClient
+from facho.fe.client.emulator import DianEmulator, EmulatorConfig
+from facho.fe.packaging import package_documents
+
+
+P12_PATH = os.path.join(os.path.dirname(__file__), '..', 'tests', 'example.p12')
+
+XML = (
+    '<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2" '
+    'xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2" '
+    'xmlns:ds="http://www.w3.org/2000/09/xmldsig#">'
+    '<cbc:ID>SETP{n}</cbc:ID><cbc:UUID>cufe-{n}</cbc:UUID><ds:Signature/></Invoice>'
+)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_job(client, n, args):
+    """Enviar un documento y esperar su estado definitivo."""
+    package = package_documents([(f'fv{n}.xml', XML.format(n=n).encode())], f'z{n}.zip')
+    start = time.perf_counter()
+    try:
+        sent = client.send_bill_async(package.file_name, package)
+        sent_at = time.perf_counter()
+        if not sent.zip_key:
+            return 'send_error', sent_at - start, None
+        status = client.verify_status_with_retry(
+            sent.zip_key, wait_seconds=args.poll, max_retries=args.retries
+        )
+    except requests.RequestException:
+        return 'http_error', time.perf_counter() - start, None
+    total = time.perf_counter() - start
+    if status.is_valid is None:
+        return 'pending', sent_at - start, total
+    return ('valid' if status.is_valid else 'rejected'), sent_at - start, total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--docs', type=int, default=200, help='Documentos a enviar')
+    parser.add_argument('--jobs', type=int, default=8, help='Hilos concurrentes')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Latencia por peticion del emulador (segundos)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraccion de peticiones que responden 500')
+    parser.add_argument('--processing-delay', type=float, default=0.0,
+                        help='Segundos que cada ZIP permanece en proceso')
+    parser.add_argument('--poll', type=float, default=0.05,
+                        help='Espera entre consultas de GetStatusZip')
+    parser.add_argument('--retries', type=int, default=20,
+                        help='Consultas maximas de GetStatusZip por documento')
+    parser.add_argument('--timeout', type=float, default=10.0,
+                        help='Timeout HTTP del cliente')
+    parser.add_argument('--no-verify-signature', action='store_true',
+                        help='No verificar WS-Security en el emulador')
+    args = parser.parse_args(argv)
+
+    config = EmulatorConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        processing_delay=args.processing_delay,
+        verify_signature=not args.no_verify_signature,
+        seed=1,
+    )
+    with open(P12_PATH, 'rb') as f:
+        client = DianSimpleClient(certificate_bytes=f.read(), certificate_password='')
+    client.timeout = args.timeout
+
+    with DianEmulator(config) as emulator:
+        client.endpoint = emulator.endpoint
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.jobs) as pool:
+            results = list(pool.map(lambda n: run_job(client, n, args), range(args.docs)))
+        elapsed = time.perf_counter() - start
+        stats = dict(emulator.stats)
+
+    outcomes = {}
+    for outcome, _, _ in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    send = [r[1] for r in results]
+    total = [r[2] for r in results if r[2] is not None]
+
+    print(f'{args.docs} documentos, {args.jobs} hilos, {elapsed:.2f} s '
+          f'({args.docs / elapsed:.1f} docs/s)')
+    for label, values in (('envio', send), ('ciclo completo', total)):
+        print(f'  {label:<15} p50 {percentile(values, 0.5) * 1000:8.1f} ms'
+              f'  p95 {percentile(values, 0.95) * 1000:8.1f} ms'
+              f'  p99 {percentile(values, 0.99) * 1000:8.1f} ms')
+    print('  resultados: ' + ', '.join(f'{k}={v}' for k, v in sorted(outcomes.items())))
+    print('  emulador:   ' + ', '.join(f'{k}={v}' for k, v in sorted(stats.items())))
+    return 0 if outcomes.get('valid', 0) == args.docs else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Benchmark de construccion de XML por tipo de documento.
+
+Mide documentos por segundo para cada builder (factura, notas credito y
+debito, documento soporte, POS, exportacion y contingencia), construyendo
+y serializando el XML sin firmar. Todos los tipos comparten el nucleo de
+emision de document_core, de modo que los resultados son comparables.
+
+Uso:
+    python benchmarks/bench_documents.py
+    python benchmarks/bench_documents.py --docs 2000 --lines 10
+    python benchmarks/bench_documents.py --only invoice,credit_note
+"""
+
+import argparse
+import sys
+import time
+
+from lxml import etree
+
+from facho.fe.builders.invoice_builder import (
+    InvoiceBuilder,
+    InvoiceConfig,
+    InvoiceData,
+    InvoiceLine,
+    Party,
+    Address,
+)
+from facho.fe.builders.credit_note_builder import CreditNoteBuilder, CreditNoteData
+from facho.fe.builders.debit_note_builder import DebitNoteBuilder, DebitNoteData
+from facho.fe.builders.support_document_builder import (
+    SupportDocumentBuilder,
+    SupportDocumentData,
+)
+from facho.fe.builders.pos_document_builder import PosDocumentBuilder, PosDocumentData
+from facho.fe.builders.export_invoice_builder import (
+    ExportInvoiceBuilder,
+    ExportInvoiceData,
+    ExchangeRate,
+    DeliveryInfo,
+    DeliveryTerms,
+)
+from facho.fe.builders.contingency_invoice_builder import (
+    ContingencyInvoiceBuilder,
+    ContingencyInvoiceData,
+)
+from facho.fe.builders.taxes import Tax
+
+
+CONFIG = InvoiceConfig(
+    software_id='1e3fa8f4-1a91-4028-9293-a9817406100f',
+    software_pin='12345',
+    technical_key='fc8eac422eba16e22ffd8c6f94b3f40a6e38162c',
+    nit='900373076',
+    company_name='EMPRESA DE PRUEBA',
+    resolution_number='18760000001',
+    resolution_date='2019-01-19',
+    resolution_end_date='2030-01-19',
+    prefix='SETP',
+    range_from='990000000',
+    range_to='995000000',
+)
+
+ADDRESS = Address(
+    city_code='68081',
+    city_name='Bucaramanga',
+    postal_zone='680001',
+    country_subentity='Santander',
+    country_subentity_code='68',
+    address_line='Calle 1 # 2-3',
+)
+
+SUPPLIER = Party(
+    nit='900373076',
+    name='EMPRESA DE PRUEBA',
+    legal_name='EMPRESA DE PRUEBA SAS',
+    organization_code='1',
+    tax_level_code='O-13',
+    address=ADDRESS,
+    email='facturacion@empresa.co',
+)
+
+CUSTOMERS = [
+    Party(
+        nit=str(1001186599 + i),
+        name=f'CLIENTE {i}',
+        legal_name=f'CLIENTE {i}',
+        organization_code='2',
+        tax_level_code='R-99-PN',
+        scheme_name='13',
+        address=ADDRESS,
+        email=f'cliente{i}@correo.co',
+    )
+    for i in range(20)
+]
+
+BILLING_REFERENCE = dict(
+    billing_reference_id='SETP990000001',
+    billing_reference_uuid='a' * 96,
+    billing_reference_date='2024-01-10',
+    discrepancy_description='Ajuste',
+)
+
+
+def make_lines(count):
+    """Lineas con IVA y una linea con impuestos y retencion."""
+    lines = [
+        InvoiceLine(
+            description=f'Producto {i}',
+            quantity=1 + i % 3,
+            unit_code='94',
+            unit_price=1234.56 * (1 + i % 5),
+            tax_percent=19.0,
+            item_id=f'P{i:04d}',
+        )
+        for i in range(max(count - 1, 0))
+    ]
+    base = 2 * 5000.0
+    lines.append(InvoiceLine(
+        description='Producto con varios impuestos',
+        quantity=2,
+        unit_code='94',
+        unit_price=5000.0,
+        taxes=[Tax.iva_5(base), Tax.inc_8(base), Tax.rete_fte(2.5, base)],
+        item_id='PMULTI',
+    ))
+    return lines
+
+
+def _number(i):
+    return f'SETP{990000001 + i}'
+
+
+def _common(i, lines):
+    return dict(
+        number=_number(i),
+        issue_date='2024-01-15',
+        issue_time='10:30:00-05:00',
+        lines=lines,
+    )
+
+
+# Cada entrada: (builder, funcion que crea los datos del documento i, kwargs de build)
+SCENARIOS = {
+    'invoice': (
+        InvoiceBuilder,
+        lambda i, lines: InvoiceData(
+            supplier=SUPPLIER, customer=CUSTOMERS[i % len(CUSTOMERS)],
+            **_common(i, lines)),
+        {},
+    ),
+    'credit_note': (
+        CreditNoteBuilder,
+        lambda i, lines: CreditNoteData(
+            supplier=SUPPLIER, customer=CUSTOMERS[i % len(CUSTOMERS)],
+            **_common(i, lines), **BILLING_REFERENCE),
+        {'validate': False},
+    ),
+    'debit_note': (
+        DebitNoteBuilder,
+        lambda i, lines: DebitNoteData(
+            supplier=SUPPLIER, customer=CUSTOMERS[i % len(CUSTOMERS)],
+            **_common(i, lines), **BILLING_REFERENCE),
+        {'validate': False},
+    ),
+    'support_document': (
+        SupportDocumentBuilder,
+        lambda i, lines: SupportDocumentData(
+            buyer=SUPPLIER, seller=CUSTOMERS[i % len(CUSTOMERS)],
+            **_common(i, lines)),
+        {},
+    ),
+    'pos': (
+        PosDocumentBuilder,
+        lambda i, lines: PosDocumentData(
+            supplier=SUPPLIER, customer=CUSTOMERS[i % len(CUSTOMERS)],
+            terminal_id='CAJA01', **_common(i, lines)),
+        {'validate_uvt': False},
+    ),
+    'export': (
+        ExportInvoiceBuilder,
+        lambda i, lines: ExportInvoiceData(
+            supplier=SUPPLIER, customer=CUSTOMERS[i % len(CUSTOMERS)],
+            exchange_rate=ExchangeRate('USD', 'COP', 4000.0, '2024-01-15'),
+            delivery=DeliveryInfo('US', 'Estados Unidos', 'Miami'),
+            delivery_terms=DeliveryTerms('FOB', 'Cartagena'),
+            **_common(i, lines)),
+        {},
+    ),
+    'contingency': (
+        ContingencyInvoiceBuilder,
+        lambda i, lines: ContingencyInvoiceData(
+            supplier=SUPPLIER, customer=CUSTOMERS[i % len(CUSTOMERS)],
+            contingency_date='2024-01-14', **_common(i, lines)),
+        {},
+    ),
+}
+
+
+def run_scenario(name, docs, line_count):
+    """
+    Construir y serializar `docs` documentos del tipo `name`.
+
+    Returns:
+        Diccionario con el tipo, documentos, segundos y documentos/segundo
+    """
+    builder_cls, make_data, build_kwargs = SCENARIOS[name]
+    builder = builder_cls(CONFIG)
+    lines = make_lines(line_count)
+    data = [make_data(i, lines) for i in range(docs)]
+
+    # Calentar caches de fragmentos
+    etree.tostring(builder.build(data[0], **build_kwargs))
+
+    start = time.perf_counter()
+    size = 0
+    for item in data:
+        size += len(etree.tostring(builder.build(item, **build_kwargs)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'type': name,
+        'docs': docs,
+        'seconds': elapsed,
+        'docs_per_sec': docs / elapsed if elapsed else float('inf'),
+        'avg_bytes': size // docs,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--docs', type=int, default=500,
+                        help='Documentos por tipo (default 500)')
+    parser.add_argument('--lines', type=int, default=5,
+                        help='Lineas por documento (default 5)')
+    parser.add_argument('--only', default='',
+                        help='Tipos separados por coma (default: todos)')
+    args = parser.parse_args(argv)
+
+    names = [n for n in args.only.split(',') if n] or list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error('Tipos desconocidos: %s' % ', '.join(unknown))
+
+    print('%-18s %8s %10s %12s %10s' % (
+        'tipo', 'docs', 'segundos', 'docs/seg', 'bytes/doc'))
+    for name in names:
+        r = run_scenario(name, args.docs, args.lines)
+        print('%-18s %8d %10.3f %12.1f %10d' % (
+            r['type'], r['docs'], r['seconds'], r['docs_per_sec'], r['avg_bytes']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
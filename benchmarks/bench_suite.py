@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Suite de benchmarks de las rutas criticas con comparacion contra linea base.
+
+Cubre construccion de facturas (1, 100 y 10.000 lineas), firma XAdES,
+sobre SOAP con WS-Security, CUFE, carga de CodeList, validacion XSD y
+operaciones del DocumentTracker (10.000 registros; 1.000.000 con --full).
+La firma usa el certificado de pruebas tests/example.p12.
+
+Cada caso se ejecuta varias rondas y se reporta la mediana por operacion.
+Los resultados se escriben en JSON (--output) y se comparan contra una
+linea base (--compare); el proceso termina con codigo 1 si algun caso es
+mas lento que la linea base por encima de la tolerancia. La linea base
+incluida (benchmarks/baseline.json) registra la plataforma donde se
+genero; regenerarla con --save-baseline en la maquina de referencia.
+
+Uso:
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --quick --only cufe,sign
+    python benchmarks/bench_suite.py --output resultados.json
+    python benchmarks/bench_suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_suite.py --compare benchmarks/baseline.json --tolerance 0.3
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+
+from lxml import etree
+
+from bench_documents import CONFIG, CUSTOMERS, SUPPLIER, make_lines
+
+from facho.fe.builders.cufe import CufeInput, calculate_cufe
+from facho.fe.builders.invoice_builder import InvoiceBuilder, InvoiceData
+from facho.fe.builders.soap_client import build_wssec_soap
+from facho.fe.client.tracker import DocumentTracker, TrackedDocument
+from facho.fe.signing.certificate import cert_to_base64, load_certificate_from_bytes
+from facho.fe.signing.xades import sign_invoice_xades
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+P12_PATH = os.path.join(ROOT, 'tests', 'example.p12')
+
+SOAP_ACTION = 'http://wcf.dian.colombia/IWcfDianCustomerServices/GetStatus'
+SOAP_ENDPOINT = 'https://vpfe-hab.dian.gov.co/WcfDianCustomerServices.svc'
+
+
+class Skip(Exception):
+    """El caso no puede ejecutarse en este entorno."""
+
+    def __init__(self, reason):
+        # Rutas relativas al repositorio: la razon termina en baseline.json
+        super().__init__(str(reason).replace(ROOT + os.sep, ''))
+
+
+def _invoice(line_count, i=0):
+    return InvoiceData(
+        number=f'SETP{990000001 + i}',
+        issue_date='2024-01-15',
+        issue_time='10:30:00-05:00',
+        supplier=SUPPLIER,
+        customer=CUSTOMERS[i % len(CUSTOMERS)],
+        lines=make_lines(line_count),
+    )
+
+
+def _certificate():
+    with open(P12_PATH, 'rb') as f:
+        return load_certificate_from_bytes(f.read(), '')
+
+
+# Cada caso recibe el directorio temporal y retorna la funcion a medir.
+
+def case_build(line_count):
+    def setup(tmpdir):
+        builder = InvoiceBuilder(CONFIG)
+        data = _invoice(line_count)
+        etree.tostring(builder.build(data))
+        return lambda: etree.tostring(builder.build(data))
+    return setup
+
+
+def case_sign(tmpdir):
+    key, cert, chain = _certificate()
+    xml = etree.tostring(InvoiceBuilder(CONFIG).build(_invoice(5)))
+
+    def run():
+        sign_invoice_xades(etree.fromstring(xml), key, cert, chain)
+    return run
+
+
+def case_soap(tmpdir):
+    key, cert, _ = _certificate()
+    cert_b64 = cert_to_base64(cert)
+    body = ('<wcf:GetStatus xmlns:wcf="http://wcf.dian.colombia">'
+            '<wcf:trackId>' + 'a' * 96 + '</wcf:trackId></wcf:GetStatus>')
+    return lambda: build_wssec_soap(body, SOAP_ACTION, SOAP_ENDPOINT, key, cert_b64)
+
+
+def case_cufe(tmpdir):
+    data = CufeInput(
+        number='SETP990000001', issue_date='2024-01-15',
+        issue_time='10:30:00-05:00', subtotal=1000000.0, iva_amount=190000.0,
+        total=1190000.0, supplier_nit='900373076', customer_nit='1001186599',
+        technical_key=CONFIG.technical_key,
+    )
+    return lambda: calculate_cufe(data)
+
+
+def case_codelist(tmpdir):
+    try:
+        from facho.fe.data.dian.codelist import CodeList, path_for_codelist
+    except (ImportError, OSError) as exc:
+        raise Skip(exc)
+    path = path_for_codelist('Municipio-2.1.gc')
+    return lambda: CodeList(path, 'code', 'name')
+
+
+def case_xsd(tmpdir):
+    # Mismo esquema que XSD.UBLInvoice, cargado directamente para no
+    # depender de los demas esquemas que ese modulo carga al importarse
+    try:
+        import xmlschema
+        schema = xmlschema.XMLSchema(os.path.join(
+            ROOT, 'facho', 'fe', 'data', 'dian', 'XSD', 'maindoc', 'UBL-Invoice-2.1.xsd'))
+    except (ImportError, OSError) as exc:
+        raise Skip(exc)
+    xml = etree.tostring(InvoiceBuilder(CONFIG).build(_invoice(5)))
+
+    def run():
+        schema.is_valid(etree.fromstring(xml))
+    return run
+
+
+def _tracked(i, is_valid=True):
+    return TrackedDocument(
+        'factura', f'SETP{990000001 + i}', format(i, '096x'), '2024-01-15',
+        issue_time='10:30:00-05:00', zip_key=f'zip-{i}', is_valid=is_valid,
+        status_code='00', total=1190000.0,
+        created_at='2024-01-15T10:30:00', updated_at='2024-01-15T10:30:00',
+    )
+
+
+def _tracking_file(tmpdir, records):
+    """Archivo de tracking con `records` facturas (el ultimo 1% pendiente)."""
+    path = os.path.join(tmpdir, f'tracking-{records}.json')
+    if not os.path.exists(path):
+        pending_from = records - records // 100
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'facturas': [asdict(_tracked(i, None if i >= pending_from else True))
+                             for i in range(records)],
+                'last_consecutive': records, 'prefix': 'SETP', 'nit': CONFIG.nit,
+            }, f)
+    return path
+
+
+def case_tracker(operation, records):
+    def setup(tmpdir):
+        path = _tracking_file(tmpdir, records)
+        if operation == 'load':
+            return lambda: DocumentTracker(path)
+
+        work = os.path.join(tmpdir, 'tracking-work.json')
+        shutil.copyfile(path, work)
+        tracker = DocumentTracker(work)
+        last = f'SETP{990000001 + records - 1}'
+        counter = iter(range(records, 2 ** 62))
+        return {
+            'lookup': lambda: tracker.get_document(last),
+            'pending': tracker.get_pending_documents,
+            'update': lambda: tracker.update_status(last, is_valid=True),
+            'add': lambda: tracker.add_document(_tracked(next(counter))),
+        }[operation]
+    return setup
+
+
+# nombre -> (setup, rondas, incluido en --quick, solo con --full)
+CASES = {
+    'build_1_line': (case_build(1), 50, True, False),
+    'build_100_lines': (case_build(100), 10, True, False),
+    'build_10k_lines': (case_build(10000), 3, False, False),
+    'sign': (case_sign, 20, True, False),
+    'soap_envelope': (case_soap, 50, True, False),
+    'cufe': (case_cufe, 2000, True, False),
+    'codelist_load': (case_codelist, 10, True, False),
+    'xsd_validate': (case_xsd, 10, False, False),
+    'tracker_load_10k': (case_tracker('load', 10000), 5, False, False),
+    'tracker_lookup_10k': (case_tracker('lookup', 10000), 50, True, False),
+    'tracker_pending_10k': (case_tracker('pending', 10000), 50, True, False),
+    'tracker_update_10k': (case_tracker('update', 10000), 3, False, False),
+    'tracker_add_10k': (case_tracker('add', 10000), 3, False, False),
+    'tracker_load_1m': (case_tracker('load', 1000000), 1, False, True),
+    'tracker_lookup_1m': (case_tracker('lookup', 1000000), 5, False, True),
+    'tracker_update_1m': (case_tracker('update', 1000000), 1, False, True),
+}
+
+
+def run_case(name, tmpdir, rounds=None):
+    """
+    Ejecutar un caso y medir cada ronda.
+
+    Returns:
+        Diccionario con mediana, minimo y rondas, o con 'skipped'
+    """
+    setup, default_rounds, _, _ = CASES[name]
+    try:
+        func = setup(tmpdir)
+    except Skip as exc:
+        return {'skipped': str(exc)}
+
+    timings = []
+    for _ in range(rounds or default_rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'median': statistics.median(timings),
+        'min': min(timings),
+        'rounds': len(timings),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Comparar resultados contra la linea base.
+
+    Returns:
+        Lista de (caso, mediana base, mediana actual, razon) de los casos
+        mas lentos que la base en mas de `tolerance`
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or 'median' not in base or 'median' not in result:
+            continue
+        ratio = result['median'] / base['median'] if base['median'] else 1.0
+        if ratio > 1 + tolerance:
+            regressions.append((name, base['median'], result['median'], ratio))
+    return regressions
+
+
+def select_cases(only='', quick=False, full=False):
+    names = [n for n in only.split(',') if n]
+    if names:
+        unknown = [n for n in names if n not in CASES]
+        if unknown:
+            raise ValueError('Casos desconocidos: %s' % ', '.join(unknown))
+        return names
+    return [
+        name for name, (_, _, in_quick, only_full) in CASES.items()
+        if (in_quick or not quick) and (full or not only_full)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--only', default='',
+                        help='Casos separados por coma (default: todos)')
+    parser.add_argument('--quick', action='store_true',
+                        help='Solo casos rapidos')
+    parser.add_argument('--full', action='store_true',
+                        help='Incluir tracker con 1.000.000 de registros')
+    parser.add_argument('--rounds', type=int, default=None,
+                        help='Rondas por caso (default: segun el caso)')
+    parser.add_argument('--output', help='Archivo JSON de resultados')
+    parser.add_argument('--compare', help='Archivo JSON de linea base')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Regresion permitida sobre la base (default 0.25)')
+    parser.add_argument('--save-baseline',
+                        help='Guardar los resultados como nueva linea base')
+    args = parser.parse_args(argv)
+
+    try:
+        names = select_cases(args.only, args.quick, args.full)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    results = {}
+    tmpdir = tempfile.mkdtemp(prefix='facho-bench-')
+    try:
+        print('%-22s %12s %12s %7s' % ('caso', 'mediana ms', 'min ms', 'rondas'))
+        for name in names:
+            r = results[name] = run_case(name, tmpdir, args.rounds)
+            if 'skipped' in r:
+                print('%-22s omitido: %s' % (name, r['skipped']))
+            else:
+                print('%-22s %12.3f %12.3f %7d' % (
+                    name, r['median'] * 1000, r['min'] * 1000, r['rounds']))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for name, base, current, ratio in regressions:
+            print('REGRESION %s: %.3f ms -> %.3f ms (x%.2f)' % (
+                name, base * 1000, current * 1000, ratio))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
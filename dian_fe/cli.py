@@ -7,12 +7,12 @@ Interfaz de linea de comandos para DIAN Facturacion Electronica.
 import argparse
 import json
 import sys
-import io
-import zipfile
 from datetime import datetime, timezone, timedelta
 
 from lxml import etree
 
+from facho.fe.packaging import package_xml
+
 
 def main():
     """Punto de entrada principal."""
@@ -180,10 +180,7 @@ def create_zip(xml_content: bytes, file_name: str) -> bytes:
     Returns:
         Contenido del ZIP en bytes
     """
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr(file_name, xml_content)
-    return zip_buffer.getvalue()
+    return package_xml(xml_content, file_name).content
 
 
 if __name__ == '__main__':
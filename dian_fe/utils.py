@@ -7,6 +7,8 @@ Incluye CUFE, CUDE, DV y funciones de hash.
 import base64
 import hashlib
 
+from facho.fe.builders.cufe import compute_uuid, calculate_software_security_code
+
 
 def calcular_dv(nit: str) -> int:
     """
@@ -59,13 +61,11 @@ def calcular_cufe(
     Returns:
         CUFE en formato SHA-384 hexadecimal (96 caracteres)
     """
-    cadena = (
-        f"{numero}{fecha_emision}{hora_emision}"
-        f"{subtotal:.2f}01{iva:.2f}04{0:.2f}03{0:.2f}"
-        f"{total:.2f}{nit_emisor}{nit_adquiriente}"
-        f"{clave_tecnica}{tipo_ambiente}"
+    return compute_uuid(
+        numero, fecha_emision, hora_emision, subtotal, iva, 0, 0, total,
+        nit_emisor, nit_adquiriente, clave_tecnica, tipo_ambiente,
+        truncate=False,
     )
-    return hashlib.sha384(cadena.encode('utf-8')).hexdigest()
 
 
 def calcular_cude(
@@ -103,13 +103,11 @@ def calcular_cude(
     Returns:
         CUDE en formato SHA-384 hexadecimal (96 caracteres)
     """
-    cadena = (
-        f"{numero}{fecha_emision}{hora_emision}"
-        f"{subtotal:.2f}01{iva:.2f}04{0:.2f}03{0:.2f}"
-        f"{total:.2f}{nit_emisor}{nit_adquiriente}"
-        f"{software_pin}{tipo_ambiente}"
+    return compute_uuid(
+        numero, fecha_emision, hora_emision, subtotal, iva, 0, 0, total,
+        nit_emisor, nit_adquiriente, software_pin, tipo_ambiente,
+        truncate=False,
     )
-    return hashlib.sha384(cadena.encode('utf-8')).hexdigest()
 
 
 def calcular_software_security_code(
@@ -130,8 +128,7 @@ def calcular_software_security_code(
     Returns:
         Hash SHA-384 hexadecimal
     """
-    cadena = f"{software_id}{pin}{numero_factura}"
-    return hashlib.sha384(cadena.encode('utf-8')).hexdigest()
+    return calculate_software_security_code(software_id, pin, numero_factura)
 
 
 def sha256_digest(data: bytes) -> str:
@@ -20,9 +20,7 @@ USO:
 """
 
 import argparse
-import io
 import random
-import zipfile
 from datetime import datetime, timezone, timedelta
 
 from lxml import etree
@@ -47,6 +45,7 @@ from facho.fe.client import (
     TrackedDocument,
     calcular_cufe,
 )
+from facho.fe.packaging import package_xml
 from facho.fe.signing import XAdESSigner
 
 
@@ -182,10 +181,7 @@ def get_random_lines() -> list:
 
 def create_zip_file(xml_content: bytes, file_name: str) -> bytes:
     """Crear archivo ZIP con el XML."""
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr(file_name, xml_content)
-    return zip_buffer.getvalue()
+    return package_xml(xml_content, file_name).content
 
 
 # =============================================================================
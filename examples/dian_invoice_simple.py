@@ -36,8 +36,6 @@ Uso:
 import os
 import sys
 import random
-import zipfile
-import io
 import time
 from datetime import datetime, timezone, timedelta
 
@@ -54,6 +52,7 @@ from facho.fe.builders.invoice_builder import (
     Party,
     Address
 )
+from facho.fe.packaging import package_xml
 from facho.fe.signing import XAdESSigner
 from facho.fe.client.dian_simple import DianSimpleClient
 
@@ -263,10 +262,7 @@ def generar_factura():
 
     # Crear ZIP
     print("\n[3] Creando archivo ZIP...")
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr(f'fv{numero}.xml', xml_bytes)
-    zip_data = zip_buffer.getvalue()
+    zip_data = package_xml(xml_bytes, f'fv{numero}.xml').content
 
     zip_path = f'/tmp/fv{numero}.zip'
     with open(zip_path, 'wb') as f:
@@ -100,6 +100,34 @@ def send_bill_sync(cert, password, habilitacion, filename, zipfile):
             click.echo(f"  * {msg}")
 
 
+@click.command()
+@click.option('--cert', required=True, type=click.Path(exists=True), help='Certificado .pfx')
+@click.option('--password', required=True, help='Password del certificado')
+@click.option('--habilitacion/--produccion', default=True, help='Ambiente')
+@click.option('--nit', required=True, help='NIT del emisor')
+@click.option('--software-id', required=True, help='Identificador del software')
+def get_numbering_range(cert, password, habilitacion, nit, software_id):
+    """Consultar los rangos de numeracion autorizados."""
+    from facho.fe.client import DianSimpleClient
+
+    environment = 'habilitacion' if habilitacion else 'produccion'
+    client = DianSimpleClient(
+        certificate_path=cert,
+        certificate_password=password,
+        environment=environment
+    )
+
+    resp = client.get_numbering_range(nit, software_id)
+
+    click.echo(f"OperationCode: {resp.status_code}")
+    click.echo(f"OperationDescription: {resp.status_description}")
+    for r in resp.ranges:
+        click.echo(
+            f"  * {r.resolution_number} {r.prefix} {r.from_number}-{r.to_number} "
+            f"vigente {r.valid_date_from} a {r.valid_date_to} clave {r.technical_key}"
+        )
+
+
 @click.command()
 @click.option('--cert', required=True, type=click.Path(exists=True), help='Certificado .pfx')
 @click.option('--password', required=True, help='Password del certificado')
@@ -124,6 +152,269 @@ def sign_xml(cert, password, xmlfile, output):
     click.echo(f"Documento firmado guardado en: {output}")
 
 
+@click.command()
+@click.option('--technical-key', help='Clave tecnica (CUFE)')
+@click.option('--software-pin', help='PIN del software (CUDE/CUDS)')
+@click.option('--jobs', default=1, type=int, help='Procesos en paralelo')
+@click.option('--json', 'as_json', is_flag=True, help='Un resultado JSON por linea')
+@click.option('--all', 'show_all', is_flag=True, help='Listar tambien los documentos correctos')
+@click.argument('source', type=click.Path(exists=True))
+def audit_cufe(technical_key, software_pin, jobs, as_json, show_all, source):
+    """Verificar el CUFE/CUDE de un directorio o ZIP de XML firmados."""
+    import json
+    from facho.fe.audit import CufeAuditor
+
+    def progress(p):
+        click.echo(
+            f"\r{p.done} documentos, {p.mismatches} diferencias, "
+            f"{p.errors} errores ({p.docs_per_sec:.0f} docs/s)",
+            nl=False, err=True
+        )
+
+    auditor = CufeAuditor(
+        technical_key=technical_key,
+        software_pin=software_pin,
+        jobs=jobs,
+        progress=progress,
+    )
+    for result in auditor.audit(source):
+        if result.ok and not show_all:
+            continue
+        if as_json:
+            click.echo(json.dumps(result.as_dict()))
+        else:
+            click.echo(f"{result.status.upper():9} {result.source} "
+                       f"{result.number or ''} {result.error or ''}".rstrip())
+
+    summary = auditor.summary()
+    click.echo('', err=True)
+    click.echo(
+        f"Documentos: {summary['documents']}  Correctos: {summary['ok']}  "
+        f"Diferencias: {summary['mismatches']}  Errores: {summary['errors']}  "
+        f"({summary['docs_per_sec']:.0f} docs/s)",
+        err=True
+    )
+    if summary['mismatches'] or summary['errors']:
+        sys.exit(1)
+
+
+def _stream_jsonl(results, outcome):
+    """Escribir cada resultado como una linea JSON y contar por `outcome`."""
+    import json
+
+    counts = {}
+    for result in results:
+        click.echo(json.dumps(result, ensure_ascii=False))
+        key = outcome(result)
+        counts[key] = counts.get(key, 0) + 1
+    click.echo('  '.join(f"{key}: {value}" for key, value in sorted(counts.items()))
+               or 'Sin elementos', err=True)
+    return counts
+
+
+def _bulk_client(cert, password, habilitacion, status_cache=None):
+    import requests
+    from facho.fe.client import DianSimpleClient
+
+    return DianSimpleClient(
+        certificate_path=cert,
+        certificate_password=password,
+        environment='habilitacion' if habilitacion else 'produccion',
+        session=requests.Session(),
+        status_cache=status_cache,
+    )
+
+
+@click.command()
+@click.option('--cert', required=True, type=click.Path(exists=True), help='Certificado .pfx')
+@click.option('--password', required=True, help='Password del certificado')
+@click.option('--output', '-o', required=True, type=click.Path(), help='Directorio de salida')
+@click.option('--jobs', default=1, type=int, help='Procesos en paralelo')
+@click.option('--overwrite', is_flag=True, help='Volver a firmar los que ya existen en la salida')
+@click.argument('sources', nargs=-1, required=True)
+def sign_dir(cert, password, output, jobs, overwrite, sources):
+    """Firmar los XML de directorios, globs o listas (@lista, -) como JSON Lines."""
+    from facho.fe.bulk_files import iter_files, sign_files
+
+    with open(cert, 'rb') as f:
+        pkcs12 = f.read()
+    results = sign_files(iter_files(sources, ('.xml',)), pkcs12, password, output,
+                         jobs=jobs, overwrite=overwrite)
+    counts = _stream_jsonl(results, lambda r: r['status'])
+    if counts.get('failed'):
+        sys.exit(1)
+
+
+@click.command()
+@click.option('--cert', required=True, type=click.Path(exists=True), help='Certificado .pfx')
+@click.option('--password', required=True, help='Password del certificado')
+@click.option('--habilitacion/--produccion', default=True, help='Ambiente')
+@click.option('--jobs', default=4, type=int, help='Envios simultaneos')
+@click.option('--tracker', 'tracking_file', default=None, type=click.Path(),
+              help='Archivo de tracking: omite lo ya enviado y registra lo nuevo')
+@click.option('--test-set-id', default=None, help='TestSetId DIAN (SendTestSetAsync)')
+@click.option('--sync', is_flag=True, help='Usar SendBillSync')
+@click.argument('sources', nargs=-1, required=True)
+def send_dir(cert, password, habilitacion, jobs, tracking_file, test_set_id, sync, sources):
+    """Enviar los ZIP (o XML firmados) de directorios, globs o listas como JSON Lines."""
+    from facho.fe.bulk_files import iter_files, send_files
+    from facho.fe.client.tracker import DocumentTracker
+
+    tracker = DocumentTracker(tracking_file) if tracking_file else None
+    results = send_files(iter_files(sources, ('.zip', '.xml')),
+                         _bulk_client(cert, password, habilitacion), jobs=jobs,
+                         tracker=tracker, test_set_id=test_set_id, sync=sync)
+    counts = _stream_jsonl(results, lambda r: r['status'])
+    if counts.get('failed'):
+        sys.exit(1)
+
+
+@click.command()
+@click.option('--cert', required=True, type=click.Path(exists=True), help='Certificado .pfx')
+@click.option('--password', required=True, help='Password del certificado')
+@click.option('--habilitacion/--produccion', default=True, help='Ambiente')
+@click.option('--jobs', default=4, type=int, help='Consultas simultaneas')
+@click.option('--tracker', 'tracking_file', default=None, type=click.Path(),
+              help='Archivo de tracking: actualiza los estados (sin IDs, consulta los pendientes)')
+@click.option('--cufe', 'by_cufe', is_flag=True, help='Los IDs son CUFE/CUDE (GetStatus)')
+@click.option('--cache', 'cache_file', default=None, type=click.Path(),
+              help='Cache SQLite de estados finales (no se vuelven a consultar)')
+@click.argument('track_ids', nargs=-1)
+def status_many(cert, password, habilitacion, jobs, tracking_file, by_cufe, cache_file,
+                track_ids):
+    """Consultar el estado de varios ZipKeys (argumentos, @lista o -) como JSON Lines."""
+    from facho.fe.bulk_files import check_statuses, iter_items, pending_track_ids
+    from facho.fe.client.dian_simple import is_terminal_status
+    from facho.fe.client.status_cache import StatusCache
+    from facho.fe.client.tracker import DocumentTracker
+
+    tracker = DocumentTracker(tracking_file) if tracking_file else None
+    status_cache = StatusCache(cache_file) if cache_file else None
+    if track_ids:
+        ids = iter_items(track_ids)
+    elif tracker is not None and not by_cufe:
+        ids = list(pending_track_ids(tracker))
+    else:
+        raise click.UsageError('Indique ZipKeys, una @lista, - o --tracker')
+
+    client = _bulk_client(cert, password, habilitacion, status_cache)
+    results = check_statuses(ids, client, jobs=jobs,
+                             tracker=tracker, by_cufe=by_cufe)
+
+    def outcome(result):
+        if 'error' in result:
+            return 'error'
+        if not is_terminal_status(result['is_valid'], result['status_code']):
+            return 'pending'
+        return 'valid' if result['is_valid'] else 'invalid'
+
+    counts = _stream_jsonl(results, outcome)
+    if counts.get('error'):
+        sys.exit(1)
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', help='Interfaz donde escuchar')
+@click.option('--port', default=8080, type=int, help='Puerto')
+@click.option('--latency', default=0.0, type=float, help='Segundos por respuesta')
+@click.option('--jitter', default=0.0, type=float, help='Segundos aleatorios adicionales')
+@click.option('--error-rate', default=0.0, type=float, help='Fraccion de SOAP Fault')
+@click.option('--hang-rate', default=0.0, type=float, help='Fraccion de solicitudes colgadas')
+@click.option('--rejection-rate', default=0.0, type=float, help='Fraccion de documentos rechazados')
+@click.option('--processing-delay', default=0.0, type=float,
+              help='Segundos hasta procesar un ZIP asincrono')
+@click.option('--processing-rate', default=None, type=float,
+              help='Documentos por segundo de la cola asincrona')
+@click.option('--no-verify-signature', is_flag=True, help='No verificar WS-Security')
+@click.option('--seed', default=None, type=int, help='Semilla aleatoria')
+def dian_emulator(host, port, latency, jitter, error_rate, hang_rate, rejection_rate,
+                  processing_delay, processing_rate, no_verify_signature, seed):
+    """Emulador local de los servicios web DIAN."""
+    from facho.fe.client.emulator import DianEmulator, EmulatorConfig
+
+    config = EmulatorConfig(
+        latency=latency,
+        latency_jitter=jitter,
+        error_rate=error_rate,
+        hang_rate=hang_rate,
+        rejection_rate=rejection_rate,
+        processing_delay=processing_delay,
+        processing_rate=processing_rate,
+        verify_signature=not no_verify_signature,
+        seed=seed,
+    )
+    emulator = DianEmulator(config, host=host, port=port)
+    click.echo(f"Emulador DIAN en {emulator.endpoint}", err=True)
+    try:
+        emulator.serve_forever()
+    except KeyboardInterrupt:
+        click.echo(f"Solicitudes: {emulator.stats}", err=True)
+
+
+@click.command()
+@click.option('--cert', required=True, type=click.Path(exists=True), help='Certificado .pfx')
+@click.option('--password', required=True, help='Password del certificado')
+@click.option('--socket', 'socket_path', required=True, type=click.Path(),
+              help='Ruta del socket Unix')
+@click.option('--cpus', default=None, help='Nucleos para fijar el proceso (ej: 2,3)')
+def signing_daemon(cert, password, socket_path, cpus):
+    """Daemon local de firma: carga el certificado una vez y firma para los workers."""
+    from facho.fe.signing.daemon import SigningDaemon
+
+    cores = [int(c) for c in cpus.split(',')] if cpus else None
+    daemon = SigningDaemon.from_pkcs12(cert, password, socket_path, cpus=cores)
+    click.echo(f"Daemon de firma en {socket_path}", err=True)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        click.echo(f"Solicitudes: {daemon.stats}", err=True)
+
+
+@click.command()
+@click.option('--cert', default=None, type=click.Path(exists=True), help='Certificado .pfx')
+@click.option('--password', default='', help='Password del certificado')
+@click.option('--signing-socket', default=None, type=click.Path(),
+              help='Socket de un daemon de firma (alternativa a --cert)')
+@click.option('--habilitacion/--produccion', default=True, help='Ambiente')
+@click.option('--settings', default=None, type=click.Path(exists=True),
+              help='JSON con "config" (InvoiceConfig) y "supplier" para /build')
+@click.option('--host', default='127.0.0.1', help='Interfaz donde escuchar')
+@click.option('--port', default=8700, type=int, help='Puerto')
+@click.option('--jobs', default=8, type=int, help='Hilos para las operaciones batch')
+def serve(cert, password, signing_socket, habilitacion, settings, host, port, jobs):
+    """Servicio HTTP local que mantiene firmador y cliente DIAN cargados."""
+    import json
+    import requests
+    from facho.fe.client import DianSimpleClient
+    from facho.fe.service import FachoService
+    from facho.fe.signing.certificate import load_certificate
+    from facho.fe.signing.daemon import connect
+    from facho.fe.signing.xades import XAdESSigner
+
+    signer = client = None
+    if cert or signing_socket:
+        credentials = connect(signing_socket) if signing_socket else load_certificate(cert, password)
+        signer = XAdESSigner(*credentials)
+        client = DianSimpleClient(
+            credentials=credentials,
+            environment='habilitacion' if habilitacion else 'produccion',
+            session=requests.Session(),
+        )
+
+    options = {}
+    if settings:
+        with open(settings, encoding='utf-8') as f:
+            options = json.load(f)
+    service = FachoService.from_settings(
+        options, signer=signer, client=client, jobs=jobs, host=host, port=port
+    )
+    click.echo(f"Servicio facho en {service.url}", err=True)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        click.echo(f"Solicitudes: {service.stats}", err=True)
+
+
 @click.command()
 def version():
     """Mostrar version."""
@@ -139,5 +430,13 @@ def main():
 main.add_command(get_status_zip)
 main.add_command(send_test_set_async)
 main.add_command(send_bill_sync)
+main.add_command(get_numbering_range)
 main.add_command(sign_xml)
+main.add_command(audit_cufe)
+main.add_command(sign_dir)
+main.add_command(send_dir)
+main.add_command(status_many)
+main.add_command(dian_emulator)
+main.add_command(signing_daemon)
+main.add_command(serve)
 main.add_command(version)
@@ -8,13 +8,44 @@ Modulos disponibles:
 - signing: Firma XAdES-EPES
 - builders: Constructores XML UBL 2.1
 - client: Cliente DIAN con WS-Security
+- packaging: ZIP y base64 de los documentos para el envio
+- pipeline: Flujo construir/firmar/enviar/registrar en paralelo
+- contingency: Modo de contingencia y reenvio al recuperarse DIAN
+- tenants: Firmadores y clientes por NIT para proveedores tecnologicos
+- service: Servicio HTTP local (construir, firmar, comprimir, enviar)
+- audit: Auditoria de CUFE/CUDE/CUDS sobre archivos de documentos firmados
+- instrumentation: Tiempos por etapa y contadores opcionales (logging,
+  Prometheus, histogramas en memoria)
 """
 
-# Modulos de firma
-from . import signing
+from ._lazy import install
 
-# Constructores XML
-from . import builders
+# Los submodulos se importan al primer acceso (ej: facho.fe.client)
+_LAZY_EXPORTS = {
+    'signing': None,
+    'builders': None,
+    'client': None,
+    'packaging': None,
+    'pipeline': None,
+    'contingency': None,
+    'tenants': None,
+    'service': None,
+    'audit': None,
+    'instrumentation': None,
+}
 
-# Cliente DIAN
-from . import client
+__all__ = [
+    'signing',
+    'builders',
+    'client',
+    'packaging',
+    'pipeline',
+    'contingency',
+    'tenants',
+    'service',
+    'audit',
+    'instrumentation',
+]
+
+install(globals(), _LAZY_EXPORTS)
+del install
@@ -0,0 +1,63 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Exportaciones diferidas de paquetes (PEP 562).
+
+Los paquetes declaran que nombre viene de que submodulo; el submodulo se
+importa la primera vez que se accede al nombre y el valor queda en el
+paquete, de modo que los accesos siguientes no pasan por __getattr__.
+Asi `from facho.fe.builders import calculate_cufe` solo carga cufe.py
+(y sus dependencias), no los ocho builders ni el cliente HTTP.
+"""
+
+import sys
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+
+def install(
+    namespace: Dict[str, Any],
+    exports: Dict[str, Optional[Sequence[str]]],
+    aliases: Dict[str, Tuple[str, str]] = None
+):
+    """
+    Definir __getattr__ y __dir__ del paquete.
+
+    Args:
+        namespace: globals() del __init__ del paquete
+        exports: Submodulo -> nombres que exporta; None exporta el
+            submodulo mismo
+        aliases: Nombre exportado -> (submodulo, nombre en el submodulo)
+    """
+    package = namespace['__name__']
+    targets: Dict[str, Tuple[str, Optional[str]]] = {}
+    for module, names in exports.items():
+        if names is None:
+            targets[module] = (module, None)
+        else:
+            for name in names:
+                targets[name] = (module, name)
+    targets.update(aliases or {})
+
+    def __getattr__(name):
+        try:
+            module, attr = targets[name]
+        except KeyError:
+            raise AttributeError(
+                f"module {package!r} has no attribute {name!r}"
+            ) from None
+        # __import__ (no importlib.import_module) para que la carga se
+        # vea en python -X importtime
+        qualified = f'{package}.{module}'
+        __import__(qualified)
+        value = sys.modules[qualified]
+        if attr is not None:
+            value = getattr(value, attr)
+        namespace[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(namespace) | set(targets))
+
+    namespace['__getattr__'] = __getattr__
+    namespace['__dir__'] = __dir__
@@ -0,0 +1,563 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Auditoria de CUFE/CUDE/CUDS sobre archivos de documentos firmados.
+
+Recorre un directorio o un archivo ZIP con XML firmados (Invoice,
+CreditNote, DebitNote, POS, documento soporte, exportacion), extrae los
+campos de la cadena CUFE directamente del XML y recalcula el codigo con
+el motor de facho.fe.builders.cufe. Cualquier diferencia indica que el
+documento fue alterado despues de emitido o que se emitio con datos
+inconsistentes.
+
+El extractor usa iterparse y se detiene al llegar a la primera linea
+del documento: todos los campos del CUFE estan en la cabecera, asi que
+el costo no depende del numero de lineas.
+
+Example:
+    auditor = CufeAuditor(technical_key='fc8eac...', software_pin='12345', jobs=4)
+    for result in auditor.audit('/archivo/2024'):
+        if not result.ok:
+            print(result.source, result.status, result.error)
+    print(auditor.summary())
+"""
+
+import io
+import os
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from lxml import etree
+
+from .builders.constants import NS
+from .builders.cufe import compute_uuid
+from .builders.exceptions import CufeError
+from .builders.taxes import truncar
+
+
+# Estados de AuditResult
+STATUS_OK = 'ok'
+STATUS_MISMATCH = 'mismatch'
+STATUS_ERROR = 'error'
+
+# Documentos por bloque enviado a cada proceso
+AUDIT_CHUNK_SIZE = 100
+
+# Esquemas de cbc:UUID que se calculan con el PIN del software
+PIN_SCHEMES = frozenset(('CUDE-SHA384', 'CUDS-SHA384'))
+
+_CBC = '{%s}' % NS['cbc']
+_CAC = '{%s}' % NS['cac']
+
+SUPPORTED_ROOTS = {
+    '{%s}Invoice' % NS['fe']: 'Invoice',
+    '{%s}CreditNote' % NS['nc']: 'CreditNote',
+    '{%s}DebitNote' % NS['nd']: 'DebitNote',
+}
+
+_LINE_TAGS = frozenset((
+    _CAC + 'InvoiceLine',
+    _CAC + 'CreditNoteLine',
+    _CAC + 'DebitNoteLine',
+))
+
+_PARTY_NIT = etree.XPath(
+    'cac:Party/cac:PartyTaxScheme/cbc:CompanyID/text()', namespaces=NS
+)
+_TAX_SCHEME_ID = etree.XPath(
+    'cac:TaxSubtotal/cac:TaxCategory/cac:TaxScheme/cbc:ID/text()', namespaces=NS
+)
+_AUTHORIZATION = etree.XPath(
+    './/sts:InvoiceControl/sts:InvoiceAuthorization/text()', namespaces=NS
+)
+
+
+@dataclass
+class ArchivedDocument:
+    """
+    Campos de la cadena CUFE leidos de un documento firmado.
+
+    Attributes:
+        root: Elemento raiz ('Invoice', 'CreditNote', 'DebitNote')
+        number: cbc:ID
+        uuid: Valor de cbc:UUID
+        scheme_name: Atributo schemeName de cbc:UUID (CUFE/CUDE/CUDS-SHA384)
+        subtotal: LineExtensionAmount del total monetario
+        taxes: TaxAmount por codigo de impuesto (TaxTotal del documento)
+        total: PayableAmount del total monetario
+        currency: DocumentCurrencyCode
+        exchange_rate: CalculationRate de PaymentExchangeRate, si existe
+        authorization: Numero de resolucion (InvoiceAuthorization), si existe
+    """
+    root: str
+    number: str = ''
+    uuid: str = ''
+    scheme_name: str = ''
+    issue_date: str = ''
+    issue_time: str = ''
+    subtotal: float = 0.0
+    taxes: Dict[str, float] = field(default_factory=dict)
+    total: float = 0.0
+    supplier_nit: str = ''
+    customer_nit: str = ''
+    environment: str = ''
+    currency: str = 'COP'
+    exchange_rate: Optional[float] = None
+    authorization: Optional[str] = None
+
+    @property
+    def uses_software_pin(self) -> bool:
+        """True si el codigo es CUDE/CUDS (SoftwarePIN)."""
+        return self.scheme_name in PIN_SCHEMES
+
+    def uuid_amounts(self) -> Tuple[float, Dict[str, float], float]:
+        """
+        Obtener (subtotal, impuestos, total) en pesos para el CUFE.
+
+        Los documentos en otra moneda se convierten con la tasa de
+        PaymentExchangeRate, igual que ExportInvoiceBuilder.
+        """
+        if self.currency == 'COP' or not self.exchange_rate:
+            return self.subtotal, self.taxes, self.total
+        rate = self.exchange_rate
+        return (
+            truncar(self.subtotal * rate),
+            {k: truncar(v * rate) for k, v in self.taxes.items()},
+            truncar(self.total * rate),
+        )
+
+
+def _text(elem) -> str:
+    return (elem.text or '').strip()
+
+
+def _set_uuid(doc: ArchivedDocument, elem):
+    doc.uuid = _text(elem)
+    doc.scheme_name = elem.get('schemeName', '')
+
+
+def _set_party(attr: str):
+    def handler(doc: ArchivedDocument, elem):
+        nits = _PARTY_NIT(elem)
+        if nits:
+            setattr(doc, attr, nits[0].strip())
+    return handler
+
+
+def _add_tax_total(doc: ArchivedDocument, elem):
+    codes = _TAX_SCHEME_ID(elem)
+    amount = elem.find(_CBC + 'TaxAmount')
+    if codes and amount is not None:
+        code = codes[0].strip()
+        doc.taxes[code] = doc.taxes.get(code, 0.0) + float(_text(amount))
+
+
+def _set_monetary_total(doc: ArchivedDocument, elem):
+    subtotal = elem.find(_CBC + 'LineExtensionAmount')
+    total = elem.find(_CBC + 'PayableAmount')
+    if subtotal is not None:
+        doc.subtotal = float(_text(subtotal))
+    if total is not None:
+        doc.total = float(_text(total))
+
+
+def _set_exchange_rate(doc: ArchivedDocument, elem):
+    rate = elem.find(_CBC + 'CalculationRate')
+    if rate is not None:
+        doc.exchange_rate = float(_text(rate))
+
+
+def _set_authorization(doc: ArchivedDocument, elem):
+    authorization = _AUTHORIZATION(elem)
+    if authorization:
+        doc.authorization = authorization[0].strip()
+
+
+def _set_text(attr: str):
+    def handler(doc: ArchivedDocument, elem):
+        setattr(doc, attr, _text(elem))
+    return handler
+
+
+# Hijos directos del elemento raiz que aportan campos al CUFE
+_HANDLERS: Dict[str, Callable[[ArchivedDocument, Any], None]] = {
+    '{%s}UBLExtensions' % NS['ext']: _set_authorization,
+    _CBC + 'ProfileExecutionID': _set_text('environment'),
+    _CBC + 'ID': _set_text('number'),
+    _CBC + 'UUID': _set_uuid,
+    _CBC + 'IssueDate': _set_text('issue_date'),
+    _CBC + 'IssueTime': _set_text('issue_time'),
+    _CBC + 'DocumentCurrencyCode': _set_text('currency'),
+    _CAC + 'AccountingSupplierParty': _set_party('supplier_nit'),
+    _CAC + 'AccountingCustomerParty': _set_party('customer_nit'),
+    _CAC + 'PaymentExchangeRate': _set_exchange_rate,
+    _CAC + 'TaxTotal': _add_tax_total,
+    _CAC + 'LegalMonetaryTotal': _set_monetary_total,
+    _CAC + 'RequestedMonetaryTotal': _set_monetary_total,
+}
+
+_REQUIRED_FIELDS = ('number', 'uuid', 'issue_date', 'issue_time', 'environment')
+
+
+def extract_archived_document(source: Union[bytes, str, BinaryIO]) -> ArchivedDocument:
+    """
+    Extraer los campos del CUFE de un documento firmado.
+
+    Args:
+        source: Contenido XML (bytes), ruta o archivo binario abierto
+
+    Returns:
+        ArchivedDocument
+
+    Raises:
+        CufeError: Si el XML no es valido, la raiz no es un documento
+            soportado o falta un campo de la cadena CUFE
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    doc = None
+    depth = 0
+    try:
+        for event, elem in etree.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if depth == 1:
+                    root = SUPPORTED_ROOTS.get(elem.tag)
+                    if root is None:
+                        raise CufeError(f"Documento no soportado: {elem.tag}")
+                    doc = ArchivedDocument(root=root)
+                elif depth == 2 and elem.tag in _LINE_TAGS:
+                    break
+                continue
+
+            if depth == 2:
+                handler = _HANDLERS.get(elem.tag)
+                if handler is not None:
+                    handler(doc, elem)
+                elem.clear()
+            depth -= 1
+    except etree.XMLSyntaxError as e:
+        raise CufeError(f"XML invalido: {e}")
+    except ValueError as e:
+        raise CufeError(
+            f"Monto invalido: {e}", document_number=doc.number if doc else None
+        )
+
+    if doc is None:
+        raise CufeError("Documento vacio")
+    missing = [name for name in _REQUIRED_FIELDS if not getattr(doc, name)]
+    if missing:
+        raise CufeError(
+            "Faltan campos del CUFE: %s" % ', '.join(missing),
+            document_number=doc.number or None,
+        )
+    return doc
+
+
+@dataclass
+class AuditResult:
+    """
+    Resultado de la auditoria de un documento.
+
+    Attributes:
+        source: Ruta del archivo (o 'archivo.zip:miembro.xml')
+        status: 'ok', 'mismatch' o 'error'
+        number: Numero del documento
+        scheme_name: CUFE-SHA384, CUDE-SHA384 o CUDS-SHA384
+        found: Codigo presente en el XML
+        expected: Codigo recalculado
+        error: Descripcion del error (status == 'error')
+    """
+    source: str
+    status: str
+    number: Optional[str] = None
+    scheme_name: Optional[str] = None
+    found: Optional[str] = None
+    expected: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == STATUS_OK
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'source': self.source,
+            'status': self.status,
+            'number': self.number,
+            'scheme_name': self.scheme_name,
+            'found': self.found,
+            'expected': self.expected,
+            'error': self.error,
+        }
+
+
+# Una tarea es (ruta_xml, None) o (ruta_zip, miembro); un ZIP que no se
+# pudo listar aporta una sola tarea (ruta_zip, '') que se reporta como error
+AuditTask = Tuple[str, Optional[str]]
+
+# Errores de lectura de un archivo o ZIP (se reportan por tarea)
+_READ_ERRORS = (OSError, zipfile.BadZipFile, zlib.error, KeyError)
+
+
+def iter_audit_tasks(path: str) -> Iterator[AuditTask]:
+    """
+    Listar los XML a auditar en un directorio o archivo ZIP.
+
+    Los directorios se recorren recursivamente en orden alfabetico; los
+    ZIP (sueltos o dentro del directorio) aportan cada miembro .xml. Un
+    ZIP corrupto o ilegible no detiene el recorrido: queda como una tarea
+    que se audita con estado error.
+
+    Args:
+        path: Directorio, archivo .zip o archivo .xml
+
+    Yields:
+        Tareas (ruta, miembro o None)
+    """
+    if os.path.isdir(path):
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for name in sorted(filenames):
+                yield from iter_audit_tasks(os.path.join(dirpath, name))
+        return
+
+    lower = path.lower()
+    if lower.endswith('.zip'):
+        try:
+            with zipfile.ZipFile(path) as zf:
+                members = [m for m in zf.namelist() if m.lower().endswith('.xml')]
+        except _READ_ERRORS:
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            members = ['']
+        for member in members:
+            yield (path, member)
+    elif lower.endswith('.xml'):
+        yield (path, None)
+    elif not os.path.exists(path):
+        raise FileNotFoundError(path)
+
+
+class _Verifier:
+    """Recalculo de codigos con las claves del emisor."""
+
+    def __init__(
+        self,
+        technical_key: Optional[str],
+        software_pin: Optional[str],
+        technical_keys: Optional[Dict[str, str]]
+    ):
+        self.technical_key = technical_key
+        self.software_pin = software_pin
+        self.technical_keys = technical_keys or {}
+
+    def key_for(self, doc: ArchivedDocument) -> str:
+        if doc.uses_software_pin:
+            key = self.software_pin
+        else:
+            key = self.technical_keys.get(doc.authorization, self.technical_key)
+        if not key:
+            raise CufeError(
+                "No hay clave para %s (resolucion %s)" % (
+                    doc.scheme_name or 'CUFE', doc.authorization),
+                document_number=doc.number,
+            )
+        return key
+
+    def verify(self, source: str, xml: Union[bytes, BinaryIO]) -> AuditResult:
+        try:
+            doc = extract_archived_document(xml)
+            subtotal, taxes, total = doc.uuid_amounts()
+            expected = compute_uuid(
+                doc.number, doc.issue_date, doc.issue_time, subtotal,
+                taxes.get('01', 0.0), taxes.get('04', 0.0), taxes.get('03', 0.0),
+                total, doc.supplier_nit, doc.customer_nit, self.key_for(doc),
+                doc.environment, truncate=False,
+            )
+        except CufeError as e:
+            return AuditResult(
+                source=source, status=STATUS_ERROR,
+                number=e.document_number, error=e.message,
+            )
+
+        return AuditResult(
+            source=source,
+            status=STATUS_OK if expected == doc.uuid.lower() else STATUS_MISMATCH,
+            number=doc.number,
+            scheme_name=doc.scheme_name,
+            found=doc.uuid,
+            expected=expected,
+        )
+
+    def verify_tasks(self, tasks: Iterable[AuditTask]) -> List[AuditResult]:
+        results = []
+        archives: Dict[str, zipfile.ZipFile] = {}
+        try:
+            for path, member in tasks:
+                source = f'{path}:{member}' if member else path
+                try:
+                    if member is None:
+                        with open(path, 'rb') as f:
+                            results.append(self.verify(source, f))
+                        continue
+                    zf = archives.get(path)
+                    if zf is None:
+                        zf = archives[path] = zipfile.ZipFile(path)
+                    with zf.open(member) as f:
+                        results.append(self.verify(source, f))
+                except _READ_ERRORS as e:
+                    results.append(AuditResult(
+                        source=source, status=STATUS_ERROR,
+                        error=f"No se pudo leer: {e}",
+                    ))
+        finally:
+            for zf in archives.values():
+                zf.close()
+        return results
+
+
+def _verify_chunk(verifier: _Verifier, tasks: List[AuditTask]) -> List[AuditResult]:
+    return verifier.verify_tasks(tasks)
+
+
+@dataclass
+class AuditProgress:
+    """Avance de una auditoria, entregado al callback de progreso."""
+    done: int
+    mismatches: int
+    errors: int
+    elapsed: float
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.done / self.elapsed if self.elapsed else 0.0
+
+
+class CufeAuditor:
+    """
+    Auditor de CUFE/CUDE/CUDS para archivos de documentos firmados.
+
+    Args:
+        technical_key: Clave tecnica para los CUFE
+        software_pin: PIN del software para los CUDE/CUDS
+        technical_keys: Claves tecnicas por numero de resolucion, para
+            archivos con varias resoluciones (tienen prioridad sobre
+            technical_key)
+        jobs: Numero de procesos (1 = en el proceso actual)
+        chunk_size: Documentos por bloque enviado a cada proceso
+        progress: Callback opcional que recibe un AuditProgress despues
+            de cada bloque
+
+    Example:
+        auditor = CufeAuditor(technical_key, software_pin, jobs=os.cpu_count())
+        mismatches = [r for r in auditor.audit('facturas.zip') if not r.ok]
+    """
+
+    def __init__(
+        self,
+        technical_key: str = None,
+        software_pin: str = None,
+        technical_keys: Dict[str, str] = None,
+        jobs: int = 1,
+        chunk_size: int = AUDIT_CHUNK_SIZE,
+        progress: Callable[[AuditProgress], None] = None
+    ):
+        if jobs < 1:
+            raise ValueError("jobs debe ser mayor o igual a 1")
+        if chunk_size < 1:
+            raise ValueError("chunk_size debe ser mayor o igual a 1")
+        self._verifier = _Verifier(technical_key, software_pin, technical_keys)
+        self.jobs = jobs
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.counts = {STATUS_OK: 0, STATUS_MISMATCH: 0, STATUS_ERROR: 0}
+        self.elapsed = 0.0
+
+    def verify_xml(self, xml: bytes, source: str = '<xml>') -> AuditResult:
+        """Auditar un documento en memoria."""
+        return self._verifier.verify(source, xml)
+
+    def _chunks(self, tasks: Iterable[AuditTask]) -> Iterator[List[AuditTask]]:
+        iterator = iter(tasks)
+        while True:
+            chunk = list(islice(iterator, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def _results(self, tasks: Iterable[AuditTask]) -> Iterator[List[AuditResult]]:
+        if self.jobs == 1:
+            for chunk in self._chunks(tasks):
+                yield self._verifier.verify_tasks(chunk)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            pending = deque()
+            for chunk in self._chunks(tasks):
+                pending.append(pool.submit(_verify_chunk, self._verifier, chunk))
+                if len(pending) >= self.jobs * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def audit_tasks(self, tasks: Iterable[AuditTask]) -> Iterator[AuditResult]:
+        """
+        Auditar una secuencia de tareas (ver iter_audit_tasks).
+
+        Yields:
+            AuditResult por documento, en el orden de las tareas
+        """
+        self.counts = dict.fromkeys(self.counts, 0)
+        start = time.perf_counter()
+        for results in self._results(tasks):
+            for result in results:
+                self.counts[result.status] += 1
+                yield result
+            self.elapsed = time.perf_counter() - start
+            if self.progress is not None:
+                self.progress(self._progress())
+        self.elapsed = time.perf_counter() - start
+
+    def audit(self, path: str) -> Iterator[AuditResult]:
+        """
+        Auditar un directorio, archivo ZIP o XML.
+
+        Yields:
+            AuditResult por documento
+        """
+        return self.audit_tasks(iter_audit_tasks(path))
+
+    def _progress(self) -> AuditProgress:
+        return AuditProgress(
+            done=sum(self.counts.values()),
+            mismatches=self.counts[STATUS_MISMATCH],
+            errors=self.counts[STATUS_ERROR],
+            elapsed=self.elapsed,
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Resumen de la ultima auditoria.
+
+        Returns:
+            Diccionario con documentos, correctos, diferencias, errores,
+            segundos y documentos por segundo
+        """
+        progress = self._progress()
+        return {
+            'documents': progress.done,
+            'ok': self.counts[STATUS_OK],
+            'mismatches': progress.mismatches,
+            'errors': progress.errors,
+            'elapsed_seconds': progress.elapsed,
+            'docs_per_sec': progress.docs_per_sec,
+        }
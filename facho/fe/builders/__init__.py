@@ -3,193 +3,266 @@
 
 """
 Constructores de documentos XML UBL 2.1 para DIAN Colombia.
+
+Los nombres exportados se cargan al primer acceso (ver facho.fe._lazy).
 """
 
-# Builders principales
-from .invoice_builder import (
-    InvoiceBuilder,
-    InvoiceConfig,
-    InvoiceData,
-    InvoiceLine,
-    Party,
-    Address,
-)
-from .credit_note_builder import CreditNoteBuilder, CreditNoteData
-from .debit_note_builder import DebitNoteBuilder, DebitNoteData
+from .._lazy import install
 
-# Builders adicionales
-from .support_document_builder import SupportDocumentBuilder, SupportDocumentData
-from .export_invoice_builder import (
-    ExportInvoiceBuilder,
-    ExportInvoiceData,
-    DeliveryTerms,
-    DeliveryInfo,
-    ExchangeRate,
-)
-from .contingency_invoice_builder import (
-    ContingencyInvoiceBuilder,
-    ContingencyInvoiceData,
-)
-from .pos_document_builder import PosDocumentBuilder, PosDocumentData
+_LAZY_EXPORTS = {
+    # Builders principales
+    'invoice_builder': (
+        'InvoiceBuilder',
+        'InvoiceConfig',
+        'InvoiceData',
+        'InvoiceLine',
+        'Party',
+        'Address',
+    ),
+    'credit_note_builder': (
+        'CreditNoteBuilder',
+        'CreditNoteData',
+    ),
+    'debit_note_builder': (
+        'DebitNoteBuilder',
+        'DebitNoteData',
+    ),
 
-# CUFE/CUDE/CUDS Calculator
-from .cufe import (
-    CufeInput,
-    calculate_cufe,
-    calculate_cude,
-    calculate_cuds,
-    calculate_software_security_code,
-    calculate_cufe_from_taxes,
-    calculate_cude_from_taxes,
-    verify_cufe,
-    verify_cude,
-    get_uuid_type,
-    calculate_uuid_by_doc_type,
-    format_amount,
-    build_cufe_string,
-)
+    # Builders adicionales
+    'support_document_builder': (
+        'SupportDocumentBuilder',
+        'SupportDocumentData',
+    ),
+    'export_invoice_builder': (
+        'ExportInvoiceBuilder',
+        'ExportInvoiceData',
+        'DeliveryTerms',
+        'DeliveryInfo',
+        'ExchangeRate',
+    ),
+    'contingency_invoice_builder': (
+        'ContingencyInvoiceBuilder',
+        'ContingencyInvoiceData',
+    ),
+    'pos_document_builder': (
+        'PosDocumentBuilder',
+        'PosDocumentData',
+    ),
 
-# SOAP WS-Security utilities
-from .soap_client import (
-    build_wssec_soap,
-    get_endpoint,
-    SOAP_ACTIONS,
-    build_send_test_set_body,
-    build_send_bill_sync_body,
-    build_send_bill_async_body,
-    build_get_status_body,
-    build_get_status_zip_body,
-)
+    # Nucleo comun de emision
+    'document_core': (
+        'DocumentSpec',
+        'DocumentTotals',
+        'compute_document_totals',
+        'INVOICE_STEPS',
+        'NOTE_STEPS',
+    ),
 
-# AllowanceCharge (descuentos y cargos)
-from .allowance_charge import (
-    AllowanceCharge,
-    add_allowance_charges_to_element,
-    calculate_totals,
-    create_discount,
-    create_charge,
-    ALLOWANCE_REASON_CODES,
-    CHARGE_REASON_CODES,
-)
+    # Fragmentos XML cacheados
+    'fragments': (
+        'FragmentCache',
+        'PartyFragmentCache',
+        'DEFAULT_PARTY_CACHE_SIZE',
+        'DEFAULT_SUPPLIER_CACHE_SIZE',
+    ),
 
-# Sistema de impuestos
-from .taxes import (
-    Tax,
-    TaxTotal,
-    TAX_CODES as TAX_CODES_FULL,
-    TAX_NAMES,
-    WITHHOLDING_TAX_CODES,
-    IVA_RATES,
-    RETENTION_RATES,
-    truncar,
-    truncar_decimal,
-    formato_dinero,
-    agrupar_impuestos,
-    separar_impuestos_retenciones,
-    calcular_totales_impuestos,
-)
+    # Carga masiva
+    'bulk': (
+        'BulkInvoiceFactory',
+        'BulkResult',
+        'DocumentProcessor',
+        'group_rows',
+        'read_csv_rows',
+        'read_jsonl_rows',
+        'rows_to_invoice_data',
+    ),
 
-# Sistema de excepciones
-from .exceptions import (
-    FachoError,
-    ValidationError,
-    ConfigurationError,
-    SignatureError,
-    CertificateError,
-    CertificateExpiredError,
-    CertificateRevokedError,
-    DianError,
-    DuplicateInvoiceError,
-    XmlBuildError,
-    CufeError,
-    CufeValidationError,
-    RangeError,
-    ResolutionExpiredError,
-    ResolutionNotFoundError,
-    ReferenceNotFoundError,
-    TotalsValidationError,
-    UvtLimitExceededError,
-    NetworkError,
-    FachoTimeoutError,
-    DIAN_ERROR_CODES,
-    get_dian_error_description,
-    parse_dian_errors,
-    create_dian_exception,
-)
+    # CUFE/CUDE/CUDS Calculator
+    'cufe': (
+        'CufeInput',
+        'CufeBatch',
+        'calculate_cufe',
+        'calculate_cude',
+        'calculate_cuds',
+        'calculate_software_security_code',
+        'calculate_cufe_from_taxes',
+        'calculate_cude_from_taxes',
+        'verify_cufe',
+        'verify_cude',
+        'get_uuid_type',
+        'calculate_uuid_by_doc_type',
+        'format_amount',
+        'build_cufe_string',
+        'uuid_string',
+        'compute_uuid',
+    ),
 
-# Validadores
-from .validators import (
-    InvoiceValidator,
-    ConfigValidator,
-    PartyValidator,
-    InvoiceLineValidator,
-    ProductionValidator,
-    validate_invoice,
-    validate_before_build,
-    validate_nit,
-    validate_date,
-    validate_time,
-    validate_uuid,
-    validate_not_empty,
-    validate_positive_number,
-    validate_resolution_dates,
-    validate_cufe_format,
-    validate_consecutive_in_range,
-    validate_totals,
-    validate_credit_note_reference,
-    validate_debit_note_reference,
-    validate_export_invoice,
-    validate_pos_limits,
-    calculate_remaining_in_range,
-    is_resolution_expiring_soon,
-)
+    # SOAP WS-Security utilities
+    'soap_client': (
+        'build_wssec_soap',
+        'get_endpoint',
+        'SOAP_ACTIONS',
+        'build_send_test_set_body',
+        'build_send_bill_sync_body',
+        'build_send_bill_async_body',
+        'build_get_status_body',
+        'build_get_status_zip_body',
+    ),
 
-# Constantes
-from .constants import (
-    NS,
-    NS_SOAP,
-    SCHEME_AGENCY_ATTRS,
-    DIAN_PROFILE_ID,
-    DIAN_PROFILE_ID_CREDIT_NOTE,
-    DIAN_PROFILE_ID_DEBIT_NOTE,
-    DIAN_PROFILE_ID_EXPORT,
-    DIAN_PROFILE_ID_CONTINGENCY,
-    DIAN_PROFILE_ID_SUPPORT,
-    DIAN_UBL_VERSION,
-    DIAN_CUSTOMIZATION_ID,
-    INVOICE_TYPE_CODE,
-    CREDIT_NOTE_TYPE_CODE,
-    DEBIT_NOTE_TYPE_CODE,
-    EXPORT_INVOICE_TYPE_CODE,
-    POS_INVOICE_TYPE_CODE,
-    CONTINGENCY_INVOICE_TYPE_CODE,
-    SUPPORT_DOCUMENT_TYPE_CODE,
-    TAX_CODES,
-    CREDIT_REASONS,
-    DEBIT_REASONS,
-    DOC_TYPES,
-    DOC_TYPES_FULL,
-    COUNTRY_ID_ATTRS,
-    AUTHORIZATION_PROVIDER_ID,
-    INCOTERMS,
-    CURRENCIES,
-    DIAN_ENDPOINTS,
-    GENERIC_CONSUMER,
-    UVT_VALUES,
-    TAX_REGIMES,
-    ID_TYPES,
-    CREDIT_NOTE_RESPONSE_CODES,
-    DEBIT_NOTE_RESPONSE_CODES,
-    # Algoritmos de firma
-    C14N_ALG,
-    C14N_EXC_ALG,
-    ENVELOPED_SIG,
-    RSA_SHA256,
-    SHA256_ALG,
-    SIGNED_PROPS_TYPE,
-    POLITICA_URL,
-    POLITICA_HASH,
-)
+    # AllowanceCharge (descuentos y cargos)
+    'allowance_charge': (
+        'AllowanceCharge',
+        'add_allowance_charges_to_element',
+        'calculate_totals',
+        'create_discount',
+        'create_charge',
+        'ALLOWANCE_REASON_CODES',
+        'CHARGE_REASON_CODES',
+    ),
+
+    # Sistema de impuestos
+    'taxes': (
+        'Tax',
+        'TaxTotal',
+        'TAX_NAMES',
+        'WITHHOLDING_TAX_CODES',
+        'IVA_RATES',
+        'RETENTION_RATES',
+        'truncar',
+        'truncar_decimal',
+        'formato_dinero',
+        'agrupar_impuestos',
+        'separar_impuestos_retenciones',
+        'calcular_totales_impuestos',
+    ),
+
+    # Sistema de excepciones
+    'exceptions': (
+        'FachoError',
+        'ValidationError',
+        'ConfigurationError',
+        'SignatureError',
+        'CertificateError',
+        'CertificateExpiredError',
+        'CertificateRevokedError',
+        'DianError',
+        'DuplicateInvoiceError',
+        'XmlBuildError',
+        'CufeError',
+        'CufeValidationError',
+        'RangeError',
+        'ResolutionExpiredError',
+        'ResolutionNotFoundError',
+        'ReferenceNotFoundError',
+        'TotalsValidationError',
+        'UvtLimitExceededError',
+        'BulkInputError',
+        'NetworkError',
+        'FachoTimeoutError',
+        'CircuitOpenError',
+        'RateLimitedError',
+        'DIAN_ERROR_CODES',
+        'get_dian_error_description',
+        'parse_dian_errors',
+        'create_dian_exception',
+    ),
+
+    # Validadores
+    'validators': (
+        'InvoiceValidator',
+        'ConfigValidator',
+        'PartyValidator',
+        'InvoiceLineValidator',
+        'ProductionValidator',
+        'validate_invoice',
+        'validate_before_build',
+        'validate_nit',
+        'validate_date',
+        'validate_time',
+        'validate_uuid',
+        'validate_not_empty',
+        'validate_positive_number',
+        'validate_resolution_dates',
+        'validate_cufe_format',
+        'validate_consecutive_in_range',
+        'validate_totals',
+        'validate_credit_note_reference',
+        'validate_debit_note_reference',
+        'validate_export_invoice',
+        'validate_pos_limits',
+        'calculate_remaining_in_range',
+        'is_resolution_expiring_soon',
+    ),
+
+    # Reglas de validacion compiladas
+    'rules': (
+        'Rule',
+        'RuleSet',
+        'RuleViolation',
+        'InvoiceRuleChecker',
+        'CHECKS',
+        'CONFIG_RULES',
+        'DOCUMENT_RULES',
+        'PRODUCTION_RULES',
+    ),
+
+    # Validacion de lotes
+    'batch_validation': (
+        'BatchValidator',
+        'BatchValidationReport',
+    ),
+
+    # Constantes
+    'constants': (
+        'NS',
+        'NS_SOAP',
+        'SCHEME_AGENCY_ATTRS',
+        'DIAN_PROFILE_ID',
+        'DIAN_PROFILE_ID_CREDIT_NOTE',
+        'DIAN_PROFILE_ID_DEBIT_NOTE',
+        'DIAN_PROFILE_ID_EXPORT',
+        'DIAN_PROFILE_ID_CONTINGENCY',
+        'DIAN_PROFILE_ID_SUPPORT',
+        'DIAN_UBL_VERSION',
+        'DIAN_CUSTOMIZATION_ID',
+        'INVOICE_TYPE_CODE',
+        'CREDIT_NOTE_TYPE_CODE',
+        'DEBIT_NOTE_TYPE_CODE',
+        'EXPORT_INVOICE_TYPE_CODE',
+        'POS_INVOICE_TYPE_CODE',
+        'CONTINGENCY_INVOICE_TYPE_CODE',
+        'SUPPORT_DOCUMENT_TYPE_CODE',
+        'TAX_CODES',
+        'CREDIT_REASONS',
+        'DEBIT_REASONS',
+        'DOC_TYPES',
+        'DOC_TYPES_FULL',
+        'COUNTRY_ID_ATTRS',
+        'AUTHORIZATION_PROVIDER_ID',
+        'INCOTERMS',
+        'CURRENCIES',
+        'DIAN_ENDPOINTS',
+        'GENERIC_CONSUMER',
+        'UVT_VALUES',
+        'TAX_REGIMES',
+        'ID_TYPES',
+        'CREDIT_NOTE_RESPONSE_CODES',
+        'DEBIT_NOTE_RESPONSE_CODES',
+        # Algoritmos de firma
+        'C14N_ALG',
+        'C14N_EXC_ALG',
+        'ENVELOPED_SIG',
+        'RSA_SHA256',
+        'SHA256_ALG',
+        'SIGNED_PROPS_TYPE',
+        'POLITICA_URL',
+        'POLITICA_HASH',
+    ),
+}
+
+_LAZY_ALIASES = {
+    'TAX_CODES_FULL': ('taxes', 'TAX_CODES'),
+}
 
 __all__ = [
     # Builders
@@ -216,8 +289,28 @@ __all__ = [
     'DeliveryInfo',
     'ExchangeRate',
     'AllowanceCharge',
+    # Document core
+    'DocumentSpec',
+    'DocumentTotals',
+    'compute_document_totals',
+    'INVOICE_STEPS',
+    'NOTE_STEPS',
+    # Fragment caches
+    'FragmentCache',
+    'PartyFragmentCache',
+    'DEFAULT_PARTY_CACHE_SIZE',
+    'DEFAULT_SUPPLIER_CACHE_SIZE',
+    # Bulk
+    'BulkInvoiceFactory',
+    'BulkResult',
+    'DocumentProcessor',
+    'group_rows',
+    'read_csv_rows',
+    'read_jsonl_rows',
+    'rows_to_invoice_data',
     # CUFE/CUDE/CUDS
     'CufeInput',
+    'CufeBatch',
     'calculate_cufe',
     'calculate_cude',
     'calculate_cuds',
@@ -230,6 +323,8 @@ __all__ = [
     'calculate_uuid_by_doc_type',
     'format_amount',
     'build_cufe_string',
+    'uuid_string',
+    'compute_uuid',
     # SOAP WS-Security
     'build_wssec_soap',
     'get_endpoint',
@@ -272,8 +367,11 @@ __all__ = [
     'ReferenceNotFoundError',
     'TotalsValidationError',
     'UvtLimitExceededError',
+    'BulkInputError',
     'NetworkError',
     'FachoTimeoutError',
+    'CircuitOpenError',
+    'RateLimitedError',
     'DIAN_ERROR_CODES',
     'get_dian_error_description',
     'parse_dian_errors',
@@ -302,6 +400,18 @@ __all__ = [
     'validate_pos_limits',
     'calculate_remaining_in_range',
     'is_resolution_expiring_soon',
+    # Rules
+    'Rule',
+    'RuleSet',
+    'RuleViolation',
+    'InvoiceRuleChecker',
+    'CHECKS',
+    'CONFIG_RULES',
+    'DOCUMENT_RULES',
+    'PRODUCTION_RULES',
+    # Batch validation
+    'BatchValidator',
+    'BatchValidationReport',
     # Constants
     'NS',
     'NS_SOAP',
@@ -354,3 +464,5 @@ __all__ = [
     'POLITICA_URL',
     'POLITICA_HASH',
 ]
+
+install(globals(), _LAZY_EXPORTS, _LAZY_ALIASES)
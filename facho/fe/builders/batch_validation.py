@@ -0,0 +1,253 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Validacion entre documentos de un lote antes de enviarlo a DIAN.
+
+Complementa la validacion por documento (InvoiceRuleChecker) con los
+chequeos que dependen de otros documentos:
+
+- Numeros repetidos dentro del lote o ya registrados en el tracker
+- Consecutivos fuera del rango de la resolucion y rango disponible
+  despues del lote
+- Notas credito/debito que referencian facturas inexistentes, aun no
+  validadas por DIAN o con CUFE/fecha distintos a los registrados
+
+Los indices (numeros del lote, numeros y facturas del tracker) se
+construyen una sola vez por llamada; cada documento se verifica con
+busquedas en diccionarios, de modo que el lote completo es O(n + m).
+
+Ejemplo:
+    validator = BatchValidator(config, tracker=tracker)
+    report = validator.validate(documents)
+    if not report.is_valid:
+        for index in report.invalid_indexes():
+            print(documents[index].number, report.violations[index])
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from .credit_note_builder import CreditNoteData
+from .debit_note_builder import DebitNoteData
+from .rules import RuleViolation, parse_consecutive
+from .validators import validate_consecutive_in_range
+
+
+# Codigos DIAN de referencia por tipo de nota: (no existe, CUFE, fecha)
+REFERENCE_CODES = {
+    'credito': ('NCB01', 'NCB02', 'NCB03'),
+    'debito': ('NDB01', 'NDB02', 'FAB04'),
+}
+
+
+def _note_type(document: Any) -> Optional[str]:
+    if isinstance(document, CreditNoteData):
+        return 'credito'
+    if isinstance(document, DebitNoteData):
+        return 'debito'
+    return None
+
+
+@dataclass
+class BatchValidationReport:
+    """
+    Resultado de la validacion de un lote.
+
+    Attributes:
+        violations: Errores de cada documento, alineados con el lote
+        remaining_in_range: Consecutivos disponibles en la resolucion
+            despues del mayor consecutivo del lote
+    """
+    violations: List[List[RuleViolation]] = field(default_factory=list)
+    remaining_in_range: Optional[int] = None
+
+    @property
+    def is_valid(self) -> bool:
+        return not any(self.violations)
+
+    def invalid_indexes(self) -> List[int]:
+        """Posiciones de los documentos con errores."""
+        return [i for i, errors in enumerate(self.violations) if errors]
+
+    def summary(self) -> Dict[str, int]:
+        """Cantidad de errores por codigo DIAN."""
+        counts: Dict[str, int] = {}
+        for errors in self.violations:
+            for violation in errors:
+                counts[violation.code] = counts.get(violation.code, 0) + 1
+        return counts
+
+
+class BatchValidator:
+    """
+    Validador de lotes de facturas y notas.
+
+    Args:
+        config: Configuracion de facturacion (prefijo y rango de la
+            resolucion)
+        tracker: DocumentTracker con los documentos ya enviados (opcional;
+            sin tracker solo se validan las referencias dentro del lote)
+        allow_pending_in_batch: Aceptar notas que referencian una factura
+            anterior del mismo lote (aun sin validar por DIAN); una factura
+            posterior a la nota siempre es un error
+    """
+
+    def __init__(
+        self,
+        config: Any,
+        tracker: Any = None,
+        allow_pending_in_batch: bool = False
+    ):
+        self.config = config
+        self.tracker = tracker
+        self.allow_pending_in_batch = allow_pending_in_batch
+
+    def validate(self, documents: Sequence[Any]) -> BatchValidationReport:
+        """
+        Validar un lote de documentos.
+
+        Args:
+            documents: InvoiceData, CreditNoteData o DebitNoteData
+
+        Returns:
+            BatchValidationReport
+        """
+        tracked_numbers, tracked_invoices = self._tracker_indexes()
+        prefix = getattr(self.config, 'prefix', '') or ''
+        range_from, range_to = self._range()
+
+        report = BatchValidationReport(
+            violations=[[] for _ in documents]
+        )
+        note_types = [_note_type(document) for document in documents]
+        batch_invoices: Dict[str, int] = {}
+        for index, document in enumerate(documents):
+            if note_types[index] is None:
+                batch_invoices.setdefault(getattr(document, 'number', None), index)
+
+        first_seen: Dict[str, int] = {}
+        highest = None
+        for index, document in enumerate(documents):
+            errors = report.violations[index]
+            number = getattr(document, 'number', None)
+            note_type = note_types[index]
+
+            # Numeros repetidos
+            if number in first_seen:
+                errors.append(RuleViolation(
+                    'FAN01', 'number',
+                    f"Numero {number} repetido en el lote "
+                    f"(documento {first_seen[number] + 1})"
+                ))
+            elif number:
+                first_seen[number] = index
+            if number in tracked_numbers:
+                errors.append(RuleViolation(
+                    'FAN01', 'number', f"Numero {number} ya fue registrado"
+                ))
+
+            # Rango de la resolucion (solo facturas: las notas no tienen rango)
+            if note_type is None and number and range_to is not None:
+                consecutive = parse_consecutive(number, prefix)
+                if consecutive is None:
+                    pass
+                elif range_from <= consecutive <= range_to:
+                    if highest is None or consecutive > highest:
+                        highest = consecutive
+                else:
+                    errors.extend(
+                        RuleViolation('FAN02', 'number', message)
+                        for message in validate_consecutive_in_range(
+                            consecutive, range_from, range_to, prefix
+                        )
+                    )
+
+            # Referencia de notas
+            if note_type is not None:
+                errors.extend(self._reference_errors(
+                    document, index, note_type, batch_invoices, tracked_invoices
+                ))
+
+        if range_to is not None:
+            current = highest
+            if current is None:
+                current = range_from - 1
+            report.remaining_in_range = max(0, range_to - current)
+        return report
+
+    def _range(self):
+        try:
+            return (int(getattr(self.config, 'range_from', None)),
+                    int(getattr(self.config, 'range_to', None)))
+        except (TypeError, ValueError):
+            return None, None
+
+    def _tracker_indexes(self):
+        """Numeros registrados y facturas por numero, en un solo recorrido."""
+        if self.tracker is None:
+            return set(), {}
+        invoices = self.tracker.get_invoices()
+        numbers = {doc.number for doc in invoices}
+        numbers.update(doc.number for doc in self.tracker.get_credit_notes())
+        numbers.update(doc.number for doc in self.tracker.get_debit_notes())
+        return numbers, {doc.number: doc for doc in invoices}
+
+    def _reference_errors(
+        self,
+        document: Any,
+        index: int,
+        note_type: str,
+        batch_invoices: Dict[str, int],
+        tracked_invoices: Dict[str, Any]
+    ) -> List[RuleViolation]:
+        missing_code, uuid_code, date_code = REFERENCE_CODES[note_type]
+        reference = document.billing_reference_id
+        field_name = 'billing_reference_id'
+        if not reference:
+            return []
+
+        tracked = tracked_invoices.get(reference)
+        if tracked is None:
+            in_batch = batch_invoices.get(reference)
+            if in_batch is not None:
+                if self.allow_pending_in_batch and in_batch < index:
+                    return []
+                return [RuleViolation(
+                    missing_code, field_name,
+                    f"Factura referenciada {reference} aun no ha sido "
+                    f"validada por DIAN (esta en el mismo lote)"
+                )]
+            if self.tracker is None:
+                # Sin tracker no hay como saber si la factura existe
+                return []
+            return [RuleViolation(
+                missing_code, field_name,
+                f"Factura referenciada {reference} no existe"
+            )]
+
+        if tracked.is_valid is not True:
+            state = 'rechazada' if tracked.is_valid is False else 'pendiente'
+            return [RuleViolation(
+                missing_code, field_name,
+                f"Factura referenciada {reference} aun no es valida en DIAN "
+                f"(estado: {state})"
+            )]
+
+        errors = []
+        uuid = document.billing_reference_uuid
+        if uuid and tracked.uuid and uuid != tracked.uuid:
+            errors.append(RuleViolation(
+                uuid_code, 'billing_reference_uuid',
+                f"CUFE de factura referenciada {reference} no coincide "
+                f"con el registrado"
+            ))
+        issue_date = document.billing_reference_date
+        if issue_date and tracked.issue_date and issue_date != tracked.issue_date:
+            errors.append(RuleViolation(
+                date_code, 'billing_reference_date',
+                f"Fecha de factura referenciada {reference} ({issue_date}) "
+                f"no coincide con la registrada ({tracked.issue_date})"
+            ))
+        return errors
+
@@ -0,0 +1,727 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Construccion masiva de facturas desde fuentes tabulares.
+
+Lee filas de encabezado y filas de linea como un flujo (CSV, JSON Lines
+o cualquier iterable de diccionarios), agrupa las lineas por numero de
+documento y entrega cada documento construido, opcionalmente firmado y
+comprimido en ZIP.
+
+La memoria es acotada: solo se mantiene en memoria el documento que se
+esta agrupando y un numero limitado de documentos en proceso. Para eso
+las filas deben venir agrupadas por numero de documento (como las
+exporta un ERP): todas las lineas de un documento contiguas y, si se
+usan dos fuentes, en el mismo orden que los encabezados.
+
+Columnas de encabezado:
+    number, issue_date, issue_time, due_date, note y los datos del
+    cliente con prefijo 'customer_' (customer_nit, customer_name,
+    customer_legal_name, customer_organization_code,
+    customer_tax_level_code, customer_scheme_name, customer_email,
+    customer_city_code, customer_city_name, customer_postal_zone,
+    customer_country_subentity, customer_country_subentity_code,
+    customer_address_line, ...)
+
+Columnas de linea:
+    number, description, quantity, unit_code, unit_price, tax_percent,
+    item_id y opcionalmente taxes ('01:19;04:8;06:2.5' o lista de
+    diccionarios {'code': '01', 'percent': 19}).
+
+Example:
+    factory = BulkInvoiceFactory(config, supplier, jobs=4, zip_output=True)
+    for result in factory.build_csv('facturas.csv', 'lineas.csv'):
+        if result.ok:
+            guardar(result.zip_name, result.zip_content)
+        else:
+            print(result.number, result.error)
+"""
+
+import csv
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from lxml import etree
+
+from .constants import NS
+from .exceptions import BulkInputError, FachoError
+from .invoice_builder import InvoiceBuilder, InvoiceConfig, InvoiceData, InvoiceLine, Party, Address
+from .taxes import Tax
+from .validators import validate_before_build
+from ..packaging import DEFAULT_COMPRESSION_LEVEL, package_xml
+from ..signing import XAdESSigner
+
+
+# Columna que identifica el documento en encabezados y lineas
+DEFAULT_KEY_COLUMN = 'number'
+
+# Prefijo de las columnas del cliente en el encabezado
+CUSTOMER_PREFIX = 'customer_'
+
+# Documentos en proceso por trabajador (limita la memoria)
+PENDING_PER_JOB = 4
+
+Row = Dict[str, Any]
+DocumentRows = Tuple[Row, List[Row]]
+
+
+# =============================================================================
+# LECTURA DE FUENTES
+# =============================================================================
+
+def _open_text(source, encoding: str):
+    """Abrir ruta o devolver el archivo ya abierto."""
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        return open(source, newline='', encoding=encoding), True
+    return source, False
+
+
+def read_csv_rows(
+    source,
+    delimiter: str = ',',
+    encoding: str = 'utf-8'
+) -> Iterator[Row]:
+    """
+    Leer filas de un CSV como diccionarios, una a la vez.
+
+    Args:
+        source: Ruta o archivo de texto abierto
+        delimiter: Separador de columnas
+        encoding: Codificacion del archivo
+
+    Yields:
+        Diccionario por fila (valores vacios como None)
+    """
+    handle, owned = _open_text(source, encoding)
+    try:
+        for row in csv.DictReader(handle, delimiter=delimiter):
+            yield {k: (v if v != '' else None) for k, v in row.items()}
+    finally:
+        if owned:
+            handle.close()
+
+
+def read_jsonl_rows(source, encoding: str = 'utf-8') -> Iterator[Row]:
+    """
+    Leer filas de un archivo JSON Lines, una a la vez.
+
+    Args:
+        source: Ruta o archivo de texto abierto
+        encoding: Codificacion del archivo
+
+    Yields:
+        Diccionario por linea no vacia
+    """
+    handle, owned = _open_text(source, encoding)
+    try:
+        for line_number, line in enumerate(handle, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise BulkInputError(f"JSON invalido: {e}", row=line_number)
+    finally:
+        if owned:
+            handle.close()
+
+
+# =============================================================================
+# AGRUPACION POR DOCUMENTO
+# =============================================================================
+
+def _key(row: Row, key: str, row_number: int) -> str:
+    value = row.get(key)
+    if value in (None, ''):
+        raise BulkInputError(f"Fila sin columna '{key}'", row=row_number)
+    return str(value)
+
+
+def group_rows(
+    headers: Iterable[Row],
+    lines: Iterable[Row] = None,
+    key: str = DEFAULT_KEY_COLUMN
+) -> Iterator[DocumentRows]:
+    """
+    Agrupar filas por numero de documento.
+
+    Con una sola fuente, cada fila trae encabezado y linea (formato
+    desnormalizado) o el encabezado trae sus lineas en la columna
+    'lines' (JSON Lines). Con dos fuentes, las lineas deben venir en el
+    mismo orden que los encabezados.
+
+    Args:
+        headers: Filas de encabezado (o filas desnormalizadas)
+        lines: Filas de linea (opcional)
+        key: Columna con el numero de documento
+
+    Yields:
+        Tupla (encabezado, lineas) por documento
+
+    Raises:
+        BulkInputError: Si las lineas no estan en el orden de los
+            encabezados o un documento no tiene lineas
+    """
+    if lines is None:
+        yield from _group_single(headers, key)
+    else:
+        yield from _group_merge(headers, lines, key)
+
+
+def _group_single(rows: Iterable[Row], key: str) -> Iterator[DocumentRows]:
+    current_key = None
+    header: Row = None
+    group: List[Row] = []
+
+    for row_number, row in enumerate(rows, 1):
+        if isinstance(row.get('lines'), list):
+            if header is not None:
+                yield header, group
+                header, current_key = None, None
+            _key(row, key, row_number)
+            yield row, row['lines']
+            continue
+
+        row_key = _key(row, key, row_number)
+        if row_key != current_key:
+            if header is not None:
+                yield header, group
+            current_key, header, group = row_key, row, []
+        group.append(row)
+
+    if header is not None:
+        yield header, group
+
+
+def _group_merge(
+    headers: Iterable[Row],
+    lines: Iterable[Row],
+    key: str
+) -> Iterator[DocumentRows]:
+    line_iter = enumerate(lines, 1)
+    pending: Optional[Tuple[int, Row]] = next(line_iter, None)
+
+    for header_number, header in enumerate(headers, 1):
+        header_key = _key(header, key, header_number)
+        group: List[Row] = []
+        while pending is not None:
+            row_number, row = pending
+            if _key(row, key, row_number) != header_key:
+                break
+            group.append(row)
+            pending = next(line_iter, None)
+
+        if not group:
+            raise BulkInputError(
+                "Documento sin lineas o lineas fuera de orden",
+                document_number=header_key,
+                row=pending[0] if pending else None
+            )
+        yield header, group
+
+    if pending is not None:
+        row_number, row = pending
+        raise BulkInputError(
+            "Linea sin encabezado",
+            document_number=row.get(key),
+            row=row_number
+        )
+
+
+# =============================================================================
+# CONVERSION DE FILAS
+# =============================================================================
+
+_ADDRESS_FIELDS = [f.name for f in fields(Address)]
+_PARTY_FIELDS = [f.name for f in fields(Party) if f.name != 'address']
+
+
+def _number(value: Any, name: str, default: float = None) -> float:
+    if value in (None, ''):
+        if default is None:
+            raise BulkInputError(f"Columna '{name}' requerida")
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise BulkInputError(f"Valor numerico invalido en '{name}': {value}")
+
+
+def row_to_party(row: Row, prefix: str = CUSTOMER_PREFIX) -> Party:
+    """
+    Construir Party a partir de las columnas con prefijo.
+
+    Args:
+        row: Fila de encabezado
+        prefix: Prefijo de las columnas de la parte
+
+    Returns:
+        Party con direccion si la fila trae customer_city_code
+    """
+    values = {
+        name: row[prefix + name]
+        for name in _PARTY_FIELDS
+        if row.get(prefix + name) not in (None, '')
+    }
+    if 'legal_name' not in values and 'name' in values:
+        values['legal_name'] = values['name']
+
+    if row.get(prefix + 'city_code') not in (None, ''):
+        values['address'] = Address(**{
+            name: row[prefix + name]
+            for name in _ADDRESS_FIELDS
+            if row.get(prefix + name) not in (None, '')
+        })
+
+    try:
+        return Party(**values)
+    except TypeError as e:
+        raise BulkInputError(f"Datos de cliente incompletos: {e}")
+
+
+def parse_taxes(value: Any, taxable_amount: float) -> List[Tax]:
+    """
+    Convertir la columna 'taxes' en impuestos de la linea.
+
+    Args:
+        value: '01:19;04:8' o lista de diccionarios con code y percent
+        taxable_amount: Base gravable de la linea
+
+    Returns:
+        Lista de Tax
+    """
+    if isinstance(value, str):
+        items = []
+        for part in value.split(';'):
+            part = part.strip()
+            if not part:
+                continue
+            code, _, percent = part.partition(':')
+            items.append({'code': code.strip(), 'percent': percent})
+    else:
+        items = value
+
+    taxes = []
+    for item in items:
+        taxes.append(Tax(
+            code=str(item['code']),
+            percent=_number(item.get('percent'), 'taxes', 0.0),
+            taxable_amount=_number(
+                item.get('taxable_amount'), 'taxes', taxable_amount
+            ),
+        ))
+    return taxes
+
+
+def row_to_line(row: Row) -> InvoiceLine:
+    """
+    Construir InvoiceLine a partir de una fila de linea.
+
+    Args:
+        row: Fila con description, quantity, unit_price, ...
+
+    Returns:
+        InvoiceLine
+    """
+    quantity = _number(row.get('quantity'), 'quantity')
+    unit_price = _number(row.get('unit_price'), 'unit_price')
+    taxes = None
+    if row.get('taxes') not in (None, ''):
+        taxes = parse_taxes(row['taxes'], quantity * unit_price)
+
+    return InvoiceLine(
+        description=row.get('description') or '',
+        quantity=quantity,
+        unit_code=str(row.get('unit_code') or '94'),
+        unit_price=unit_price,
+        tax_percent=_number(row.get('tax_percent'), 'tax_percent', 19.0),
+        taxes=taxes,
+        item_id=str(row.get('item_id') or ''),
+    )
+
+
+def rows_to_invoice_data(
+    header: Row,
+    lines: List[Row],
+    supplier: Party
+) -> InvoiceData:
+    """
+    Construir InvoiceData a partir de un documento agrupado.
+
+    Args:
+        header: Fila de encabezado
+        lines: Filas de linea del documento
+        supplier: Emisor de todas las facturas de la carga
+
+    Returns:
+        InvoiceData
+    """
+    data = InvoiceData(
+        number=str(header[DEFAULT_KEY_COLUMN]),
+        issue_date=header.get('issue_date'),
+        issue_time=header.get('issue_time'),
+        due_date=header.get('due_date'),
+        supplier=supplier,
+        customer=row_to_party(header),
+        lines=[row_to_line(row) for row in lines],
+    )
+    if header.get('note'):
+        data.note = header['note']
+    return data
+
+
+# =============================================================================
+# RESULTADOS
+# =============================================================================
+
+@dataclass
+class BulkResult:
+    """
+    Resultado de construir un documento.
+
+    Attributes:
+        number: Numero del documento
+        uuid: CUFE/CUDE del documento
+        issue_date: Fecha de emision
+        issue_time: Hora de emision
+        total: Valor a pagar (PayableAmount)
+        xml: XML serializado (firmado si hay certificado)
+        zip_name: Nombre del ZIP (si se pidio zip_output)
+        zip_content: Contenido del ZIP
+        error: Mensaje de error si el documento no se pudo construir
+        timings: Segundos por etapa (build, validate, sign, zip)
+    """
+    number: str
+    uuid: str = None
+    issue_date: str = None
+    issue_time: str = None
+    total: float = 0.0
+    xml: bytes = None
+    zip_name: str = None
+    zip_content: bytes = None
+    error: str = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        """True si el documento se construyo."""
+        return self.error is None
+
+
+def zip_document(
+    xml_bytes: bytes,
+    file_name: str,
+    compression_level: int = DEFAULT_COMPRESSION_LEVEL
+) -> bytes:
+    """
+    Comprimir un XML en un ZIP con un solo archivo.
+
+    Args:
+        xml_bytes: Contenido del XML
+        file_name: Nombre del XML dentro del ZIP
+        compression_level: Nivel de compresion 0-9 (ver facho.fe.packaging)
+
+    Returns:
+        Contenido del ZIP
+    """
+    return package_xml(xml_bytes, file_name, compression_level=compression_level).content
+
+
+# Prefijo de archivo por elemento raiz (fv = factura de venta)
+FILE_PREFIXES = {
+    'Invoice': 'fv',
+    'CreditNote': 'nc',
+    'DebitNote': 'nd',
+}
+
+
+# =============================================================================
+# PROCESADOR DE DOCUMENTOS
+# =============================================================================
+
+class DocumentProcessor:
+    """
+    Construir, validar, firmar y comprimir un documento.
+
+    Mantiene un builder y un firmante que se reutilizan entre documentos.
+    Es el trabajo que cada proceso ejecuta en BulkInvoiceFactory y en
+    DocumentPipeline.
+
+    Args:
+        config: Configuracion de facturacion
+        builder_class: Clase del builder (InvoiceBuilder o subclase)
+        pkcs12: Contenido del certificado .p12 para firmar (opcional)
+        password: Contrasena del certificado
+        zip_output: Generar ZIP por documento
+        validate: Validar con validate_before_build antes de construir
+            (si el builder no lo hace ya)
+        compression_level: Nivel de compresion del ZIP (0-9)
+        signing_socket: Socket de un SigningDaemon (alternativa a pkcs12):
+            el proceso firma sin cargar el certificado
+    """
+
+    def __init__(
+        self,
+        config: InvoiceConfig,
+        builder_class: type = InvoiceBuilder,
+        pkcs12: bytes = None,
+        password: str = None,
+        zip_output: bool = False,
+        validate: bool = False,
+        compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+        signing_socket: str = None
+    ):
+        self.config = config
+        self.builder = builder_class(config)
+        if signing_socket is not None:
+            from ..signing.daemon import remote_signer
+            self.signer = remote_signer(signing_socket)
+        elif pkcs12 is not None:
+            self.signer = XAdESSigner.from_pkcs12_bytes(pkcs12, password)
+        else:
+            self.signer = None
+        self.zip_output = zip_output
+        self.compression_level = compression_level
+        self.validate = validate and not self.builder.SPEC.validate_data
+        self.file_prefix = FILE_PREFIXES.get(self.builder.SPEC.root_element, 'fv')
+
+    def process(self, data: Any) -> BulkResult:
+        """
+        Procesar un documento.
+
+        Args:
+            data: Datos del documento (InvoiceData, CreditNoteData, ...)
+
+        Returns:
+            BulkResult con el XML o con el error
+        """
+        result = BulkResult(
+            number=str(data.number),
+            issue_date=data.issue_date,
+            issue_time=data.issue_time,
+        )
+        timings = result.timings
+        try:
+            if self.validate:
+                start = time.perf_counter()
+                validate_before_build(
+                    data, self.config, self.builder.SPEC.display_name
+                )
+                timings['validate'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            doc = self.builder.build(data)
+            uuid_el = doc.find('{%s}UUID' % NS['cbc'])
+            total_el = doc.find('.//{%s}PayableAmount' % NS['cbc'])
+            timings['build'] = time.perf_counter() - start
+
+            if self.signer is not None:
+                start = time.perf_counter()
+                doc = self.signer.sign(doc)
+                timings['sign'] = time.perf_counter() - start
+
+            xml = etree.tostring(doc, encoding='UTF-8', xml_declaration=True)
+        except (FachoError, KeyError, ValueError) as e:
+            result.error = str(e)
+            return result
+
+        result.uuid = uuid_el.text if uuid_el is not None else None
+        result.total = float(total_el.text) if total_el is not None else 0.0
+        result.xml = xml
+        if self.zip_output:
+            start = time.perf_counter()
+            base_name = f"{self.file_prefix}{result.number}"
+            result.zip_name = f"{base_name}.zip"
+            result.zip_content = zip_document(
+                xml, f"{base_name}.xml", self.compression_level
+            )
+            timings['zip'] = time.perf_counter() - start
+        return result
+
+    def process_rows(
+        self,
+        header: Row,
+        lines: List[Row],
+        supplier: Party
+    ) -> BulkResult:
+        """
+        Convertir un documento agrupado a InvoiceData y procesarlo.
+
+        Args:
+            header: Fila de encabezado
+            lines: Filas de linea
+            supplier: Emisor
+
+        Returns:
+            BulkResult con el XML o con el error
+        """
+        try:
+            data = rows_to_invoice_data(header, lines, supplier)
+        except (FachoError, KeyError, ValueError) as e:
+            return BulkResult(
+                number=str(header.get(DEFAULT_KEY_COLUMN)), error=str(e)
+            )
+        return self.process(data)
+
+
+# Estado por proceso del pool de BulkInvoiceFactory
+_PROCESSOR: Optional[DocumentProcessor] = None
+_SUPPLIER: Optional[Party] = None
+
+
+def _init_worker(supplier: Party, *processor_args):
+    global _PROCESSOR, _SUPPLIER
+    _SUPPLIER = supplier
+    _PROCESSOR = DocumentProcessor(*processor_args)
+
+
+def _process_in_worker(item: DocumentRows) -> BulkResult:
+    return _PROCESSOR.process_rows(item[0], item[1], _SUPPLIER)
+
+
+# =============================================================================
+# FABRICA
+# =============================================================================
+
+class BulkInvoiceFactory:
+    """
+    Fabrica de facturas para cargas masivas.
+
+    Reutiliza InvoiceConfig y InvoiceBuilder (o una subclase que acepte
+    InvoiceData). Con jobs > 1 los documentos se construyen en un pool de
+    procesos; cada proceso crea su propio builder y firmante una sola vez,
+    de modo que las caches de fragmentos se aprovechan entre documentos.
+    Los resultados se entregan en el orden de entrada.
+
+    Args:
+        config: Configuracion de facturacion
+        supplier: Emisor de las facturas
+        builder_class: Clase del builder (default InvoiceBuilder)
+        pkcs12: Contenido del certificado .p12 para firmar (opcional)
+        password: Contrasena del certificado
+        zip_output: Generar ZIP por documento
+        compression_level: Nivel de compresion del ZIP (0-9)
+        jobs: Numero de procesos (1 = en el proceso actual)
+        max_pending: Documentos en proceso como maximo
+            (default jobs * PENDING_PER_JOB)
+        signing_socket: Socket de un SigningDaemon (alternativa a pkcs12)
+
+    Example:
+        factory = BulkInvoiceFactory(config, supplier, jobs=4)
+        for result in factory.build_jsonl('facturas.jsonl'):
+            ...
+    """
+
+    def __init__(
+        self,
+        config: InvoiceConfig,
+        supplier: Party,
+        builder_class: type = InvoiceBuilder,
+        pkcs12: bytes = None,
+        password: str = None,
+        zip_output: bool = False,
+        compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+        jobs: int = 1,
+        max_pending: int = None,
+        signing_socket: str = None
+    ):
+        if jobs < 1:
+            raise ValueError("jobs debe ser mayor o igual a 1")
+        self.jobs = jobs
+        self.max_pending = max_pending or jobs * PENDING_PER_JOB
+        self.supplier = supplier
+        self._processor_args = (
+            config, builder_class, pkcs12, password, zip_output, False,
+            compression_level, signing_socket,
+        )
+
+    def build(self, documents: Iterable[DocumentRows]) -> Iterator[BulkResult]:
+        """
+        Construir documentos ya agrupados.
+
+        Args:
+            documents: Iterable de (encabezado, lineas), ver group_rows
+
+        Yields:
+            BulkResult por documento, en el orden de entrada
+        """
+        if self.jobs == 1:
+            processor = DocumentProcessor(*self._processor_args)
+            for header, lines in documents:
+                yield processor.process_rows(header, lines, self.supplier)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=_init_worker,
+            initargs=(self.supplier,) + self._processor_args
+        ) as pool:
+            pending = deque()
+            for item in documents:
+                pending.append(pool.submit(_process_in_worker, item))
+                if len(pending) >= self.max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def build_rows(
+        self,
+        headers: Iterable[Row],
+        lines: Iterable[Row] = None,
+        key: str = DEFAULT_KEY_COLUMN
+    ) -> Iterator[BulkResult]:
+        """
+        Agrupar y construir desde iterables de diccionarios.
+
+        Sirve para cualquier fuente tabular (por ejemplo lotes de un
+        archivo Parquet convertidos a diccionarios).
+        """
+        return self.build(group_rows(headers, lines, key))
+
+    def build_csv(
+        self,
+        headers_source,
+        lines_source=None,
+        delimiter: str = ',',
+        encoding: str = 'utf-8'
+    ) -> Iterator[BulkResult]:
+        """
+        Construir desde CSV: un archivo desnormalizado o encabezados y lineas.
+
+        Args:
+            headers_source: Ruta o archivo con encabezados (o filas completas)
+            lines_source: Ruta o archivo con lineas (opcional)
+            delimiter: Separador de columnas
+            encoding: Codificacion de los archivos
+        """
+        headers = read_csv_rows(headers_source, delimiter, encoding)
+        lines = (
+            read_csv_rows(lines_source, delimiter, encoding)
+            if lines_source is not None else None
+        )
+        return self.build_rows(headers, lines)
+
+    def build_jsonl(
+        self,
+        headers_source,
+        lines_source=None,
+        encoding: str = 'utf-8'
+    ) -> Iterator[BulkResult]:
+        """
+        Construir desde JSON Lines.
+
+        Cada encabezado puede traer sus lineas en la clave 'lines' o
+        venir acompanado de un segundo archivo de lineas.
+        """
+        headers = read_jsonl_rows(headers_source, encoding)
+        lines = (
+            read_jsonl_rows(lines_source, encoding)
+            if lines_source is not None else None
+        )
+        return self.build_rows(headers, lines)
@@ -20,8 +20,12 @@ Formula general:
 """
 
 import hashlib
-from dataclasses import dataclass
-from typing import Dict, Optional
+import math
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import MISSING, dataclass, fields
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
 
 from .taxes import truncar
 
@@ -82,6 +86,98 @@ def format_amount(value: float, decimals: int = 2) -> str:
     return f"{truncated:.{decimals}f}"
 
 
+# =============================================================================
+# MOTOR DE CALCULO
+# =============================================================================
+
+# Cadena hasta ValorTotal, en el orden de _CUFE_ROW_FIELDS:
+# NumDoc FecDoc HoraDoc ValorBruto 01 ValorIVA 04 ValorINC 03 ValorICA ValorTotal
+_CUFE_HEAD_FORMAT = '%s%s%s%.2f01%.2f04%.2f03%.2f%.2f'
+
+
+def _truncated(value: float) -> float:
+    """truncar(value, 2) sin el caso general de decimales."""
+    return math.trunc(value * 100) / 100
+
+
+def uuid_string(
+    number: str,
+    issue_date: str,
+    issue_time: str,
+    subtotal: float,
+    iva_amount: float,
+    inc_amount: float,
+    ica_amount: float,
+    total: float,
+    supplier_nit: str,
+    customer_nit: str,
+    technical_key: str,
+    environment: str = '2',
+    truncate: bool = True
+) -> str:
+    """
+    Construir la cadena CUFE/CUDE/CUDS a partir de sus componentes.
+
+    Es el unico formateador de la cadena en facho: build_cufe_string,
+    CufeBatch, los builders y las funciones calcular_* de
+    facho.fe.client.dian_simple y dian_fe.utils pasan por aqui. Los
+    argumentos siguen el orden de la cadena, asi que una fila de
+    CufeBatch se puede pasar como *fila.
+
+    Args:
+        number, ..., environment: Componentes de la cadena (ver CufeInput)
+        truncate: True trunca los montos a 2 decimales (format_amount);
+            False los formatea con ':.2f', como las funciones calcular_*
+            y los builders, cuyos montos ya vienen con 2 decimales
+
+    Returns:
+        Cadena concatenada para hash
+    """
+    if truncate:
+        return _CUFE_HEAD_FORMAT % (
+            number, issue_date, issue_time,
+            _truncated(subtotal), _truncated(iva_amount), _truncated(inc_amount),
+            _truncated(ica_amount), _truncated(total),
+        ) + f"{supplier_nit}{customer_nit}{technical_key}{environment}"
+    return (
+        f"{number}{issue_date}{issue_time}"
+        f"{subtotal:.2f}01{iva_amount:.2f}04{inc_amount:.2f}03{ica_amount:.2f}"
+        f"{total:.2f}{supplier_nit}{customer_nit}"
+        f"{technical_key}{environment}"
+    )
+
+
+def compute_uuid(
+    number: str,
+    issue_date: str,
+    issue_time: str,
+    subtotal: float,
+    iva_amount: float,
+    inc_amount: float,
+    ica_amount: float,
+    total: float,
+    supplier_nit: str,
+    customer_nit: str,
+    technical_key: str,
+    environment: str = '2',
+    truncate: bool = True
+) -> str:
+    """
+    Calcular CUFE/CUDE/CUDS (SHA-384) a partir de sus componentes.
+
+    Args:
+        Los mismos de uuid_string
+
+    Returns:
+        Codigo de 96 caracteres hexadecimales
+    """
+    return hashlib.sha384(uuid_string(
+        number, issue_date, issue_time, subtotal, iva_amount, inc_amount,
+        ica_amount, total, supplier_nit, customer_nit, technical_key,
+        environment, truncate,
+    ).encode('utf-8')).hexdigest()
+
+
 def build_cufe_string(data: CufeInput) -> str:
     """
     Construir cadena para calculo de CUFE/CUDE.
@@ -97,22 +193,11 @@ def build_cufe_string(data: CufeInput) -> str:
     Returns:
         Cadena concatenada para hash
     """
-    return (
-        f"{data.number}"
-        f"{data.issue_date}"
-        f"{data.issue_time}"
-        f"{format_amount(data.subtotal)}"
-        f"01"
-        f"{format_amount(data.iva_amount)}"
-        f"04"
-        f"{format_amount(data.inc_amount)}"
-        f"03"
-        f"{format_amount(data.ica_amount)}"
-        f"{format_amount(data.total)}"
-        f"{data.supplier_nit}"
-        f"{data.customer_nit}"
-        f"{data.technical_key}"
-        f"{data.environment}"
+    return uuid_string(
+        data.number, data.issue_date, data.issue_time,
+        data.subtotal, data.iva_amount, data.inc_amount, data.ica_amount,
+        data.total, data.supplier_nit, data.customer_nit,
+        data.technical_key, data.environment,
     )
 
 
@@ -146,8 +231,7 @@ def calculate_cufe(data: CufeInput) -> str:
         >>> len(cufe)
         96
     """
-    cadena = build_cufe_string(data)
-    return hashlib.sha384(cadena.encode('utf-8')).hexdigest()
+    return hashlib.sha384(build_cufe_string(data).encode('utf-8')).hexdigest()
 
 
 def calculate_cude(data: CufeInput, software_pin: str = None) -> str:
@@ -181,26 +265,12 @@ def calculate_cude(data: CufeInput, software_pin: str = None) -> str:
         96
     """
     # Si se proporciona software_pin, usarlo; sino usar technical_key
-    if software_pin:
-        data_copy = CufeInput(
-            number=data.number,
-            issue_date=data.issue_date,
-            issue_time=data.issue_time,
-            subtotal=data.subtotal,
-            iva_amount=data.iva_amount,
-            inc_amount=data.inc_amount,
-            ica_amount=data.ica_amount,
-            total=data.total,
-            supplier_nit=data.supplier_nit,
-            customer_nit=data.customer_nit,
-            technical_key=software_pin,
-            environment=data.environment,
-        )
-        cadena = build_cufe_string(data_copy)
-    else:
-        cadena = build_cufe_string(data)
-
-    return hashlib.sha384(cadena.encode('utf-8')).hexdigest()
+    return compute_uuid(
+        data.number, data.issue_date, data.issue_time,
+        data.subtotal, data.iva_amount, data.inc_amount, data.ica_amount,
+        data.total, data.supplier_nit, data.customer_nit,
+        software_pin or data.technical_key, data.environment,
+    )
 
 
 def calculate_cuds(data: CufeInput, software_pin: str = None) -> str:
@@ -421,3 +491,209 @@ def calculate_uuid_by_doc_type(
         return calculate_cude(data, software_pin)
     else:
         return calculate_cufe(data)
+
+
+# =============================================================================
+# CALCULO EN LOTE
+# =============================================================================
+
+# Documentos por bloque enviado a cada proceso
+CUFE_BATCH_CHUNK_SIZE = 5000
+
+# Orden de los campos de CufeInput en las filas internas del lote
+_CUFE_ROW_FIELDS = (
+    'number', 'issue_date', 'issue_time', 'subtotal', 'iva_amount',
+    'inc_amount', 'ica_amount', 'total', 'supplier_nit', 'customer_nit',
+    'technical_key', 'environment',
+)
+
+_CUFE_DEFAULTS = {
+    f.name: f.default for f in fields(CufeInput) if f.default is not MISSING
+}
+
+CufeRow = Tuple
+
+
+def _hash_rows(rows: Sequence[CufeRow]) -> List[str]:
+    """
+    Calcular los codigos de un bloque de filas.
+
+    Misma cadena que uuid_string(truncate=True) (mismo _CUFE_HEAD_FORMAT
+    y truncamiento); la parte NitEmisor y ClaveTecnica+TipoAmbiente se
+    arma una vez por emisor.
+    """
+    trunc = math.trunc
+    sha384 = hashlib.sha384
+    head_format = _CUFE_HEAD_FORMAT
+    issuers: Dict[Tuple[str, str, str], Tuple[str, str]] = {}
+    codes = []
+
+    for (number, issue_date, issue_time, subtotal, iva, inc, ica, total,
+         supplier_nit, customer_nit, key, environment) in rows:
+        issuer = issuers.get((supplier_nit, key, environment))
+        if issuer is None:
+            issuer = issuers[(supplier_nit, key, environment)] = (
+                f"{supplier_nit}", f"{key}{environment}"
+            )
+
+        cadena = head_format % (
+            number, issue_date, issue_time,
+            trunc(subtotal * 100) / 100,
+            trunc(iva * 100) / 100,
+            trunc(inc * 100) / 100,
+            trunc(ica * 100) / 100,
+            trunc(total * 100) / 100,
+        ) + issuer[0] + f"{customer_nit}" + issuer[1]
+        codes.append(sha384(cadena.encode('utf-8')).hexdigest())
+
+    return codes
+
+
+class CufeBatch:
+    """
+    Calculo de CUFE/CUDE/CUDS para muchos documentos.
+
+    Produce los mismos codigos que calculate_cufe/calculate_cude, pero
+    evita crear copias de CufeInput, reutiliza la parte fija de cada
+    emisor y puede repartir bloques entre procesos para lotes grandes
+    (por ejemplo, revalidar archivos historicos).
+
+    Args:
+        software_pin: Si se indica reemplaza technical_key en todas las
+            entradas (CUDE/CUDS, como calculate_cude)
+        jobs: Numero de procesos (1 = en el proceso actual)
+        chunk_size: Documentos por bloque enviado a cada proceso
+
+    Example:
+        batch = CufeBatch(jobs=4)
+        codes = batch.compute(entradas)                  # Iterable[CufeInput]
+        codes = batch.compute_columns({'number': [...], 'issue_date': [...], ...})
+    """
+
+    def __init__(
+        self,
+        software_pin: str = None,
+        jobs: int = 1,
+        chunk_size: int = CUFE_BATCH_CHUNK_SIZE
+    ):
+        if jobs < 1:
+            raise ValueError("jobs debe ser mayor o igual a 1")
+        if chunk_size < 1:
+            raise ValueError("chunk_size debe ser mayor o igual a 1")
+        self.software_pin = software_pin
+        self.jobs = jobs
+        self.chunk_size = chunk_size
+
+    def _row(self, data: CufeInput) -> CufeRow:
+        return (
+            data.number, data.issue_date, data.issue_time,
+            data.subtotal, data.iva_amount, data.inc_amount, data.ica_amount,
+            data.total, data.supplier_nit, data.customer_nit,
+            self.software_pin or data.technical_key, data.environment,
+        )
+
+    def _chunks(self, rows: Iterable[CufeRow]) -> Iterator[List[CufeRow]]:
+        iterator = iter(rows)
+        while True:
+            chunk = list(islice(iterator, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def iter_rows(self, rows: Iterable[CufeRow]) -> Iterator[str]:
+        """
+        Calcular codigos a partir de filas en el orden de _CUFE_ROW_FIELDS.
+
+        Args:
+            rows: Tuplas (number, issue_date, issue_time, subtotal,
+                iva_amount, inc_amount, ica_amount, total, supplier_nit,
+                customer_nit, technical_key, environment)
+
+        Yields:
+            Codigo por fila, en el orden de entrada
+        """
+        if self.jobs == 1:
+            for chunk in self._chunks(rows):
+                yield from _hash_rows(chunk)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            pending = deque()
+            for chunk in self._chunks(rows):
+                pending.append(pool.submit(_hash_rows, chunk))
+                if len(pending) >= self.jobs * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def iter_compute(self, inputs: Iterable[CufeInput]) -> Iterator[str]:
+        """
+        Calcular codigos de un iterable de CufeInput sin materializarlo.
+
+        Yields:
+            Codigo por entrada, en el orden de entrada
+        """
+        return self.iter_rows(self._row(data) for data in inputs)
+
+    def compute(self, inputs: Iterable[CufeInput]) -> List[str]:
+        """
+        Calcular codigos de un iterable de CufeInput.
+
+        Returns:
+            Lista de codigos (96 caracteres hexadecimales)
+        """
+        return list(self.iter_compute(inputs))
+
+    def compute_columns(self, columns: Dict[str, Sequence]) -> List[str]:
+        """
+        Calcular codigos desde una tabla por columnas.
+
+        Las claves son los nombres de campo de CufeInput. iva_amount,
+        inc_amount, ica_amount y environment son opcionales.
+
+        Args:
+            columns: Diccionario columna -> secuencia de valores
+
+        Returns:
+            Lista de codigos
+
+        Raises:
+            ValueError: Si falta una columna requerida o los largos difieren
+        """
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("Todas las columnas deben tener el mismo largo")
+        size = lengths.pop() if lengths else 0
+
+        ordered = []
+        for name in _CUFE_ROW_FIELDS:
+            if name == 'technical_key' and self.software_pin:
+                ordered.append([self.software_pin] * size)
+            elif name in columns:
+                ordered.append(columns[name])
+            elif name in _CUFE_DEFAULTS:
+                ordered.append([_CUFE_DEFAULTS[name]] * size)
+            else:
+                raise ValueError(f"Columna requerida: {name}")
+
+        return list(self.iter_rows(zip(*ordered)))
+
+    def verify(
+        self,
+        inputs: Iterable[CufeInput],
+        codes: Iterable[str]
+    ) -> List[bool]:
+        """
+        Verificar codigos existentes contra los datos.
+
+        Args:
+            inputs: Datos de los documentos
+            codes: Codigos a verificar, en el mismo orden
+
+        Returns:
+            Lista con True para cada codigo correcto
+        """
+        return [
+            expected == (code or '').lower()
+            for expected, code in zip(self.iter_compute(inputs), codes)
+        ]
@@ -0,0 +1,210 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Nucleo comun para la emision de documentos UBL 2.1.
+
+Todos los builders (factura, notas, documento soporte, POS, exportacion
+y contingencia) comparten la misma ruta de emision. Cada tipo de
+documento declara en un DocumentSpec su orden de elementos y sus
+diferencias (elemento raiz, codigos, totales, lineas), y InvoiceBuilder
+recorre esa tabla invocando un emisor por paso.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Tuple
+
+from .taxes import TaxTotal, truncar
+
+
+# =============================================================================
+# ORDEN DE ELEMENTOS
+# =============================================================================
+
+# Cada paso corresponde a un metodo _emit_<paso>(doc, ctx) del builder
+INVOICE_STEPS: Tuple[str, ...] = (
+    'ubl_extensions',
+    'basic_elements',
+    'supplier',
+    'customer',
+    'payment_means',
+    'tax_totals',
+    'withholding_tax_totals',
+    'monetary_total',
+    'lines',
+)
+
+# DiscrepancyResponse ANTES de BillingReference (orden segun Anexo Tecnico DIAN)
+NOTE_STEPS: Tuple[str, ...] = (
+    'ubl_extensions',
+    'basic_elements',
+    'discrepancy_response',
+    'billing_reference',
+    'supplier',
+    'customer',
+    'payment_means',
+    'tax_totals',
+    'withholding_tax_totals',
+    'monetary_total',
+    'lines',
+)
+
+
+# =============================================================================
+# ESPECIFICACION DE DOCUMENTO
+# =============================================================================
+
+@dataclass(frozen=True)
+class DocumentSpec:
+    """
+    Especificacion declarativa de un tipo de documento.
+
+    Los nombres de los campos siguen los de DOC_TYPES_FULL.
+
+    Attributes:
+        root_element: Elemento raiz ('Invoice', 'CreditNote', 'DebitNote')
+        namespace: Clave en NS del namespace por defecto ('fe', 'nc', 'nd')
+        customization_id: Valor de CustomizationID
+        profile_id: Valor de ProfileID
+        code: Codigo de tipo de documento (InvoiceTypeCode, etc.)
+        uuid_scheme: schemeName del UUID ('CUFE-SHA384', 'CUDE-SHA384', ...)
+        display_name: Nombre usado en mensajes de error
+        type_code_element: Elemento del codigo de tipo
+        uses_technical_key: True = CUFE (ClaveTecnica), False = CUDE (PIN)
+        invoice_control: Incluir InvoiceControl en DianExtensions
+        due_date: Emitir DueDate cuando el documento la trae
+        total_element: Elemento de totales monetarios
+        prepaid_amount: Incluir PrepaidAmount en los totales
+        truncate_totals: Formatear totales con truncamiento (formato_dinero)
+        line_element: Elemento de linea
+        quantity_element: Elemento de cantidad de la linea
+        group_line_taxes: Agrupar impuestos de linea por codigo
+        base_quantity_unit: Incluir unitCode en BaseQuantity
+        validate_data: Validar con validate_before_build y envolver
+            errores en XmlBuildError
+        steps: Orden de los elementos del documento
+    """
+    root_element: str
+    namespace: str
+    customization_id: str
+    profile_id: str
+    code: str
+    uuid_scheme: str
+    display_name: str
+    type_code_element: str = 'InvoiceTypeCode'
+    uses_technical_key: bool = True
+    invoice_control: bool = True
+    due_date: bool = True
+    total_element: str = 'LegalMonetaryTotal'
+    prepaid_amount: bool = True
+    truncate_totals: bool = False
+    line_element: str = 'InvoiceLine'
+    quantity_element: str = 'InvoicedQuantity'
+    group_line_taxes: bool = True
+    base_quantity_unit: bool = False
+    validate_data: bool = False
+    steps: Tuple[str, ...] = INVOICE_STEPS
+
+
+# =============================================================================
+# TOTALES
+# =============================================================================
+
+@dataclass
+class DocumentTotals:
+    """
+    Totales del documento calculados en una sola pasada.
+
+    Attributes:
+        subtotal: Suma de los totales de linea
+        impuestos: Impuestos agrupados por codigo
+        retenciones: Retenciones agrupadas por codigo
+        total_impuestos: Suma de impuestos (sin retenciones)
+        total_retenciones: Suma de retenciones
+        total: subtotal + total_impuestos
+    """
+    subtotal: float
+    impuestos: Dict[str, TaxTotal]
+    retenciones: Dict[str, TaxTotal]
+    total_impuestos: float
+    total_retenciones: float
+    total: float
+
+    @property
+    def tax_amounts(self) -> Dict[str, float]:
+        """Monto por codigo de impuesto (para CUFE/CUDE)."""
+        return {code: t.total_amount for code, t in self.impuestos.items()}
+
+    @property
+    def withholding_amounts(self) -> Dict[str, float]:
+        """Monto por codigo de retencion."""
+        return {code: t.total_amount for code, t in self.retenciones.items()}
+
+
+def compute_document_totals(lines: Iterable[Any]) -> DocumentTotals:
+    """
+    Calcular subtotal, impuestos y retenciones recorriendo las lineas una vez.
+
+    Produce los mismos valores que separar_impuestos_retenciones +
+    calcular_totales_impuestos + agrupar_impuestos, sin listas intermedias.
+
+    Args:
+        lines: Lineas del documento (InvoiceLine)
+
+    Returns:
+        DocumentTotals
+    """
+    subtotal = 0.0
+    impuestos: Dict[str, TaxTotal] = {}
+    retenciones: Dict[str, TaxTotal] = {}
+
+    for line in lines:
+        subtotal += line.get_line_total()
+        for tax in line.taxes:
+            grouped = retenciones if tax.is_withholding else impuestos
+            tax_total = grouped.get(tax.code)
+            if tax_total is None:
+                tax_total = grouped[tax.code] = TaxTotal(
+                    code=tax.code,
+                    name=tax.name,
+                    is_withholding=tax.is_withholding
+                )
+            tax_total.add_tax(tax)
+
+    subtotal = truncar(subtotal)
+    total_impuestos = truncar(sum(t.total_amount for t in impuestos.values()))
+    total_retenciones = truncar(sum(t.total_amount for t in retenciones.values()))
+
+    return DocumentTotals(
+        subtotal=subtotal,
+        impuestos=impuestos,
+        retenciones=retenciones,
+        total_impuestos=total_impuestos,
+        total_retenciones=total_retenciones,
+        total=truncar(subtotal + total_impuestos),
+    )
+
+
+@dataclass
+class DocumentContext:
+    """
+    Estado compartido por los emisores durante la construccion.
+
+    Attributes:
+        spec: Especificacion del tipo de documento
+        data: Datos del documento (InvoiceData, CreditNoteData, ...)
+        supplier: Parte emisora
+        customer: Parte adquiriente
+        totals: Totales calculados
+        uuid: CUFE/CUDE del documento
+        software_security_code: Codigo de seguridad del software
+        currency: Moneda del documento
+    """
+    spec: DocumentSpec
+    data: Any
+    supplier: Any
+    customer: Any
+    totals: DocumentTotals
+    uuid: str
+    software_security_code: str
+    currency: str = 'COP'
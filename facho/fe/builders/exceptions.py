@@ -201,6 +201,28 @@ class FachoTimeoutError(NetworkError):
         self.details['timeout_seconds'] = timeout_seconds
 
 
+class CircuitOpenError(NetworkError):
+    """Circuito abierto: la operacion no se intenta contra DIAN."""
+
+    def __init__(self, operation: str, retry_after: float = None):
+        self.operation = operation
+        self.retry_after = retry_after
+        super().__init__(f"Circuito abierto para {operation}; DIAN no disponible")
+        self.code = "CIRCUIT_OPEN"
+        self.details.update({'operation': operation, 'retry_after': retry_after})
+
+
+class RateLimitedError(NetworkError):
+    """No hubo cupo en el limitador de tasa dentro del tiempo de espera."""
+
+    def __init__(self, operation: str, wait_seconds: float = None):
+        self.operation = operation
+        self.wait_seconds = wait_seconds
+        super().__init__(f"Limite de tasa alcanzado para {operation}")
+        self.code = "RATE_LIMITED"
+        self.details.update({'operation': operation, 'wait_seconds': wait_seconds})
+
+
 # Codigos de error DIAN conocidos
 DIAN_ERROR_CODES = {
     # Errores de firma (ZE)
@@ -440,6 +462,25 @@ class UvtLimitExceededError(ValidationError):
         self.max_value = max_value
 
 
+class BulkInputError(ValidationError):
+    """Error en los datos de entrada de una carga masiva."""
+
+    def __init__(
+        self,
+        message: str,
+        document_number: str = None,
+        row: int = None
+    ):
+        errors = []
+        if document_number:
+            errors.append(f"Documento: {document_number}")
+        if row is not None:
+            errors.append(f"Fila: {row}")
+        super().__init__(message, errors=errors, code="BULK_INPUT_ERROR")
+        self.document_number = document_number
+        self.row = row
+
+
 def create_dian_exception(error_code: str, message: str = None) -> FachoError:
     """
     Crear excepcion apropiada basada en codigo de error DIAN.
@@ -0,0 +1,233 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Cache de fragmentos XML reutilizables entre documentos.
+
+Buena parte del XML de un documento depende solo de la configuracion
+(InvoiceControl, SoftwareProvider) o de partes que se repiten en cada
+documento (proveedor). Estos fragmentos se construyen una sola vez por
+configuracion y se copian (deepcopy de lxml) en cada documento nuevo.
+"""
+
+import copy
+from collections import OrderedDict
+from dataclasses import fields
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from lxml import etree
+
+from .constants import NS
+
+
+# Namespaces con los que se construyen las plantillas. Coinciden con los
+# prefijos declarados en la raiz de todos los documentos, de modo que al
+# insertar la copia lxml reutiliza las declaraciones del documento.
+FRAGMENT_NSMAP = {
+    'cac': NS['cac'],
+    'cbc': NS['cbc'],
+    'ext': NS['ext'],
+    'sts': NS['sts'],
+    'xsi': NS['xsi'],
+}
+
+# Numero de clientes distintos que se mantienen por builder
+DEFAULT_PARTY_CACHE_SIZE = 256
+
+# Numero de proveedores (emisores) distintos que se mantienen por builder
+DEFAULT_SUPPLIER_CACHE_SIZE = 16
+
+
+def _build_template(factory: Callable[[etree._Element], None]) -> etree._Element:
+    """Construir un fragmento en un elemento temporal y devolverlo."""
+    scratch = etree.Element('Fragment', nsmap=FRAGMENT_NSMAP)
+    factory(scratch)
+    return scratch[0]
+
+
+def config_fingerprint(config: Any) -> Tuple:
+    """
+    Obtener huella de una configuracion (dataclass).
+
+    La huella cambia si se modifica cualquier campo, incluso si la
+    configuracion se modifica en sitio.
+
+    Args:
+        config: Instancia de InvoiceConfig (o cualquier dataclass plano)
+
+    Returns:
+        Tupla con los valores de todos los campos
+    """
+    return tuple(getattr(config, f.name) for f in fields(config))
+
+
+def party_fingerprint(party: Any) -> Tuple:
+    """
+    Obtener huella estable de una parte (Party) incluyendo su direccion.
+
+    Args:
+        party: Instancia de Party
+
+    Returns:
+        Tupla hashable con los valores de la parte
+    """
+    values = []
+    for f in fields(party):
+        value = getattr(party, f.name)
+        if f.name == 'address' and value is not None:
+            value = tuple(getattr(value, af.name) for af in fields(value))
+        values.append(value)
+    return tuple(values)
+
+
+class FragmentCache:
+    """
+    Cache de fragmentos XML ligada a una configuracion.
+
+    Cada fragmento se construye una vez en un elemento temporal y se
+    entrega como copia profunda. Cuando la huella de la configuracion
+    cambia, todas las plantillas se descartan.
+
+    Example:
+        cache = FragmentCache()
+        el = cache.get(config, 'invoice_control', builder_fn)
+        parent.append(el)
+    """
+
+    def __init__(self):
+        self._key: Optional[Tuple] = None
+        self._templates: Dict[Hashable, etree._Element] = {}
+
+    def get(
+        self,
+        config: Any,
+        name: Hashable,
+        factory: Callable[[etree._Element], None]
+    ) -> etree._Element:
+        """
+        Obtener copia del fragmento, construyendolo si no existe.
+
+        Args:
+            config: Configuracion de la que depende el fragmento
+            name: Clave del fragmento (puede incluir otras huellas)
+            factory: Funcion que agrega el fragmento como unico hijo
+                del elemento recibido
+
+        Returns:
+            Copia independiente del fragmento
+        """
+        key = config_fingerprint(config)
+        if key != self._key:
+            self._templates.clear()
+            self._key = key
+
+        template = self._templates.get(name)
+        if template is None:
+            template = _build_template(factory)
+            self._templates[name] = template
+
+        return copy.deepcopy(template)
+
+    def clear(self):
+        """Descartar todas las plantillas."""
+        self._templates.clear()
+        self._key = None
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+
+class PartyFragmentCache:
+    """
+    Cache LRU de fragmentos de parte (AccountingCustomerParty o
+    AccountingSupplierParty).
+
+    La clave es la huella de la parte (ver party_fingerprint); los clientes
+    recurrentes se copian desde la plantilla en lugar de reconstruirse.
+    La cache se vacia si cambia la configuracion, porque el fragmento
+    depende de ella (CorporateRegistrationScheme usa el prefijo).
+
+    Args:
+        maxsize: Numero maximo de partes en cache (0 deshabilita la cache)
+
+    Example:
+        cache = PartyFragmentCache(maxsize=1000)
+        el = cache.get(config, customer, builder_fn)
+        cache.stats()  # {'hits': ..., 'misses': ..., ...}
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_PARTY_CACHE_SIZE):
+        if maxsize < 0:
+            raise ValueError("maxsize debe ser mayor o igual a 0")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._config_key: Optional[Tuple] = None
+        self._templates: 'OrderedDict[Tuple, etree._Element]' = OrderedDict()
+
+    def get(
+        self,
+        config: Any,
+        party: Any,
+        factory: Callable[[etree._Element], None]
+    ) -> etree._Element:
+        """
+        Obtener el fragmento de la parte, desde cache si es posible.
+
+        Args:
+            config: Configuracion de la que depende el fragmento
+            party: Parte (Party) a representar
+            factory: Funcion que agrega el fragmento como unico hijo
+                del elemento recibido
+
+        Returns:
+            Elemento independiente listo para insertar en el documento
+        """
+        if self.maxsize == 0:
+            self.misses += 1
+            return _build_template(factory)
+
+        config_key = config_fingerprint(config)
+        if config_key != self._config_key:
+            self._templates.clear()
+            self._config_key = config_key
+
+        key = party_fingerprint(party)
+        template = self._templates.get(key)
+        if template is not None:
+            self.hits += 1
+            self._templates.move_to_end(key)
+            return copy.deepcopy(template)
+
+        self.misses += 1
+        template = _build_template(factory)
+        self._templates[key] = template
+        if len(self._templates) > self.maxsize:
+            self._templates.popitem(last=False)
+        return copy.deepcopy(template)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Obtener estadisticas de la cache.
+
+        Returns:
+            Diccionario con hits, misses, size, maxsize y hit_rate
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._templates),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        """Vaciar la cache y reiniciar contadores."""
+        self._templates.clear()
+        self._config_key = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._templates)
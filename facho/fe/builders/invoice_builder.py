@@ -7,7 +7,7 @@ Basado en implementacion funcional aprobada por DIAN.
 """
 
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Callable, Optional, List, Tuple
 from dataclasses import dataclass, field
 
 from lxml import etree
@@ -20,17 +20,30 @@ from .constants import (
     DIAN_PROFILE_ID,
     COUNTRY_ID_ATTRS,
     AUTHORIZATION_PROVIDER_ID,
+    INVOICE_TYPE_CODE,
 )
 from .taxes import (
     Tax,
     TaxTotal,
-    agrupar_impuestos,
-    separar_impuestos_retenciones,
-    calcular_totales_impuestos,
     truncar,
     formato_dinero,
-    WITHHOLDING_TAX_CODES,
 )
+from .document_core import (
+    DocumentContext,
+    DocumentSpec,
+    DocumentTotals,
+    compute_document_totals,
+)
+from .exceptions import ValidationError, XmlBuildError
+from .fragments import (
+    DEFAULT_PARTY_CACHE_SIZE,
+    DEFAULT_SUPPLIER_CACHE_SIZE,
+    FragmentCache,
+    PartyFragmentCache,
+)
+from .validators import validate_before_build
+from ..instrumentation import span
+from .cufe import compute_uuid, calculate_software_security_code
 from ..client.dian_simple import calcular_dv
 
 
@@ -196,21 +209,66 @@ class InvoiceData:
 # BUILDER
 # =============================================================================
 
+INVOICE_SPEC = DocumentSpec(
+    root_element='Invoice',
+    namespace='fe',
+    customization_id=DIAN_CUSTOMIZATION_ID,
+    profile_id=DIAN_PROFILE_ID,
+    code=INVOICE_TYPE_CODE,
+    uuid_scheme='CUFE-SHA384',
+    display_name='factura',
+)
+
+
+def _document_nsmap(spec: DocumentSpec) -> Dict[Optional[str], str]:
+    """Namespaces de la raiz del documento."""
+    return {
+        None: NS[spec.namespace],
+        'cac': NS['cac'],
+        'cbc': NS['cbc'],
+        'ext': NS['ext'],
+        'sts': NS['sts'],
+        'xsi': NS['xsi'],
+    }
+
+
 class InvoiceBuilder:
     """
     Constructor de facturas electronicas UBL 2.1 para DIAN.
 
     Genera XML valido segun Anexo Tecnico v1.9.
+
+    Es tambien la base de los demas builders: cada subclase declara su
+    DocumentSpec (orden de elementos y diferencias por tipo) y comparte
+    la misma ruta de emision, cache de fragmentos y calculo de totales.
     """
 
-    def __init__(self, config: InvoiceConfig):
+    SPEC = INVOICE_SPEC
+
+    def __init__(
+        self,
+        config: InvoiceConfig,
+        customer_cache_size: int = DEFAULT_PARTY_CACHE_SIZE,
+        supplier_cache_size: int = DEFAULT_SUPPLIER_CACHE_SIZE
+    ):
         """
         Inicializar builder.
 
         Args:
             config: Configuracion de factura
+            customer_cache_size: Numero de clientes cuyo XML se mantiene en
+                cache LRU (0 deshabilita la cache)
+            supplier_cache_size: Numero de proveedores cuyo XML se mantiene
+                en cache LRU (0 deshabilita la cache)
         """
         self.config = config
+        # Fragmentos derivados de la configuracion (InvoiceControl,
+        # SoftwareProvider); se invalidan si config cambia
+        self._fragments = FragmentCache()
+        # Clientes recurrentes (ver customer_cache.stats())
+        self.customer_cache = PartyFragmentCache(customer_cache_size)
+        # Proveedores; acotado para procesos que emiten por varios emisores
+        self.supplier_cache = PartyFragmentCache(supplier_cache_size)
 
     def build(self, invoice_data: InvoiceData) -> etree._Element:
         """
@@ -222,142 +280,182 @@ class InvoiceBuilder:
         Returns:
             Elemento XML de la factura
         """
-        # Calcular subtotal
-        subtotal = truncar(sum(
-            line.get_line_total()
-            for line in invoice_data.lines
-        ))
+        return self._build_document(invoice_data)
 
-        # Recolectar todos los impuestos de todas las lineas
-        all_taxes: List[Tax] = []
-        for line in invoice_data.lines:
-            all_taxes.extend(line.taxes)
-
-        # Separar impuestos regulares de retenciones
-        impuestos, retenciones = separar_impuestos_retenciones(all_taxes)
-
-        # Calcular totales por tipo de impuesto
-        totales_impuestos = calcular_totales_impuestos(impuestos)
-        totales_retenciones = calcular_totales_impuestos(retenciones)
-
-        # Total de impuestos (sin retenciones)
-        total_impuestos = truncar(sum(totales_impuestos.values()))
-
-        # Total de retenciones
-        total_retenciones = truncar(sum(totales_retenciones.values()))
-
-        # IVA especifico para CUFE
-        tax_iva = totales_impuestos.get('01', 0.0)
-        tax_inc = totales_impuestos.get('04', 0.0)
-        tax_ica = totales_impuestos.get('03', 0.0)
-
-        # Total factura = subtotal + impuestos - retenciones
-        total = truncar(subtotal + total_impuestos)
-
-        # Calcular CUFE y SoftwareSecurityCode
-        from ..client.dian_simple import calcular_cufe_flexible, calcular_software_security_code
-
-        cufe = calcular_cufe_flexible(
-            numero=invoice_data.number,
-            fecha_emision=invoice_data.issue_date,
-            hora_emision=invoice_data.issue_time,
-            subtotal=subtotal,
-            impuestos=totales_impuestos,
-            total=total,
-            nit_emisor=self.config.nit,
-            nit_adquiriente=invoice_data.customer.nit,
-            clave_tecnica=self.config.technical_key,
-            tipo_ambiente=self.config.environment
-        )
+    # =========================================================================
+    # RUTA DE EMISION COMUN (dirigida por self.SPEC)
+    # =========================================================================
 
-        software_security_code = calcular_software_security_code(
-            self.config.software_id,
-            self.config.software_pin,
-            invoice_data.number
-        )
+    def _build_document(
+        self,
+        data: Any,
+        check_totals: Optional[Callable[[DocumentTotals], None]] = None
+    ) -> etree._Element:
+        """
+        Construir un documento segun la especificacion del builder.
 
-        # Agrupar impuestos para XML
-        impuestos_agrupados = agrupar_impuestos(impuestos)
-        retenciones_agrupadas = agrupar_impuestos(retenciones)
-
-        # Construir XML
-        return self._build_invoice_xml(
-            invoice_data=invoice_data,
-            cufe=cufe,
-            software_security_code=software_security_code,
-            subtotal=subtotal,
-            impuestos_agrupados=impuestos_agrupados,
-            retenciones_agrupadas=retenciones_agrupadas,
-            total_impuestos=total_impuestos,
-            total_retenciones=total_retenciones,
-            total=total
-        )
+        Args:
+            data: Datos del documento
+            check_totals: Verificacion opcional sobre los totales antes de
+                calcular el CUFE/CUDE (ej: limite UVT de POS)
 
-    def _build_invoice_xml(
+        Returns:
+            Elemento XML raiz del documento
+        """
+        spec = self.SPEC
+        with span('build', builder=type(self).__name__):
+            if not spec.validate_data:
+                return self._assemble_document(spec, data, check_totals)
+
+            try:
+                validate_before_build(data, self.config, spec.display_name)
+                return self._assemble_document(spec, data, check_totals)
+            except ValidationError:
+                raise
+            except Exception as e:
+                raise XmlBuildError(
+                    f"Error construyendo {spec.display_name}: {str(e)}"
+                )
+
+    def _assemble_document(
         self,
-        invoice_data: InvoiceData,
-        cufe: str,
-        software_security_code: str,
-        subtotal: float,
-        impuestos_agrupados: Dict[str, TaxTotal],
-        retenciones_agrupadas: Dict[str, TaxTotal],
-        total_impuestos: float,
-        total_retenciones: float,
-        total: float
+        spec: DocumentSpec,
+        data: Any,
+        check_totals: Optional[Callable[[DocumentTotals], None]] = None
     ) -> etree._Element:
-        """Construir estructura XML de factura."""
-
-        nsmap = {
-            None: NS['fe'],
-            'cac': NS['cac'],
-            'cbc': NS['cbc'],
-            'ext': NS['ext'],
-            'sts': NS['sts'],
-            'xsi': NS['xsi'],
-        }
+        """Calcular totales y UUID, y emitir los elementos en orden."""
+        supplier, customer = self._document_parties(data)
+        totals = compute_document_totals(data.lines)
+        if check_totals is not None:
+            check_totals(totals)
+
+        ctx = DocumentContext(
+            spec=spec,
+            data=data,
+            supplier=supplier,
+            customer=customer,
+            totals=totals,
+            uuid=self._calculate_uuid(spec, data, customer, totals),
+            software_security_code=calculate_software_security_code(
+                self.config.software_id,
+                self.config.software_pin,
+                data.number
+            ),
+            currency=self._document_currency(data),
+        )
+
+        doc = etree.Element(spec.root_element, nsmap=_document_nsmap(spec))
+        for step in spec.steps:
+            getattr(self, '_emit_' + step)(doc, ctx)
+        return doc
+
+    def _document_parties(self, data: Any) -> Tuple[Party, Party]:
+        """Obtener (emisor, adquiriente) del documento."""
+        return data.supplier, data.customer
+
+    def _document_currency(self, data: Any) -> str:
+        """Obtener moneda del documento."""
+        return 'COP'
+
+    def _document_notes(self, data: Any) -> List[str]:
+        """Obtener textos de los elementos Note."""
+        return [data.note]
 
-        invoice = etree.Element('Invoice', nsmap=nsmap)
+    def _uuid_amounts(
+        self,
+        data: Any,
+        totals: DocumentTotals
+    ) -> Tuple[float, Dict[str, float], float]:
+        """Obtener (subtotal, impuestos, total) para el CUFE/CUDE."""
+        return totals.subtotal, totals.tax_amounts, totals.total
+
+    def _calculate_uuid(
+        self,
+        spec: DocumentSpec,
+        data: Any,
+        customer: Party,
+        totals: DocumentTotals
+    ) -> str:
+        """
+        Calcular CUFE (ClaveTecnica) o CUDE (SoftwarePIN) segun el tipo.
+        """
+        subtotal, impuestos, total = self._uuid_amounts(data, totals)
+        key = (
+            self.config.technical_key if spec.uses_technical_key
+            else self.config.software_pin
+        )
+        return compute_uuid(
+            data.number, data.issue_date, data.issue_time, subtotal,
+            impuestos.get('01', 0.0),
+            impuestos.get('04', 0.0),
+            impuestos.get('03', 0.0),
+            total, self.config.nit, customer.nit, key,
+            self.config.environment, truncate=False,
+        )
 
-        # UBLExtensions
+    def _emit_ubl_extensions(self, doc: etree._Element, ctx: DocumentContext):
+        """Paso: UBLExtensions."""
         self._add_ubl_extensions(
-            invoice, invoice_data, cufe, software_security_code
+            doc, ctx.data, ctx.uuid, ctx.software_security_code,
+            invoice_control=ctx.spec.invoice_control
         )
 
-        # Elementos basicos
-        self._add_basic_elements(invoice, invoice_data, cufe)
+    def _emit_supplier(self, doc: etree._Element, ctx: DocumentContext):
+        """Paso: AccountingSupplierParty."""
+        self._add_supplier(doc, ctx.supplier)
 
-        # Proveedor
-        self._add_supplier(invoice, invoice_data.supplier)
+    def _emit_customer(self, doc: etree._Element, ctx: DocumentContext):
+        """Paso: AccountingCustomerParty."""
+        self._add_customer(doc, ctx.customer)
 
-        # Cliente
-        self._add_customer(invoice, invoice_data.customer)
+    def _emit_payment_means(self, doc: etree._Element, ctx: DocumentContext):
+        """Paso: PaymentMeans."""
+        self._add_payment_means(doc, ctx.data)
 
-        # Medios de pago
-        self._add_payment_means(invoice, invoice_data)
+    def _emit_tax_totals(self, doc: etree._Element, ctx: DocumentContext):
+        """Paso: TaxTotal por tipo de impuesto."""
+        self._add_tax_totals(doc, ctx.totals.impuestos, ctx.currency)
 
-        # Impuestos totales (TaxTotal para cada tipo de impuesto)
-        self._add_tax_totals(invoice, impuestos_agrupados)
+    def _emit_withholding_tax_totals(self, doc: etree._Element, ctx: DocumentContext):
+        """Paso: WithholdingTaxTotal (solo si hay retenciones)."""
+        if ctx.totals.retenciones:
+            self._add_withholding_tax_totals(
+                doc, ctx.totals.retenciones, ctx.currency
+            )
 
-        # Retenciones (WithholdingTaxTotal)
-        if retenciones_agrupadas:
-            self._add_withholding_tax_totals(invoice, retenciones_agrupadas)
+    def _emit_monetary_total(self, doc: etree._Element, ctx: DocumentContext):
+        """Paso: totales monetarios."""
+        totals = ctx.totals
+        self._add_monetary_total(
+            doc, totals.subtotal, totals.total_impuestos, totals.total,
+            currency=ctx.currency, spec=ctx.spec
+        )
 
-        # Totales monetarios
-        self._add_monetary_total(invoice, subtotal, total_impuestos, total)
+    def _emit_lines(self, doc: etree._Element, ctx: DocumentContext):
+        """Paso: lineas del documento."""
+        self._add_invoice_lines(doc, ctx.data.lines, ctx.currency, spec=ctx.spec)
 
-        # Lineas de factura
-        self._add_invoice_lines(invoice, invoice_data.lines)
+    def _emit_discrepancy_response(self, doc: etree._Element, ctx: DocumentContext):
+        """Paso: DiscrepancyResponse."""
+        self._add_discrepancy_response(doc, ctx.data)
 
-        return invoice
+    def _emit_billing_reference(self, doc: etree._Element, ctx: DocumentContext):
+        """Paso: BillingReference."""
+        self._add_billing_reference(doc, ctx.data)
 
     def _add_ubl_extensions(
         self,
         invoice: etree._Element,
         invoice_data: InvoiceData,
         cufe: str,
-        software_security_code: str
+        software_security_code: str,
+        invoice_control: bool = True
     ):
-        """Agregar UBLExtensions con extensiones DIAN."""
+        """
+        Agregar UBLExtensions con extensiones DIAN.
+
+        Las notas credito y debito no llevan InvoiceControl.
+        """
 
         extensions = etree.SubElement(invoice, '{%s}UBLExtensions' % NS['ext'])
 
@@ -372,7 +470,8 @@ class InvoiceBuilder:
         )
 
         # InvoiceControl
-        self._add_invoice_control(dian_ext)
+        if invoice_control:
+            self._add_invoice_control(dian_ext)
 
         # InvoiceSource
         inv_source = etree.SubElement(dian_ext, '{%s}InvoiceSource' % NS['sts'])
@@ -382,18 +481,7 @@ class InvoiceBuilder:
         id_country.text = 'CO'
 
         # SoftwareProvider
-        software_prov = etree.SubElement(dian_ext, '{%s}SoftwareProvider' % NS['sts'])
-        prov_id = etree.SubElement(software_prov, '{%s}ProviderID' % NS['sts'])
-        prov_id.set('schemeAgencyID', '195')
-        prov_id.set('schemeAgencyName', SCHEME_AGENCY_ATTRS['schemeAgencyName'])
-        prov_id.set('schemeID', str(calcular_dv(self.config.nit)))
-        prov_id.set('schemeName', '31')
-        prov_id.text = self.config.nit
-
-        soft_id = etree.SubElement(software_prov, '{%s}SoftwareID' % NS['sts'])
-        soft_id.set('schemeAgencyID', '195')
-        soft_id.set('schemeAgencyName', SCHEME_AGENCY_ATTRS['schemeAgencyName'])
-        soft_id.text = self.config.software_id
+        self._add_software_provider(dian_ext)
 
         # SoftwareSecurityCode
         soft_sec = etree.SubElement(dian_ext, '{%s}SoftwareSecurityCode' % NS['sts'])
@@ -421,7 +509,13 @@ class InvoiceBuilder:
         etree.SubElement(ext2, '{%s}ExtensionContent' % NS['ext'])
 
     def _add_invoice_control(self, dian_ext: etree._Element):
-        """Agregar InvoiceControl."""
+        """Agregar InvoiceControl (fragmento cacheado por configuracion)."""
+        dian_ext.append(self._fragments.get(
+            self.config, 'invoice_control', self._build_invoice_control
+        ))
+
+    def _build_invoice_control(self, dian_ext: etree._Element):
+        """Construir InvoiceControl."""
         inv_control = etree.SubElement(dian_ext, '{%s}InvoiceControl' % NS['sts'])
         etree.SubElement(
             inv_control, '{%s}InvoiceAuthorization' % NS['sts']
@@ -436,49 +530,116 @@ class InvoiceBuilder:
         etree.SubElement(auth_inv, '{%s}From' % NS['sts']).text = self.config.range_from
         etree.SubElement(auth_inv, '{%s}To' % NS['sts']).text = self.config.range_to
 
-    def _add_basic_elements(
-        self,
-        invoice: etree._Element,
-        invoice_data: InvoiceData,
-        cufe: str
-    ):
-        """Agregar elementos basicos de factura."""
+    def _add_software_provider(self, dian_ext: etree._Element):
+        """Agregar SoftwareProvider (fragmento cacheado por configuracion)."""
+        dian_ext.append(self._fragments.get(
+            self.config, 'software_provider', self._build_software_provider
+        ))
+
+    def _build_software_provider(self, dian_ext: etree._Element):
+        """Construir SoftwareProvider."""
+        software_prov = etree.SubElement(dian_ext, '{%s}SoftwareProvider' % NS['sts'])
+        prov_id = etree.SubElement(software_prov, '{%s}ProviderID' % NS['sts'])
+        prov_id.set('schemeAgencyID', '195')
+        prov_id.set('schemeAgencyName', SCHEME_AGENCY_ATTRS['schemeAgencyName'])
+        prov_id.set('schemeID', str(calcular_dv(self.config.nit)))
+        prov_id.set('schemeName', '31')
+        prov_id.text = self.config.nit
+
+        soft_id = etree.SubElement(software_prov, '{%s}SoftwareID' % NS['sts'])
+        soft_id.set('schemeAgencyID', '195')
+        soft_id.set('schemeAgencyName', SCHEME_AGENCY_ATTRS['schemeAgencyName'])
+        soft_id.text = self.config.software_id
+
+    def _emit_basic_elements(self, doc: etree._Element, ctx: DocumentContext):
+        """Agregar elementos basicos del documento."""
+        spec = ctx.spec
+        data = ctx.data
 
-        etree.SubElement(invoice, '{%s}UBLVersionID' % NS['cbc']).text = DIAN_UBL_VERSION
-        etree.SubElement(invoice, '{%s}CustomizationID' % NS['cbc']).text = DIAN_CUSTOMIZATION_ID
-        etree.SubElement(invoice, '{%s}ProfileID' % NS['cbc']).text = DIAN_PROFILE_ID
+        etree.SubElement(doc, '{%s}UBLVersionID' % NS['cbc']).text = DIAN_UBL_VERSION
+        etree.SubElement(doc, '{%s}CustomizationID' % NS['cbc']).text = spec.customization_id
+        etree.SubElement(doc, '{%s}ProfileID' % NS['cbc']).text = spec.profile_id
         etree.SubElement(
-            invoice, '{%s}ProfileExecutionID' % NS['cbc']
+            doc, '{%s}ProfileExecutionID' % NS['cbc']
         ).text = self.config.environment
-        etree.SubElement(invoice, '{%s}ID' % NS['cbc']).text = invoice_data.number
+        etree.SubElement(doc, '{%s}ID' % NS['cbc']).text = data.number
 
-        uuid_el = etree.SubElement(invoice, '{%s}UUID' % NS['cbc'])
+        uuid_el = etree.SubElement(doc, '{%s}UUID' % NS['cbc'])
         uuid_el.set('schemeID', self.config.environment)
-        uuid_el.set('schemeName', 'CUFE-SHA384')
-        uuid_el.text = cufe
+        uuid_el.set('schemeName', spec.uuid_scheme)
+        uuid_el.text = ctx.uuid
 
-        etree.SubElement(invoice, '{%s}IssueDate' % NS['cbc']).text = invoice_data.issue_date
-        etree.SubElement(invoice, '{%s}IssueTime' % NS['cbc']).text = invoice_data.issue_time
-        if invoice_data.due_date:
-            etree.SubElement(invoice, '{%s}DueDate' % NS['cbc']).text = invoice_data.due_date
+        etree.SubElement(doc, '{%s}IssueDate' % NS['cbc']).text = data.issue_date
+        etree.SubElement(doc, '{%s}IssueTime' % NS['cbc']).text = data.issue_time
+        if spec.due_date and data.due_date:
+            etree.SubElement(doc, '{%s}DueDate' % NS['cbc']).text = data.due_date
 
-        inv_type = etree.SubElement(invoice, '{%s}InvoiceTypeCode' % NS['cbc'])
-        inv_type.text = '01'
+        doc_type = etree.SubElement(doc, '{%s}%s' % (NS['cbc'], spec.type_code_element))
+        doc_type.text = spec.code
 
-        etree.SubElement(invoice, '{%s}Note' % NS['cbc']).text = invoice_data.note
+        for note in self._document_notes(data):
+            etree.SubElement(doc, '{%s}Note' % NS['cbc']).text = note
 
-        doc_currency = etree.SubElement(invoice, '{%s}DocumentCurrencyCode' % NS['cbc'])
+        doc_currency = etree.SubElement(doc, '{%s}DocumentCurrencyCode' % NS['cbc'])
         doc_currency.set('listAgencyID', '6')
         doc_currency.set('listAgencyName', 'United Nations Economic Commission for Europe')
         doc_currency.set('listID', 'ISO 4217 Alpha')
-        doc_currency.text = 'COP'
+        doc_currency.text = ctx.currency
+
+        etree.SubElement(
+            doc, '{%s}LineCountNumeric' % NS['cbc']
+        ).text = str(len(data.lines))
+
+    def _add_discrepancy_response(self, doc: etree._Element, data: Any):
+        """
+        Agregar respuesta de discrepancia (notas credito y debito).
+
+        Contiene ReferenceID (factura referenciada), ResponseCode (motivo)
+        y Description.
+        """
+        disc_resp = etree.SubElement(doc, '{%s}DiscrepancyResponse' % NS['cac'])
+        etree.SubElement(
+            disc_resp, '{%s}ReferenceID' % NS['cbc']
+        ).text = data.billing_reference_id
+        etree.SubElement(
+            disc_resp, '{%s}ResponseCode' % NS['cbc']
+        ).text = data.discrepancy_response_code
+        etree.SubElement(
+            disc_resp, '{%s}Description' % NS['cbc']
+        ).text = data.response_description
+
+    def _add_billing_reference(self, doc: etree._Element, data: Any):
+        """Agregar referencia a la factura original (notas credito y debito)."""
+        billing_ref = etree.SubElement(doc, '{%s}BillingReference' % NS['cac'])
+        inv_doc_ref = etree.SubElement(billing_ref, '{%s}InvoiceDocumentReference' % NS['cac'])
+        etree.SubElement(
+            inv_doc_ref, '{%s}ID' % NS['cbc']
+        ).text = data.billing_reference_id
+
+        uuid_ref = etree.SubElement(inv_doc_ref, '{%s}UUID' % NS['cbc'])
+        uuid_ref.set('schemeName', 'CUFE-SHA384')
+        uuid_ref.text = data.billing_reference_uuid
 
         etree.SubElement(
-            invoice, '{%s}LineCountNumeric' % NS['cbc']
-        ).text = str(len(invoice_data.lines))
+            inv_doc_ref, '{%s}IssueDate' % NS['cbc']
+        ).text = data.billing_reference_date
 
     def _add_supplier(self, invoice: etree._Element, supplier: Party):
-        """Agregar proveedor."""
+        """
+        Agregar proveedor.
+
+        El proveedor es el mismo en practicamente todos los documentos, por
+        lo que el fragmento se cachea (LRU) por configuracion y datos de la
+        parte.
+        """
+        invoice.append(self.supplier_cache.get(
+            self.config,
+            supplier,
+            lambda parent: self._build_supplier(parent, supplier)
+        ))
+
+    def _build_supplier(self, invoice: etree._Element, supplier: Party):
+        """Construir AccountingSupplierParty."""
         supplier_el = etree.SubElement(invoice, '{%s}AccountingSupplierParty' % NS['cac'])
         etree.SubElement(supplier_el, '{%s}AdditionalAccountID' % NS['cbc']).text = supplier.organization_code
 
@@ -504,7 +665,15 @@ class InvoiceBuilder:
             etree.SubElement(contact, '{%s}ElectronicMail' % NS['cbc']).text = supplier.email
 
     def _add_customer(self, invoice: etree._Element, customer: Party):
-        """Agregar cliente."""
+        """Agregar cliente (desde la cache LRU de clientes)."""
+        invoice.append(self.customer_cache.get(
+            self.config,
+            customer,
+            lambda parent: self._build_customer(parent, customer)
+        ))
+
+    def _build_customer(self, invoice: etree._Element, customer: Party):
+        """Construir AccountingCustomerParty."""
         customer_el = etree.SubElement(invoice, '{%s}AccountingCustomerParty' % NS['cac'])
         etree.SubElement(customer_el, '{%s}AdditionalAccountID' % NS['cbc']).text = customer.organization_code
 
@@ -623,7 +792,10 @@ class InvoiceBuilder:
         """Agregar medios de pago."""
         payment = etree.SubElement(invoice, '{%s}PaymentMeans' % NS['cac'])
         etree.SubElement(payment, '{%s}ID' % NS['cbc']).text = '1'
-        etree.SubElement(payment, '{%s}PaymentMeansCode' % NS['cbc']).text = '10'  # Efectivo
+        # 10 = Efectivo, salvo que el documento indique otro medio
+        etree.SubElement(
+            payment, '{%s}PaymentMeansCode' % NS['cbc']
+        ).text = getattr(invoice_data, 'payment_means_code', '10')
         etree.SubElement(
             payment, '{%s}PaymentDueDate' % NS['cbc']
         ).text = invoice_data.due_date or invoice_data.issue_date
@@ -769,45 +941,57 @@ class InvoiceBuilder:
         invoice: etree._Element,
         subtotal: float,
         tax_iva: float,
-        total: float
+        total: float,
+        currency: str = 'COP',
+        spec: Optional[DocumentSpec] = None
     ):
-        """Agregar totales monetarios."""
-        monetary = etree.SubElement(invoice, '{%s}LegalMonetaryTotal' % NS['cac'])
+        """Agregar totales monetarios (LegalMonetaryTotal o RequestedMonetaryTotal)."""
+        spec = spec or self.SPEC
+        monetary = etree.SubElement(invoice, '{%s}%s' % (NS['cac'], spec.total_element))
 
-        for tag, value in [
+        amounts = [
             ('LineExtensionAmount', subtotal),
             ('TaxExclusiveAmount', subtotal),
             ('TaxInclusiveAmount', total),
             ('AllowanceTotalAmount', 0),
             ('ChargeTotalAmount', 0),
-            ('PrepaidAmount', 0),
-            ('PayableAmount', total),
-        ]:
+        ]
+        if spec.prepaid_amount:
+            amounts.append(('PrepaidAmount', 0))
+        amounts.append(('PayableAmount', total))
+
+        for tag, value in amounts:
             el = etree.SubElement(monetary, '{%s}%s' % (NS['cbc'], tag))
-            el.set('currencyID', 'COP')
-            el.text = f"{value:.2f}"
+            el.set('currencyID', currency)
+            el.text = formato_dinero(value) if spec.truncate_totals else f"{value:.2f}"
 
     def _add_invoice_lines(
         self,
         invoice: etree._Element,
         lines: List[InvoiceLine],
-        currency: str = 'COP'
+        currency: str = 'COP',
+        spec: Optional[DocumentSpec] = None
     ):
         """
-        Agregar lineas de factura con soporte para multiples impuestos.
+        Agregar lineas con soporte para multiples impuestos.
 
         Args:
             invoice: Elemento XML padre
             lines: Lista de lineas de factura
             currency: Moneda (default COP)
+            spec: Especificacion del documento (elementos de linea y cantidad)
         """
+        spec = spec or self.SPEC
+        line_tag = '{%s}%s' % (NS['cac'], spec.line_element)
+        quantity_tag = '{%s}%s' % (NS['cbc'], spec.quantity_element)
+
         for idx, line_data in enumerate(lines, 1):
             line_total = line_data.get_line_total()
 
-            line = etree.SubElement(invoice, '{%s}InvoiceLine' % NS['cac'])
+            line = etree.SubElement(invoice, line_tag)
             etree.SubElement(line, '{%s}ID' % NS['cbc']).text = str(idx)
 
-            qty = etree.SubElement(line, '{%s}InvoicedQuantity' % NS['cbc'])
+            qty = etree.SubElement(line, quantity_tag)
             qty.set('unitCode', line_data.unit_code)
             qty.text = formato_dinero(line_data.quantity)
 
@@ -815,12 +999,31 @@ class InvoiceBuilder:
             line_ext.set('currencyID', currency)
             line_ext.text = formato_dinero(line_total)
 
-            # Separar impuestos regulares de retenciones
-            impuestos, retenciones = separar_impuestos_retenciones(line_data.taxes)
-
-            # TaxTotal por cada tipo de impuesto en la linea
-            impuestos_agrupados = agrupar_impuestos(impuestos)
-            for codigo, tax_total in impuestos_agrupados.items():
+            # TaxTotal por cada tipo de impuesto (o por impuesto) en la linea
+            if spec.group_line_taxes:
+                impuestos_agrupados: Dict[str, TaxTotal] = {}
+                for tax in line_data.taxes:
+                    if tax.is_withholding:
+                        continue
+                    tax_total = impuestos_agrupados.get(tax.code)
+                    if tax_total is None:
+                        tax_total = impuestos_agrupados[tax.code] = TaxTotal(
+                            code=tax.code, name=tax.name
+                        )
+                    tax_total.add_tax(tax)
+                line_tax_totals = impuestos_agrupados.values()
+            else:
+                line_tax_totals = [
+                    TaxTotal(
+                        code=tax.code,
+                        name=tax.name,
+                        total_amount=tax.amount,
+                        total_taxable_amount=tax.taxable_amount,
+                        subtotals=[tax]
+                    )
+                    for tax in line_data.taxes if not tax.is_withholding
+                ]
+            for tax_total in line_tax_totals:
                 self._add_line_tax_total(line, tax_total, currency)
 
             # Item
@@ -843,7 +1046,10 @@ class InvoiceBuilder:
             price_amt = etree.SubElement(price, '{%s}PriceAmount' % NS['cbc'])
             price_amt.set('currencyID', currency)
             price_amt.text = formato_dinero(line_data.unit_price)
-            etree.SubElement(price, '{%s}BaseQuantity' % NS['cbc']).text = '1.00'
+            base_qty = etree.SubElement(price, '{%s}BaseQuantity' % NS['cbc'])
+            if spec.base_quantity_unit:
+                base_qty.set('unitCode', line_data.unit_code)
+            base_qty.text = '1.00'
 
     def _add_line_tax_total(
         self,
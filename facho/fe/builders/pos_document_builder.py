@@ -17,33 +17,42 @@ from typing import List, Optional
 from lxml import etree
 
 from .constants import (
-    NS,
-    SCHEME_AGENCY_ATTRS,
-    DIAN_UBL_VERSION,
-    COUNTRY_ID_ATTRS,
-    AUTHORIZATION_PROVIDER_ID,
     GENERIC_CONSUMER,
     UVT_VALUES,
 )
-from .taxes import (
-    Tax,
-    agrupar_impuestos,
-    separar_impuestos_retenciones,
-    calcular_totales_impuestos,
-    truncar,
-    formato_dinero,
-)
-from .cufe import CufeInput, calculate_cude, calculate_software_security_code
+from .document_core import DocumentSpec, DocumentTotals
 from .invoice_builder import InvoiceBuilder, InvoiceConfig, InvoiceLine, Party, Address
-from .exceptions import ValidationError, XmlBuildError, UvtLimitExceededError
-from .validators import validate_before_build, validate_pos_limits
-from ..client.dian_simple import calcular_dv
+from .exceptions import UvtLimitExceededError
+from .validators import validate_pos_limits
 
 
 POS_DOCUMENT_TYPE_CODE = '03'
 POS_DOCUMENT_PROFILE_ID = 'DIAN 2.1: Factura Electronica de Venta'
 POS_UVT_LIMIT = 5  # Limite de 5 UVT para documento POS
 
+# POS no emite retenciones (WithholdingTaxTotal)
+POS_DOCUMENT_SPEC = DocumentSpec(
+    root_element='Invoice',
+    namespace='fe',
+    customization_id='10',
+    profile_id=POS_DOCUMENT_PROFILE_ID,
+    code=POS_DOCUMENT_TYPE_CODE,
+    uuid_scheme='CUDE-SHA384',
+    display_name='documento POS',
+    uses_technical_key=False,  # CUDE usa SoftwarePIN
+    validate_data=True,
+    steps=(
+        'ubl_extensions',
+        'basic_elements',
+        'supplier',
+        'customer',
+        'payment_means',
+        'tax_totals',
+        'monetary_total',
+        'lines',
+    ),
+)
+
 
 @dataclass
 class PosDocumentData:
@@ -83,6 +92,7 @@ class PosDocumentData:
             legal_name=GENERIC_CONSUMER['name'],
             scheme_name=GENERIC_CONSUMER['doc_type'],
             organization_code='2',  # Persona natural
+            tax_level_code='R-99-PN',  # No responsable
         )
 
     @staticmethod
@@ -138,6 +148,8 @@ class PosDocumentBuilder(InvoiceBuilder):
         xml = builder.build(data)
     """
 
+    SPEC = POS_DOCUMENT_SPEC
+
     def __init__(self, config: InvoiceConfig, uvt_year: int = None):
         """
         Inicializar builder POS.
@@ -169,270 +181,28 @@ class PosDocumentBuilder(InvoiceBuilder):
         Raises:
             UvtLimitExceededError: Si el total excede el limite de 5 UVT
         """
-        try:
-            # Si no hay cliente, usar generico
-            if data.customer is None:
-                data.use_generic_consumer()
-
-            # Validar datos
-            validate_before_build(data, self.config, "documento POS")
-
-            # Calcular subtotal
-            subtotal = truncar(sum(
-                line.get_line_total() for line in data.lines
-            ))
-
-            # Recolectar todos los impuestos
-            all_taxes: List[Tax] = []
-            for line in data.lines:
-                all_taxes.extend(line.taxes)
-
-            # Separar impuestos de retenciones
-            impuestos, retenciones = separar_impuestos_retenciones(all_taxes)
-
-            # Calcular totales
-            totales_impuestos = calcular_totales_impuestos(impuestos)
-            total_impuestos = truncar(sum(totales_impuestos.values()))
-
-            # Agrupar para XML
-            impuestos_agrupados = agrupar_impuestos(impuestos)
-
-            # Total documento
-            total = truncar(subtotal + total_impuestos)
-
-            # Validar limite UVT
-            if validate_uvt:
-                errors = validate_pos_limits(total, self.uvt_limit, self.uvt_value)
-                if errors:
-                    raise UvtLimitExceededError(
-                        total=total,
-                        uvt_limit=self.uvt_limit,
-                        uvt_value=self.uvt_value
-                    )
-
-            # Calcular CUDE (documento POS usa CUDE con SoftwarePIN)
-            cufe_input = CufeInput(
-                number=data.number,
-                issue_date=data.issue_date,
-                issue_time=data.issue_time,
-                subtotal=subtotal,
-                iva_amount=totales_impuestos.get('01', 0.0),
-                inc_amount=totales_impuestos.get('04', 0.0),
-                ica_amount=totales_impuestos.get('03', 0.0),
-                total=total,
-                supplier_nit=self.config.nit,
-                customer_nit=data.customer.nit,
-                technical_key=self.config.software_pin,  # PIN para CUDE
-                environment=self.config.environment,
-            )
-            cude = calculate_cude(cufe_input)
-
-            software_security_code = calculate_software_security_code(
-                self.config.software_id,
-                self.config.software_pin,
-                data.number
-            )
+        # Si no hay cliente, usar generico
+        if data.customer is None:
+            data.use_generic_consumer()
 
-            # Construir XML
-            nsmap = {
-                None: NS['fe'],
-                'cac': NS['cac'],
-                'cbc': NS['cbc'],
-                'ext': NS['ext'],
-                'sts': NS['sts'],
-                'xsi': NS['xsi'],
-            }
-
-            doc = etree.Element('Invoice', nsmap=nsmap)
-
-            # UBLExtensions
-            self._add_ubl_extensions_pos(
-                doc, data, cude, software_security_code
-            )
-
-            # Campos principales
-            etree.SubElement(
-                doc, '{%s}UBLVersionID' % NS['cbc']
-            ).text = DIAN_UBL_VERSION
-            etree.SubElement(
-                doc, '{%s}CustomizationID' % NS['cbc']
-            ).text = '10'
-            etree.SubElement(
-                doc, '{%s}ProfileID' % NS['cbc']
-            ).text = POS_DOCUMENT_PROFILE_ID
-            etree.SubElement(
-                doc, '{%s}ProfileExecutionID' % NS['cbc']
-            ).text = self.config.environment
-            etree.SubElement(
-                doc, '{%s}ID' % NS['cbc']
-            ).text = data.number
-
-            # UUID (CUDE)
-            uuid_el = etree.SubElement(doc, '{%s}UUID' % NS['cbc'])
-            uuid_el.set('schemeID', self.config.environment)
-            uuid_el.set('schemeName', 'CUDE-SHA384')
-            uuid_el.text = cude
-
-            # Fechas
-            etree.SubElement(
-                doc, '{%s}IssueDate' % NS['cbc']
-            ).text = data.issue_date
-            etree.SubElement(
-                doc, '{%s}IssueTime' % NS['cbc']
-            ).text = data.issue_time
-            if data.due_date:
-                etree.SubElement(
-                    doc, '{%s}DueDate' % NS['cbc']
-                ).text = data.due_date
-
-            # Tipo de documento
-            inv_type = etree.SubElement(doc, '{%s}InvoiceTypeCode' % NS['cbc'])
-            inv_type.text = POS_DOCUMENT_TYPE_CODE
-
-            # Nota
-            if data.note:
-                etree.SubElement(doc, '{%s}Note' % NS['cbc']).text = data.note
-
-            # Terminal ID en nota adicional
-            if data.terminal_id:
-                etree.SubElement(
-                    doc, '{%s}Note' % NS['cbc']
-                ).text = f"Terminal: {data.terminal_id}"
-
-            # Moneda
-            doc_currency = etree.SubElement(
-                doc, '{%s}DocumentCurrencyCode' % NS['cbc']
-            )
-            doc_currency.set('listAgencyID', '6')
-            doc_currency.set(
-                'listAgencyName',
-                'United Nations Economic Commission for Europe'
-            )
-            doc_currency.set('listID', 'ISO 4217 Alpha')
-            doc_currency.text = 'COP'
-
-            # Cantidad de lineas
-            etree.SubElement(
-                doc, '{%s}LineCountNumeric' % NS['cbc']
-            ).text = str(len(data.lines))
-
-            # Partes
-            self._add_supplier(doc, data.supplier)
-            self._add_customer(doc, data.customer)
-
-            # Medio de pago
-            payment = etree.SubElement(doc, '{%s}PaymentMeans' % NS['cac'])
-            etree.SubElement(payment, '{%s}ID' % NS['cbc']).text = '1'
-            etree.SubElement(
-                payment, '{%s}PaymentMeansCode' % NS['cbc']
-            ).text = data.payment_means_code
-            etree.SubElement(
-                payment, '{%s}PaymentDueDate' % NS['cbc']
-            ).text = data.due_date or data.issue_date
-
-            # Impuestos
-            if impuestos_agrupados:
-                self._add_tax_totals(doc, impuestos_agrupados)
-
-            # Totales monetarios
-            self._add_monetary_total(doc, subtotal, total_impuestos, total)
-
-            # Lineas
-            self._add_invoice_lines(doc, data.lines)
-
-            return doc
-
-        except (ValidationError, UvtLimitExceededError):
-            raise
-        except Exception as e:
-            raise XmlBuildError(
-                f"Error construyendo documento POS: {str(e)}"
-            )
-
-    def _add_ubl_extensions_pos(
-        self,
-        doc: etree._Element,
-        data: PosDocumentData,
-        cude: str,
-        software_security_code: str
-    ):
-        """Agregar UBLExtensions para documento POS."""
-        extensions = etree.SubElement(doc, '{%s}UBLExtensions' % NS['ext'])
-
-        # Extension 1: DIAN Extensions
-        ext1 = etree.SubElement(extensions, '{%s}UBLExtension' % NS['ext'])
-        ext1_content = etree.SubElement(ext1, '{%s}ExtensionContent' % NS['ext'])
-
-        dian_ext = etree.SubElement(
-            ext1_content,
-            '{%s}DianExtensions' % NS['sts'],
-            nsmap={'sts': NS['sts']}
+        return self._build_document(
+            data,
+            check_totals=self._check_uvt_limit if validate_uvt else None
         )
 
-        # InvoiceControl
-        self._add_invoice_control(dian_ext)
-
-        # InvoiceSource
-        inv_source = etree.SubElement(dian_ext, '{%s}InvoiceSource' % NS['sts'])
-        id_country = etree.SubElement(
-            inv_source, '{%s}IdentificationCode' % NS['cbc']
-        )
-        for attr, value in COUNTRY_ID_ATTRS.items():
-            id_country.set(attr, value)
-        id_country.text = 'CO'
-
-        # SoftwareProvider
-        software_prov = etree.SubElement(
-            dian_ext, '{%s}SoftwareProvider' % NS['sts']
-        )
-        prov_id = etree.SubElement(
-            software_prov, '{%s}ProviderID' % NS['sts']
-        )
-        prov_id.set('schemeAgencyID', '195')
-        prov_id.set('schemeAgencyName', SCHEME_AGENCY_ATTRS['schemeAgencyName'])
-        prov_id.set('schemeID', str(calcular_dv(self.config.nit)))
-        prov_id.set('schemeName', '31')
-        prov_id.text = self.config.nit
-
-        soft_id = etree.SubElement(
-            software_prov, '{%s}SoftwareID' % NS['sts']
-        )
-        soft_id.set('schemeAgencyID', '195')
-        soft_id.set('schemeAgencyName', SCHEME_AGENCY_ATTRS['schemeAgencyName'])
-        soft_id.text = self.config.software_id
-
-        # SoftwareSecurityCode
-        soft_sec = etree.SubElement(
-            dian_ext, '{%s}SoftwareSecurityCode' % NS['sts']
-        )
-        soft_sec.set('schemeAgencyID', '195')
-        soft_sec.set('schemeAgencyName', SCHEME_AGENCY_ATTRS['schemeAgencyName'])
-        soft_sec.text = software_security_code
-
-        # AuthorizationProvider
-        auth_prov = etree.SubElement(
-            dian_ext, '{%s}AuthorizationProvider' % NS['sts']
-        )
-        auth_prov_id = etree.SubElement(
-            auth_prov, '{%s}AuthorizationProviderID' % NS['sts']
-        )
-        auth_prov_id.set('schemeAgencyID', '195')
-        auth_prov_id.set(
-            'schemeAgencyName', SCHEME_AGENCY_ATTRS['schemeAgencyName']
-        )
-        auth_prov_id.set('schemeID', '4')
-        auth_prov_id.set('schemeName', '31')
-        auth_prov_id.text = AUTHORIZATION_PROVIDER_ID
-
-        # QRCode
-        qr_base = (
-            'https://catalogo-vpfe-hab.dian.gov.co'
-            if self.config.environment == '2'
-            else 'https://catalogo-vpfe.dian.gov.co'
-        )
-        qr_code = etree.SubElement(dian_ext, '{%s}QRCode' % NS['sts'])
-        qr_code.text = f"{qr_base}/document/searchqr?documentkey={cude}"
+    def _check_uvt_limit(self, totals: DocumentTotals):
+        """Validar que el total no exceda el limite UVT."""
+        errors = validate_pos_limits(totals.total, self.uvt_limit, self.uvt_value)
+        if errors:
+            raise UvtLimitExceededError(
+                total=totals.total,
+                uvt_limit=self.uvt_limit,
+                uvt_value=self.uvt_value
+            )
 
-        # Extension 2: Signature (vacio, se llena con firma)
-        ext2 = etree.SubElement(extensions, '{%s}UBLExtension' % NS['ext'])
-        etree.SubElement(ext2, '{%s}ExtensionContent' % NS['ext'])
+    def _document_notes(self, data: PosDocumentData) -> List[str]:
+        """Nota opcional y nota adicional con el terminal."""
+        notes = [data.note] if data.note else []
+        if data.terminal_id:
+            notes.append(f"Terminal: {data.terminal_id}")
+        return notes
@@ -0,0 +1,620 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Motor de reglas de validacion compiladas.
+
+Las validaciones de configuracion, partes, lineas y factura se declaran
+como listas de Rule. Un RuleSet las compila una sola vez en una funcion
+de Python generada: los atributos se leen una vez, los chequeos simples
+quedan en linea, las expresiones regulares ya compiladas y las reglas de
+un mismo campo se ordenan por costo. Al validar, la primera regla que
+falla en un campo detiene las siguientes del mismo campo (no se valida
+el formato de un valor requerido que falta ni la fecha de un valor con
+formato invalido).
+
+Cada error es un RuleViolation con el codigo DIAN (ver DIAN_ERROR_CODES),
+el campo y el mensaje.
+
+Ejemplo:
+    checker = InvoiceRuleChecker()
+    violations = checker.validate(data, config)
+    report = checker.validate_many([data1, data2, data3], config)
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Expresiones regulares
+NIT_PATTERN = re.compile(r'^\d{9,10}$')
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+TIME_PATTERN = re.compile(r'^\d{2}:\d{2}:\d{2}-05:00$')
+UUID_PATTERN = re.compile(
+    r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$',
+    re.IGNORECASE
+)
+POSTAL_CODE_PATTERN = re.compile(r'^\d{6}$')
+MUNICIPALITY_CODE_PATTERN = re.compile(r'^\d{5}$')
+
+# Raiz de las rutas que se leen de la configuracion
+CONFIG_ROOT = 'config'
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    Regla de validacion declarativa.
+
+    Attributes:
+        field: Ruta del valor con puntos ('supplier.address.city_name');
+            'config.' lee de la configuracion y '[]' recorre una lista
+            ('lines[].quantity')
+        check: Nombre del chequeo en CHECKS
+        code: Codigo DIAN del error (ver DIAN_ERROR_CODES)
+        label: Nombre del campo en el mensaje; '{index}' se reemplaza por
+            la posicion del elemento en listas (desde 1)
+        arg: Argumento del chequeo (patron, valores permitidos, etc.)
+        message: Plantilla del mensaje (default: la del chequeo)
+        when: Condicion (ruta, valores[, default]): la regla solo aplica
+            si el valor de la ruta esta en los valores; default es el valor
+            cuando el atributo no existe
+        unless: Condicion (ruta, valores[, default]): la regla no aplica
+            si el valor de la ruta esta en los valores
+        cost: Costo relativo (default: el del chequeo)
+    """
+    field: str
+    check: str
+    code: str
+    label: str = ''
+    arg: Any = None
+    message: Optional[str] = None
+    when: Optional[Tuple[str, Sequence]] = None
+    unless: Optional[Tuple[str, Sequence]] = None
+    cost: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class RuleViolation:
+    """Error de validacion con su codigo DIAN."""
+    code: str
+    field: str
+    message: str
+
+    @property
+    def is_config(self) -> bool:
+        """True si el error es de la configuracion."""
+        return self.field.startswith(CONFIG_ROOT + '.')
+
+    def as_dict(self) -> Dict[str, str]:
+        return {'code': self.code, 'field': self.field, 'message': self.message}
+
+
+# =============================================================================
+# CHEQUEOS
+# =============================================================================
+#
+# Cada fabrica recibe la Rule y devuelve fn(value, data, config) que
+# retorna None si el valor es valido o la plantilla del mensaje. Los
+# chequeos simples llevan ademas `inline`: la expresion (sobre `v`) que
+# indica el error, para que el codigo generado no haga la llamada.
+
+def _inline(check, expression: str, message: str):
+    check.inline = expression
+    check.message = message
+    return check
+
+
+def _required(rule):
+    message = rule.message or '{label} es requerido'
+
+    def check(value, data, config):
+        if not value or not str(value).strip():
+            return message
+    return _inline(check, 'not v or not str(v).strip()', message)
+
+
+def _non_empty(rule):
+    message = rule.message or '{label} es requerido'
+
+    def check(value, data, config):
+        if not value:
+            return message
+    return _inline(check, 'not v', message)
+
+
+def _pattern(rule):
+    match = re.compile(rule.arg).match if isinstance(rule.arg, str) else rule.arg.match
+    message = rule.message or '{label} tiene formato invalido (recibido: {value})'
+
+    def check(value, data, config):
+        if value and not match(str(value)):
+            return message
+    return check
+
+
+def _nit(rule):
+    match = NIT_PATTERN.match
+    message = rule.message or '{label} debe tener 9-10 digitos (recibido: {value})'
+
+    def check(value, data, config):
+        if value and not match(value.replace('-', '').replace(' ', '').strip()):
+            return message
+    return check
+
+
+def _parse_date(value: str) -> date:
+    """Fecha YYYY-MM-DD (sin pasar por strptime en el caso comun)."""
+    if DATE_PATTERN.match(value):
+        return date(int(value[:4]), int(value[5:7]), int(value[8:10]))
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _date(rule):
+    message = rule.message or '{label} no es una fecha valida: {value}'
+
+    def check(value, data, config):
+        if not value:
+            return None
+        try:
+            _parse_date(value)
+        except (TypeError, ValueError):
+            return message
+    return check
+
+
+def _one_of(rule):
+    allowed = frozenset(rule.arg)
+    message = rule.message or '{label} no es valido (recibido: {value})'
+
+    def check(value, data, config):
+        if value not in allowed:
+            return message
+    check.allowed = allowed
+    return _inline(check, 'v not in {allowed}', message)
+
+
+def _positive(rule):
+    allow_zero = bool(rule.arg)
+
+    def check(value, data, config):
+        if value is None:
+            return '{label} es requerido'
+        if allow_zero:
+            if value < 0:
+                return '{label} no puede ser negativo (recibido: {value})'
+        elif value <= 0:
+            return '{label} debe ser mayor que cero (recibido: {value})'
+    return check
+
+
+def parse_consecutive(number: Any, prefix: str = '') -> Optional[int]:
+    """
+    Consecutivo numerico de un numero de documento.
+
+    Args:
+        number: Numero del documento (ej: 'SETP990000001')
+        prefix: Prefijo de la resolucion (ej: 'SETP')
+
+    Returns:
+        Consecutivo (ej: 990000001) o None si no tiene digitos
+    """
+    num_str = str(number).replace(prefix or '', '').strip()
+    if not num_str.isdigit():
+        num_str = ''.join(filter(str.isdigit, num_str))
+    return int(num_str) if num_str else None
+
+
+def _consecutive_range(rule):
+    """Numero del documento dentro del rango de la resolucion."""
+
+    def check(value, data, config):
+        range_from = getattr(config, 'range_from', None)
+        range_to = getattr(config, 'range_to', None)
+        if not (value and range_from and range_to):
+            return None
+        try:
+            current = parse_consecutive(value, getattr(config, 'prefix', ''))
+            if current is None:
+                return None
+            from_val = int(range_from)
+            to_val = int(range_to)
+        except (ValueError, AttributeError):
+            return None
+        if current < from_val or current > to_val:
+            return f"Consecutivo {current} fuera de rango [{from_val}-{to_val}]"
+    return check
+
+
+def _resolution_period(rule):
+    """Fecha de emision dentro del periodo de la resolucion."""
+
+    def check(value, data, config):
+        start_date = getattr(config, 'resolution_date', None)
+        end_date = getattr(config, 'resolution_end_date', None)
+        if not (value and start_date and end_date):
+            return None
+        try:
+            start = _parse_date(start_date)
+            end = _parse_date(end_date)
+            issue = _parse_date(value)
+        except (TypeError, ValueError):
+            # Las fechas invalidas ya las reportan sus propias reglas
+            return None
+        if issue < start:
+            return (f"Fecha emision {value} anterior a inicio de "
+                    f"resolucion {start_date}")
+        if issue > end:
+            return (f"Fecha emision {value} posterior a fin de "
+                    f"resolucion {end_date}")
+    return check
+
+
+# Nombre -> (fabrica, costo por defecto)
+CHECKS: Dict[str, Tuple[Callable, int]] = {
+    'required': (_required, 0),
+    'non_empty': (_non_empty, 0),
+    'one_of': (_one_of, 0),
+    'positive': (_positive, 0),
+    'pattern': (_pattern, 1),
+    'nit': (_nit, 1),
+    'date': (_date, 3),
+    'consecutive_range': (_consecutive_range, 4),
+    'resolution_period': (_resolution_period, 5),
+}
+
+
+# =============================================================================
+# COMPILACION
+# =============================================================================
+#
+# Un RuleSet genera el codigo de una sola funcion de validacion: cada
+# objeto intermedio ('supplier', 'supplier.address') se lee una vez, las
+# reglas de las listas se evaluan en un solo recorrido por elemento y las
+# reglas de un campo quedan encadenadas por costo (la siguiente solo se
+# evalua si la anterior paso).
+
+
+def _split_path(path: str) -> Tuple[str, Tuple[str, ...]]:
+    """'config.nit' -> ('config', ('nit',)); 'supplier.nit' -> ('data', ...)."""
+    names = tuple(name for name in path.split('.') if name)
+    if names and names[0] == CONFIG_ROOT:
+        return CONFIG_ROOT, names[1:]
+    return 'data', names
+
+
+def _violation(rule: Rule, field: str, message: str, value: Any, index: int):
+    """Construir el RuleViolation (solo se llama cuando una regla falla)."""
+    return RuleViolation(
+        code=rule.code,
+        field=field.format(index=index),
+        message=message.format(label=rule.label.format(index=index), value=value),
+    )
+
+
+# Marca de nombre sin valor asociado en el codigo generado
+_NO_VALUE = object()
+
+
+class _CodeGenerator:
+    """Generador del codigo de la funcion de validacion."""
+
+    def __init__(self):
+        self.lines = ['def check(data, config):', '    out = []']
+        self.namespace = {'_violation': _violation}
+        self._counter = 0
+
+    def name(self, prefix: str, value: Any = _NO_VALUE) -> str:
+        self._counter += 1
+        name = f'{prefix}{self._counter}'
+        if value is not _NO_VALUE:
+            self.namespace[name] = value
+        return name
+
+    def emit(self, indent: int, line: str):
+        self.lines.append('    ' * indent + line)
+
+    def object_var(self, scope: Dict, base: str, names: Tuple[str, ...], indent: int) -> str:
+        """Variable con el objeto en `names` (relativo a `base`), leido una vez."""
+        if not names:
+            return base
+        key = (base,) + names
+        if key not in scope:
+            parent = self.object_var(scope, base, names[:-1], indent)
+            var = self.name('o')
+            self.emit(indent, f'{var} = getattr({parent}, {names[-1]!r}, None) '
+                              f'if {parent} else None')
+            scope[key] = var
+        return scope[key]
+
+    def condition(self, scope: Dict, rule: Rule, indent: int) -> Optional[str]:
+        """Expresion de las condiciones when/unless de la regla."""
+        parts = []
+        for condition, operator in ((rule.when, 'in'), (rule.unless, 'not in')):
+            if condition is None:
+                continue
+            path, values, *default = condition
+            default = self.name('d', default[0]) if default else 'None'
+            root, names = _split_path(path)
+            parent = self.object_var(scope, root, names[:-1], indent)
+            allowed = self.name('a', frozenset(values))
+            parts.append(f'(getattr({parent}, {names[-1]!r}, {default}) '
+                         f'if {parent} else {default}) {operator} {allowed}')
+        return ' and '.join(parts) or None
+
+    def field(self, scope: Dict, base: str, names: Tuple[str, ...], field: str,
+              rules: List[Rule], indent: int, index: str = 'None', checked: str = None):
+        """Codigo de las reglas de un campo (`checked`: variable ya no vacia)."""
+        ordered = sorted(rules, key=lambda r: CHECKS[r.check][1] if r.cost is None else r.cost)
+        conditions = [self.condition(scope, rule, indent) for rule in ordered]
+
+        if names:
+            parent = self.object_var(scope, base, names[:-1], indent)
+            if parent != checked:
+                self.emit(indent, f'if {parent}:')
+                indent += 1
+            self.emit(indent, f'v = getattr({parent}, {names[-1]!r}, None)')
+        else:
+            self.emit(indent, f'v = {base}')
+
+        field_name = self.name('f', field)
+        for position, (rule, condition) in enumerate(zip(ordered, conditions)):
+            check = CHECKS[rule.check][0](rule)
+            rule_name = self.name('r', rule)
+            inline = getattr(check, 'inline', None)
+            if inline:
+                if hasattr(check, 'allowed'):
+                    inline = inline.format(allowed=self.name('a', check.allowed))
+                failed = inline
+                if condition:
+                    failed = f'({condition}) and ({failed})'
+                message = self.name('s', check.message)
+                self.emit(indent, f'if {failed}:')
+                self.emit(indent + 1, f'out.append(_violation({rule_name}, {field_name}, '
+                                      f'{message}, v, {index}))')
+            else:
+                call = f'{self.name("c", check)}(v, data, config)'
+                if condition:
+                    call = f'{call} if {condition} else None'
+                self.emit(indent, f'm = {call}')
+                self.emit(indent, 'if m is not None:')
+                self.emit(indent + 1, f'out.append(_violation({rule_name}, {field_name}, '
+                                      f'm, v, {index}))')
+            if position < len(ordered) - 1:
+                self.emit(indent, 'else:')
+                indent += 1
+
+    def compile(self) -> Callable:
+        self.emit(1, 'return out')
+        exec('\n'.join(self.lines), self.namespace)
+        return self.namespace['check']
+
+
+class RuleSet:
+    """
+    Conjunto de reglas compilado.
+
+    Las reglas se agrupan por campo (en el orden de su primera aparicion)
+    y, dentro de cada campo, se ordenan por costo. Las reglas sobre
+    elementos de una lista ('lines[].x') se evaluan elemento por elemento.
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules = list(rules)
+        for rule in self.rules:
+            if rule.check not in CHECKS:
+                raise ValueError(f"Chequeo desconocido: {rule.check}")
+        self._check = self._compile()
+
+    def _compile(self) -> Callable:
+        # Plan: campos simples y listas, en el orden de primera aparicion
+        plan: Dict[Any, Any] = {}
+        for rule in self.rules:
+            if '[]' in rule.field:
+                list_path, item_path = rule.field.split('[]', 1)
+                items = plan.setdefault(('list', list_path), {})
+                items.setdefault(item_path, []).append(rule)
+            else:
+                plan.setdefault(('field', rule.field), []).append(rule)
+
+        code = _CodeGenerator()
+        scope = {}
+        for (kind, path), content in plan.items():
+            root, names = _split_path(path)
+            if kind == 'field':
+                code.field(scope, root, names, path, content, 1)
+                continue
+
+            # Lista: un recorrido con todas las reglas de sus elementos
+            items_var = code.object_var(scope, root, names, 1)
+            code.emit(1, f'if {items_var}:')
+            code.emit(2, 'for i, item in enumerate(' + items_var + ', 1):')
+            code.emit(3, 'if item:')
+            # Variables leidas dentro del recorrido: no se reutilizan fuera
+            item_scope = dict(scope)
+            for item_path, rules in content.items():
+                _, item_names = _split_path(item_path)
+                code.field(item_scope, 'item', item_names,
+                           f'{path}[{{index}}]{item_path}', rules, 4, 'i', 'item')
+        return code.compile()
+
+    def __add__(self, other: 'RuleSet') -> 'RuleSet':
+        return RuleSet(self.rules + other.rules)
+
+    def check(self, data: Any, config: Any = None) -> List[RuleViolation]:
+        """
+        Validar un objeto.
+
+        Args:
+            data: Objeto a validar (rutas sin 'config.')
+            config: Configuracion (rutas con 'config.')
+
+        Returns:
+            Lista de RuleViolation (vacia si es valido)
+        """
+        return self._check(data, config)
+
+
+# =============================================================================
+# REGLAS
+# =============================================================================
+
+def _join(path: str, name: str) -> str:
+    return f'{path}.{name}' if path else name
+
+
+def config_rules(path: str = CONFIG_ROOT) -> List[Rule]:
+    """Reglas de la configuracion de facturacion."""
+    f = lambda name: _join(path, name)  # noqa: E731
+    return [
+        # Software
+        Rule(f('software_id'), 'required', 'SFT01', 'Software ID'),
+        Rule(f('software_id'), 'pattern', 'SFT01', 'Software ID', UUID_PATTERN,
+             '{label} no tiene formato UUID valido: {value}'),
+        Rule(f('software_pin'), 'required', 'SFT02', 'Software PIN'),
+        Rule(f('technical_key'), 'required', 'FAB03', 'Clave tecnica'),
+        # Empresa
+        Rule(f('nit'), 'non_empty', 'FAJ44a', 'NIT empresa'),
+        Rule(f('nit'), 'nit', 'FAB04', 'NIT empresa'),
+        Rule(f('company_name'), 'required', 'FAJ43a', 'Nombre empresa'),
+        # Resolucion
+        Rule(f('resolution_number'), 'required', 'FAN05', 'Numero de resolucion'),
+        *_date_rules(f('resolution_date'), 'Fecha inicio resolucion', 'FAN05'),
+        *_date_rules(f('resolution_end_date'), 'Fecha fin resolucion', 'FAN05'),
+        # Rangos
+        Rule(f('range_from'), 'required', 'FAN02', 'Rango desde'),
+        Rule(f('range_to'), 'required', 'FAN02', 'Rango hasta'),
+        # Ambiente
+        Rule(f('environment'), 'one_of', 'FAB04', 'Ambiente', ('1', '2'),
+             "Ambiente debe ser '1' (produccion) o '2' (pruebas)"),
+    ]
+
+
+def _date_rules(field: str, label: str, code: str) -> List[Rule]:
+    return [
+        Rule(field, 'non_empty', code, label, message='{label} es requerida'),
+        Rule(field, 'pattern', code, label, DATE_PATTERN,
+             '{label} debe tener formato YYYY-MM-DD (recibido: {value})'),
+        Rule(field, 'date', code, label),
+    ]
+
+
+# Codigos DIAN por rol: (documento, nombre, tipo organizacion, direccion, municipio)
+PARTY_CODES = {
+    'Emisor': ('FAJ44a', 'FAJ43a', 'FAB04', 'FAJ45', 'FAJ46'),
+    'Adquiriente': ('FAK01', 'FAK02', 'FAK03', 'FAB03', 'FAB04'),
+}
+
+
+def party_rules(path: str, role: str) -> List[Rule]:
+    """Reglas de una parte (emisor o adquiriente) en la ruta `path`."""
+    doc_code, name_code, org_code, address_code, city_code = PARTY_CODES.get(
+        role, ('FAB03', 'FAB03', 'FAB04', 'FAB03', 'FAB04')
+    )
+    f = lambda name: _join(path, name)  # noqa: E731
+    scheme = (f('scheme_name'), ('31',), '31')
+    return [
+        Rule(path, 'non_empty', doc_code, role),
+        # Documento de identificacion: NIT con formato, otros solo requeridos
+        Rule(f('nit'), 'non_empty', doc_code, f'NIT {role}', when=scheme),
+        Rule(f('nit'), 'nit', 'FAB04', f'NIT {role}', when=scheme),
+        Rule(f('nit'), 'required', doc_code, f'Documento {role}', unless=scheme),
+        # Nombres
+        Rule(f('name'), 'required', name_code, f'Nombre {role}'),
+        Rule(f('legal_name'), 'required', name_code, f'Razon social {role}'),
+        # Tipo de organizacion
+        Rule(f('organization_code'), 'one_of', org_code, role, ('1', '2'),
+             "Tipo organizacion {label} debe ser '1' (juridica) o '2' (natural)"),
+        # Direccion
+        Rule(f('address'), 'non_empty', address_code, f'Direccion {role}',
+             message='{label} es requerida'),
+        Rule(f('address.city_code'), 'non_empty', city_code, f'Codigo municipio {role}'),
+        Rule(f('address.city_name'), 'required', city_code, f'Ciudad {role}'),
+        Rule(f('address.address_line'), 'required', address_code, f'Direccion {role}'),
+    ]
+
+
+def line_rules(path: str = 'lines') -> List[Rule]:
+    """Reglas de las lineas del documento."""
+    f = lambda name: f'{path}[].{name}'  # noqa: E731
+    return [
+        Rule(path, 'non_empty', 'FAB03',
+             message='Factura debe tener al menos una linea'),
+        Rule(f('description'), 'required', 'FAL03', 'Linea {index} descripcion'),
+        Rule(f('quantity'), 'positive', 'FAL01', 'Linea {index} cantidad', False),
+        Rule(f('unit_price'), 'positive', 'FAL02', 'Linea {index} precio unitario', True),
+        Rule(f('unit_code'), 'required', 'FAL04', 'Linea {index} codigo unidad'),
+    ]
+
+
+def document_rules() -> List[Rule]:
+    """Reglas de los datos de una factura o nota (sin configuracion)."""
+    return [
+        Rule('number', 'required', 'FAB03', 'Numero de factura'),
+        *_date_rules('issue_date', 'Fecha emision', 'FAD01'),
+        Rule('issue_time', 'non_empty', 'FAD03', 'Hora emision',
+             message='{label} es requerida'),
+        Rule('issue_time', 'pattern', 'FAD03', 'Hora emision', TIME_PATTERN,
+             '{label} debe tener formato HH:MM:SS-05:00 (recibido: {value})'),
+        Rule('due_date', 'pattern', 'FAD04', 'Fecha vencimiento', DATE_PATTERN,
+             '{label} debe tener formato YYYY-MM-DD (recibido: {value})'),
+        Rule('due_date', 'date', 'FAD04', 'Fecha vencimiento'),
+        *party_rules('supplier', 'Emisor'),
+        *party_rules('customer', 'Adquiriente'),
+        *line_rules('lines'),
+        Rule('number', 'consecutive_range', 'FAN02'),
+    ]
+
+
+def production_rules() -> List[Rule]:
+    """Reglas adicionales para produccion."""
+    return [
+        Rule('issue_date', 'resolution_period', 'FAD02'),
+    ]
+
+
+# Conjuntos compilados una sola vez
+CONFIG_RULES = RuleSet(config_rules())
+DOCUMENT_RULES = RuleSet(document_rules())
+PRODUCTION_RULES = RuleSet(document_rules() + production_rules())
+
+
+class InvoiceRuleChecker:
+    """
+    Validacion de facturas y notas con las reglas compiladas.
+
+    Las reglas de configuracion y las del documento se evaluan por
+    separado: en validate_many la configuracion se valida una sola vez
+    para todo el lote.
+    """
+
+    def __init__(
+        self,
+        config_rules: RuleSet = None,
+        document_rules: RuleSet = None
+    ):
+        self.config_rules = config_rules or CONFIG_RULES
+        self.document_rules = document_rules or DOCUMENT_RULES
+
+    def validate(self, data: Any, config: Any) -> List[RuleViolation]:
+        """Validar un documento y su configuracion."""
+        return (self.config_rules.check(None, config)
+                + self.document_rules.check(data, config))
+
+    def validate_many(
+        self,
+        documents: Iterable[Any],
+        config: Any
+    ) -> List[List[RuleViolation]]:
+        """
+        Validar varios documentos con la misma configuracion.
+
+        Returns:
+            Lista alineada con `documents`: los errores de cada documento
+            (los de configuracion se repiten en todos)
+        """
+        config_violations = self.config_rules.check(None, config)
+        check = self.document_rules.check
+        return [config_violations + check(data, config) for data in documents]
@@ -20,6 +20,7 @@ from typing import Optional, Tuple
 
 from lxml import etree
 
+from ..instrumentation import timed
 from .constants import NS_SOAP, C14N_EXC_ALG, RSA_SHA256, SHA256_ALG, DIAN_ENDPOINTS
 
 
@@ -191,6 +192,7 @@ def build_signed_info_xml(
 </ds:SignedInfo>'''
 
 
+@timed('soap.envelope')
 def build_wssec_soap(
     body_content: str,
     action: str,
@@ -10,18 +10,19 @@ from datetime import datetime
 from typing import List, Any, Optional
 
 from .exceptions import ValidationError, RangeError
-
-
-# Expresiones regulares
-NIT_PATTERN = re.compile(r'^\d{9,10}$')
-DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
-TIME_PATTERN = re.compile(r'^\d{2}:\d{2}:\d{2}-05:00$')
-UUID_PATTERN = re.compile(
-    r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$',
-    re.IGNORECASE
+from .rules import (
+    CONFIG_RULES,
+    DATE_PATTERN,
+    NIT_PATTERN,
+    PRODUCTION_RULES,
+    TIME_PATTERN,
+    UUID_PATTERN,
+    InvoiceRuleChecker,
+    RuleSet,
+    RuleViolation,
+    line_rules,
+    party_rules,
 )
-POSTAL_CODE_PATTERN = re.compile(r'^\d{6}$')
-MUNICIPALITY_CODE_PATTERN = re.compile(r'^\d{5}$')
 
 
 def validate_nit(nit: str, field_name: str = "NIT") -> List[str]:
@@ -108,217 +109,81 @@ def validate_positive_number(
     return errors
 
 
+def _messages(violations: List[RuleViolation]) -> List[str]:
+    """Mensajes de error con el prefijo 'Config: ' para la configuracion."""
+    return [
+        f"Config: {v.message}" if v.is_config else v.message
+        for v in violations
+    ]
+
+
 class ConfigValidator:
     """Validador de configuracion de facturacion."""
 
     def validate(self, config: Any) -> List[str]:
         """Validar configuracion."""
-        errors = []
-
-        # Software
-        errors.extend(validate_uuid(
-            getattr(config, 'software_id', None), "Software ID"
-        ))
-        errors.extend(validate_not_empty(
-            getattr(config, 'software_pin', None), "Software PIN"
-        ))
-        errors.extend(validate_not_empty(
-            getattr(config, 'technical_key', None), "Clave tecnica"
-        ))
-
-        # Empresa
-        errors.extend(validate_nit(
-            getattr(config, 'nit', None), "NIT empresa"
-        ))
-        errors.extend(validate_not_empty(
-            getattr(config, 'company_name', None), "Nombre empresa"
-        ))
-
-        # Resolucion
-        errors.extend(validate_not_empty(
-            getattr(config, 'resolution_number', None), "Numero de resolucion"
-        ))
-        errors.extend(validate_date(
-            getattr(config, 'resolution_date', None), "Fecha inicio resolucion"
-        ))
-        errors.extend(validate_date(
-            getattr(config, 'resolution_end_date', None), "Fecha fin resolucion"
-        ))
-
-        # Rangos
-        errors.extend(validate_not_empty(
-            getattr(config, 'range_from', None), "Rango desde"
-        ))
-        errors.extend(validate_not_empty(
-            getattr(config, 'range_to', None), "Rango hasta"
-        ))
-
-        # Ambiente
-        environment = getattr(config, 'environment', None)
-        if environment not in ('1', '2'):
-            errors.append("Ambiente debe ser '1' (produccion) o '2' (pruebas)")
-
-        return errors
+        return [v.message for v in CONFIG_RULES.check(None, config)]
 
 
 class PartyValidator:
     """Validador de datos de parte (emisor/receptor)."""
 
+    # Reglas compiladas por tipo de parte
+    _rules = {}
+
     def validate(self, party: Any, party_type: str = "Parte") -> List[str]:
         """Validar datos de una parte."""
-        errors = []
-        if party is None:
-            errors.append(f"{party_type} es requerido")
-            return errors
-
-        # Documento de identificacion
-        scheme_name = getattr(party, 'scheme_name', '31')
-        nit = getattr(party, 'nit', None)
-        if scheme_name == '31':
-            errors.extend(validate_nit(nit, f"NIT {party_type}"))
-        else:
-            errors.extend(validate_not_empty(nit, f"Documento {party_type}"))
-
-        # Nombres
-        errors.extend(validate_not_empty(
-            getattr(party, 'name', None), f"Nombre {party_type}"
-        ))
-        errors.extend(validate_not_empty(
-            getattr(party, 'legal_name', None), f"Razon social {party_type}"
-        ))
-
-        # Tipo de organizacion
-        org_code = getattr(party, 'organization_code', None)
-        if org_code not in ('1', '2'):
-            errors.append(
-                f"Tipo organizacion {party_type} debe ser "
-                "'1' (juridica) o '2' (natural)"
-            )
-
-        # Direccion
-        address = getattr(party, 'address', None)
-        if address:
-            if not getattr(address, 'city_code', None):
-                errors.append(f"Codigo municipio {party_type} es requerido")
-            errors.extend(validate_not_empty(
-                getattr(address, 'city_name', None), f"Ciudad {party_type}"
-            ))
-            errors.extend(validate_not_empty(
-                getattr(address, 'address_line', None), f"Direccion {party_type}"
-            ))
-        else:
-            errors.append(f"Direccion {party_type} es requerida")
-
-        return errors
+        rules = self._rules.get(party_type)
+        if rules is None:
+            rules = self._rules[party_type] = RuleSet(party_rules('', party_type))
+        return [v.message for v in rules.check(party)]
 
 
 class InvoiceLineValidator:
     """Validador de lineas de factura."""
 
+    _rules = RuleSet(line_rules(''))
+
     def validate(self, lines: List[Any]) -> List[str]:
         """Validar lineas de factura."""
-        errors = []
-        if not lines:
-            errors.append("Factura debe tener al menos una linea")
-            return errors
-
-        for i, line in enumerate(lines, 1):
-            prefix = f"Linea {i}"
-
-            errors.extend(validate_not_empty(
-                getattr(line, 'description', None), f"{prefix} descripcion"
-            ))
-            errors.extend(validate_positive_number(
-                getattr(line, 'quantity', None),
-                f"{prefix} cantidad",
-                allow_zero=False
-            ))
-            errors.extend(validate_positive_number(
-                getattr(line, 'unit_price', None),
-                f"{prefix} precio unitario",
-                allow_zero=True
-            ))
-            errors.extend(validate_not_empty(
-                getattr(line, 'unit_code', None), f"{prefix} codigo unidad"
-            ))
-
-        return errors
+        return [v.message for v in self._rules.check(lines)]
 
 
 class InvoiceValidator:
-    """Validador completo de factura."""
+    """
+    Validador completo de factura.
+
+    Usa las reglas compiladas de rules.py; validate_violations y
+    validate_many devuelven los errores con su codigo DIAN.
+    """
 
-    def __init__(self):
-        self.config_validator = ConfigValidator()
-        self.party_validator = PartyValidator()
-        self.line_validator = InvoiceLineValidator()
+    def __init__(self, checker: InvoiceRuleChecker = None):
+        self.checker = checker or InvoiceRuleChecker()
 
     def validate(self, data: Any, config: Any) -> List[str]:
         """Validar factura completa."""
-        errors = []
+        return _messages(self.checker.validate(data, config))
 
-        # Validar configuracion
-        config_errors = self.config_validator.validate(config)
-        if config_errors:
-            errors.extend([f"Config: {e}" for e in config_errors])
+    def validate_violations(self, data: Any, config: Any) -> List[RuleViolation]:
+        """Validar factura completa devolviendo RuleViolation."""
+        return self.checker.validate(data, config)
 
-        # Numero de documento
-        errors.extend(validate_not_empty(
-            getattr(data, 'number', None), "Numero de factura"
-        ))
-
-        # Fechas
-        errors.extend(validate_date(
-            getattr(data, 'issue_date', None), "Fecha emision"
-        ))
-        errors.extend(validate_time(
-            getattr(data, 'issue_time', None), "Hora emision"
-        ))
+    def validate_many(
+        self,
+        documents: List[Any],
+        config: Any
+    ) -> List[List[RuleViolation]]:
+        """Validar varios documentos (la configuracion se valida una vez)."""
+        return self.checker.validate_many(documents, config)
 
-        due_date = getattr(data, 'due_date', None)
-        if due_date:
-            errors.extend(validate_date(due_date, "Fecha vencimiento"))
-
-        # Partes
-        supplier = getattr(data, 'supplier', None)
-        customer = getattr(data, 'customer', None)
-        errors.extend(self.party_validator.validate(supplier, "Emisor"))
-        errors.extend(self.party_validator.validate(customer, "Adquiriente"))
-
-        # Lineas
-        lines = getattr(data, 'lines', [])
-        errors.extend(self.line_validator.validate(lines))
-
-        # Validar consecutivo en rango
-        number = getattr(data, 'number', None)
-        range_from = getattr(config, 'range_from', None)
-        range_to = getattr(config, 'range_to', None)
-
-        if number and range_from and range_to:
-            try:
-                prefix = getattr(config, 'prefix', '') or ''
-                num_str = str(number).replace(prefix, '').strip()
-                if not num_str.isdigit():
-                    num_str = ''.join(filter(str.isdigit, num_str))
-                if num_str:
-                    current = int(num_str)
-                    from_val = int(range_from)
-                    to_val = int(range_to)
-                    if current < from_val or current > to_val:
-                        errors.append(
-                            f"Consecutivo {current} fuera de rango "
-                            f"[{from_val}-{to_val}]"
-                        )
-            except (ValueError, AttributeError):
-                pass
 
-        return errors
+# Validador compartido: las reglas se compilan al importar el modulo
+_INVOICE_VALIDATOR = InvoiceValidator()
 
 
 def validate_invoice(data: Any, config: Any) -> None:
     """Validar factura y lanzar excepcion si hay errores."""
-    validator = InvoiceValidator()
-    errors = validator.validate(data, config)
+    errors = _INVOICE_VALIDATOR.validate(data, config)
     if errors:
         raise ValidationError("Datos de factura invalidos", errors=errors)
 
@@ -329,8 +194,7 @@ def validate_before_build(
     doc_type: str = "factura"
 ) -> None:
     """Validar antes de construir XML."""
-    validator = InvoiceValidator()
-    errors = validator.validate(data, config)
+    errors = _INVOICE_VALIDATOR.validate(data, config)
     if errors:
         raise ValidationError(f"Datos de {doc_type} invalidos", errors=errors)
 
@@ -673,6 +537,9 @@ class ProductionValidator:
     un documento a produccion.
     """
 
+    # Reglas de factura mas el periodo de la resolucion, compiladas juntas
+    _checker = InvoiceRuleChecker(document_rules=PRODUCTION_RULES)
+
     def __init__(self, uvt_value: float = 47065.0):
         """
         Inicializar validador de produccion.
@@ -697,23 +564,20 @@ class ProductionValidator:
         Returns:
             Lista de todos los errores encontrados
         """
-        errors = []
-
-        # Validacion basica
-        validator = InvoiceValidator()
-        errors.extend(validator.validate(data, config))
+        return _messages(self._checker.validate(data, config))
 
-        # Validar fechas de resolucion
-        start_date = getattr(config, 'resolution_date', None)
-        end_date = getattr(config, 'resolution_end_date', None)
-        issue_date = getattr(data, 'issue_date', None)
-
-        if start_date and end_date and issue_date:
-            errors.extend(validate_resolution_dates(
-                start_date, end_date, issue_date
-            ))
+    def validate_many_for_production(
+        self,
+        documents: List[Any],
+        config: Any
+    ) -> List[List[RuleViolation]]:
+        """
+        Validar varias facturas para produccion.
 
-        return errors
+        Returns:
+            Errores de cada documento (RuleViolation con codigo DIAN)
+        """
+        return self._checker.validate_many(documents, config)
 
     def validate_credit_note_for_production(
         self,
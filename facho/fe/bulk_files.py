@@ -0,0 +1,418 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Operaciones masivas sobre archivos: firmar, enviar y consultar estados.
+
+Es la base de los comandos `facho sign-dir`, `facho send-dir` y
+`facho status-many`: reciben directorios, patrones glob o listas (un
+elemento por linea, `@lista.txt` o `-` para stdin), procesan con un pool
+de `jobs` trabajadores y entregan un diccionario por elemento, en el
+orden de entrada, listo para escribir como JSON Lines.
+
+- sign_files: pool de procesos (la firma RSA usa CPU); cada proceso
+  descifra el PKCS#12 una sola vez.
+- send_files / check_statuses: pool de hilos sobre un solo
+  DianSimpleClient (el envio espera la red).
+
+Con un DocumentTracker, send_files omite los documentos que ya tienen
+ZipKey (reanudar tras un corte) y registra los enviados; check_statuses
+actualiza el estado de los documentos consultados.
+
+Ejemplo:
+    client = DianSimpleClient(certificate_path='cert.p12', certificate_password='...')
+    tracker = DocumentTracker('tracking.json')
+    for result in send_files(iter_files(['salida/'], ('.zip',)), client,
+                             jobs=8, tracker=tracker):
+        print(json.dumps(result))
+"""
+
+import glob
+import io
+import os
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from lxml import etree
+
+from .audit import extract_archived_document
+from .builders.exceptions import CufeError
+from .client.dian_simple import is_terminal_status
+from .client.tracker import TRACKER_DOC_TYPES, DocumentTracker, TrackedDocument
+from .packaging import DEFAULT_COMPRESSION_LEVEL, package_xml
+from .signing.xades import XAdESSigner
+
+
+# Elementos en vuelo por trabajador (limita la memoria)
+PENDING_PER_JOB = 4
+
+# (ruta, nombre relativo a la fuente)
+FileItem = Tuple[str, str]
+
+_GLOB_CHARS = '*?['
+
+
+def _is_glob(source: str) -> bool:
+    return any(char in source for char in _GLOB_CHARS)
+
+
+def read_list(source: str) -> Iterator[str]:
+    """Elementos no vacios de una lista (ruta o '-' para stdin)."""
+    handle = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    try:
+        for line in handle:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def iter_items(sources: Iterable[str]) -> Iterator[str]:
+    """
+    Expandir argumentos de texto: '@lista' y '-' se leen linea a linea,
+    los demas se entregan tal cual (ej: ZipKeys en la linea de comandos).
+    """
+    for source in sources:
+        if source == '-':
+            yield from read_list(source)
+        elif source.startswith('@'):
+            yield from read_list(source[1:])
+        else:
+            yield source
+
+
+def iter_files(sources: Iterable[str], suffixes: Tuple[str, ...]) -> Iterator[FileItem]:
+    """
+    Listar los archivos a procesar.
+
+    Args:
+        sources: Directorios (recorridos recursivamente en orden
+            alfabetico), patrones glob, archivos, '@lista' o '-'
+        suffixes: Extensiones aceptadas al recorrer directorios y globs
+            (ej: ('.xml',))
+
+    Yields:
+        (ruta, nombre relativo a su directorio fuente)
+    """
+    for source in iter_items(sources):
+        if os.path.isdir(source):
+            for dirpath, dirnames, filenames in os.walk(source):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    if name.lower().endswith(suffixes):
+                        path = os.path.join(dirpath, name)
+                        yield path, os.path.relpath(path, source)
+        elif _is_glob(source) and not os.path.exists(source):
+            for path in sorted(glob.glob(source, recursive=True)):
+                if os.path.isfile(path) and path.lower().endswith(suffixes):
+                    yield path, os.path.basename(path)
+        elif os.path.isfile(source):
+            yield source, os.path.basename(source)
+        else:
+            raise FileNotFoundError(source)
+
+
+def _ordered(pool: Executor, fn: Callable, items: Iterable, max_pending: int) -> Iterator[Any]:
+    """Aplicar `fn` en el pool con una ventana acotada, en el orden de entrada."""
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+# =============================================================================
+# FIRMA
+# =============================================================================
+
+# Estado por proceso del pool de sign_files
+_SIGNER: Optional[XAdESSigner] = None
+_OUTPUT_DIR: Optional[str] = None
+_OVERWRITE = False
+
+
+def _init_sign_worker(pkcs12: bytes, password: str, output_dir: str, overwrite: bool):
+    global _SIGNER, _OUTPUT_DIR, _OVERWRITE
+    _SIGNER = XAdESSigner.from_pkcs12_bytes(pkcs12, password)
+    _OUTPUT_DIR = output_dir
+    _OVERWRITE = overwrite
+
+
+def _sign_file(item: FileItem) -> Dict[str, Any]:
+    path, name = item
+    output = os.path.join(_OUTPUT_DIR, name)
+    result = {'source': path, 'output': output}
+    if not _OVERWRITE and os.path.exists(output):
+        result['status'] = 'skipped'
+        return result
+    start = time.perf_counter()
+    try:
+        doc = etree.parse(path).getroot()
+        signed = _SIGNER.sign(doc)
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        # Escritura atomica: un corte no deja archivos a medias que
+        # la siguiente ejecucion tomaria como ya firmados
+        partial = output + '.partial'
+        with open(partial, 'wb') as f:
+            f.write(etree.tostring(signed, encoding='UTF-8', xml_declaration=True))
+        os.replace(partial, output)
+        result['status'] = 'signed'
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f'{type(e).__name__}: {e}'
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def sign_files(
+    files: Iterable[FileItem],
+    pkcs12: bytes,
+    password: str,
+    output_dir: str,
+    jobs: int = 1,
+    overwrite: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """
+    Firmar XML con XAdES-EPES.
+
+    Los firmados se escriben en `output_dir` con la misma ruta relativa;
+    los que ya existen se omiten (status 'skipped') salvo `overwrite`,
+    asi una ejecucion interrumpida se retoma donde quedo.
+
+    Yields:
+        {'source', 'output', 'status': signed|skipped|failed, 'error',
+        'seconds'} por archivo
+    """
+    initargs = (pkcs12, password, output_dir, overwrite)
+    if jobs == 1:
+        _init_sign_worker(*initargs)
+        for item in files:
+            yield _sign_file(item)
+        return
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_sign_worker,
+                             initargs=initargs) as pool:
+        yield from _ordered(pool, _sign_file, files, jobs * PENDING_PER_JOB)
+
+
+# =============================================================================
+# ENVIO
+# =============================================================================
+
+def _tracked_documents(tracker: DocumentTracker):
+    return tracker.get_invoices() + tracker.get_credit_notes() + tracker.get_debit_notes()
+
+
+def _first_xml(content: bytes) -> Optional[bytes]:
+    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+        for member in zf.namelist():
+            if member.lower().endswith('.xml'):
+                return zf.read(member)
+    return None
+
+
+def send_files(
+    files: Iterable[FileItem],
+    client: Any,
+    jobs: int = 1,
+    tracker: DocumentTracker = None,
+    test_set_id: str = None,
+    sync: bool = False,
+    compression_level: int = DEFAULT_COMPRESSION_LEVEL
+) -> Iterator[Dict[str, Any]]:
+    """
+    Enviar ZIP (o XML firmados, que se comprimen al vuelo) a DIAN.
+
+    Args:
+        files: Archivos a enviar (ver iter_files)
+        client: DianSimpleClient
+        jobs: Envios simultaneos
+        tracker: Tracker para omitir lo ya enviado y registrar lo nuevo
+        test_set_id: Enviar con SendTestSetAsync (habilitacion)
+        sync: Enviar con SendBillSync
+        compression_level: Nivel de compresion de los XML sueltos
+
+    Yields:
+        {'source', 'number', 'uuid', 'status': sent|skipped|failed,
+        'zip_key', 'status_code', 'error', 'seconds'} por archivo
+    """
+    # Foto de lo enviado: los hilos solo la leen
+    sent: Set[str] = set()
+    if tracker is not None:
+        sent = {doc.number for doc in _tracked_documents(tracker) if doc.zip_key or doc.is_valid}
+
+    def send(item: FileItem) -> Tuple[Dict[str, Any], Any]:
+        path, name = item
+        result = {'source': path}
+        start = time.perf_counter()
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+            if path.lower().endswith('.xml'):
+                xml = content
+                package = package_xml(xml, os.path.basename(path),
+                                      compression_level=compression_level)
+                file_name, content = package.file_name, package.content
+            else:
+                xml = _first_xml(content)
+                file_name = os.path.basename(path)
+            try:
+                document = extract_archived_document(xml) if xml else None
+            except CufeError:
+                # Sin datos para el tracker; DIAN reportara el problema
+                document = None
+            if document is not None:
+                result.update(number=document.number, uuid=document.uuid)
+                if document.number in sent:
+                    result['status'] = 'skipped'
+                    return result, None
+
+            if test_set_id:
+                response = client.send_test_set_async(file_name, content, test_set_id)
+            elif sync:
+                response = client.send_bill_sync(file_name, content)
+            else:
+                response = client.send_bill_async(file_name, content)
+        except Exception as e:
+            result.update(status='failed', error=f'{type(e).__name__}: {e}',
+                          seconds=time.perf_counter() - start)
+            return result, None
+
+        zip_key = getattr(response, 'zip_key', None)
+        ok = bool(zip_key) if not sync else response.is_valid is not None
+        result.update(
+            status='sent' if ok else 'failed',
+            zip_key=zip_key,
+            status_code=response.status_code,
+            seconds=time.perf_counter() - start,
+        )
+        if not ok:
+            result['error'] = ('; '.join(response.error_messages or [])
+                               or response.status_description
+                               or 'DIAN no devolvio ZipKey')
+        return result, (document, response)
+
+    with ThreadPoolExecutor(jobs) as pool:
+        for result, sent_doc in _ordered(pool, send, files, jobs * PENDING_PER_JOB):
+            # El tracker se actualiza en este hilo: no es thread-safe
+            if tracker is not None and sent_doc is not None and sent_doc[0] is not None \
+                    and result['status'] == 'sent':
+                document, response = sent_doc
+                tracker.add_document(TrackedDocument(
+                    doc_type=TRACKER_DOC_TYPES.get(document.root, 'factura'),
+                    number=document.number,
+                    uuid=document.uuid,
+                    issue_date=document.issue_date,
+                    issue_time=document.issue_time,
+                    zip_key=result.get('zip_key'),
+                    is_valid=response.is_valid if sync else None,
+                    status_code=response.status_code if sync else None,
+                    total=document.total,
+                ))
+            yield result
+
+
+# =============================================================================
+# ESTADOS
+# =============================================================================
+
+def check_statuses(
+    track_ids: Iterable[str],
+    client: Any,
+    jobs: int = 1,
+    tracker: DocumentTracker = None,
+    by_cufe: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """
+    Consultar el estado de varios ZipKeys (GetStatusZip) o CUFEs
+    (GetStatus).
+
+    Con tracker, registra el estado de cada documento cuyo ZipKey (o
+    CUFE) coincide, ubicado por CUFE/CUDE entre los estados por
+    documento de la respuesta. Solo se registran estados definitivos
+    (ver is_terminal_status): un documento en proceso sigue pendiente.
+
+    Yields:
+        Campos de la respuesta DIAN (sin el XML crudo) con 'track_id'
+        (y 'numbers' de los documentos del tracker; 'number' si es uno), o
+        {'track_id', 'error'} si la consulta fallo
+    """
+    def check(track_id: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            if by_cufe:
+                response = client.get_status(track_id)
+            else:
+                response = client.get_status_zip(track_id)
+        except Exception as e:
+            return {'track_id': track_id, 'error': f'{type(e).__name__}: {e}'}
+        result = asdict(response)
+        result.pop('xml_response', None)
+        result['track_id'] = track_id
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+    tracked: Dict[str, List[TrackedDocument]] = {}
+    if tracker is not None:
+        for doc in _tracked_documents(tracker):
+            key = doc.uuid if by_cufe else doc.zip_key
+            if key:
+                tracked.setdefault(key, []).append(doc)
+
+    with ThreadPoolExecutor(jobs) as pool:
+        for result in _ordered(pool, check, track_ids, jobs * PENDING_PER_JOB):
+            docs = tracked.get(result['track_id'])
+            if docs and result.get('status_code'):
+                with tracker.batch():
+                    for doc in docs:
+                        status = _document_status(result, doc, single=len(docs) == 1)
+                        if status is not None:
+                            tracker.update_status(doc.number, **status)
+                result['numbers'] = [doc.number for doc in docs]
+                if len(docs) == 1:
+                    result['number'] = docs[0].number
+            yield result
+
+
+def _document_status(
+    result: Dict[str, Any],
+    doc: TrackedDocument,
+    single: bool
+) -> Optional[Dict[str, Any]]:
+    """
+    Estado definitivo de un documento del tracker dentro de una respuesta,
+    o None si sigue en proceso (o la respuesta no lo incluye).
+
+    Se ubica por CUFE/CUDE entre los estados por documento; sin estados
+    por documento, el del encabezado aplica si es el unico documento del
+    trackId o si es definitivo para todo el ZIP (ej: ZIP rechazado).
+    """
+    statuses = result.get('documents') or []
+    status = next((s for s in statuses if s.get('document_key') == doc.uuid), None)
+    if status is None:
+        if statuses and not single:
+            return None
+        status = result
+    if not is_terminal_status(status.get('is_valid'), status.get('status_code')):
+        return None
+    return {
+        'is_valid': status['is_valid'],
+        'status_code': status['status_code'],
+        'status_description': status.get('status_description'),
+        'application_response': status.get('application_response'),
+    }
+
+
+def pending_track_ids(tracker: DocumentTracker) -> Iterator[str]:
+    """ZipKeys de los documentos del tracker sin estado definitivo."""
+    for doc in tracker.get_pending_documents():
+        if doc.zip_key:
+            yield doc.zip_key
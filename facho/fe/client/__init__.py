@@ -4,27 +4,80 @@
 """
 Cliente DIAN para facturacion electronica.
 Implementacion con WS-Security sin dependencias de zeep.
+
+Los nombres exportados se cargan al primer acceso (ver facho.fe._lazy).
 """
 
-# Cliente simplificado
-from .dian_simple import (
-    DianSimpleClient,
-    DianResponse,
-    SendTestSetResponse,
-    GetStatusZipResponse,
-    SendBillSyncResponse,
-    calcular_dv,
-    calcular_cufe,
-    calcular_cude,
-    calcular_software_security_code,
-)
-
-# Sistema de tracking de documentos
-from .tracker import (
-    DocumentTracker,
-    TrackedDocument,
-    TrackingData,
-)
+from .._lazy import install
+
+_LAZY_EXPORTS = {
+    # Cliente simplificado
+    'dian_simple': (
+        'DianSimpleClient',
+        'DianResponse',
+        'SendTestSetResponse',
+        'GetStatusZipResponse',
+        'DocumentStatus',
+        'SendBillSyncResponse',
+        'is_terminal_status',
+        'NumberingRangeResponse',
+        'ResolutionRange',
+        'calcular_dv',
+        'calcular_cufe',
+        'calcular_cude',
+        'calcular_software_security_code',
+    ),
+
+    # Envio de varios documentos por ZIP
+    'batching': (
+        'BatchDocument',
+        'DocumentBatch',
+        'ZipBatchSender',
+        'plan_batches',
+        'MAX_DOCUMENTS_PER_ZIP',
+        'MAX_ZIP_BYTES',
+    ),
+
+    # Emulador local de los servicios DIAN
+    'emulator': (
+        'DianEmulator',
+        'EmulatorConfig',
+        'NumberingRange',
+        'verify_wssec_envelope',
+    ),
+
+    # Outbox durable de envios
+    'outbox': (
+        'DocumentOutbox',
+        'OutboxItem',
+        'OutboxWorker',
+    ),
+
+    # Limitador de tasa y circuit breaker
+    'resilience': (
+        'DianCallGuard',
+        'ResilienceConfig',
+        'CircuitBreaker',
+        'TokenBucket',
+    ),
+
+    # Rangos de numeracion consultados a DIAN
+    'resolutions': (
+        'ResolutionRegistry',
+    ),
+
+    # Cache de estados finales
+    'status_cache': (
+        'StatusCache',
+    ),
+
+    # Sistema de tracking de documentos
+    'tracker': (
+        'DocumentTracker',
+        'TrackedDocument',
+        'TrackingData',
+    ),
+}
 
 __all__ = [
     # Cliente
@@ -32,14 +85,45 @@ __all__ = [
     'DianResponse',
     'SendTestSetResponse',
     'GetStatusZipResponse',
+    'DocumentStatus',
     'SendBillSyncResponse',
+    'is_terminal_status',
+    'NumberingRangeResponse',
+    'ResolutionRange',
     # Utilidades
     'calcular_dv',
     'calcular_cufe',
     'calcular_cude',
     'calcular_software_security_code',
+    # Lotes ZIP
+    'BatchDocument',
+    'DocumentBatch',
+    'ZipBatchSender',
+    'plan_batches',
+    'MAX_DOCUMENTS_PER_ZIP',
+    'MAX_ZIP_BYTES',
+    # Emulador
+    'DianEmulator',
+    'EmulatorConfig',
+    'NumberingRange',
+    'verify_wssec_envelope',
+    # Outbox
+    'DocumentOutbox',
+    'OutboxItem',
+    'OutboxWorker',
+    # Resiliencia
+    'DianCallGuard',
+    'ResilienceConfig',
+    'CircuitBreaker',
+    'TokenBucket',
+    # Resoluciones
+    'ResolutionRegistry',
+    # Cache de estados
+    'StatusCache',
     # Tracker
     'DocumentTracker',
     'TrackedDocument',
     'TrackingData',
 ]
+
+install(globals(), _LAZY_EXPORTS)
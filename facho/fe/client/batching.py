@@ -0,0 +1,367 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Envio de varios documentos por ZIP (SendBillAsync / SendTestSetAsync).
+
+DIAN acepta ZIP con varios XML firmados en los envios asincronos. En
+lugar de una solicitud (con su TLS y su firma WS-Security) por
+documento, ZipBatchSender agrupa los documentos en lotes que respetan
+el maximo de documentos y de tamano por ZIP, envia cada lote en una
+sola solicitud y reparte el ZipKey y los estados por documento de
+GetStatusZip a cada documento del DocumentTracker (los documentos que
+el tracker no tiene se agregan, leidos del XML firmado).
+
+Ejemplo:
+    sender = ZipBatchSender(client, tracker=tracker)
+    batches = sender.send([
+        BatchDocument('fvSETP990000001.xml', xml1, number='SETP990000001'),
+        BatchDocument('fvSETP990000002.xml', xml2, number='SETP990000002'),
+    ])
+    statuses = sender.verify(batches)
+"""
+
+import zlib
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from ..audit import extract_archived_document
+from ..builders.exceptions import CufeError
+from ..packaging import DEFAULT_COMPRESSION_LEVEL, ZipPackage, package_documents
+from .dian_simple import (
+    DianSimpleClient, DocumentStatus, GetStatusZipResponse, is_terminal_status,
+)
+from .tracker import TRACKER_DOC_TYPES, DocumentTracker, TrackedDocument
+
+
+# Maximo de documentos por ZIP en los envios asincronos de DIAN
+MAX_DOCUMENTS_PER_ZIP = 50
+
+# Tamano maximo del ZIP (antes de base64) aceptado por lote
+MAX_ZIP_BYTES = 2 * 1024 * 1024
+
+# Encabezados ZIP: local (30) + directorio central (46) por entrada, fin (22)
+_ZIP_ENTRY_OVERHEAD = 30 + 46
+_ZIP_END_OVERHEAD = 22
+
+
+@dataclass
+class BatchDocument:
+    """
+    Documento firmado a enviar dentro de un lote.
+
+    Attributes:
+        xml_name: Nombre del XML dentro del ZIP (ej: 'fvSETP990000001.xml')
+        xml: Contenido del XML firmado
+        number: Numero del documento en el DocumentTracker
+        uuid: CUFE/CUDE del documento (alternativa para ubicar su estado)
+    """
+    xml_name: str
+    xml: bytes
+    number: Optional[str] = None
+    uuid: Optional[str] = None
+
+
+@dataclass
+class DocumentBatch:
+    """
+    Lote de documentos empaquetados en un solo ZIP.
+
+    Attributes:
+        package: ZIP con los documentos del lote
+        documents: Documentos del lote, en el orden del ZIP
+        zip_key: ZipKey devuelto por DIAN
+        error: Error del envio, si lo hubo
+        untracked: xml_name de los documentos que no se pudieron
+            registrar en el tracker (sin numero ni XML legible)
+    """
+    package: ZipPackage
+    documents: List[BatchDocument] = field(default_factory=list)
+    zip_key: Optional[str] = None
+    error: Optional[str] = None
+    untracked: List[str] = field(default_factory=list)
+
+
+def zip_entry_size(xml_name: str, xml: bytes, compression_level: int) -> int:
+    """
+    Bytes que ocupa un XML dentro del ZIP (datos y encabezados).
+
+    Comprime igual que zipfile (DEFLATE crudo con el mismo nivel), de
+    modo que la suma de entradas mas _ZIP_END_OVERHEAD es el tamano
+    exacto del ZIP.
+    """
+    if compression_level:
+        compressor = zlib.compressobj(compression_level, zlib.DEFLATED, -15)
+        size = len(compressor.compress(xml)) + len(compressor.flush())
+    else:
+        size = len(xml)
+    return size + _ZIP_ENTRY_OVERHEAD + 2 * len(xml_name.encode('utf-8'))
+
+
+def plan_batches(
+    documents: Iterable[BatchDocument],
+    max_documents: int = MAX_DOCUMENTS_PER_ZIP,
+    max_zip_bytes: int = MAX_ZIP_BYTES,
+    compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+    zip_name: Callable[[int], str] = None
+) -> List[DocumentBatch]:
+    """
+    Agrupar documentos en ZIP que respetan los limites de DIAN.
+
+    Los documentos conservan su orden; se abre un nuevo lote cuando el
+    siguiente documento superaria max_documents o max_zip_bytes.
+
+    Args:
+        documents: Documentos a agrupar
+        max_documents: Maximo de documentos por ZIP
+        max_zip_bytes: Tamano maximo de cada ZIP en bytes
+        compression_level: Nivel de compresion 0-9
+        zip_name: Funcion que recibe el indice del lote (desde 1) y
+            devuelve el nombre del ZIP (default: 'lote0001.zip', ...)
+
+    Returns:
+        Lista de DocumentBatch
+
+    Raises:
+        ValueError: Si un documento no cabe solo en un ZIP
+    """
+    if max_documents < 1:
+        raise ValueError("max_documents debe ser mayor que cero")
+    if zip_name is None:
+        zip_name = 'lote{:04d}.zip'.format
+
+    groups = []
+    current, current_size = [], _ZIP_END_OVERHEAD
+    for document in documents:
+        size = zip_entry_size(document.xml_name, document.xml, compression_level)
+        if size + _ZIP_END_OVERHEAD > max_zip_bytes:
+            raise ValueError(
+                f"El documento {document.xml_name} excede el tamano maximo "
+                f"del ZIP ({max_zip_bytes} bytes)"
+            )
+        if current and (len(current) == max_documents
+                        or current_size + size > max_zip_bytes):
+            groups.append(current)
+            current, current_size = [], _ZIP_END_OVERHEAD
+        current.append(document)
+        current_size += size
+    if current:
+        groups.append(current)
+
+    return [
+        DocumentBatch(
+            package=package_documents(
+                [(d.xml_name, d.xml) for d in group],
+                zip_name(index),
+                compression_level,
+            ),
+            documents=group,
+        )
+        for index, group in enumerate(groups, 1)
+    ]
+
+
+def _base_name(file_name: str) -> str:
+    """Nombre sin extension .xml, como lo reporta XmlFileName."""
+    return file_name[:-4] if file_name.lower().endswith('.xml') else file_name
+
+
+def match_statuses(
+    batch: DocumentBatch,
+    response: GetStatusZipResponse
+) -> Dict[int, DocumentStatus]:
+    """
+    Asociar los estados de GetStatusZip a los documentos del lote.
+
+    Cada estado se ubica por XmlFileName o, si no coincide, por
+    XmlDocumentKey (CUFE/CUDE). Si la respuesta no trae estados por
+    documento pero si un estado definitivo del ZIP (ej: ZIP rechazado),
+    ese estado se aplica a todos los documentos; un estado en proceso
+    (98) no se aplica (ver is_terminal_status).
+
+    Returns:
+        Diccionario indice del documento en el lote -> DocumentStatus
+    """
+    by_name = {_base_name(d.xml_name): i for i, d in enumerate(batch.documents)}
+    by_uuid = {d.uuid: i for i, d in enumerate(batch.documents) if d.uuid}
+
+    matched = {}
+    for status in response.documents or []:
+        index = by_name.get(_base_name(status.xml_file_name or ''))
+        if index is None:
+            index = by_uuid.get(status.document_key)
+        if index is not None:
+            matched[index] = status
+
+    if not matched and is_terminal_status(response.is_valid, response.status_code):
+        status = DocumentStatus(
+            is_valid=response.is_valid,
+            status_code=response.status_code,
+            status_description=response.status_description,
+            error_messages=response.error_messages,
+        )
+        matched = {i: status for i in range(len(batch.documents))}
+    return matched
+
+
+class ZipBatchSender:
+    """
+    Envio de documentos en lotes ZIP con seguimiento por documento.
+
+    Cada lote viaja en una sola solicitud SendBillAsync (o
+    SendTestSetAsync si se indica test_set_id). Con un DocumentTracker,
+    el ZipKey y el estado final quedan registrados en cada documento
+    (por su `number`, o su `uuid`); los que el tracker no tiene se
+    agregan. El archivo del tracker se escribe una vez por lote.
+    """
+
+    def __init__(
+        self,
+        client: DianSimpleClient,
+        tracker: DocumentTracker = None,
+        max_documents: int = MAX_DOCUMENTS_PER_ZIP,
+        max_zip_bytes: int = MAX_ZIP_BYTES,
+        compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+        zip_name: Callable[[int], str] = None
+    ):
+        """
+        Args:
+            client: Cliente DIAN
+            tracker: Tracker donde registrar ZipKey y estados (opcional)
+            max_documents: Maximo de documentos por ZIP
+            max_zip_bytes: Tamano maximo de cada ZIP en bytes
+            compression_level: Nivel de compresion 0-9
+            zip_name: Nombre de cada ZIP segun su indice (ver plan_batches)
+        """
+        self.client = client
+        self.tracker = tracker
+        self.max_documents = max_documents
+        self.max_zip_bytes = max_zip_bytes
+        self.compression_level = compression_level
+        self.zip_name = zip_name
+
+    def send(
+        self,
+        documents: Iterable[BatchDocument],
+        test_set_id: str = None,
+        on_batch_sent: Callable[[DocumentBatch], None] = None
+    ) -> List[DocumentBatch]:
+        """
+        Empaquetar y enviar los documentos.
+
+        Args:
+            documents: Documentos firmados
+            test_set_id: ID del set de pruebas (si es habilitacion)
+            on_batch_sent: Callback tras enviar cada lote
+
+        Returns:
+            Lotes enviados, con su zip_key o su error
+        """
+        batches = plan_batches(
+            documents, self.max_documents, self.max_zip_bytes,
+            self.compression_level, self.zip_name,
+        )
+        for batch in batches:
+            package = batch.package
+            try:
+                if test_set_id:
+                    response = self.client.send_test_set_async(
+                        package.file_name, package, test_set_id
+                    )
+                else:
+                    response = self.client.send_bill_async(package.file_name, package)
+                batch.zip_key = response.zip_key
+                if not response.zip_key:
+                    batch.error = '; '.join(response.error_messages or []) or \
+                        'DIAN no devolvio ZipKey'
+            except Exception as e:
+                batch.error = str(e)
+
+            if batch.zip_key:
+                self._track(batch, zip_key=batch.zip_key)
+            if on_batch_sent:
+                on_batch_sent(batch)
+        return batches
+
+    def verify(
+        self,
+        batches: Iterable[DocumentBatch]
+    ) -> Dict[str, DocumentStatus]:
+        """
+        Consultar GetStatusZip una vez por lote y repartir los estados.
+
+        Args:
+            batches: Lotes devueltos por send
+
+        Returns:
+            Diccionario xml_name -> DocumentStatus (solo documentos con
+            estado definitivo; los que siguen en proceso se omiten y
+            quedan pendientes en el tracker)
+        """
+        statuses = {}
+        for batch in batches:
+            if not batch.zip_key:
+                continue
+            response = self.client.get_status_zip(batch.zip_key)
+            with self._tracker_batch():
+                for index, status in match_statuses(batch, response).items():
+                    if not is_terminal_status(status.is_valid, status.status_code):
+                        continue
+                    document = batch.documents[index]
+                    statuses[document.xml_name] = status
+                    self._track_document(
+                        batch,
+                        document,
+                        is_valid=status.is_valid,
+                        status_code=status.status_code,
+                        status_description=status.status_description,
+                        application_response=status.application_response,
+                    )
+        return statuses
+
+    def _tracker_batch(self):
+        """Una sola escritura del tracker para los cambios del bloque."""
+        return self.tracker.batch() if self.tracker is not None else nullcontext()
+
+    def _track(self, batch: DocumentBatch, **changes):
+        with self._tracker_batch():
+            for document in batch.documents:
+                self._track_document(batch, document, **changes)
+
+    def _track_document(self, batch: DocumentBatch, document: BatchDocument, **changes):
+        if self.tracker is None:
+            return
+        number = document.number
+        if number is None and document.uuid:
+            tracked = self.tracker.get_document_by_uuid(document.uuid)
+            number = tracked.number if tracked else None
+        if number is not None and self.tracker.update_status(number, **changes):
+            return
+
+        tracked = _tracked_document(document, **changes)
+        if tracked is None:
+            if document.xml_name not in batch.untracked:
+                batch.untracked.append(document.xml_name)
+        else:
+            self.tracker.add_document(tracked)
+
+
+def _tracked_document(document: BatchDocument, **changes) -> Optional[TrackedDocument]:
+    """TrackedDocument de un documento del lote que el tracker no tiene."""
+    try:
+        archived = extract_archived_document(document.xml)
+    except CufeError:
+        archived = None
+    number = document.number or (archived.number if archived else None)
+    if not number:
+        return None
+    return TrackedDocument(
+        doc_type=TRACKER_DOC_TYPES.get(archived.root, 'factura') if archived else 'factura',
+        number=number,
+        uuid=document.uuid or (archived.uuid if archived else ''),
+        issue_date=archived.issue_date if archived else '',
+        issue_time=archived.issue_time if archived else '',
+        total=archived.total if archived else 0.0,
+        **changes
+    )
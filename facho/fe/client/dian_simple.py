@@ -7,19 +7,22 @@ Implementacion pura sin dependencias de zeep.
 Basado en implementacion funcional aprobada por DIAN.
 """
 
-import uuid
 import base64
-import hashlib
+import uuid
 import time
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, Any, List, Callable
-from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Callable, Sequence, Tuple, Union
+from dataclasses import dataclass, field
 
-import requests
 from lxml import etree
 
+from ..builders.cufe import compute_uuid, calculate_software_security_code
+from ..builders.exceptions import CircuitOpenError, RateLimitedError
+from ..instrumentation import count, span, timed
+from ..packaging import ZipPackage, assemble
 from ..signing.certificate import cert_to_base64, load_certificate, load_certificate_from_bytes
 from ..signing.utils import sha256_digest, sign_data
+from .resilience import DianCallGuard
 
 
 # =============================================================================
@@ -46,6 +49,21 @@ ENDPOINT_HABILITACION = 'https://vpfe-hab.dian.gov.co/WcfDianCustomerServices.sv
 ENDPOINT_PRODUCCION = 'https://vpfe.dian.gov.co/WcfDianCustomerServices.svc'
 
 
+# StatusCode de rechazo definitivo (Validacion contiene errores)
+REJECTED_STATUS_CODES = ('99',)
+
+
+def is_terminal_status(is_valid: Optional[bool], status_code: Optional[str]) -> bool:
+    """
+    True si un estado de DIAN ya no cambiara.
+
+    Solo son definitivos IsValid true y el rechazo (IsValid false con
+    StatusCode 99). Mientras un ZIP esta en proceso DIAN responde
+    IsValid false con StatusCode 98, que no es un rechazo.
+    """
+    return is_valid is True or (is_valid is False and status_code in REJECTED_STATUS_CODES)
+
+
 # =============================================================================
 # DATA CLASSES
 # =============================================================================
@@ -59,6 +77,7 @@ class DianResponse:
     status_message: Optional[str] = None
     error_messages: Optional[list] = None
     xml_response: Optional[str] = None
+    application_response: Optional[str] = None  # XmlBase64Bytes decodificado
 
 
 @dataclass
@@ -67,10 +86,28 @@ class SendTestSetResponse(DianResponse):
     zip_key: Optional[str] = None
 
 
+@dataclass
+class DocumentStatus:
+    """Estado de un documento dentro de la respuesta de GetStatusZip."""
+    xml_file_name: Optional[str] = None
+    document_key: Optional[str] = None
+    is_valid: Optional[bool] = None
+    status_code: Optional[str] = None
+    status_description: Optional[str] = None
+    error_messages: Optional[list] = None
+    application_response: Optional[str] = None
+
+
 @dataclass
 class GetStatusZipResponse(DianResponse):
-    """Respuesta de GetStatusZip."""
-    pass
+    """
+    Respuesta de GetStatusZip.
+
+    Los campos heredados corresponden al primer documento del ZIP;
+    `documents` trae el estado de cada documento cuando el ZIP contiene
+    varios.
+    """
+    documents: Optional[List[DocumentStatus]] = None
 
 
 @dataclass
@@ -79,10 +116,81 @@ class SendBillSyncResponse(DianResponse):
     pass
 
 
+@dataclass
+class ResolutionRange:
+    """Rango de numeracion autorizado (un NumberRangeResponse)."""
+    resolution_number: str
+    resolution_date: str
+    prefix: str
+    from_number: int
+    to_number: int
+    valid_date_from: str
+    valid_date_to: str
+    technical_key: str
+
+
+@dataclass
+class NumberingRangeResponse(DianResponse):
+    """
+    Respuesta de GetNumberingRange.
+
+    status_code y status_description traen OperationCode y
+    OperationDescription; is_valid es True con OperationCode 100.
+    """
+    ranges: List[ResolutionRange] = field(default_factory=list)
+
+
 # =============================================================================
 # CLIENTE DIAN
 # =============================================================================
 
+# Texto que ocupa el lugar del Body al firmar el sobre
+_BODY_MARKER = 'FACHO-SOAP-BODY'
+
+
+def _decode_application_response(element) -> Optional[str]:
+    """ApplicationResponse de un elemento XmlBase64Bytes (None si falta)."""
+    if element is None or not element.text:
+        return None
+    try:
+        return base64.b64decode(element.text).decode('utf-8')
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _parse_document_status(item) -> DocumentStatus:
+    """Estado de un documento a partir de un elemento DianResponse."""
+    ns_data = 'http://schemas.datacontract.org/2004/07/DianResponse'
+
+    def text(tag):
+        element = item.find(f'{{{ns_data}}}{tag}')
+        return element.text if element is not None else None
+
+    is_valid = text('IsValid')
+    error_list = item.find(f'{{{ns_data}}}ErrorMessage')
+    errors = None
+    if error_list is not None:
+        errors = [e.strip() for e in error_list.itertext() if e.strip()]
+    return DocumentStatus(
+        xml_file_name=text('XmlFileName'),
+        document_key=text('XmlDocumentKey'),
+        is_valid=is_valid.lower() == 'true' if is_valid else None,
+        status_code=text('StatusCode'),
+        status_description=text('StatusDescription'),
+        error_messages=errors or None,
+        application_response=_decode_application_response(
+            item.find(f'{{{ns_data}}}XmlBase64Bytes')
+        ),
+    )
+
+
+def _as_package(file_name: str, content_file: Union[bytes, ZipPackage]) -> ZipPackage:
+    """Tratar el contenido recibido como ZipPackage."""
+    if isinstance(content_file, ZipPackage):
+        return content_file
+    return ZipPackage(file_name=file_name, content=content_file)
+
+
 class DianSimpleClient:
     """
     Cliente simplificado para servicios web DIAN.
@@ -96,7 +204,12 @@ class DianSimpleClient:
         certificate_path: str = None,
         certificate_password: str = None,
         certificate_bytes: bytes = None,
-        environment: str = 'habilitacion'
+        environment: str = 'habilitacion',
+        call_guard: DianCallGuard = None,
+        signing_socket: str = None,
+        credentials: Tuple = None,
+        session: Any = None,
+        status_cache: Any = None
     ):
         """
         Inicializar cliente DIAN.
@@ -106,8 +219,25 @@ class DianSimpleClient:
             certificate_password: Contrasena del certificado
             certificate_bytes: Bytes del certificado (alternativa a certificate_path)
             environment: 'habilitacion' o 'produccion'
+            call_guard: Limitador de tasa y circuit breaker opcional
+                (ver resilience.DianCallGuard); con circuito abierto las
+                operaciones fallan de inmediato con CircuitOpenError
+            signing_socket: Socket de un SigningDaemon; el sobre WS-Security
+                se firma en el daemon y este proceso no carga la clave
+            credentials: Tupla (private_key, certificate, chain) ya cargada
+                (ver load_certificate); evita descifrar el PKCS#12 de nuevo
+            session: requests.Session compartida; varios clientes (ej: uno
+                por emisor) reutilizan asi el pool de conexiones a DIAN
+            status_cache: StatusCache (ver status_cache); los estados
+                finales de GetStatus/GetStatusZip se sirven sin consultar
+                a DIAN
         """
-        if certificate_bytes:
+        if credentials:
+            self.private_key, self.certificate, self.chain = credentials
+        elif signing_socket:
+            from ..signing.daemon import connect
+            self.private_key, self.certificate, self.chain = connect(signing_socket)
+        elif certificate_bytes:
             self.private_key, self.certificate, self.chain = load_certificate_from_bytes(
                 certificate_bytes, certificate_password
             )
@@ -116,17 +246,22 @@ class DianSimpleClient:
                 certificate_path, certificate_password
             )
         else:
-            raise ValueError("Se requiere certificate_path o certificate_bytes")
+            raise ValueError(
+                "Se requiere certificate_path, certificate_bytes, signing_socket o credentials"
+            )
 
         self.cert_b64 = cert_to_base64(self.certificate)
         self.environment = environment
         self.endpoint = ENDPOINT_HABILITACION if environment == 'habilitacion' else ENDPOINT_PRODUCCION
         self.timeout = 60
+        self.call_guard = call_guard
+        self.session = session
+        self.status_cache = status_cache
 
     def send_test_set_async(
         self,
         file_name: str,
-        content_file: bytes,
+        content_file: Union[bytes, ZipPackage],
         test_set_id: str
     ) -> SendTestSetResponse:
         """
@@ -134,135 +269,237 @@ class DianSimpleClient:
 
         Args:
             file_name: Nombre del archivo ZIP
-            content_file: Contenido del archivo ZIP en bytes
+            content_file: Contenido del archivo ZIP en bytes (o ZipPackage)
             test_set_id: ID del set de pruebas DIAN
 
         Returns:
             SendTestSetResponse con el ZipKey si fue exitoso
         """
-        content_b64 = base64.b64encode(content_file).decode('utf-8')
-
-        body = f'''<wcf:SendTestSetAsync xmlns:wcf="{NS_SOAP['wcf']}">
+        response = self._send_soap_parts([
+            f'''<wcf:SendTestSetAsync xmlns:wcf="{NS_SOAP['wcf']}">
 <wcf:fileName>{file_name}</wcf:fileName>
-<wcf:contentFile>{content_b64}</wcf:contentFile>
+<wcf:contentFile>'''.encode('utf-8'),
+            _as_package(file_name, content_file),
+            f'''</wcf:contentFile>
 <wcf:testSetId>{test_set_id}</wcf:testSetId>
-</wcf:SendTestSetAsync>'''
-
-        action = 'http://wcf.dian.colombia/IWcfDianCustomerServices/SendTestSetAsync'
-        response = self._send_soap_request(body, action)
+</wcf:SendTestSetAsync>'''.encode('utf-8'),
+        ], 'http://wcf.dian.colombia/IWcfDianCustomerServices/SendTestSetAsync')
 
         return self._parse_send_test_set_response(response)
 
     def send_bill_sync(
         self,
         file_name: str,
-        content_file: bytes
+        content_file: Union[bytes, ZipPackage]
     ) -> SendBillSyncResponse:
         """
         Enviar documento sincronicamente a DIAN (SendBillSync).
 
         Args:
             file_name: Nombre del archivo ZIP
-            content_file: Contenido del archivo ZIP en bytes
+            content_file: Contenido del archivo ZIP en bytes (o ZipPackage)
 
         Returns:
             SendBillSyncResponse con el resultado
         """
-        content_b64 = base64.b64encode(content_file).decode('utf-8')
-
-        body = f'''<wcf:SendBillSync xmlns:wcf="{NS_SOAP['wcf']}">
+        response = self._send_soap_parts([
+            f'''<wcf:SendBillSync xmlns:wcf="{NS_SOAP['wcf']}">
 <wcf:fileName>{file_name}</wcf:fileName>
-<wcf:contentFile>{content_b64}</wcf:contentFile>
-</wcf:SendBillSync>'''
-
-        action = 'http://wcf.dian.colombia/IWcfDianCustomerServices/SendBillSync'
-        response = self._send_soap_request(body, action)
+<wcf:contentFile>'''.encode('utf-8'),
+            _as_package(file_name, content_file),
+            b'''</wcf:contentFile>
+</wcf:SendBillSync>''',
+        ], 'http://wcf.dian.colombia/IWcfDianCustomerServices/SendBillSync')
 
         return self._parse_status_response(response, SendBillSyncResponse)
 
     def send_bill_async(
         self,
         file_name: str,
-        content_file: bytes
+        content_file: Union[bytes, ZipPackage]
     ) -> SendTestSetResponse:
         """
         Enviar documento asincronicamente a DIAN (SendBillAsync).
 
         Args:
             file_name: Nombre del archivo ZIP
-            content_file: Contenido del archivo ZIP en bytes
+            content_file: Contenido del archivo ZIP en bytes (o ZipPackage)
 
         Returns:
             SendTestSetResponse con el ZipKey si fue exitoso
         """
-        content_b64 = base64.b64encode(content_file).decode('utf-8')
-
-        body = f'''<wcf:SendBillAsync xmlns:wcf="{NS_SOAP['wcf']}">
+        response = self._send_soap_parts([
+            f'''<wcf:SendBillAsync xmlns:wcf="{NS_SOAP['wcf']}">
 <wcf:fileName>{file_name}</wcf:fileName>
-<wcf:contentFile>{content_b64}</wcf:contentFile>
-</wcf:SendBillAsync>'''
-
-        action = 'http://wcf.dian.colombia/IWcfDianCustomerServices/SendBillAsync'
-        response = self._send_soap_request(body, action)
+<wcf:contentFile>'''.encode('utf-8'),
+            _as_package(file_name, content_file),
+            b'''</wcf:contentFile>
+</wcf:SendBillAsync>''',
+        ], 'http://wcf.dian.colombia/IWcfDianCustomerServices/SendBillAsync')
 
         return self._parse_send_test_set_response(response)
 
-    def get_status_zip(self, track_id: str) -> GetStatusZipResponse:
+    def get_status_zip(self, track_id: str, allow_pending: bool = True) -> GetStatusZipResponse:
         """
         Consultar estado de documento por TrackId/ZipKey (GetStatusZip).
 
         Args:
             track_id: TrackId o ZipKey del documento
+            allow_pending: False consulta a DIAN aunque la cache tenga un
+                estado no definitivo reciente
 
         Returns:
             GetStatusZipResponse con el estado
         """
-        body = f'''<wcf:GetStatusZip xmlns:wcf="{NS_SOAP['wcf']}">
-<wcf:trackId>{track_id}</wcf:trackId>
-</wcf:GetStatusZip>'''
-
-        action = 'http://wcf.dian.colombia/IWcfDianCustomerServices/GetStatusZip'
-        response = self._send_soap_request(body, action)
+        cached = self._cached_status('GetStatusZip', track_id, allow_pending)
+        if cached is not None:
+            return cached
+        return self._fetch_status('GetStatusZip', track_id)
 
-        return self._parse_status_response(response, GetStatusZipResponse)
-
-    def get_status(self, track_id: str) -> GetStatusZipResponse:
+    def get_status(self, track_id: str, allow_pending: bool = True) -> GetStatusZipResponse:
         """
         Consultar estado de documento por TrackId (GetStatus).
 
         Args:
             track_id: TrackId del documento (CUFE/CUDE)
+            allow_pending: False consulta a DIAN aunque la cache tenga un
+                estado no definitivo reciente
 
         Returns:
             GetStatusZipResponse con el estado
         """
-        body = f'''<wcf:GetStatus xmlns:wcf="{NS_SOAP['wcf']}">
+        cached = self._cached_status('GetStatus', track_id, allow_pending)
+        if cached is not None:
+            return cached
+        return self._fetch_status('GetStatus', track_id)
+
+    def get_numbering_range(
+        self,
+        account_code: str,
+        software_code: str
+    ) -> NumberingRangeResponse:
+        """
+        Consultar los rangos de numeracion de un software (GetNumberingRange).
+
+        Args:
+            account_code: NIT del emisor
+            software_code: Identificador del software
+
+        Returns:
+            NumberingRangeResponse con los rangos autorizados
+        """
+        from ..builders.soap_client import build_get_numbering_range_body
+
+        body = build_get_numbering_range_body(account_code, software_code)
+        action = 'http://wcf.dian.colombia/IWcfDianCustomerServices/GetNumberingRange'
+        response = self._send_soap_request(body, action)
+
+        return self._parse_numbering_range_response(response)
+
+    def _cached_status(
+        self,
+        operation: str,
+        track_id: str,
+        allow_pending: bool = True
+    ) -> Optional[GetStatusZipResponse]:
+        if self.status_cache is None:
+            return None
+        return self.status_cache.get(operation, track_id, allow_pending)
+
+    def _fetch_status(self, operation: str, track_id: str) -> GetStatusZipResponse:
+        """Consultar GetStatus/GetStatusZip a DIAN y guardar la respuesta."""
+        body = f'''<wcf:{operation} xmlns:wcf="{NS_SOAP['wcf']}">
 <wcf:trackId>{track_id}</wcf:trackId>
-</wcf:GetStatus>'''
+</wcf:{operation}>'''
 
-        action = 'http://wcf.dian.colombia/IWcfDianCustomerServices/GetStatus'
+        action = f'http://wcf.dian.colombia/IWcfDianCustomerServices/{operation}'
         response = self._send_soap_request(body, action)
 
-        return self._parse_status_response(response, GetStatusZipResponse)
+        return self._store_status(operation, track_id,
+                                  self._parse_status_response(response, GetStatusZipResponse))
+
+    def _store_status(
+        self,
+        operation: str,
+        track_id: str,
+        response: GetStatusZipResponse
+    ) -> GetStatusZipResponse:
+        if self.status_cache is not None:
+            self.status_cache.put(operation, track_id, response)
+        return response
 
     def _send_soap_request(self, body_content: str, action: str) -> str:
         """Enviar solicitud SOAP con WS-Security."""
-        soap_msg = self._build_wssec_soap(body_content, action)
-
-        resp = requests.post(
-            self.endpoint,
-            data=soap_msg.encode('utf-8'),
-            headers={
-                'Content-Type': 'application/soap+xml;charset=UTF-8',
-                'SOAPAction': action,
-            },
-            timeout=self.timeout
-        )
+        return self._send_soap_parts([body_content.encode('utf-8')], action)
+
+    def _send_soap_parts(
+        self,
+        body_parts: Sequence[Union[bytes, ZipPackage]],
+        action: str
+    ) -> str:
+        """
+        Enviar solicitud SOAP cuyo cuerpo se arma por partes.
+
+        El sobre firmado y las partes del cuerpo (los ZipPackage van en
+        base64) se escriben en un unico buffer que se entrega tal cual
+        al transporte HTTP.
+        """
+        head, tail = self._build_wssec_envelope(action)
+        payload = assemble([head, *body_parts, tail])
+
+        # requests se importa al primer envio: calcular CUFE o construir
+        # documentos no necesita el cliente HTTP
+        import requests
+
+        action_name = action.rsplit('/', 1)[-1]
+
+        def post():
+            with span('dian.http', action=action_name):
+                return (self.session or requests).post(
+                    self.endpoint,
+                    data=payload,
+                    headers={
+                        'Content-Type': 'application/soap+xml;charset=UTF-8',
+                        'SOAPAction': action,
+                    },
+                    timeout=self.timeout
+                )
+
+        outcome = 'error'
+        try:
+            if self.call_guard is not None:
+                resp = self.call_guard.execute(action_name, post)
+            else:
+                resp = post()
+            outcome = 'ok' if resp.ok else 'http_%d' % resp.status_code
+            count('dian.bytes_received', len(resp.content), action=action_name)
+        except (CircuitOpenError, RateLimitedError):
+            # Rechazada por el guard: no salio nada hacia DIAN
+            outcome = 'rejected'
+            raise
+        finally:
+            count('dian.requests', action=action_name, outcome=outcome)
+            if outcome != 'rejected':
+                count('dian.bytes_sent', len(payload), action=action_name)
 
         return resp.text
 
     def _build_wssec_soap(self, body_content: str, action: str) -> str:
         """Construir mensaje SOAP con WS-Security firmado."""
+        head, tail = self._build_wssec_envelope(action)
+        return f"{head.decode('utf-8')}{body_content}{tail.decode('utf-8')}"
+
+    @timed('soap.envelope')
+    def _build_wssec_envelope(self, action: str) -> Tuple[bytes, bytes]:
+        """
+        Construir el sobre SOAP firmado, sin el contenido del Body.
+
+        La firma WS-Security cubre Timestamp y To, no el Body, por lo que
+        el cuerpo se puede insertar despues entre las dos partes.
+
+        Returns:
+            (sobre hasta <soap:Body>, sobre desde </soap:Body>) en UTF-8
+        """
         suffix = uuid.uuid4().hex[:8]
         id_ts = f'TS-{suffix}'
         id_tok = f'X509-{suffix}'
@@ -296,7 +533,7 @@ class DianSimpleClient:
 <wsa:Action>{action}</wsa:Action>
 <wsa:To xmlns:wsu="{NS_SOAP['wsu']}" wsu:Id="{id_to}">{self.endpoint}</wsa:To>
 </soap:Header>
-<soap:Body>{body_content}</soap:Body>
+<soap:Body>{_BODY_MARKER}</soap:Body>
 </soap:Envelope>'''
 
         doc = etree.fromstring(soap_template.encode('utf-8'))
@@ -366,8 +603,10 @@ class DianSimpleClient:
         sig.insert(1, sig_val_el)
         sig.append(key_info)
 
-        return etree.tostring(doc, encoding='unicode')
+        head, tail = etree.tostring(doc, encoding='unicode').split(_BODY_MARKER)
+        return head.encode('utf-8'), tail.encode('utf-8')
 
+    @timed('dian.parse', response='send')
     def _parse_send_test_set_response(self, xml_response: str) -> SendTestSetResponse:
         """Parsear respuesta de SendTestSetAsync/SendBillAsync."""
         response = SendTestSetResponse(xml_response=xml_response)
@@ -396,6 +635,7 @@ class DianSimpleClient:
 
         return response
 
+    @timed('dian.parse', response='status')
     def _parse_status_response(self, xml_response: str, response_class) -> DianResponse:
         """Parsear respuesta de GetStatusZip/GetStatus."""
         response = response_class(xml_response=xml_response)
@@ -442,6 +682,52 @@ class DianSimpleClient:
             if error_msgs:
                 response.error_messages = [e.text for e in error_msgs if e.text]
 
+            response.application_response = _decode_application_response(
+                doc.find(f'.//{{{ns_data}}}XmlBase64Bytes')
+            )
+
+            if isinstance(response, GetStatusZipResponse):
+                response.documents = [
+                    _parse_document_status(item)
+                    for item in doc.iter(f'{{{ns_data}}}DianResponse')
+                ]
+
+        except Exception:
+            pass
+
+        return response
+
+    @timed('dian.parse', response='numbering_range')
+    def _parse_numbering_range_response(self, xml_response: str) -> NumberingRangeResponse:
+        """Parsear respuesta de GetNumberingRange."""
+        response = NumberingRangeResponse(xml_response=xml_response)
+
+        try:
+            doc = etree.fromstring(xml_response.encode('utf-8'))
+
+            ns_list = 'http://schemas.datacontract.org/2004/07/NumberRangeResponseList'
+            ns_range = 'http://schemas.datacontract.org/2004/07/NumberRangeResponse'
+
+            response.status_code = doc.findtext(f'.//{{{ns_list}}}OperationCode')
+            response.status_description = doc.findtext(f'.//{{{ns_list}}}OperationDescription')
+            if response.status_code is not None:
+                response.is_valid = response.status_code == '100'
+
+            for item in doc.iter(f'{{{ns_range}}}NumberRangeResponse'):
+                def text(tag):
+                    return (item.findtext(f'{{{ns_range}}}{tag}') or '').strip()
+
+                response.ranges.append(ResolutionRange(
+                    resolution_number=text('ResolutionNumber'),
+                    resolution_date=text('ResolutionDate'),
+                    prefix=text('Prefix'),
+                    from_number=int(text('FromNumber')),
+                    to_number=int(text('ToNumber')),
+                    valid_date_from=text('ValidDateFrom'),
+                    valid_date_to=text('ValidDateTo'),
+                    technical_key=text('TechnicalKey'),
+                ))
+
         except Exception:
             pass
 
@@ -470,15 +756,18 @@ class DianSimpleClient:
         Returns:
             GetStatusZipResponse con el estado del documento
         """
+        import requests
+
         if wait_seconds > 0:
             time.sleep(wait_seconds)
 
         for attempt in range(max_retries):
             try:
-                response = self.get_status_zip(zip_key)
+                # Un estado en proceso guardado en la cache no sirve aqui
+                response = self.get_status_zip(zip_key, allow_pending=False)
 
                 # Si tenemos un estado definitivo, retornar
-                if response.is_valid is not None:
+                if is_terminal_status(response.is_valid, response.status_code):
                     return response
 
                 # Si no hay estado, esperar y reintentar
@@ -558,7 +847,9 @@ class DianSimpleClient:
         on_document_verified: Callable[[int, Dict], None] = None
     ) -> List[Dict[str, Any]]:
         """
-        Enviar lote de documentos a DIAN.
+        Enviar lote de documentos a DIAN, una solicitud por documento.
+
+        Para enviar varios documentos por ZIP ver batching.ZipBatchSender.
 
         Args:
             documents: Lista de diccionarios con 'file_name' y 'content_file'
@@ -621,8 +912,16 @@ class DianSimpleClient:
         results = {}
 
         for zip_key in zip_keys:
+            cached = self._cached_status('GetStatusZip', zip_key, allow_pending=False)
+            if cached is not None:
+                # Estado definitivo ya conocido: sin consulta ni espera
+                results[zip_key] = cached
+                if on_verified:
+                    on_verified(zip_key, cached)
+                continue
+
             try:
-                response = self.get_status_zip(zip_key)
+                response = self._fetch_status('GetStatusZip', zip_key)
                 results[zip_key] = response
 
                 if on_verified:
@@ -692,13 +991,11 @@ def calcular_cufe(
     Returns:
         CUFE en formato SHA-384 hexadecimal
     """
-    cadena = (
-        f"{numero}{fecha_emision}{hora_emision}"
-        f"{subtotal:.2f}01{iva:.2f}04{0:.2f}03{0:.2f}"
-        f"{total:.2f}{nit_emisor}{nit_adquiriente}"
-        f"{clave_tecnica}{tipo_ambiente}"
+    return compute_uuid(
+        numero, fecha_emision, hora_emision, subtotal, iva, 0, 0, total,
+        nit_emisor, nit_adquiriente, clave_tecnica, tipo_ambiente,
+        truncate=False,
     )
-    return hashlib.sha384(cadena.encode('utf-8')).hexdigest()
 
 
 def calcular_cufe_flexible(
@@ -737,18 +1034,14 @@ def calcular_cufe_flexible(
     Returns:
         CUFE en formato SHA-384 hexadecimal
     """
-    # Obtener valores de impuestos (0 si no existe)
-    iva = impuestos.get('01', 0.0)  # IVA
-    inc = impuestos.get('04', 0.0)  # INC
-    ica = impuestos.get('03', 0.0)  # ICA
-
-    cadena = (
-        f"{numero}{fecha_emision}{hora_emision}"
-        f"{subtotal:.2f}01{iva:.2f}04{inc:.2f}03{ica:.2f}"
-        f"{total:.2f}{nit_emisor}{nit_adquiriente}"
-        f"{clave_tecnica}{tipo_ambiente}"
+    return compute_uuid(
+        numero, fecha_emision, hora_emision, subtotal,
+        impuestos.get('01', 0.0),  # IVA
+        impuestos.get('04', 0.0),  # INC
+        impuestos.get('03', 0.0),  # ICA
+        total, nit_emisor, nit_adquiriente, clave_tecnica, tipo_ambiente,
+        truncate=False,
     )
-    return hashlib.sha384(cadena.encode('utf-8')).hexdigest()
 
 
 def calcular_software_security_code(
@@ -769,8 +1062,7 @@ def calcular_software_security_code(
     Returns:
         Hash SHA-384 hexadecimal
     """
-    cadena = f"{software_id}{pin}{numero_factura}"
-    return hashlib.sha384(cadena.encode('utf-8')).hexdigest()
+    return calculate_software_security_code(software_id, pin, numero_factura)
 
 
 def calcular_cude(
@@ -806,16 +1098,11 @@ def calcular_cude(
     Returns:
         CUDE en formato SHA-384 hexadecimal
     """
-    # CUDE = SHA384(NumDoc + FecDoc + HoraDoc + ValorBruto + 01 + ValorIVA +
-    #               04 + 0 + 03 + 0 + ValorTotal + NitEmisor + NumAdquiriente +
-    #               SoftwarePIN + TipoAmbiente)
-    cadena = (
-        f"{numero}{fecha_emision}{hora_emision}"
-        f"{subtotal:.2f}01{iva:.2f}04{0:.2f}03{0:.2f}"
-        f"{total:.2f}{nit_emisor}{nit_adquiriente}"
-        f"{software_pin}{tipo_ambiente}"
+    return compute_uuid(
+        numero, fecha_emision, hora_emision, subtotal, iva, 0, 0, total,
+        nit_emisor, nit_adquiriente, software_pin, tipo_ambiente,
+        truncate=False,
     )
-    return hashlib.sha384(cadena.encode('utf-8')).hexdigest()
 
 
 def calcular_cude_flexible(
@@ -857,15 +1144,11 @@ def calcular_cude_flexible(
     Returns:
         CUDE en formato SHA-384 hexadecimal
     """
-    # Obtener valores de impuestos (0 si no existe)
-    iva = impuestos.get('01', 0.0)  # IVA
-    inc = impuestos.get('04', 0.0)  # INC
-    ica = impuestos.get('03', 0.0)  # ICA
-
-    cadena = (
-        f"{numero}{fecha_emision}{hora_emision}"
-        f"{subtotal:.2f}01{iva:.2f}04{inc:.2f}03{ica:.2f}"
-        f"{total:.2f}{nit_emisor}{nit_adquiriente}"
-        f"{software_pin}{tipo_ambiente}"
+    return compute_uuid(
+        numero, fecha_emision, hora_emision, subtotal,
+        impuestos.get('01', 0.0),  # IVA
+        impuestos.get('04', 0.0),  # INC
+        impuestos.get('03', 0.0),  # ICA
+        total, nit_emisor, nit_adquiriente, software_pin, tipo_ambiente,
+        truncate=False,
     )
-    return hashlib.sha384(cadena.encode('utf-8')).hexdigest()
@@ -0,0 +1,606 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Emulador local de los servicios web DIAN para pruebas de carga.
+
+Implementa las operaciones WCF que usa DianSimpleClient (SendBillSync,
+SendBillAsync, SendTestSetAsync, GetStatus, GetStatusZip y
+GetNumberingRange) sobre un servidor HTTP local:
+
+- Verifica la firma WS-Security del sobre (digests de Timestamp y To,
+  firma RSA de SignedInfo con el certificado del BinarySecurityToken y
+  vigencia del Timestamp).
+- Descomprime el ZIP recibido y lee cada XML (CUFE/CUDE, numero, firma
+  XAdES presente, documentos repetidos).
+- Responde ZipKeys y cuerpos de estado con el formato de DIAN (los
+  estados finales traen el ApplicationResponse en XmlBase64Bytes).
+- Simula latencia, errores del servidor, respuestas colgadas, rechazos y
+  una cola de procesamiento con capacidad limitada.
+
+Ejemplo:
+    config = EmulatorConfig(latency=0.05, error_rate=0.01, processing_rate=200)
+    with DianEmulator(config) as emulator:
+        client = DianSimpleClient(certificate_bytes=p12, certificate_password='')
+        client.endpoint = emulator.endpoint
+        zip_key = client.send_bill_async('z.zip', package).zip_key
+        print(client.get_status_zip(zip_key).is_valid)
+        print(emulator.stats)
+
+Desde la linea de comandos:
+    facho dian-emulator --port 8080 --latency 0.2 --error-rate 0.05
+"""
+
+import base64
+import io
+import random
+import threading
+import time
+import uuid
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from cryptography import x509
+from lxml import etree
+
+from ..builders.exceptions import SignatureError
+from ..signing.utils import sha256_digest, verify_signature
+from .dian_simple import NS_SOAP
+
+
+NS_UBL_CBC = 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2'
+NS_UBL_CAC = 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2'
+NS_UBL_APPLICATION_RESPONSE = 'urn:oasis:names:specification:ubl:schema:xsd:ApplicationResponse-2'
+NS_DIAN_RESPONSE = 'http://schemas.datacontract.org/2004/07/DianResponse'
+NS_UPLOAD_RESPONSE = 'http://schemas.datacontract.org/2004/07/UploadDocumentResponse'
+NS_RANGE_LIST = 'http://schemas.datacontract.org/2004/07/NumberRangeResponseList'
+NS_RANGE = 'http://schemas.datacontract.org/2004/07/NumberRangeResponse'
+NS_ARRAYS = 'http://schemas.microsoft.com/2003/10/Serialization/Arrays'
+
+OPERATIONS = (
+    'SendBillSync', 'SendBillAsync', 'SendTestSetAsync',
+    'GetStatus', 'GetStatusZip', 'GetNumberingRange',
+)
+
+# Estados que responde el emulador
+STATUS_VALID = ('00', 'Procesado Correctamente.')
+STATUS_REJECTED = ('99', 'Validacion contiene errores en campos mandatorios.')
+STATUS_PROCESSING = ('98', 'En proceso de validacion.')
+STATUS_NOT_FOUND = ('66', 'TrackId no existe en los registros de la DIAN.')
+
+
+@dataclass
+class NumberingRange:
+    """Rango de numeracion que responde GetNumberingRange."""
+    resolution_number: str
+    resolution_date: str
+    prefix: str
+    from_number: int
+    to_number: int
+    valid_date_from: str
+    valid_date_to: str
+    technical_key: str
+
+
+@dataclass
+class EmulatorConfig:
+    """
+    Comportamiento del emulador.
+
+    Attributes:
+        latency: Segundos fijos antes de cada respuesta
+        latency_jitter: Segundos aleatorios adicionales (0 a jitter)
+        error_rate: Fraccion de solicitudes respondidas con SOAP Fault
+            (HTTP 500)
+        hang_rate: Fraccion de solicitudes que esperan hang_seconds antes
+            de responder (para probar timeouts del cliente)
+        hang_seconds: Espera de las solicitudes colgadas
+        rejection_rate: Fraccion de documentos validos que se rechazan
+        processing_delay: Segundos minimos hasta que un ZIP asincrono
+            queda procesado
+        processing_rate: Documentos por segundo que procesa la cola
+            asincrona (None = sin limite); con mas carga los ZIP quedan
+            mas tiempo en estado 'en proceso'
+        verify_signature: Verificar la firma WS-Security del sobre
+        numbering_ranges: Rangos por codigo de software
+        seed: Semilla de los valores aleatorios (resultados repetibles)
+    """
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    hang_rate: float = 0.0
+    hang_seconds: float = 30.0
+    rejection_rate: float = 0.0
+    processing_delay: float = 0.0
+    processing_rate: Optional[float] = None
+    verify_signature: bool = True
+    numbering_ranges: Dict[str, List[NumberingRange]] = field(default_factory=dict)
+    seed: Optional[int] = None
+
+
+@dataclass
+class EmulatedDocument:
+    """Resultado de la validacion de un XML recibido."""
+    xml_file_name: str
+    document_key: Optional[str]
+    is_valid: bool
+    errors: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _ZipRecord:
+    documents: List[EmulatedDocument]
+    ready_at: float
+    test_set_id: Optional[str] = None
+
+
+# =============================================================================
+# WS-SECURITY
+# =============================================================================
+
+def _prefix_list(parent: etree._Element) -> List[str]:
+    element = parent.find('{%s}InclusiveNamespaces' % NS_SOAP['ec'])
+    if element is None:
+        return []
+    return element.get('PrefixList', '').split()
+
+
+def _c14n(element: etree._Element, prefixes: List[str]) -> bytes:
+    return etree.tostring(element, method='c14n', exclusive=True,
+                          with_comments=False, inclusive_ns_prefixes=prefixes)
+
+
+def verify_wssec_envelope(envelope: etree._Element, now: datetime = None):
+    """
+    Verificar la firma WS-Security de un sobre SOAP.
+
+    Comprueba el digest de cada Reference (C14N exclusivo con los
+    prefijos indicados en su Transform), la firma RSA-SHA256 de
+    SignedInfo con el certificado del BinarySecurityToken y que el
+    Timestamp este vigente.
+
+    Args:
+        envelope: Elemento raiz del sobre
+        now: Hora de referencia (default: ahora, UTC)
+
+    Raises:
+        SignatureError: Si falta algun elemento o la firma no es valida
+    """
+    wsse, wsu, ds = NS_SOAP['wsse'], NS_SOAP['wsu'], NS_SOAP['ds']
+    security = envelope.find('.//{%s}Security' % wsse)
+    if security is None:
+        raise SignatureError('Sobre sin encabezado wsse:Security')
+    signed_info = security.find('{%s}Signature/{%s}SignedInfo' % (ds, ds))
+    signature_value = security.find('{%s}Signature/{%s}SignatureValue' % (ds, ds))
+    token = security.find('{%s}BinarySecurityToken' % wsse)
+    if signed_info is None or signature_value is None or token is None:
+        raise SignatureError('Firma WS-Security incompleta')
+
+    ids = {
+        element.get('{%s}Id' % wsu): element
+        for element in envelope.iter(etree.Element)
+        if element.get('{%s}Id' % wsu)
+    }
+    references = signed_info.findall('{%s}Reference' % ds)
+    if not references:
+        raise SignatureError('SignedInfo sin referencias')
+    for reference in references:
+        target = ids.get(reference.get('URI', '').lstrip('#'))
+        if target is None:
+            raise SignatureError(f"Referencia {reference.get('URI')} no encontrada")
+        transform = reference.find('{%s}Transforms/{%s}Transform' % (ds, ds))
+        prefixes = _prefix_list(transform) if transform is not None else []
+        digest = reference.findtext('{%s}DigestValue' % ds)
+        if sha256_digest(_c14n(target, prefixes)) != digest:
+            raise SignatureError(f"Digest invalido para {reference.get('URI')}")
+
+    try:
+        certificate = x509.load_der_x509_certificate(base64.b64decode(token.text))
+        signature = base64.b64decode(signature_value.text)
+    except (TypeError, ValueError) as e:
+        raise SignatureError(f'Certificado o firma ilegibles: {e}')
+    method = signed_info.find('{%s}CanonicalizationMethod' % ds)
+    prefixes = _prefix_list(method) if method is not None else []
+    if not verify_signature(certificate.public_key(), signature,
+                            _c14n(signed_info, prefixes)):
+        raise SignatureError('Firma RSA de SignedInfo invalida')
+
+    expires = security.findtext('{%s}Timestamp/{%s}Expires' % (wsu, wsu))
+    if expires:
+        expires_at = datetime.strptime(expires, '%Y-%m-%dT%H:%M:%S.%fZ')
+        if expires_at.replace(tzinfo=timezone.utc) < (now or datetime.now(timezone.utc)):
+            raise SignatureError('Timestamp WS-Security vencido')
+
+
+# =============================================================================
+# RESPUESTAS
+# =============================================================================
+
+def _envelope(operation: str, result: str) -> bytes:
+    return (
+        f'<s:Envelope xmlns:s="{NS_SOAP["soap"]}" '
+        f'xmlns:a="{NS_SOAP["wsa"]}"><s:Header>'
+        f'<a:Action s:mustUnderstand="1">{NS_SOAP["wcf"]}/IWcfDianCustomerServices/'
+        f'{operation}Response</a:Action></s:Header><s:Body>'
+        f'<{operation}Response xmlns="{NS_SOAP["wcf"]}">{result}</{operation}Response>'
+        '</s:Body></s:Envelope>'
+    ).encode('utf-8')
+
+
+def _fault(reason: str, code: str = 's:Receiver') -> bytes:
+    return (
+        f'<s:Envelope xmlns:s="{NS_SOAP["soap"]}"><s:Body><s:Fault>'
+        f'<s:Code><s:Value>{code}</s:Value></s:Code>'
+        f'<s:Reason><s:Text xml:lang="es-CO">{escape(reason)}</s:Text></s:Reason>'
+        '</s:Fault></s:Body></s:Envelope>'
+    ).encode('utf-8')
+
+
+def _application_response(document: EmulatedDocument, code: str) -> str:
+    """ApplicationResponse (base64) que DIAN adjunta a un estado final."""
+    response_code = '02' if code == STATUS_VALID[0] else '04'
+    xml = (
+        f'<ApplicationResponse xmlns="{NS_UBL_APPLICATION_RESPONSE}" '
+        f'xmlns:cac="{NS_UBL_CAC}" xmlns:cbc="{NS_UBL_CBC}">'
+        '<cbc:UBLVersionID>UBL 2.1</cbc:UBLVersionID>'
+        f'<cbc:ID>{uuid.uuid4().hex}</cbc:ID>'
+        '<cac:DocumentResponse><cac:Response>'
+        f'<cbc:ResponseCode>{response_code}</cbc:ResponseCode>'
+        '</cac:Response><cac:DocumentReference>'
+        f'<cbc:UUID>{escape(document.document_key or "")}</cbc:UUID>'
+        '</cac:DocumentReference></cac:DocumentResponse>'
+        '</ApplicationResponse>'
+    )
+    return base64.b64encode(xml.encode('utf-8')).decode('ascii')
+
+
+def _dian_response(
+    document: Optional[EmulatedDocument],
+    status: Tuple[str, str],
+    xml_file_name: str = None,
+    document_key: str = None
+) -> str:
+    """Elemento b:DianResponse (sin el prefijo de la operacion)."""
+    errors = ''.join(f'<c:string>{escape(e)}</c:string>' for e in (document.errors if document else []))
+    code, description = status
+    is_valid = ''
+    if code != STATUS_PROCESSING[0]:
+        is_valid = f'<b:IsValid>{"true" if code == STATUS_VALID[0] else "false"}</b:IsValid>'
+    application_response = ''
+    if document is not None:
+        xml_file_name = document.xml_file_name
+        document_key = document.document_key
+        if code != STATUS_PROCESSING[0]:
+            application_response = (
+                f'<b:XmlBase64Bytes>{_application_response(document, code)}</b:XmlBase64Bytes>'
+            )
+    return (
+        f'<b:ErrorMessage xmlns:c="{NS_ARRAYS}">{errors}</b:ErrorMessage>'
+        f'{is_valid}'
+        f'<b:StatusCode>{code}</b:StatusCode>'
+        f'<b:StatusDescription>{escape(description)}</b:StatusDescription>'
+        f'<b:StatusMessage>{escape(description)}</b:StatusMessage>'
+        f'{application_response}'
+        f'<b:XmlDocumentKey>{escape(document_key or "")}</b:XmlDocumentKey>'
+        f'<b:XmlFileName>{escape(xml_file_name or "")}</b:XmlFileName>'
+    )
+
+
+def _document_status(document: EmulatedDocument) -> Tuple[str, str]:
+    return STATUS_VALID if document.is_valid else STATUS_REJECTED
+
+
+# =============================================================================
+# EMULADOR
+# =============================================================================
+
+class DianEmulator:
+    """
+    Servidor local que emula los servicios web DIAN.
+
+    Args:
+        config: Comportamiento del emulador (default: sin latencia ni
+            errores)
+        host: Interfaz donde escuchar
+        port: Puerto (0 = puerto libre asignado por el sistema)
+
+    Attributes:
+        stats: Contadores de solicitudes por operacion y de fallas
+            simuladas o detectadas
+    """
+
+    def __init__(self, config: EmulatorConfig = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or EmulatorConfig()
+        self.host = host
+        self.port = port
+        self.stats: Dict[str, int] = {}
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._zips: Dict[str, _ZipRecord] = {}
+        self._documents: Dict[str, Tuple[EmulatedDocument, str]] = {}
+        self._queue_free_at = 0.0
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # -------------------------------------------------------------------------
+    # Ciclo de vida
+    # -------------------------------------------------------------------------
+
+    @property
+    def endpoint(self) -> str:
+        """URL que se asigna a DianSimpleClient.endpoint."""
+        return f'http://{self.host}:{self.port}/WcfDianCustomerServices.svc'
+
+    def start(self) -> 'DianEmulator':
+        """Iniciar el servidor en un hilo."""
+        emulator = self
+
+        class Handler(_EmulatorHandler):
+            pass
+        Handler.emulator = emulator
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Iniciar el servidor en el hilo actual (bloquea)."""
+        self.start()
+        try:
+            self._thread.join()
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Detener el servidor."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'DianEmulator':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    # -------------------------------------------------------------------------
+    # Procesamiento
+    # -------------------------------------------------------------------------
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def _delay(self) -> float:
+        delay = self.config.latency
+        if self.config.latency_jitter:
+            with self._lock:
+                delay += self._random.uniform(0, self.config.latency_jitter)
+        return delay
+
+    def handle(self, body: bytes) -> Tuple[int, bytes]:
+        """
+        Procesar una solicitud SOAP.
+
+        Returns:
+            (codigo HTTP, respuesta)
+        """
+        self._count('requests')
+        try:
+            envelope = etree.fromstring(body)
+        except etree.XMLSyntaxError:
+            self._count('malformed')
+            return 400, _fault('Sobre SOAP mal formado', 's:Sender')
+
+        request = envelope.find('{%s}Body/*' % NS_SOAP['soap'])
+        operation = etree.QName(request).localname if request is not None else None
+        if operation not in OPERATIONS:
+            self._count('unknown_operation')
+            return 400, _fault(f'Operacion no soportada: {operation}', 's:Sender')
+        self._count(operation)
+
+        action = envelope.findtext('{%s}Header/{%s}Action' % (NS_SOAP['soap'], NS_SOAP['wsa']))
+        if action is not None and action.rsplit('/', 1)[-1] != operation:
+            self._count('action_mismatch')
+            return 400, _fault(f'wsa:Action {action} no corresponde a {operation}', 's:Sender')
+
+        if self.config.verify_signature:
+            try:
+                verify_wssec_envelope(envelope)
+            except SignatureError as e:
+                self._count('signature_errors')
+                return 500, _fault(f'InvalidSecurity: {e.message}', 's:Sender')
+
+        if self._roll(self.config.error_rate):
+            self._count('simulated_errors')
+            return 500, _fault('Error interno simulado por el emulador')
+
+        def field_text(name):
+            return request.findtext('{%s}%s' % (NS_SOAP['wcf'], name))
+
+        result = getattr(self, '_op_' + operation)(field_text)
+        return 200, _envelope(operation, result)
+
+    def _evaluate_zip(self, file_name: str, content_b64: str) -> List[EmulatedDocument]:
+        try:
+            content = base64.b64decode(content_b64 or '', validate=True)
+            archive = zipfile.ZipFile(io.BytesIO(content))
+            entries = [(name, archive.read(name)) for name in archive.namelist()]
+        except (ValueError, zipfile.BadZipFile):
+            return [EmulatedDocument(file_name, None, False,
+                                     ['Regla: ZIP01, Rechazo: Archivo ZIP invalido'])]
+        if not entries:
+            return [EmulatedDocument(file_name, None, False,
+                                     ['Regla: ZIP02, Rechazo: ZIP sin documentos'])]
+        return [self._evaluate_xml(name, xml) for name, xml in entries]
+
+    def _evaluate_xml(self, name: str, xml: bytes) -> EmulatedDocument:
+        xml_file_name = name[:-4] if name.lower().endswith('.xml') else name
+        try:
+            root = etree.fromstring(xml)
+        except etree.XMLSyntaxError:
+            return EmulatedDocument(xml_file_name, None, False,
+                                    ['Regla: ZB01, Rechazo: XML mal formado'])
+
+        key = root.findtext('{%s}UUID' % NS_UBL_CBC)
+        errors = []
+        if not key:
+            errors.append('Regla: FAD06, Rechazo: Documento sin CUFE/CUDE')
+        if root.find('.//{%s}Signature' % NS_SOAP['ds']) is None:
+            errors.append('Regla: ZE02, Rechazo: Documento sin firma digital')
+        with self._lock:
+            if key and key in self._documents and self._documents[key][0].is_valid:
+                errors.append('Regla: 90, Rechazo: Documento procesado anteriormente.')
+        if not errors and self._roll(self.config.rejection_rate):
+            errors.append('Regla: FAB19b, Rechazo: Rechazo simulado por el emulador')
+        return EmulatedDocument(xml_file_name, key, not errors, errors)
+
+    def _register(self, documents: List[EmulatedDocument], ready_at: float,
+                  test_set_id: str = None) -> str:
+        zip_key = str(uuid.uuid4())
+        with self._lock:
+            self._zips[zip_key] = _ZipRecord(documents, ready_at, test_set_id)
+            for document in documents:
+                if document.document_key:
+                    self._documents[document.document_key] = (document, zip_key)
+        return zip_key
+
+    def _ready_at(self, documents: int) -> float:
+        """Hora en que la cola asincrona termina de procesar el ZIP."""
+        now = time.monotonic()
+        with self._lock:
+            ready = now
+            if self.config.processing_rate:
+                start = max(now, self._queue_free_at)
+                ready = self._queue_free_at = start + documents / self.config.processing_rate
+        return ready + self.config.processing_delay
+
+    def _upload_result(self, operation: str, field_text) -> str:
+        documents = self._evaluate_zip(field_text('fileName'), field_text('contentFile'))
+        zip_key = self._register(documents, self._ready_at(len(documents)),
+                                 field_text('testSetId'))
+        return (
+            f'<{operation}Result xmlns:b="{NS_UPLOAD_RESPONSE}">'
+            '<b:ErrorMessageList/>'
+            f'<b:ZipKey>{zip_key}</b:ZipKey>'
+            f'</{operation}Result>'
+        )
+
+    def _op_SendBillAsync(self, field_text) -> str:
+        return self._upload_result('SendBillAsync', field_text)
+
+    def _op_SendTestSetAsync(self, field_text) -> str:
+        return self._upload_result('SendTestSetAsync', field_text)
+
+    def _op_SendBillSync(self, field_text) -> str:
+        documents = self._evaluate_zip(field_text('fileName'), field_text('contentFile'))
+        self._register(documents, time.monotonic())
+        document = documents[0]
+        return (
+            f'<SendBillSyncResult xmlns:b="{NS_DIAN_RESPONSE}">'
+            f'{_dian_response(document, _document_status(document))}'
+            '</SendBillSyncResult>'
+        )
+
+    def _op_GetStatusZip(self, field_text) -> str:
+        track_id = field_text('trackId')
+        with self._lock:
+            record = self._zips.get(track_id)
+        if record is None:
+            items = [_dian_response(None, STATUS_NOT_FOUND, document_key=track_id)]
+        elif time.monotonic() < record.ready_at:
+            items = [_dian_response(d, STATUS_PROCESSING) for d in record.documents]
+        else:
+            items = [_dian_response(d, _document_status(d)) for d in record.documents]
+        return (
+            f'<GetStatusZipResult xmlns:b="{NS_DIAN_RESPONSE}">'
+            + ''.join(f'<b:DianResponse>{item}</b:DianResponse>' for item in items)
+            + '</GetStatusZipResult>'
+        )
+
+    def _op_GetStatus(self, field_text) -> str:
+        track_id = field_text('trackId')
+        with self._lock:
+            document, zip_key = self._documents.get(track_id, (None, None))
+            record = self._zips.get(zip_key)
+        if document is None:
+            item = _dian_response(None, STATUS_NOT_FOUND, document_key=track_id)
+        elif time.monotonic() < record.ready_at:
+            item = _dian_response(document, STATUS_PROCESSING)
+        else:
+            item = _dian_response(document, _document_status(document))
+        return f'<GetStatusResult xmlns:b="{NS_DIAN_RESPONSE}">{item}</GetStatusResult>'
+
+    def _op_GetNumberingRange(self, field_text) -> str:
+        ranges = self.config.numbering_ranges.get(field_text('softwareCode'), [])
+        if ranges:
+            code, description = '100', 'Accion completada OK.'
+        else:
+            code, description = '301', 'No se encontraron rangos de numeracion.'
+        items = ''.join(
+            f'<c:NumberRangeResponse xmlns:c="{NS_RANGE}">'
+            f'<c:ResolutionNumber>{escape(r.resolution_number)}</c:ResolutionNumber>'
+            f'<c:ResolutionDate>{r.resolution_date}</c:ResolutionDate>'
+            f'<c:Prefix>{escape(r.prefix)}</c:Prefix>'
+            f'<c:FromNumber>{r.from_number}</c:FromNumber>'
+            f'<c:ToNumber>{r.to_number}</c:ToNumber>'
+            f'<c:ValidDateFrom>{r.valid_date_from}</c:ValidDateFrom>'
+            f'<c:ValidDateTo>{r.valid_date_to}</c:ValidDateTo>'
+            f'<c:TechnicalKey>{escape(r.technical_key)}</c:TechnicalKey>'
+            '</c:NumberRangeResponse>'
+            for r in ranges
+        )
+        return (
+            f'<GetNumberingRangeResult xmlns:b="{NS_RANGE_LIST}">'
+            f'<b:OperationCode>{code}</b:OperationCode>'
+            f'<b:OperationDescription>{description}</b:OperationDescription>'
+            f'<b:ResponseList>{items}</b:ResponseList>'
+            '</GetNumberingRangeResult>'
+        )
+
+
+class _EmulatorHandler(BaseHTTPRequestHandler):
+    """Adaptador HTTP: lee el cuerpo, aplica latencia y responde."""
+
+    emulator: DianEmulator = None
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        emulator = self.emulator
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+
+        delay = emulator._delay()
+        if emulator._roll(emulator.config.hang_rate):
+            emulator._count('simulated_hangs')
+            delay = emulator.config.hang_seconds
+        if delay:
+            time.sleep(delay)
+
+        status, response = emulator.handle(body)
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/soap+xml; charset=utf-8')
+            self.send_header('Content-Length', str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente abandono la solicitud (ej: timeout)
+            pass
+
+    def log_message(self, *args: Any):
+        pass
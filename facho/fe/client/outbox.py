@@ -0,0 +1,575 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Outbox durable para enviar documentos a DIAN al menos una vez, sin
+duplicados.
+
+Cada documento firmado se registra en SQLite (WAL, synchronous=FULL)
+antes del envio, con su CUFE/CUDE como llave de idempotencia, y avanza
+por estos estados:
+
+    queued -> uploading -> uploaded(zip_key) -> verified | rejected
+                  |                                 (o failed tras
+                  +-> queued  (DIAN no lo conoce)    max_attempts)
+
+'uploading' se escribe y sincroniza antes de la peticion. Si el proceso
+muere o la peticion termina sin ZipKey (timeout, error de conexion,
+fault), no se sabe si DIAN recibio el documento: el item queda en
+'uploading' y antes de reenviarlo se reconcilia con GetStatus por
+CUFE. Solo si DIAN responde que no lo conoce (66) vuelve a 'queued';
+asi un reinicio no produce rechazos por documento duplicado.
+
+Varios workers (hilos o procesos) drenan el mismo archivo con leases:
+lease() toma items libres o con lease vencido dentro de una transaccion
+BEGIN IMMEDIATE, y cada transicion verifica que el lease siga siendo
+del worker.
+
+Ejemplo:
+    outbox = DocumentOutbox('outbox.sqlite3')
+    outbox.enqueue(cufe, 'z001.zip', zip_bytes, number='SETP990000001')
+
+    worker = OutboxWorker(outbox, client)
+    worker.drain()
+    outbox.counts()   # {'verified': 1}
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from ..builders.exceptions import CircuitOpenError, RateLimitedError
+from ..instrumentation import count, timed
+from ..packaging import ZipPackage
+from .dian_simple import is_terminal_status
+
+
+# Estados
+QUEUED = 'queued'
+UPLOADING = 'uploading'
+UPLOADED = 'uploaded'
+VERIFIED = 'verified'
+REJECTED = 'rejected'
+FAILED = 'failed'
+
+ACTIVE_STATES = (QUEUED, UPLOADING, UPLOADED)
+FINAL_STATES = (VERIFIED, REJECTED, FAILED)
+
+# StatusCode de GetStatus cuando DIAN no conoce el trackId
+DIAN_STATUS_NOT_FOUND = '66'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_key TEXT NOT NULL UNIQUE,
+    number TEXT,
+    doc_type TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    content BLOB NOT NULL,
+    test_set_id TEXT,
+    state TEXT NOT NULL,
+    zip_key TEXT,
+    status_code TEXT,
+    status_description TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (state, available_at);
+CREATE TABLE IF NOT EXISTS outbox_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+@dataclass
+class OutboxItem:
+    """
+    Documento registrado en el outbox.
+
+    Attributes:
+        id: Identificador interno
+        document_key: CUFE/CUDE (llave de idempotencia)
+        number: Numero del documento
+        doc_type: 'factura', 'credito', 'debito'...
+        file_name: Nombre del ZIP
+        content: Contenido del ZIP
+        test_set_id: Set de pruebas (SendTestSetAsync) o None
+        state: Estado actual
+        zip_key: ZipKey devuelto por DIAN
+        status_code: StatusCode de la ultima consulta
+        status_description: StatusDescription de la ultima consulta
+        error: Ultimo error (JSON con la lista de mensajes DIAN, o texto)
+        attempts: Envios intentados
+        available_at: Epoch desde el cual el item puede tomarse
+        lease_owner: Worker que tiene el lease
+        lease_expires: Epoch de vencimiento del lease
+        created_at: Timestamp de registro
+        updated_at: Timestamp de la ultima transicion
+    """
+    id: int
+    document_key: str
+    number: Optional[str]
+    doc_type: str
+    file_name: str
+    content: bytes
+    test_set_id: Optional[str]
+    state: str
+    zip_key: Optional[str]
+    status_code: Optional[str]
+    status_description: Optional[str]
+    error: Optional[str]
+    attempts: int
+    available_at: float
+    lease_owner: Optional[str]
+    lease_expires: Optional[float]
+    created_at: str
+    updated_at: str
+
+
+_COLUMNS = ', '.join(f.name for f in fields(OutboxItem))
+
+
+class DocumentOutbox:
+    """Cola durable de documentos por enviar, respaldada por SQLite."""
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 300.0,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            path: Archivo SQLite (se crea si no existe)
+            lease_seconds: Duracion de los leases; debe superar el
+                timeout del cliente para que un envio en curso no se
+                tome dos veces
+            clock: Reloj epoch (inyectable para tests)
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._clock = clock
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._db.executescript(_SCHEMA)
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """Conexion del hilo actual (sqlite3 no comparte conexiones)."""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            # FULL: cada COMMIT hace fsync del WAL
+            db.execute('PRAGMA synchronous=FULL')
+            self._local.db = db
+            with self._connections_lock:
+                self._connections.append(db)
+        return db
+
+    def close(self):
+        """Cerrar las conexiones de todos los hilos."""
+        with self._connections_lock:
+            for db in self._connections:
+                db.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _now_iso() -> str:
+        return datetime.now().isoformat()
+
+    def _fetch(self, sql: str, params: Sequence[Any] = ()) -> List[OutboxItem]:
+        rows = self._db.execute(f'SELECT {_COLUMNS} FROM outbox {sql}', params)
+        return [OutboxItem(*row) for row in rows]
+
+    # -------------------------------------------------------------------------
+    # Registro y consulta
+    # -------------------------------------------------------------------------
+
+    @timed('outbox.enqueue')
+    def enqueue(
+        self,
+        document_key: str,
+        file_name: str,
+        content: Union[bytes, ZipPackage],
+        number: str = None,
+        doc_type: str = 'factura',
+        test_set_id: str = None
+    ) -> OutboxItem:
+        """
+        Registrar un documento firmado antes de enviarlo.
+
+        Es idempotente por document_key: registrar de nuevo el mismo
+        CUFE/CUDE retorna el item existente sin modificarlo.
+
+        Args:
+            document_key: CUFE/CUDE del documento
+            file_name: Nombre del ZIP
+            content: ZIP en bytes o ZipPackage
+            number: Numero del documento
+            doc_type: Tipo de documento
+            test_set_id: Set de pruebas (habilitacion)
+
+        Returns:
+            El item registrado
+        """
+        if isinstance(content, ZipPackage):
+            content = content.content
+        now = self._now_iso()
+        self._db.execute(
+            'INSERT INTO outbox (document_key, number, doc_type, file_name, content, '
+            'test_set_id, state, available_at, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (document_key) DO NOTHING',
+            (document_key, number, doc_type, file_name, content, test_set_id,
+             QUEUED, self._clock(), now, now),
+        )
+        return self.get(document_key)
+
+    def get(self, document_key: str) -> Optional[OutboxItem]:
+        """Item por CUFE/CUDE."""
+        items = self._fetch('WHERE document_key = ?', (document_key,))
+        return items[0] if items else None
+
+    def items(self, state: str = None) -> List[OutboxItem]:
+        """Items (de un estado, o todos) en orden de registro."""
+        if state is None:
+            return self._fetch('ORDER BY id')
+        return self._fetch('WHERE state = ? ORDER BY id', (state,))
+
+    def counts(self) -> Dict[str, int]:
+        """Cantidad de items por estado."""
+        rows = self._db.execute('SELECT state, COUNT(*) FROM outbox GROUP BY state')
+        return dict(rows.fetchall())
+
+    def set_meta(self, key: str, value: Any):
+        """Guardar un valor JSON asociado al outbox (ej: modo de contingencia)."""
+        self._db.execute(
+            'INSERT INTO outbox_meta (key, value) VALUES (?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value',
+            (key, json.dumps(value)),
+        )
+
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        """Leer un valor guardado con set_meta."""
+        row = self._db.execute('SELECT value FROM outbox_meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    # -------------------------------------------------------------------------
+    # Leases
+    # -------------------------------------------------------------------------
+
+    def lease(
+        self,
+        owner: str,
+        limit: int = 1,
+        states: Sequence[str] = ACTIVE_STATES
+    ) -> List[OutboxItem]:
+        """
+        Tomar hasta `limit` items disponibles para `owner`.
+
+        Un item esta disponible si su estado esta en `states`, ya paso su
+        available_at y no tiene lease vigente de otro worker.
+        """
+        now = self._clock()
+        marks = ', '.join('?' * len(states))
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            ids = [row[0] for row in db.execute(
+                f'SELECT id FROM outbox WHERE state IN ({marks}) AND available_at <= ? '
+                'AND (lease_expires IS NULL OR lease_expires <= ?) '
+                'ORDER BY available_at, id LIMIT ?',
+                (*states, now, now, limit),
+            )]
+            if ids:
+                db.executemany(
+                    'UPDATE outbox SET lease_owner = ?, lease_expires = ? WHERE id = ?',
+                    [(owner, now + self.lease_seconds, i) for i in ids],
+                )
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        if not ids:
+            return []
+        marks = ', '.join('?' * len(ids))
+        return self._fetch(f'WHERE id IN ({marks}) ORDER BY available_at, id', ids)
+
+    def release_leases(self, owner: str = None) -> int:
+        """
+        Liberar leases de `owner` (o todos).
+
+        Liberar todos sirve al reiniciar un unico proceso que murio con
+        leases vigentes; con otros workers activos liberar solo los
+        propios.
+
+        Returns:
+            Cantidad de leases liberados
+        """
+        if owner is None:
+            cursor = self._db.execute(
+                'UPDATE outbox SET lease_owner = NULL, lease_expires = NULL '
+                'WHERE lease_owner IS NOT NULL'
+            )
+        else:
+            cursor = self._db.execute(
+                'UPDATE outbox SET lease_owner = NULL, lease_expires = NULL '
+                'WHERE lease_owner = ?', (owner,)
+            )
+        return cursor.rowcount
+
+    def transition(
+        self,
+        item: OutboxItem,
+        owner: str,
+        state: str,
+        delay: float = 0.0,
+        keep_lease: bool = False,
+        **changes: Any
+    ) -> bool:
+        """
+        Cambiar el estado de un item tomado por `owner`.
+
+        Args:
+            item: Item (se actualiza en memoria si la transicion aplica)
+            owner: Worker que tiene el lease
+            state: Nuevo estado
+            delay: Segundos hasta que el item vuelva a estar disponible
+            keep_lease: Conservar el lease (transiciones intermedias)
+            **changes: Otras columnas a actualizar (zip_key, error...)
+
+        Returns:
+            False si el lease ya no es de `owner` (vencio y otro worker
+            tomo el item); en ese caso no se modifica nada
+        """
+        now = self._clock()
+        values = dict(changes, state=state, available_at=now + delay,
+                      updated_at=self._now_iso())
+        if not keep_lease:
+            values.update(lease_owner=None, lease_expires=None)
+        assignments = ', '.join(f'{column} = ?' for column in values)
+        cursor = self._db.execute(
+            f'UPDATE outbox SET {assignments} WHERE id = ? AND lease_owner = ? '
+            'AND lease_expires > ?',
+            (*values.values(), item.id, owner, now),
+        )
+        if cursor.rowcount != 1:
+            count('outbox.lease_lost')
+            return False
+        for column, value in values.items():
+            setattr(item, column, value)
+        count('outbox.transition', state=state)
+        return True
+
+
+def _errors_json(messages: Optional[List[str]]) -> Optional[str]:
+    return json.dumps(messages, ensure_ascii=False) if messages else None
+
+
+class OutboxWorker:
+    """
+    Worker que drena un DocumentOutbox con un DianSimpleClient.
+
+    Varios workers pueden compartir el outbox (en hilos o procesos);
+    cada uno usa su propio `owner`.
+    """
+
+    def __init__(
+        self,
+        outbox: DocumentOutbox,
+        client: Any,
+        owner: str = None,
+        batch_size: int = 10,
+        poll_interval: float = 10.0,
+        retry_delay: float = 30.0,
+        max_attempts: int = 5
+    ):
+        """
+        Args:
+            outbox: Outbox a drenar
+            client: Cliente DIAN (DianSimpleClient)
+            owner: Identificador del worker (por defecto host:pid:aleatorio)
+            batch_size: Items por lease
+            poll_interval: Espera entre consultas de GetStatusZip
+            retry_delay: Espera tras un error de red o un envio fallido
+            max_attempts: Envios maximos antes de marcar 'failed'
+        """
+        self.outbox = outbox
+        self.client = client
+        self.owner = owner or f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+
+    def run_once(self, states: Sequence[str] = ACTIVE_STATES) -> int:
+        """
+        Tomar un lote de items y avanzarlos un paso.
+
+        Returns:
+            Cantidad de items procesados
+        """
+        items = self.outbox.lease(self.owner, self.batch_size, states)
+        for item in items:
+            self.process(item)
+        return len(items)
+
+    def reconcile(self) -> int:
+        """
+        Reconciliar los envios inciertos ('uploading') con GetStatus.
+
+        Llamarlo al arrancar, antes de drain(), resuelve lo que quedo en
+        curso cuando el proceso anterior murio (si sus leases vencieron
+        o se liberaron con release_leases).
+        """
+        processed = 0
+        while True:
+            done = self.run_once(states=(UPLOADING,))
+            processed += done
+            if done < self.batch_size:
+                return processed
+
+    def drain(
+        self,
+        stop: threading.Event = None,
+        idle_sleep: float = None,
+        states: Sequence[str] = ACTIVE_STATES
+    ) -> int:
+        """
+        Procesar items hasta que no quede ninguno en `states`.
+
+        Args:
+            stop: Evento para detener el ciclo
+            idle_sleep: Espera cuando hay items pendientes pero ninguno
+                disponible (por defecto min(poll_interval, 1))
+            states: Estados a procesar; (QUEUED, UPLOADING) solo envia y
+                deja la verificacion para despues
+
+        Returns:
+            Cantidad de pasos ejecutados
+        """
+        idle_sleep = min(self.poll_interval, 1.0) if idle_sleep is None else idle_sleep
+        processed = 0
+        while stop is None or not stop.is_set():
+            done = self.run_once(states)
+            processed += done
+            if done:
+                continue
+            counts = self.outbox.counts()
+            if not any(counts.get(state) for state in states):
+                break
+            if stop is not None:
+                stop.wait(idle_sleep)
+            else:
+                time.sleep(idle_sleep)
+        return processed
+
+    def process(self, item: OutboxItem):
+        """Avanzar un item tomado segun su estado."""
+        if item.state == QUEUED:
+            self._upload(item)
+        elif item.state == UPLOADING:
+            self._reconcile(item)
+        elif item.state == UPLOADED:
+            self._verify(item)
+
+    def _upload(self, item: OutboxItem):
+        if item.attempts >= self.max_attempts:
+            self.outbox.transition(item, self.owner, FAILED,
+                                   error=item.error or 'Intentos de envio agotados')
+            return
+        # Punto de no retorno: desde aqui el documento pudo llegar a DIAN
+        if not self.outbox.transition(item, self.owner, UPLOADING, keep_lease=True,
+                                      attempts=item.attempts + 1):
+            return
+
+        try:
+            if item.test_set_id:
+                response = self.client.send_test_set_async(
+                    item.file_name, item.content, item.test_set_id
+                )
+            else:
+                response = self.client.send_bill_async(item.file_name, item.content)
+        except (CircuitOpenError, RateLimitedError) as e:
+            # El guard lo rechazo antes de enviarlo: no llego a DIAN
+            delay = getattr(e, 'retry_after', None) or self.retry_delay
+            self.outbox.transition(item, self.owner, QUEUED, delay=delay,
+                                   attempts=item.attempts - 1, error=str(e))
+            return
+        except Exception as e:
+            # Resultado incierto: se reconcilia antes de reenviar
+            self.outbox.transition(item, self.owner, UPLOADING,
+                                   delay=self.retry_delay, error=str(e))
+            return
+
+        if response.zip_key:
+            self.outbox.transition(item, self.owner, UPLOADED, delay=self.poll_interval,
+                                   zip_key=response.zip_key, error=None)
+        else:
+            self.outbox.transition(
+                item, self.owner, UPLOADING, delay=self.retry_delay,
+                error=_errors_json(response.error_messages)
+                or response.status_description or 'DIAN no devolvio ZipKey',
+            )
+
+    def _reconcile(self, item: OutboxItem):
+        try:
+            response = self.client.get_status(item.document_key)
+        except Exception as e:
+            self.outbox.transition(item, self.owner, UPLOADING,
+                                   delay=self.retry_delay, error=str(e))
+            return
+
+        if response.status_code == DIAN_STATUS_NOT_FOUND:
+            count('outbox.resend')
+            self.outbox.transition(item, self.owner, QUEUED)
+        elif not is_terminal_status(response.is_valid, response.status_code):
+            # Sin respuesta concluyente (error HTTP o aun en proceso)
+            self.outbox.transition(item, self.owner, UPLOADING, delay=self.retry_delay)
+        else:
+            self._finish(item, response)
+
+    def _verify(self, item: OutboxItem):
+        try:
+            response = self.client.get_status_zip(item.zip_key)
+        except Exception as e:
+            self.outbox.transition(item, self.owner, UPLOADED,
+                                   delay=self.retry_delay, error=str(e))
+            return
+
+        if not is_terminal_status(response.is_valid, response.status_code):
+            # En proceso (98 llega con IsValid false): se vuelve a consultar
+            self.outbox.transition(item, self.owner, UPLOADED, delay=self.poll_interval,
+                                   status_code=response.status_code,
+                                   status_description=response.status_description)
+        else:
+            self._finish(item, response)
+
+    def _finish(self, item: OutboxItem, response: Any):
+        self.outbox.transition(
+            item, self.owner, VERIFIED if response.is_valid else REJECTED,
+            status_code=response.status_code,
+            status_description=response.status_description,
+            error=_errors_json(response.error_messages),
+        )
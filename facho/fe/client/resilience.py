@@ -0,0 +1,388 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Limitador de tasa y circuit breaker para las llamadas a DIAN.
+
+Cuando DIAN se degrada, cada peticion espera el timeout completo del
+cliente y los hilos de envio se acumulan. DianCallGuard agrupa las
+operaciones WCF en 'upload' (SendBill*, SendTestSetAsync) y 'status'
+(GetStatus*, GetNumberingRange); cada grupo tiene:
+
+- un TokenBucket que limita las peticiones por segundo (con rafaga), y
+- un CircuitBreaker que se abre tras N fallas consecutivas (timeouts,
+  errores de conexion, HTTP 5xx que no sean faults de tipo Sender) y
+  rechaza de inmediato con CircuitOpenError hasta que pasa
+  reset_timeout; luego deja pasar peticiones de prueba (half-open) y se
+  cierra con la primera exitosa.
+
+Uso:
+    guard = DianCallGuard(ResilienceConfig(upload_rate=2, status_rate=8))
+    client = DianSimpleClient(..., call_guard=guard)
+    try:
+        client.send_bill_async(name, package)
+    except (CircuitOpenError, RateLimitedError):
+        ...  # emitir en contingencia, encolar, etc.
+
+    guard.available('SendBillAsync')   # consultar antes de intentar
+    guard.metrics()                    # estado y contadores por grupo
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from lxml import etree
+
+from ..builders.exceptions import CircuitOpenError, RateLimitedError
+from ..instrumentation import count
+
+
+# Grupo de cada operacion WCF
+OPERATION_GROUPS = {
+    'SendBillSync': 'upload',
+    'SendBillAsync': 'upload',
+    'SendTestSetAsync': 'upload',
+    'GetStatus': 'status',
+    'GetStatusZip': 'status',
+    'GetNumberingRange': 'status',
+}
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+NS_SOAP_ENV = 'http://www.w3.org/2003/05/soap-envelope'
+SOAP_FAULT_CODE = '{0}Body/{0}Fault/{0}Code/{0}Value'.format('{%s}' % NS_SOAP_ENV)
+
+
+class TokenBucket:
+    """
+    Token bucket con reserva: quien toma un token sin cupo queda con la
+    espera hasta su turno, asi varios hilos salen espaciados a `rate`.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Args:
+            rate: Tokens por segundo
+            capacity: Rafaga maxima (por defecto max(1, rate))
+            clock: Reloj monotono (inyectable para tests)
+            sleep: Funcion de espera (inyectable para tests)
+        """
+        if rate <= 0:
+            raise ValueError("rate debe ser mayor que cero")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        """Tokens disponibles (negativo si hay reservas pendientes)."""
+        with self._lock:
+            self._refill(self._clock())
+            return self._tokens
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Tomar un token, esperando a lo sumo `timeout` segundos.
+
+        Args:
+            timeout: Espera maxima; None espera lo necesario
+
+        Returns:
+            False si el turno llegaria despues de `timeout` (no se espera)
+        """
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if timeout is not None and wait > timeout:
+                self._tokens += 1
+                return False
+        if wait > 0:
+            self._sleep(wait)
+        return True
+
+
+class CircuitBreaker:
+    """Circuit breaker por fallas consecutivas con estado half-open."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        on_state_change: Callable[[str, str, str], None] = None
+    ):
+        """
+        Args:
+            name: Nombre del circuito (grupo de operaciones)
+            failure_threshold: Fallas consecutivas que abren el circuito
+            reset_timeout: Segundos abierto antes de probar (half-open)
+            half_open_max_calls: Peticiones de prueba simultaneas
+            clock: Reloj monotono (inyectable para tests)
+            on_state_change: Callback (name, estado_anterior, estado_nuevo)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.on_state_change = on_state_change
+        self._clock = clock
+        # RLock: on_state_change corre con el lock tomado y puede
+        # consultar el circuito
+        self._lock = threading.RLock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self.consecutive_failures = 0
+        self.stats = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def _transition(self, state: str):
+        previous, self._state = self._state, state
+        self._probes = 0
+        if state == OPEN:
+            self._opened_at = self._clock()
+            self.stats['opened'] += 1
+        count('dian.circuit', circuit=self.name, state=state)
+        if self.on_state_change:
+            self.on_state_change(self.name, previous, state)
+
+    def retry_after(self) -> float:
+        """Segundos hasta que el circuito abierto pase a half-open."""
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def before_call(self):
+        """
+        Reservar el paso de una peticion.
+
+        Raises:
+            CircuitOpenError: Si el circuito esta abierto o ya hay
+                suficientes peticiones de prueba en curso
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return
+            self.stats['rejected'] += 1
+            retry_after = max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+        count('dian.circuit_rejected', circuit=self.name)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def release(self):
+        """Devolver una reserva de before_call sin resultado (no se envio)."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def reset(self):
+        """Cerrar el circuito (ej: otra verificacion confirmo que DIAN responde)."""
+        with self._lock:
+            self.consecutive_failures = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_success(self):
+        with self._lock:
+            self.stats['successes'] += 1
+            self.consecutive_failures = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.stats['failures'] += 1
+            self.consecutive_failures += 1
+            if self._state == HALF_OPEN or (
+                    self._state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self._transition(OPEN)
+
+
+@dataclass
+class ResilienceConfig:
+    """
+    Configuracion de DianCallGuard.
+
+    Attributes:
+        upload_rate: Envios (SendBill*, SendTestSetAsync) por segundo
+        upload_burst: Rafaga de envios
+        status_rate: Consultas (GetStatus*, GetNumberingRange) por segundo
+        status_burst: Rafaga de consultas
+        max_wait: Segundos maximos esperando turno en el limitador antes
+            de RateLimitedError; None espera lo necesario
+        failure_threshold: Fallas consecutivas que abren el circuito
+        reset_timeout: Segundos que el circuito queda abierto
+        half_open_max_calls: Peticiones de prueba en half-open
+    """
+    upload_rate: float = 5.0
+    upload_burst: float = 10.0
+    status_rate: float = 10.0
+    status_burst: float = 20.0
+    max_wait: Optional[float] = 10.0
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    half_open_max_calls: int = 1
+
+
+def is_failure_response(response: Any) -> bool:
+    """
+    Clasificar una respuesta HTTP de DIAN.
+
+    Los 5xx cuentan como falla del servicio salvo los SOAP faults con
+    codigo Sender (firma invalida, peticion mal formada): ahi DIAN
+    responde, el problema es del lado del cliente.
+    """
+    if response.status_code < 500:
+        return False
+    try:
+        fault_code = etree.fromstring(response.content).findtext(SOAP_FAULT_CODE)
+    except (etree.XMLSyntaxError, ValueError):
+        return True
+    return not (fault_code or '').endswith('Sender')
+
+
+class DianCallGuard:
+    """Limitador de tasa y circuit breaker por grupo de operaciones."""
+
+    def __init__(
+        self,
+        config: ResilienceConfig = None,
+        on_state_change: Callable[[str, str, str], None] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Args:
+            config: Configuracion (por defecto ResilienceConfig())
+            on_state_change: Callback (grupo, estado_anterior, estado_nuevo),
+                por ejemplo para pasar a emision en contingencia
+            clock: Reloj monotono (inyectable para tests)
+            sleep: Funcion de espera (inyectable para tests)
+        """
+        self.config = config or ResilienceConfig()
+        c = self.config
+        self.buckets = {
+            'upload': TokenBucket(c.upload_rate, c.upload_burst, clock, sleep),
+            'status': TokenBucket(c.status_rate, c.status_burst, clock, sleep),
+        }
+        self.listeners: List[Callable[[str, str, str], None]] = []
+        if on_state_change:
+            self.listeners.append(on_state_change)
+        self.breakers = {
+            group: CircuitBreaker(group, c.failure_threshold, c.reset_timeout,
+                                  c.half_open_max_calls, clock, self._notify)
+            for group in self.buckets
+        }
+        self.rate_limited = {group: 0 for group in self.buckets}
+
+    def _notify(self, group: str, previous: str, state: str):
+        for listener in list(self.listeners):
+            listener(group, previous, state)
+
+    def subscribe(self, listener: Callable[[str, str, str], None]):
+        """Agregar un callback (grupo, estado_anterior, estado_nuevo)."""
+        self.listeners.append(listener)
+
+    @staticmethod
+    def group(operation: str) -> str:
+        """Grupo ('upload' o 'status') de una operacion WCF."""
+        return OPERATION_GROUPS.get(operation, 'status')
+
+    def available(self, operation: str) -> bool:
+        """True si el circuito de la operacion no esta abierto."""
+        return self.breakers[self.group(operation)].state != OPEN
+
+    def execute(
+        self,
+        operation: str,
+        send: Callable[[], Any],
+        fallback: Callable[[Exception], Any] = None
+    ) -> Any:
+        """
+        Ejecutar `send` bajo el limitador y el circuito de la operacion.
+
+        Args:
+            operation: Nombre de la operacion WCF (ej: 'SendBillAsync')
+            send: Funcion que hace la peticion y retorna la respuesta HTTP
+            fallback: Si se indica, se llama con la CircuitOpenError o
+                RateLimitedError en lugar de propagarla
+
+        Returns:
+            La respuesta de `send` (o el resultado de `fallback`)
+
+        Raises:
+            CircuitOpenError: Circuito abierto y sin fallback
+            RateLimitedError: Sin turno dentro de max_wait y sin fallback
+        """
+        group = self.group(operation)
+        breaker = self.breakers[group]
+        try:
+            breaker.before_call()
+            if not self.buckets[group].acquire(self.config.max_wait):
+                breaker.release()
+                self.rate_limited[group] += 1
+                count('dian.rate_limited', group=group, operation=operation)
+                raise RateLimitedError(operation, self.config.max_wait)
+        except (CircuitOpenError, RateLimitedError) as e:
+            if fallback is None:
+                raise
+            return fallback(e)
+
+        try:
+            response = send()
+        except Exception:
+            breaker.record_failure()
+            raise
+        if is_failure_response(response):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Estado, contadores y tokens disponibles por grupo."""
+        return {
+            group: {
+                'state': breaker.state,
+                'consecutive_failures': breaker.consecutive_failures,
+                'retry_after': breaker.retry_after(),
+                'tokens': self.buckets[group].tokens,
+                'rate_limited': self.rate_limited[group],
+                **breaker.stats,
+            }
+            for group, breaker in self.breakers.items()
+        }
@@ -0,0 +1,233 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Registro de resoluciones de numeracion consultadas a DIAN.
+
+ResolutionRegistry guarda, por emisor (NIT) y software, los rangos que
+responde GetNumberingRange e indexa cada uno por prefijo. Las
+validaciones por documento (consecutivo dentro del rango, fecha dentro
+de la vigencia, resolucion por vencer) se resuelven con una busqueda en
+un diccionario: DIAN se consulta una vez por emisor y software cada
+`ttl` segundos, no por documento.
+
+Uso:
+    registry = ResolutionRegistry(client, ttl=6 * 3600)
+    config = registry.apply(config)          # InvoiceConfig con la resolucion
+    registry.check(config, 'SETP990000001', '2024-01-15')
+    registry.is_expiring_soon(config, days_warning=30)
+
+    number = tracker.get_next_document_number(registry.for_config(config))
+
+Si una consulta falla y hay rangos vencidos en memoria, se siguen usando
+hasta la siguiente consulta exitosa.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..builders.exceptions import (
+    DianError, RangeError, ResolutionExpiredError, ResolutionNotFoundError,
+)
+from ..builders.rules import parse_consecutive
+from ..builders.validators import is_resolution_expiring_soon, validate_resolution_dates
+from ..instrumentation import count
+from .dian_simple import NumberingRangeResponse, ResolutionRange
+
+
+# Segundos que se reutilizan los rangos consultados
+DEFAULT_TTL = 6 * 3600.0
+
+# OperationCode de GetNumberingRange
+OPERATION_OK = '100'
+OPERATION_NO_RANGES = '301'
+
+
+@dataclass
+class _Entry:
+    """Rangos de un emisor y software."""
+    fetched_at: float
+    by_prefix: Dict[str, ResolutionRange]
+
+
+class ResolutionRegistry:
+    """Rangos de numeracion por (NIT, software), con expiracion."""
+
+    def __init__(
+        self,
+        client: Any = None,
+        ttl: float = DEFAULT_TTL,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            client: DianSimpleClient (o cualquier objeto con
+                get_numbering_range); sin cliente solo se usan los rangos
+                registrados con register()
+            ttl: Segundos antes de volver a consultar a DIAN
+                (None = no expiran)
+            clock: Reloj (inyectable para tests)
+        """
+        self.client = client
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._lock = threading.Lock()
+        self._loading: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def register(self, nit: str, software_id: str, ranges: List[ResolutionRange]):
+        """Guardar rangos obtenidos por otro medio (ej: configuracion)."""
+        entry = _Entry(self._clock(), {r.prefix: r for r in ranges})
+        with self._lock:
+            self._entries[(nit, software_id)] = entry
+
+    def invalidate(self, nit: str, software_id: str = None):
+        """Olvidar los rangos de un emisor (de un software o de todos)."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == nit]:
+                if software_id is None or key[1] == software_id:
+                    del self._entries[key]
+
+    def _fresh(self, key: Tuple[str, str]) -> Optional[_Entry]:
+        """Entrada vigente (con el lock tomado)."""
+        entry = self._entries.get(key)
+        if entry is not None and (self.ttl is None or self._clock() - entry.fetched_at < self.ttl):
+            return entry
+        return None
+
+    def _entry(self, nit: str, software_id: str) -> _Entry:
+        key = (nit, software_id)
+        with self._lock:
+            entry = self._fresh(key)
+            if entry is None:
+                loading = self._loading.setdefault(key, threading.Lock())
+        if entry is not None:
+            count('resolutions.lookups', outcome='hit')
+            return entry
+
+        # Un solo hilo consulta a DIAN; los demas esperan su resultado
+        with loading:
+            with self._lock:
+                entry = self._fresh(key)
+            if entry is not None:
+                count('resolutions.lookups', outcome='hit')
+                return entry
+            try:
+                return self._fetch(nit, software_id)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+    def _fetch(self, nit: str, software_id: str) -> _Entry:
+        key = (nit, software_id)
+        with self._lock:
+            stale = self._entries.get(key)
+        if self.client is None:
+            if stale is not None:
+                return stale
+            raise ResolutionNotFoundError(f'NIT {nit}, software {software_id}')
+
+        try:
+            response: NumberingRangeResponse = self.client.get_numbering_range(nit, software_id)
+            if response.status_code not in (OPERATION_OK, OPERATION_NO_RANGES):
+                raise DianError(
+                    f'GetNumberingRange fallo para NIT {nit}',
+                    status_code=response.status_code,
+                    dian_errors=[response.status_description] if response.status_description else None,
+                )
+        except Exception:
+            if stale is None:
+                count('resolutions.lookups', outcome='error')
+                raise
+            count('resolutions.lookups', outcome='stale')
+            return stale
+
+        count('resolutions.lookups', outcome='fetch')
+        self.register(nit, software_id, response.ranges)
+        with self._lock:
+            return self._entries[key]
+
+    def ranges(self, nit: str, software_id: str) -> List[ResolutionRange]:
+        """Rangos autorizados del emisor para el software."""
+        return list(self._entry(nit, software_id).by_prefix.values())
+
+    def get(self, nit: str, software_id: str, prefix: str = '') -> ResolutionRange:
+        """
+        Rango de un prefijo.
+
+        Raises:
+            ResolutionNotFoundError: DIAN no tiene un rango con ese prefijo
+            DianError: La consulta fallo y no hay rangos en memoria
+        """
+        resolution = self._entry(nit, software_id).by_prefix.get(prefix or '')
+        if resolution is None:
+            raise ResolutionNotFoundError(
+                f'NIT {nit}, software {software_id}, prefijo {prefix or "(sin prefijo)"}'
+            )
+        return resolution
+
+    def for_config(self, config: Any) -> ResolutionRange:
+        """Rango que corresponde a un InvoiceConfig (nit, software_id, prefix)."""
+        return self.get(config.nit, config.software_id, getattr(config, 'prefix', ''))
+
+    def apply(self, config: Any) -> Any:
+        """
+        Copia del InvoiceConfig con la resolucion, el rango y la clave
+        tecnica que reporta DIAN.
+        """
+        resolution = self.for_config(config)
+        return replace(
+            config,
+            technical_key=resolution.technical_key,
+            resolution_number=resolution.resolution_number,
+            resolution_date=resolution.valid_date_from,
+            resolution_end_date=resolution.valid_date_to,
+            range_from=str(resolution.from_number),
+            range_to=str(resolution.to_number),
+        )
+
+    def validate_issue_date(self, config: Any, issue_date: str) -> List[str]:
+        """validate_resolution_dates contra la vigencia del rango."""
+        resolution = self.for_config(config)
+        return validate_resolution_dates(
+            resolution.valid_date_from, resolution.valid_date_to, issue_date
+        )
+
+    def is_expiring_soon(self, config: Any, days_warning: int = 30) -> bool:
+        """is_resolution_expiring_soon con la fecha fin del rango."""
+        return is_resolution_expiring_soon(self.for_config(config).valid_date_to, days_warning)
+
+    def check(self, config: Any, number: Any, issue_date: str = None) -> ResolutionRange:
+        """
+        Verificar un numero de documento contra su rango.
+
+        Args:
+            config: InvoiceConfig del emisor
+            number: Numero con o sin prefijo (ej: 'SETP990000001')
+            issue_date: Fecha de emision (YYYY-MM-DD); None = no verificar
+
+        Raises:
+            RangeError: El consecutivo esta fuera del rango autorizado
+            ResolutionExpiredError: La fecha de emision no esta en la
+                vigencia de la resolucion
+        """
+        resolution = self.for_config(config)
+        consecutive = parse_consecutive(number, resolution.prefix)
+        if consecutive is None or not (
+                resolution.from_number <= consecutive <= resolution.to_number):
+            raise RangeError(
+                f'Consecutivo {number} fuera de la resolucion {resolution.resolution_number}',
+                current=consecutive,
+                range_from=resolution.from_number,
+                range_to=resolution.to_number,
+            )
+        if issue_date and validate_resolution_dates(
+                resolution.valid_date_from, resolution.valid_date_to, issue_date):
+            raise ResolutionExpiredError(resolution.resolution_number, resolution.valid_date_to)
+        return resolution
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
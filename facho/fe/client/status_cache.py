@@ -0,0 +1,244 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Cache en disco de las respuestas de GetStatus y GetStatusZip.
+
+Un documento validado (IsValid true) o rechazado (StatusCode 99) no
+cambia de estado: StatusCache guarda esas respuestas, con el
+ApplicationResponse decodificado, y las sirve sin consultar a DIAN. Los
+estados no definitivos (en proceso, TrackId inexistente) se guardan
+`pending_ttl` segundos, para que varios consultores seguidos
+(dashboards, operadores) no repitan la misma consulta, y despues se
+vuelven a pedir.
+
+Con un DocumentTracker, los documentos que el tracker ya tiene con
+estado definitivo y ApplicationResponse tampoco se consultan aunque no
+esten en la cache (por CUFE/CUDE para GetStatus; para GetStatusZip,
+solo si todos los documentos del ZipKey estan asi).
+
+Uso:
+    cache = StatusCache('estados.sqlite3', tracker=tracker)
+    client = DianSimpleClient(..., status_cache=cache)
+    client.get_status_zip(zip_key)      # DIAN
+    client.get_status_zip(zip_key)      # cache si el estado es final
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from typing import Callable, List, Optional
+
+from ..instrumentation import count
+from .dian_simple import DocumentStatus, GetStatusZipResponse, is_terminal_status
+from .tracker import DocumentTracker, TrackedDocument
+
+
+# Operaciones cacheables
+GET_STATUS = 'GetStatus'
+GET_STATUS_ZIP = 'GetStatusZip'
+
+# Segundos que se reutiliza un estado no definitivo
+DEFAULT_PENDING_TTL = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS status_cache (
+    operation TEXT NOT NULL,
+    track_id TEXT NOT NULL,
+    terminal INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    response TEXT NOT NULL,
+    PRIMARY KEY (operation, track_id)
+);
+"""
+
+
+def is_terminal(response: GetStatusZipResponse) -> bool:
+    """
+    True si el estado ya no cambiara.
+
+    Una respuesta de GetStatusZip es final solo si todos sus documentos
+    lo son.
+    """
+    if response.documents:
+        return all(is_terminal_status(d.is_valid, d.status_code) for d in response.documents)
+    return is_terminal_status(response.is_valid, response.status_code)
+
+
+def _load_response(data: str) -> GetStatusZipResponse:
+    values = json.loads(data)
+    documents = values.pop('documents', None)
+    response = GetStatusZipResponse(**values)
+    if documents is not None:
+        response.documents = [DocumentStatus(**d) for d in documents]
+    return response
+
+
+class StatusCache:
+    """Respuestas de estado de DIAN en SQLite, por operacion y trackId."""
+
+    def __init__(
+        self,
+        path: str,
+        pending_ttl: float = DEFAULT_PENDING_TTL,
+        tracker: DocumentTracker = None,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            path: Archivo SQLite (se crea si no existe)
+            pending_ttl: Segundos que se reutiliza un estado no definitivo
+                (0 = consultar siempre)
+            tracker: Tracker cuyos documentos validados no se consultan.
+                La cache lo lee bajo su propio lock; no debe modificarse
+                a la vez desde otros hilos
+            clock: Reloj epoch (inyectable para tests)
+        """
+        self.path = path
+        self.pending_ttl = pending_ttl
+        self.tracker = tracker
+        self._clock = clock
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._db.executescript(_SCHEMA)
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """Conexion del hilo actual (sqlite3 no comparte conexiones)."""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            self._local.db = db
+            with self._lock:
+                self._connections.append(db)
+        return db
+
+    def close(self):
+        """Cerrar las conexiones de todos los hilos."""
+        with self._lock:
+            for db in self._connections:
+                db.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(
+        self,
+        operation: str,
+        track_id: str,
+        allow_pending: bool = True
+    ) -> Optional[GetStatusZipResponse]:
+        """
+        Respuesta guardada, o None si hay que consultar a DIAN.
+
+        Args:
+            operation: GET_STATUS o GET_STATUS_ZIP
+            track_id: ZipKey (GetStatusZip) o CUFE/CUDE (GetStatus)
+            allow_pending: False ignora los estados no definitivos
+                guardados (para quien espera a que el estado cambie)
+        """
+        row = self._db.execute(
+            'SELECT terminal, fetched_at, response FROM status_cache '
+            'WHERE operation = ? AND track_id = ?',
+            (operation, track_id),
+        ).fetchone()
+        if row is not None:
+            terminal, fetched_at, data = row
+            if terminal or (allow_pending and self._clock() - fetched_at < self.pending_ttl):
+                count('dian.status_cache', operation=operation,
+                      outcome='terminal' if terminal else 'pending')
+                return _load_response(data)
+
+        response = self._from_tracker(operation, track_id)
+        if response is not None:
+            count('dian.status_cache', operation=operation, outcome='tracker')
+            return response
+        count('dian.status_cache', operation=operation, outcome='miss')
+        return None
+
+    def put(self, operation: str, track_id: str, response: GetStatusZipResponse) -> bool:
+        """
+        Guardar una respuesta de DIAN.
+
+        No se guardan respuestas sin StatusCode (fallas de red o de
+        parseo), ni estados no definitivos si pending_ttl es 0.
+
+        Returns:
+            True si la respuesta quedo guardada
+        """
+        if response.status_code is None:
+            return False
+        terminal = is_terminal(response)
+        if not terminal and self.pending_ttl <= 0:
+            return False
+        self._db.execute(
+            'INSERT OR REPLACE INTO status_cache '
+            '(operation, track_id, terminal, fetched_at, response) VALUES (?, ?, ?, ?, ?)',
+            (operation, track_id, int(terminal), self._clock(), json.dumps(asdict(response))),
+        )
+        return True
+
+    def invalidate(self, operation: str, track_id: str):
+        self._db.execute(
+            'DELETE FROM status_cache WHERE operation = ? AND track_id = ?',
+            (operation, track_id),
+        )
+
+    def purge_pending(self) -> int:
+        """Borrar los estados no definitivos; devuelve cuantos habia."""
+        return self._db.execute('DELETE FROM status_cache WHERE terminal = 0').rowcount
+
+    def __len__(self) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM status_cache').fetchone()[0]
+
+    def _from_tracker(self, operation: str, track_id: str) -> Optional[GetStatusZipResponse]:
+        """
+        Respuesta armada con los documentos del tracker.
+
+        Solo si todos los documentos del trackId tienen estado
+        definitivo y ApplicationResponse; si no, hay que consultar a DIAN.
+        """
+        if self.tracker is None:
+            return None
+        with self._lock:
+            if operation == GET_STATUS_ZIP:
+                docs = self.tracker.get_documents_by_zip_key(track_id)
+            else:
+                doc = self.tracker.get_document_by_uuid(track_id)
+                docs = [doc] if doc is not None else []
+        if not docs or not all(
+                is_terminal_status(doc.is_valid, doc.status_code) and doc.application_response
+                for doc in docs):
+            return None
+        return _tracked_response(docs)
+
+
+def _tracked_response(docs: List[TrackedDocument]) -> GetStatusZipResponse:
+    documents = [
+        DocumentStatus(
+            document_key=doc.uuid,
+            is_valid=doc.is_valid,
+            status_code=doc.status_code or '00',
+            status_description=doc.status_description,
+            application_response=doc.application_response,
+        )
+        for doc in docs
+    ]
+    # Como en la respuesta de DIAN, el encabezado es el del primer documento
+    first = documents[0]
+    return GetStatusZipResponse(
+        is_valid=first.is_valid,
+        status_code=first.status_code,
+        status_description=first.status_description,
+        application_response=first.application_response,
+        documents=documents,
+    )
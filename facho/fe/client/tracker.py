@@ -8,11 +8,24 @@ Permite rastrear documentos enviados, sus estados y consecutivos.
 
 import json
 import os
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field, asdict
 from pathlib import Path
 
+from ..builders.exceptions import RangeError
+from ..builders.rules import parse_consecutive
+from ..instrumentation import timed
+
+
+# Elemento raiz del documento -> doc_type del tracker
+TRACKER_DOC_TYPES = {
+    'Invoice': 'factura',
+    'CreditNote': 'credito',
+    'DebitNote': 'debito',
+}
+
 
 @dataclass
 class TrackedDocument:
@@ -29,6 +42,7 @@ class TrackedDocument:
     total: float = 0.0  # Total del documento
     ref_invoice_number: Optional[str] = None  # Para notas: numero factura referenciada
     ref_invoice_uuid: Optional[str] = None  # Para notas: CUFE factura referenciada
+    application_response: Optional[str] = None  # ApplicationResponse de DIAN (XML)
     created_at: str = ''  # Timestamp de creacion del tracking
     updated_at: str = ''  # Timestamp de ultima actualizacion
 
@@ -46,6 +60,7 @@ class TrackingData:
     notas_credito: List[TrackedDocument] = field(default_factory=list)
     notas_debito: List[TrackedDocument] = field(default_factory=list)
     last_consecutive: int = 0
+    consecutives: Dict[str, int] = field(default_factory=dict)  # Por resolucion
     prefix: str = ''
     nit: str = ''
     created_at: str = ''
@@ -86,6 +101,11 @@ class DocumentTracker:
 
         # Obtener documentos pendientes de verificacion
         pending = tracker.get_pending_documents()
+
+        # Varios cambios con una sola escritura del archivo
+        with tracker.batch():
+            for number in numbers:
+                tracker.update_status(number, is_valid=True)
     """
 
     def __init__(self, tracking_file: str = None):
@@ -101,6 +121,8 @@ class DocumentTracker:
 
         self.tracking_file = Path(tracking_file)
         self._data: TrackingData = self._load()
+        self._batch_depth = 0
+        self._dirty = False
 
     def _load(self) -> TrackingData:
         """Cargar datos de tracking desde archivo."""
@@ -130,6 +152,7 @@ class DocumentTracker:
                 notas_credito=notas_credito,
                 notas_debito=notas_debito,
                 last_consecutive=raw_data.get('last_consecutive', 0),
+                consecutives=raw_data.get('consecutives', {}),
                 prefix=raw_data.get('prefix', ''),
                 nit=raw_data.get('nit', ''),
                 created_at=raw_data.get('created_at', ''),
@@ -138,8 +161,30 @@ class DocumentTracker:
         except (json.JSONDecodeError, KeyError):
             return TrackingData()
 
+    @contextmanager
+    def batch(self):
+        """
+        Agrupar cambios: el archivo se escribe una vez al salir del bloque
+        y no en cada add_document/update_status.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._dirty:
+                self._save()
+
     def _save(self):
-        """Guardar datos de tracking a archivo."""
+        """Guardar datos de tracking a archivo (al final del batch, si hay uno)."""
+        if self._batch_depth:
+            self._dirty = True
+            return
+        self._dirty = False
+        self._write()
+
+    @timed('tracker.save')
+    def _write(self):
         self._data.updated_at = datetime.now().isoformat()
 
         # Convertir a diccionarios para JSON
@@ -148,6 +193,7 @@ class DocumentTracker:
             'notas_credito': [asdict(doc) for doc in self._data.notas_credito],
             'notas_debito': [asdict(doc) for doc in self._data.notas_debito],
             'last_consecutive': self._data.last_consecutive,
+            'consecutives': self._data.consecutives,
             'prefix': self._data.prefix,
             'nit': self._data.nit,
             'created_at': self._data.created_at,
@@ -182,26 +228,70 @@ class DocumentTracker:
             self._data.last_consecutive = start_consecutive
         self._save()
 
-    def get_next_consecutive(self) -> int:
+    def get_next_consecutive(self, resolution: Any = None) -> int:
         """
         Obtener siguiente numero consecutivo.
 
+        Args:
+            resolution: ResolutionRange (ver resolutions.ResolutionRegistry);
+                si se indica, se usa el consecutivo propio de la resolucion
+                (prefijo y numero), que arranca en su from_number y no
+                puede pasar de to_number
+
         Returns:
             Siguiente numero consecutivo
+
+        Raises:
+            RangeError: El rango de la resolucion se agoto
         """
-        self._data.last_consecutive += 1
+        if resolution is None:
+            consecutive = self._data.last_consecutive + 1
+            self._data.last_consecutive = consecutive
+            self._save()
+            return consecutive
+
+        key = f"{resolution.prefix}/{resolution.resolution_number}"
+        last = self._data.consecutives.get(key)
+        if last is None:
+            last = self._last_tracked_consecutive(resolution)
+        consecutive = max(last + 1, resolution.from_number)
+        if consecutive > resolution.to_number:
+            raise RangeError(
+                f"Rango de la resolucion {resolution.resolution_number} agotado",
+                current=consecutive,
+                range_from=resolution.from_number,
+                range_to=resolution.to_number,
+            )
+        self._data.consecutives[key] = consecutive
         self._save()
-        return self._data.last_consecutive
+        return consecutive
 
-    def get_next_document_number(self) -> str:
+    def _last_tracked_consecutive(self, resolution: Any) -> int:
+        """Mayor consecutivo ya registrado dentro del rango (0 si no hay)."""
+        all_docs = self._data.facturas + self._data.notas_credito + self._data.notas_debito
+        last = 0
+        for doc in all_docs:
+            if not doc.number.startswith(resolution.prefix):
+                continue
+            consecutive = parse_consecutive(doc.number, resolution.prefix)
+            if consecutive is not None and (
+                    resolution.from_number <= consecutive <= resolution.to_number):
+                last = max(last, consecutive)
+        return last
+
+    def get_next_document_number(self, resolution: Any = None) -> str:
         """
         Obtener siguiente numero de documento con prefijo.
 
+        Args:
+            resolution: ResolutionRange cuyo prefijo y rango se usan
+
         Returns:
             Numero de documento (ej: 'SETP990000001')
         """
-        consecutive = self.get_next_consecutive()
-        return f"{self._data.prefix}{consecutive}"
+        consecutive = self.get_next_consecutive(resolution)
+        prefix = resolution.prefix if resolution is not None else self._data.prefix
+        return f"{prefix}{consecutive}"
 
     def add_document(self, document: TrackedDocument):
         """
@@ -229,7 +319,8 @@ class DocumentTracker:
         is_valid: bool = None,
         status_code: str = None,
         status_description: str = None,
-        zip_key: str = None
+        zip_key: str = None,
+        application_response: str = None
     ) -> bool:
         """
         Actualizar estado de un documento.
@@ -240,6 +331,7 @@ class DocumentTracker:
             status_code: Codigo de estado DIAN
             status_description: Descripcion del estado
             zip_key: ZipKey de DIAN
+            application_response: ApplicationResponse de DIAN (XML)
 
         Returns:
             True si el documento fue encontrado y actualizado
@@ -256,6 +348,8 @@ class DocumentTracker:
                     doc.status_description = status_description
                 if zip_key is not None:
                     doc.zip_key = zip_key
+                if application_response is not None:
+                    doc.application_response = application_response
                 doc.updated_at = datetime.now().isoformat()
                 self._save()
                 return True
@@ -298,6 +392,37 @@ class DocumentTracker:
 
         return None
 
+    def get_document_by_zip_key(self, zip_key: str) -> Optional[TrackedDocument]:
+        """
+        Obtener documento por ZipKey de DIAN.
+
+        Args:
+            zip_key: ZipKey devuelto al enviar
+
+        Returns:
+            TrackedDocument o None si no existe
+        """
+        all_docs = self._data.facturas + self._data.notas_credito + self._data.notas_debito
+
+        for doc in all_docs:
+            if doc.zip_key == zip_key:
+                return doc
+
+        return None
+
+    def get_documents_by_zip_key(self, zip_key: str) -> List[TrackedDocument]:
+        """
+        Obtener todos los documentos enviados en un mismo ZIP.
+
+        Args:
+            zip_key: ZipKey devuelto al enviar
+
+        Returns:
+            Lista de TrackedDocument (vacia si no hay ninguno)
+        """
+        all_docs = self._data.facturas + self._data.notas_credito + self._data.notas_debito
+        return [doc for doc in all_docs if doc.zip_key == zip_key]
+
     def get_pending_documents(self) -> List[TrackedDocument]:
         """
         Obtener documentos pendientes de verificacion.
@@ -439,6 +564,7 @@ class DocumentTracker:
             'notas_credito': [asdict(doc) for doc in self._data.notas_credito],
             'notas_debito': [asdict(doc) for doc in self._data.notas_debito],
             'last_consecutive': self._data.last_consecutive,
+            'consecutives': self._data.consecutives,
             'prefix': self._data.prefix,
             'nit': self._data.nit,
             'summary': self.get_summary(),
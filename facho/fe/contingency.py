@@ -0,0 +1,346 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Modo de contingencia: detectar la caida de DIAN, acumular documentos y
+reenviarlos en paralelo cuando el servicio vuelve.
+
+ContingencyController escucha el circuito 'upload' de un DianCallGuard;
+cuando se abre pasa a modo 'contingency' (persistido en el outbox, asi
+un reinicio no vuelve a emitir como si DIAN estuviera arriba). En ese
+modo los documentos (facturas tipo 04 de ContingencyInvoiceBuilder) solo
+se registran en el DocumentOutbox. Una consulta GetStatus periodica
+detecta el regreso del servicio y dispara el reenvio: `replay_jobs`
+hilos OutboxWorker envian lo acumulado (la verificacion de estados queda
+para el modo normal) mientras on_progress recibe avance, tasa, tiempo
+estimado y el plazo legal de transmision.
+
+    normal --(circuito upload abierto / enter())--> contingency
+    contingency --(probe() responde)--> replaying --(backlog vacio)--> normal
+                                            |
+                                            +--(circuito abierto)--> contingency
+
+Ejemplo:
+    guard = DianCallGuard()
+    client = DianSimpleClient(..., call_guard=guard)
+    outbox = DocumentOutbox('outbox.sqlite3')
+    controller = ContingencyController(outbox, client, guard, replay_jobs=32)
+
+    builder = (ContingencyInvoiceBuilder if controller.in_contingency
+               else InvoiceBuilder)(config)
+    ...
+    controller.submit(cufe, zip_name, zip_bytes, number=numero)
+
+    # En un hilo de servicio:
+    controller.run(stop_event)
+"""
+
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Optional, Union
+
+from .client.outbox import QUEUED, UPLOADING, DocumentOutbox, OutboxItem, OutboxWorker
+from .client.resilience import OPEN, DianCallGuard
+from .instrumentation import count
+from .packaging import ZipPackage
+
+
+# Modos
+NORMAL = 'normal'
+CONTINGENCY = 'contingency'
+REPLAYING = 'replaying'
+
+# Horas para transmitir los documentos de contingencia una vez DIAN se
+# restablece
+DEFAULT_DEADLINE_HOURS = 48
+
+# trackId consultado para saber si DIAN responde
+PROBE_TRACK_ID = 'facho-contingency-probe'
+
+_META_KEY = 'contingency'
+_REPLAY_STATES = (QUEUED, UPLOADING)
+
+
+@dataclass
+class ReplayProgress:
+    """
+    Avance del reenvio de documentos acumulados.
+
+    Attributes:
+        total: Documentos por enviar (los que habia al empezar mas los
+            que llegaron durante el reenvio)
+        remaining: Documentos aun sin ZipKey
+        failed: Documentos que agotaron sus intentos
+        started_at: Epoch de inicio
+        elapsed: Segundos transcurridos
+        rate: Documentos enviados por segundo
+        eta_seconds: Tiempo estimado para terminar (None sin tasa aun)
+        deadline_at: Epoch limite para transmitir
+    """
+    total: int
+    remaining: int
+    failed: int = 0
+    started_at: float = 0.0
+    elapsed: float = 0.0
+    rate: float = 0.0
+    eta_seconds: Optional[float] = None
+    deadline_at: Optional[float] = None
+
+    @property
+    def done(self) -> int:
+        return self.total - self.remaining
+
+    @property
+    def on_track(self) -> bool:
+        """True si al ritmo actual se termina antes del plazo."""
+        if self.deadline_at is None or self.eta_seconds is None:
+            return True
+        return self.started_at + self.elapsed + self.eta_seconds <= self.deadline_at
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(asdict(self), done=self.done, on_track=self.on_track)
+
+
+class ContingencyController:
+    """Controla el modo de emision y el reenvio posterior a una caida de DIAN."""
+
+    def __init__(
+        self,
+        outbox: DocumentOutbox,
+        client: Any,
+        guard: DianCallGuard = None,
+        replay_jobs: int = 16,
+        probe_interval: float = 60.0,
+        progress_interval: float = 5.0,
+        deadline_hours: float = DEFAULT_DEADLINE_HOURS,
+        on_mode_change: Callable[[str, str], None] = None,
+        on_progress: Callable[[ReplayProgress], None] = None,
+        worker_options: Dict[str, Any] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            outbox: Outbox donde se persisten los documentos y el modo
+            client: Cliente DIAN (DianSimpleClient)
+            guard: DianCallGuard del cliente; su circuito 'upload' activa
+                la contingencia
+            replay_jobs: Hilos de envio durante el reenvio
+            probe_interval: Segundos entre consultas en contingencia
+            progress_interval: Segundos entre reportes de avance
+            deadline_hours: Plazo para transmitir desde la recuperacion
+            on_mode_change: Callback (modo_anterior, modo_nuevo)
+            on_progress: Callback con ReplayProgress durante el reenvio
+            worker_options: Argumentos extra de OutboxWorker
+            clock: Reloj epoch (inyectable para tests)
+        """
+        if replay_jobs < 1:
+            raise ValueError("replay_jobs debe ser mayor a 0")
+        self.outbox = outbox
+        self.client = client
+        self.guard = guard
+        self.replay_jobs = replay_jobs
+        self.probe_interval = probe_interval
+        self.progress_interval = progress_interval
+        self.deadline_hours = deadline_hours
+        self.on_mode_change = on_mode_change
+        self.on_progress = on_progress
+        self.worker_options = worker_options or {}
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._replay_stop = threading.Event()
+        self.progress: Optional[ReplayProgress] = None
+
+        self._state = outbox.get_meta(_META_KEY) or {'mode': NORMAL}
+        if self._state['mode'] == REPLAYING:
+            # El proceso murio a mitad del reenvio: se retoma
+            self._state['mode'] = CONTINGENCY
+        if guard is not None:
+            guard.subscribe(self._on_circuit)
+
+    # -------------------------------------------------------------------------
+    # Modo
+    # -------------------------------------------------------------------------
+
+    @property
+    def mode(self) -> str:
+        return self._state['mode']
+
+    @property
+    def in_contingency(self) -> bool:
+        """
+        True si los documentos nuevos deben emitirse en contingencia.
+
+        Durante el reenvio DIAN ya responde: se vuelve a emitir normal y
+        los documentos nuevos se envian junto con el backlog.
+        """
+        return self.mode == CONTINGENCY
+
+    @property
+    def status(self) -> Dict[str, Any]:
+        """Modo, motivo, marcas de tiempo y avance del ultimo reenvio."""
+        return dict(
+            self._state,
+            progress=self.progress.as_dict() if self.progress else None,
+        )
+
+    def _set_mode(self, mode: str, **changes: Any):
+        with self._lock:
+            previous = self._state['mode']
+            self._state = dict(self._state, mode=mode, **changes)
+            self.outbox.set_meta(_META_KEY, self._state)
+        if previous != mode:
+            count('contingency.mode', mode=mode)
+            if self.on_mode_change:
+                self.on_mode_change(previous, mode)
+
+    def enter(self, reason: str = 'Falla tecnica en servicios DIAN'):
+        """Pasar a contingencia (y detener un reenvio en curso)."""
+        with self._lock:
+            if self.mode == CONTINGENCY:
+                return
+            self._replay_stop.set()
+            since = self._state.get('since') if self.mode == REPLAYING else None
+            self._set_mode(CONTINGENCY, reason=reason, since=since or self._clock(),
+                           recovered_at=None, deadline_at=None)
+
+    def _on_circuit(self, group: str, previous: str, state: str):
+        if group == 'upload' and state == OPEN:
+            self.enter(f'Circuito {group} abierto')
+
+    # -------------------------------------------------------------------------
+    # Emision
+    # -------------------------------------------------------------------------
+
+    def submit(
+        self,
+        document_key: str,
+        file_name: str,
+        content: Union[bytes, ZipPackage],
+        number: str = None,
+        doc_type: str = 'factura',
+        test_set_id: str = None
+    ) -> OutboxItem:
+        """
+        Registrar un documento firmado en el outbox.
+
+        En modo normal lo envia el worker de run() (o los del reenvio en
+        curso); en contingencia queda acumulado hasta el reenvio.
+        """
+        item = self.outbox.enqueue(document_key, file_name, content,
+                                   number, doc_type, test_set_id)
+        if self.in_contingency:
+            count('contingency.buffered')
+        return item
+
+    # -------------------------------------------------------------------------
+    # Recuperacion
+    # -------------------------------------------------------------------------
+
+    def probe(self) -> bool:
+        """
+        Consultar a DIAN con GetStatus de un trackId inexistente.
+
+        Cualquier respuesta con StatusCode (normalmente 66) indica que el
+        servicio responde; en ese caso se cierra el circuito 'upload'.
+        """
+        try:
+            response = self.client.get_status(PROBE_TRACK_ID)
+        except Exception:
+            # Error de red o rechazo del guard (CircuitOpenError)
+            return False
+        if response.status_code is None:
+            return False
+        if self.guard is not None:
+            self.guard.breakers['upload'].reset()
+        return True
+
+    def _report(self, progress: ReplayProgress, failed_before: int):
+        counts = self.outbox.counts()
+        remaining = sum(counts.get(state, 0) for state in _REPLAY_STATES)
+        progress.total = max(progress.total, progress.done + remaining)
+        progress.remaining = remaining
+        progress.failed = counts.get('failed', 0) - failed_before
+        progress.elapsed = self._clock() - progress.started_at
+        progress.rate = progress.done / progress.elapsed if progress.elapsed > 0 else 0.0
+        progress.eta_seconds = remaining / progress.rate if progress.rate else None
+        if self.on_progress:
+            self.on_progress(progress)
+
+    def replay(self, stop: threading.Event = None) -> ReplayProgress:
+        """
+        Enviar lo acumulado con `replay_jobs` hilos.
+
+        Vuelve a modo normal al vaciar el backlog; si el circuito se abre
+        de nuevo, los hilos se detienen y el modo queda en contingencia.
+        Si se detiene con `stop`, el modo queda en 'replaying' y el
+        reenvio se retoma (con el mismo plazo) en la siguiente ejecucion.
+
+        Args:
+            stop: Evento para interrumpir el reenvio
+
+        Returns:
+            Avance final del reenvio
+        """
+        now = self._clock()
+        with self._lock:
+            # Un reenvio retomado tras reiniciar conserva el plazo original
+            deadline = self._state.get('deadline_at') or now + self.deadline_hours * 3600
+            self._replay_stop.clear()
+            self._set_mode(REPLAYING, recovered_at=self._state.get('recovered_at') or now,
+                           deadline_at=deadline)
+
+        counts = self.outbox.counts()
+        remaining = sum(counts.get(state, 0) for state in _REPLAY_STATES)
+        progress = ReplayProgress(total=remaining, remaining=remaining,
+                                  started_at=now, deadline_at=deadline)
+        failed_before = counts.get('failed', 0)
+        self.progress = progress
+
+        def drain():
+            worker = OutboxWorker(self.outbox, self.client, **self.worker_options)
+            worker.drain(self._replay_stop, states=_REPLAY_STATES)
+
+        threads = [threading.Thread(target=drain, name=f'facho-replay-{n}', daemon=True)
+                   for n in range(self.replay_jobs)]
+        if stop is not None and stop.is_set():
+            self._replay_stop.set()
+        for thread in threads:
+            thread.start()
+        next_report = time.monotonic() + self.progress_interval
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(max(0.0, next_report - time.monotonic()))
+                if stop is not None and stop.is_set():
+                    self._replay_stop.set()
+                if time.monotonic() >= next_report:
+                    self._report(progress, failed_before)
+                    next_report += self.progress_interval
+        self._report(progress, failed_before)
+
+        with self._lock:
+            if self.mode == REPLAYING and not progress.remaining:
+                self._set_mode(NORMAL, reason=None, since=None, recovered_at=None,
+                               deadline_at=None)
+        return progress
+
+    def run(self, stop: threading.Event, idle_sleep: float = 1.0):
+        """
+        Ciclo de servicio: envia en modo normal, consulta a DIAN en
+        contingencia y reenvia al recuperarse. Termina cuando `stop` se
+        activa.
+        """
+        worker = OutboxWorker(self.outbox, self.client, **self.worker_options)
+        next_probe = 0.0
+        while not stop.is_set():
+            if self.mode == NORMAL:
+                if not worker.run_once():
+                    stop.wait(idle_sleep)
+            elif self.mode == REPLAYING:
+                self.replay(stop)
+            elif self._clock() >= next_probe and self.probe():
+                self.replay(stop)
+            else:
+                if self._clock() >= next_probe:
+                    next_probe = self._clock() + self.probe_interval
+                stop.wait(min(idle_sleep, self.probe_interval))
@@ -0,0 +1,487 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Instrumentacion opcional de las rutas criticas.
+
+Las etapas costosas (construccion del XML, cada C14N y la firma RSA de
+XAdES, sobre WS-Security, HTTP hacia DIAN, lectura de respuestas y
+escritura del tracker) emiten tiempos y contadores a los sinks
+registrados. Sin sinks registrados cada punto de medicion cuesta una
+comparacion: no se toma el tiempo ni se crean objetos.
+
+Mediciones emitidas (nombre, etiquetas):
+
+    build                  builder
+    sign                   -
+    sign.c14n              part (document, key_info, signed_properties,
+                           signed_info)
+    sign.rsa               -
+    soap.envelope          -
+    dian.http              action
+    dian.parse             response (send, status)
+    tracker.save           -
+
+Contadores: dian.requests (action, outcome), dian.bytes_sent y
+dian.bytes_received (action).
+
+Los sinks son por proceso: los trabajadores de un ProcessPoolExecutor
+(ej: DocumentPipeline con build_jobs > 1) no ven los sinks del proceso
+principal y deben registrar los suyos.
+
+Ejemplo:
+    from facho.fe import instrumentation
+
+    histograms = instrumentation.HistogramSink()
+    instrumentation.add_sink(histograms)
+    instrumentation.add_sink(
+        instrumentation.PrometheusFileSink('/var/lib/node_exporter/facho.prom')
+    )
+    ...
+    print(histograms.histogram('sign.rsa').mean)
+"""
+
+import bisect
+import functools
+import logging
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# Limites superiores (segundos) de los histogramas
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# Sinks activos; se reemplaza la tupla completa al agregar o quitar para
+# que los hilos que estan midiendo no vean una lista a medio modificar
+_SINKS: Tuple['MetricsSink', ...] = ()
+_SINKS_LOCK = threading.Lock()
+
+
+# =============================================================================
+# SINKS
+# =============================================================================
+
+class MetricsSink:
+    """
+    Destino de las mediciones.
+
+    Las subclases implementan observe (duraciones) e increment
+    (contadores). Se pueden llamar desde varios hilos a la vez.
+    """
+
+    def observe(self, name: str, seconds: float, labels: Dict[str, str]):
+        """Registrar la duracion de una etapa."""
+
+    def increment(self, name: str, value: float, labels: Dict[str, str]):
+        """Incrementar un contador."""
+
+
+class LoggingSink(MetricsSink):
+    """
+    Escribe cada medicion en un logger.
+
+    Args:
+        logger: Logger destino (default 'facho.metrics')
+        level: Nivel de los mensajes (default DEBUG)
+    """
+
+    def __init__(self, logger: logging.Logger = None, level: int = logging.DEBUG):
+        self.logger = logger or logging.getLogger('facho.metrics')
+        self.level = level
+
+    def observe(self, name: str, seconds: float, labels: Dict[str, str]):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, '%s %.3f ms %s',
+                            name, seconds * 1000, _format_labels(labels))
+
+    def increment(self, name: str, value: float, labels: Dict[str, str]):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, '%s +%g %s',
+                            name, value, _format_labels(labels))
+
+
+@dataclass
+class Histogram:
+    """
+    Histograma de duraciones con limites fijos.
+
+    Attributes:
+        buckets: Limites superiores en segundos
+        counts: Observaciones por bucket (la ultima posicion es +Inf)
+        count: Total de observaciones
+        total: Suma de las duraciones
+        min: Duracion minima
+        max: Duracion maxima
+    """
+    buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    counts: List[int] = field(default_factory=list)
+    count: int = 0
+    total: float = 0.0
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+    def __post_init__(self):
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, seconds: float):
+        """Agregar una observacion."""
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self) -> float:
+        """Duracion promedio."""
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimar un cuantil con el limite superior de su bucket.
+
+        Args:
+            q: Cuantil entre 0 y 1 (ej: 0.99)
+
+        Returns:
+            Limite del bucket que contiene el cuantil (la duracion maxima
+            si cae en +Inf; 0.0 sin observaciones)
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                break
+        if index < len(self.buckets):
+            return min(self.buckets[index], self.max)
+        return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Convertir a diccionario."""
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.mean,
+            'min': self.min or 0.0,
+            'max': self.max or 0.0,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+        }
+
+
+class HistogramSink(MetricsSink):
+    """
+    Acumula histogramas y contadores en memoria.
+
+    Args:
+        buckets: Limites superiores de los histogramas en segundos
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._histograms: Dict[Tuple, Histogram] = {}
+        self._counters: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, labels: Dict[str, str]):
+        key = _series_key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def increment(self, name: str, value: float, labels: Dict[str, str]):
+        key = _series_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        """Histograma de una serie (vacio si no hay observaciones)."""
+        with self._lock:
+            histogram = self._histograms.get(_series_key(name, labels))
+            if histogram is None:
+                return Histogram(self.buckets)
+            return Histogram(self.buckets, list(histogram.counts), histogram.count,
+                             histogram.total, histogram.min, histogram.max)
+
+    def counter(self, name: str, **labels) -> float:
+        """Valor de un contador (0 si no se ha incrementado)."""
+        with self._lock:
+            return self._counters.get(_series_key(name, labels), 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Copia de todas las series.
+
+        Returns:
+            {'histograms': {nombre: [(etiquetas, resumen), ...]},
+             'counters': {nombre: [(etiquetas, valor), ...]}}
+        """
+        histograms: Dict[str, List] = {}
+        counters: Dict[str, List] = {}
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                histograms.setdefault(name, []).append(
+                    (dict(labels), histogram.as_dict()))
+            for (name, labels), value in sorted(self._counters.items()):
+                counters.setdefault(name, []).append((dict(labels), value))
+        return {'histograms': histograms, 'counters': counters}
+
+    def reset(self):
+        """Descartar todas las series."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+class PrometheusFileSink(HistogramSink):
+    """
+    Acumula como HistogramSink y escribe el formato de texto de
+    Prometheus en un archivo (ej: para el textfile collector de
+    node_exporter).
+
+    El archivo se reemplaza de forma atomica. Con `interval` se reescribe
+    automaticamente cuando pasan al menos esos segundos desde la ultima
+    escritura; sin `interval` solo se escribe al llamar write().
+
+    Args:
+        path: Archivo destino
+        prefix: Prefijo de los nombres de metricas
+        interval: Segundos minimos entre escrituras automaticas
+        buckets: Limites superiores de los histogramas en segundos
+    """
+
+    def __init__(
+        self,
+        path: str,
+        prefix: str = 'facho',
+        interval: Optional[float] = 10.0,
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(buckets)
+        self.path = path
+        self.prefix = prefix
+        self.interval = interval
+        self._last_write = time.monotonic()
+
+    def observe(self, name: str, seconds: float, labels: Dict[str, str]):
+        super().observe(name, seconds, labels)
+        self._maybe_write()
+
+    def increment(self, name: str, value: float, labels: Dict[str, str]):
+        super().increment(name, value, labels)
+        self._maybe_write()
+
+    def _maybe_write(self):
+        if self.interval is not None and \
+                time.monotonic() - self._last_write >= self.interval:
+            self.write()
+
+    def render(self) -> str:
+        """Series actuales en formato de texto de Prometheus."""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        last_name = None
+        for (name, labels), histogram in histograms:
+            metric = self._metric_name(name, 'seconds')
+            if name != last_name:
+                lines.append(f'# TYPE {metric} histogram')
+                last_name = name
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), histogram.counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == math.inf else repr(bound)
+                lines.append(f'{metric}_bucket{_prometheus_labels(labels, le=le)} {cumulative}')
+            lines.append(f'{metric}_sum{_prometheus_labels(labels)} {histogram.total!r}')
+            lines.append(f'{metric}_count{_prometheus_labels(labels)} {histogram.count}')
+
+        last_name = None
+        for (name, labels), value in counters:
+            metric = self._metric_name(name, 'total')
+            if name != last_name:
+                lines.append(f'# TYPE {metric} counter')
+                last_name = name
+            lines.append(f'{metric}{_prometheus_labels(labels)} {value!r}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        """Escribir el archivo de metricas."""
+        self._last_write = time.monotonic()
+        content = self.render()
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, self.path)
+
+    def _metric_name(self, name: str, suffix: str) -> str:
+        return _INVALID_METRIC_CHARS.sub('_', f'{self.prefix}_{name}_{suffix}')
+
+
+_INVALID_METRIC_CHARS = re.compile(r'[^a-zA-Z0-9_]')
+
+
+def _series_key(name: str, labels: Dict[str, str]) -> Tuple:
+    return name, tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    return ' '.join(f'{k}={v}' for k, v in sorted(labels.items()))
+
+
+def _prometheus_labels(labels: Tuple, **extra) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (
+        '%s="%s"' % (key, str(value).replace('\\', '\\\\')
+                     .replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+# =============================================================================
+# REGISTRO DE SINKS
+# =============================================================================
+
+def add_sink(sink: MetricsSink) -> MetricsSink:
+    """Registrar un sink; retorna el mismo sink."""
+    global _SINKS
+    with _SINKS_LOCK:
+        if sink not in _SINKS:
+            _SINKS = _SINKS + (sink,)
+    return sink
+
+
+def remove_sink(sink: MetricsSink):
+    """Quitar un sink registrado (no falla si no estaba)."""
+    global _SINKS
+    with _SINKS_LOCK:
+        _SINKS = tuple(s for s in _SINKS if s is not sink)
+
+
+def clear_sinks():
+    """Quitar todos los sinks: la instrumentacion queda desactivada."""
+    global _SINKS
+    with _SINKS_LOCK:
+        _SINKS = ()
+
+
+def enabled() -> bool:
+    """True si hay al menos un sink registrado."""
+    return bool(_SINKS)
+
+
+@contextmanager
+def instrumented(*sinks: MetricsSink) -> Iterator[Tuple[MetricsSink, ...]]:
+    """
+    Registrar sinks mientras dura el bloque.
+
+    Ejemplo:
+        with instrumented(HistogramSink()) as (histograms,):
+            builder.build(data)
+    """
+    for sink in sinks:
+        add_sink(sink)
+    try:
+        yield sinks
+    finally:
+        for sink in sinks:
+            remove_sink(sink)
+
+
+# =============================================================================
+# PUNTOS DE MEDICION
+# =============================================================================
+
+class _Span:
+    __slots__ = ('name', 'labels', 'sinks', 'start')
+
+    def __init__(self, name, labels, sinks):
+        self.name = name
+        self.labels = labels
+        self.sinks = sinks
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        labels = self.labels
+        if exc_type is not None:
+            labels = dict(labels, error=exc_type.__name__)
+        for sink in self.sinks:
+            sink.observe(self.name, seconds, labels)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, **labels):
+    """
+    Medir la duracion de un bloque.
+
+    Si el bloque lanza una excepcion la medicion lleva la etiqueta
+    error=<tipo de excepcion>.
+
+    Ejemplo:
+        with span('sign.c14n', part='document'):
+            data = etree.tostring(element, method='c14n')
+    """
+    sinks = _SINKS
+    if not sinks:
+        return _NULL_SPAN
+    return _Span(name, labels, sinks)
+
+
+def timed(name: str, **labels):
+    """Decorador: medir cada llamada de la funcion como span(name)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            sinks = _SINKS
+            if not sinks:
+                return func(*args, **kwargs)
+            with _Span(name, labels, sinks):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name: str, value: float = 1, **labels):
+    """Incrementar un contador."""
+    sinks = _SINKS
+    if sinks:
+        for sink in sinks:
+            sink.increment(name, value, labels)
@@ -0,0 +1,188 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Empaquetado de documentos para envio a DIAN.
+
+DIAN recibe cada XML firmado dentro de un ZIP, codificado en base64 en
+el elemento contentFile del cuerpo SOAP. Este modulo arma el ZIP en
+memoria con el nivel de compresion elegido y escribe el base64 por
+bloques directamente en el buffer final del mensaje, de modo que el
+contenido no se copia a cadenas intermedias (base64 -> str -> cuerpo
+-> sobre SOAP -> bytes).
+
+Example:
+    package = package_xml(xml_bytes, 'fvSETP990000001.xml', compression_level=9)
+    payload = assemble([b'<wcf:contentFile>', package, b'</wcf:contentFile>'])
+    # payload es un unico bytearray listo para el transporte HTTP
+"""
+
+import binascii
+import io
+import zipfile
+from dataclasses import dataclass
+from typing import Iterable, Sequence, Tuple, Union
+
+
+# Nivel de zlib por defecto (0 = sin compresion, 9 = maxima)
+DEFAULT_COMPRESSION_LEVEL = 6
+
+# Bytes de entrada por bloque de base64 (multiplo de 3: sin relleno intermedio)
+BASE64_CHUNK_SIZE = 3 * 16 * 1024
+
+
+def base64_size(size: int) -> int:
+    """Largo del base64 (sin saltos de linea) de `size` bytes."""
+    return (size + 2) // 3 * 4
+
+
+def b64encode_into(
+    data: Union[bytes, bytearray, memoryview],
+    out: Union[bytearray, memoryview],
+    offset: int = 0,
+    chunk_size: int = BASE64_CHUNK_SIZE
+) -> int:
+    """
+    Codificar en base64 escribiendo por bloques en un buffer existente.
+
+    Args:
+        data: Bytes a codificar
+        out: Buffer de destino con espacio suficiente (ver base64_size)
+        offset: Posicion de inicio en el buffer
+        chunk_size: Bytes de entrada por bloque (multiplo de 3)
+
+    Returns:
+        Posicion siguiente al ultimo byte escrito
+    """
+    if chunk_size % 3:
+        raise ValueError("chunk_size debe ser multiplo de 3")
+    view = memoryview(data)
+    encode = binascii.b2a_base64
+    for start in range(0, len(view), chunk_size):
+        chunk = encode(view[start:start + chunk_size], newline=False)
+        end = offset + len(chunk)
+        out[offset:end] = chunk
+        offset = end
+    return offset
+
+
+@dataclass
+class ZipPackage:
+    """
+    ZIP listo para enviar a DIAN.
+
+    Attributes:
+        file_name: Nombre del archivo ZIP (fileName del mensaje SOAP)
+        content: Contenido del ZIP
+    """
+    file_name: str
+    content: bytes
+
+    @property
+    def base64_size(self) -> int:
+        """Largo del contenido codificado en base64."""
+        return base64_size(len(self.content))
+
+    def write_base64(self, out: Union[bytearray, memoryview], offset: int = 0) -> int:
+        """
+        Escribir el contenido en base64 dentro de `out`.
+
+        Returns:
+            Posicion siguiente al ultimo byte escrito
+        """
+        return b64encode_into(self.content, out, offset)
+
+    def base64(self) -> bytes:
+        """Contenido codificado en base64."""
+        return binascii.b2a_base64(self.content, newline=False)
+
+
+def zip_name_for(xml_name: str) -> str:
+    """Nombre del ZIP para un XML ('fv1.xml' -> 'fv1.zip')."""
+    base = xml_name[:-4] if xml_name.lower().endswith('.xml') else xml_name
+    return f"{base}.zip"
+
+
+def package_documents(
+    documents: Iterable[Tuple[str, bytes]],
+    zip_name: str,
+    compression_level: int = DEFAULT_COMPRESSION_LEVEL
+) -> ZipPackage:
+    """
+    Comprimir uno o varios XML en un ZIP en memoria.
+
+    Args:
+        documents: Pares (nombre del XML dentro del ZIP, contenido)
+        zip_name: Nombre del archivo ZIP
+        compression_level: 0 guarda sin comprimir (ZIP_STORED); 1-9 usa
+            DEFLATE con ese nivel de zlib
+
+    Returns:
+        ZipPackage
+    """
+    if not 0 <= compression_level <= 9:
+        raise ValueError("compression_level debe estar entre 0 y 9")
+    if compression_level:
+        compression, level = zipfile.ZIP_DEFLATED, compression_level
+    else:
+        compression, level = zipfile.ZIP_STORED, None
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(
+        buffer, 'w', compression, compresslevel=level
+    ) as zf:
+        for name, xml in documents:
+            zf.writestr(name, xml)
+    return ZipPackage(file_name=zip_name, content=buffer.getvalue())
+
+
+def package_xml(
+    xml: bytes,
+    xml_name: str,
+    zip_name: str = None,
+    compression_level: int = DEFAULT_COMPRESSION_LEVEL
+) -> ZipPackage:
+    """
+    Comprimir un XML firmado en un ZIP en memoria.
+
+    Args:
+        xml: Contenido del XML
+        xml_name: Nombre del XML dentro del ZIP (ej: 'fvSETP990000001.xml')
+        zip_name: Nombre del ZIP (default: el del XML con extension .zip)
+        compression_level: Nivel de compresion 0-9 (ver package_documents)
+
+    Returns:
+        ZipPackage
+    """
+    return package_documents(
+        [(xml_name, xml)], zip_name or zip_name_for(xml_name), compression_level
+    )
+
+
+def assemble(parts: Sequence[Union[bytes, ZipPackage]]) -> bytearray:
+    """
+    Unir las partes de un mensaje en un unico buffer preasignado.
+
+    Las partes bytes se copian tal cual; los ZipPackage se escriben en
+    base64. El buffer se reserva una sola vez con el largo final.
+
+    Args:
+        parts: Partes del mensaje, en orden
+
+    Returns:
+        bytearray con el mensaje completo
+    """
+    size = 0
+    for part in parts:
+        size += part.base64_size if isinstance(part, ZipPackage) else len(part)
+
+    out = bytearray(size)
+    offset = 0
+    for part in parts:
+        if isinstance(part, ZipPackage):
+            offset = part.write_base64(out, offset)
+        else:
+            end = offset + len(part)
+            out[offset:end] = part
+            offset = end
+    return out
@@ -0,0 +1,473 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Flujo completo de documentos: construir, validar, firmar, comprimir,
+enviar a DIAN y registrar en el tracker.
+
+Las etapas se conectan con colas acotadas, de modo que una etapa lenta
+(normalmente el envio) frena a las anteriores en lugar de acumular
+documentos en memoria:
+
+    entrada -> [construir/validar/firmar/zip] -> cola -> [enviar] -> cola -> [registrar]
+               pool de procesos (build_jobs)            hilos (send_jobs)   hilo del llamador
+
+El registro en DocumentTracker se hace en el hilo que consume los
+resultados, por lo que el tracker no necesita ser thread-safe. Al
+reiniciar despues de una falla, los documentos que el tracker ya tiene
+con ZipKey se omiten.
+
+Example:
+    client = DianSimpleClient(certificate_path='cert.p12', certificate_password='...')
+    tracker = DocumentTracker('tracking.json')
+    pipeline = DocumentPipeline(
+        config, client, tracker,
+        pkcs12=open('cert.p12', 'rb').read(), password='...',
+        build_jobs=4, send_jobs=8,
+    )
+    for result in pipeline.run(documentos):
+        print(result.number, result.status, result.zip_key)
+    print(pipeline.summary())
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from .builders.bulk import BulkResult, DocumentProcessor
+from .builders.invoice_builder import InvoiceBuilder, InvoiceConfig
+from .client.tracker import TRACKER_DOC_TYPES, DocumentTracker, TrackedDocument
+from .packaging import DEFAULT_COMPRESSION_LEVEL
+
+
+# Etapas medidas por el pipeline, en orden
+PIPELINE_STAGES = ('validate', 'build', 'sign', 'zip', 'send', 'track')
+
+# Estados de PipelineResult
+STATUS_SENT = 'sent'
+STATUS_FAILED = 'failed'
+STATUS_SKIPPED = 'skipped'
+
+_DONE = object()
+
+
+# =============================================================================
+# METRICAS
+# =============================================================================
+
+@dataclass
+class StageMetrics:
+    """
+    Latencia y volumen de una etapa del pipeline.
+
+    Attributes:
+        name: Nombre de la etapa
+        count: Documentos procesados
+        errors: Documentos que fallaron en la etapa
+        total_seconds: Suma de latencias
+        min_seconds: Latencia minima
+        max_seconds: Latencia maxima
+    """
+    name: str
+    count: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    min_seconds: float = None
+    max_seconds: float = None
+
+    def record(self, seconds: float):
+        """Registrar la latencia de un documento."""
+        self.count += 1
+        self.total_seconds += seconds
+        if self.min_seconds is None or seconds < self.min_seconds:
+            self.min_seconds = seconds
+        if self.max_seconds is None or seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    @property
+    def mean_seconds(self) -> float:
+        """Latencia promedio."""
+        return self.total_seconds / self.count if self.count else 0.0
+
+    def as_dict(self, elapsed: float = None) -> Dict[str, Any]:
+        """
+        Convertir a diccionario.
+
+        Args:
+            elapsed: Duracion total de la ejecucion para calcular
+                documentos por segundo
+
+        Returns:
+            Diccionario con contadores, latencias y throughput
+        """
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'mean_seconds': self.mean_seconds,
+            'min_seconds': self.min_seconds or 0.0,
+            'max_seconds': self.max_seconds or 0.0,
+            'docs_per_sec': self.count / elapsed if elapsed else 0.0,
+        }
+
+
+# =============================================================================
+# RESULTADOS
+# =============================================================================
+
+@dataclass
+class PipelineResult:
+    """
+    Resultado de un documento en el pipeline.
+
+    Attributes:
+        number: Numero del documento
+        status: 'sent', 'failed' o 'skipped' (ya registrado en el tracker)
+        uuid: CUFE/CUDE
+        zip_key: ZipKey devuelto por DIAN
+        stage: Etapa en que fallo el documento
+        error: Mensaje de error
+        timings: Segundos por etapa
+    """
+    number: str
+    status: str
+    uuid: str = None
+    zip_key: str = None
+    stage: str = None
+    error: str = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        """True si el documento se envio o ya estaba enviado."""
+        return self.status != STATUS_FAILED
+
+
+# =============================================================================
+# TRABAJADOR DE CONSTRUCCION
+# =============================================================================
+
+_PROCESSOR: Optional[DocumentProcessor] = None
+
+
+def _init_build_worker(*processor_args):
+    global _PROCESSOR
+    _PROCESSOR = DocumentProcessor(*processor_args)
+
+
+def _build_in_worker(data: Any) -> BulkResult:
+    return _PROCESSOR.process(data)
+
+
+# =============================================================================
+# PIPELINE
+# =============================================================================
+
+class DocumentPipeline:
+    """
+    Pipeline construir -> validar -> firmar -> zip -> enviar -> registrar.
+
+    Args:
+        config: Configuracion de facturacion
+        client: Cliente DIAN (DianSimpleClient)
+        tracker: Tracker donde registrar los envios (opcional)
+        builder_class: Builder de los documentos (default InvoiceBuilder)
+        pkcs12: Contenido del certificado .p12 para firmar
+        password: Contrasena del certificado
+        test_set_id: Si se indica se usa SendTestSetAsync en lugar de
+            SendBillAsync
+        build_jobs: Procesos para construir y firmar (1 = hilo propio)
+        send_jobs: Hilos de envio
+        queue_size: Capacidad de cada cola entre etapas
+        validate: Validar los datos antes de construir
+        resume: Omitir documentos que el tracker ya tiene con ZipKey
+        compression_level: Nivel de compresion de los ZIP (0-9)
+        signing_socket: Socket de un SigningDaemon; los procesos de
+            construccion firman sin cargar el certificado (en lugar de
+            pkcs12/password)
+    """
+
+    def __init__(
+        self,
+        config: InvoiceConfig,
+        client: Any,
+        tracker: DocumentTracker = None,
+        builder_class: type = InvoiceBuilder,
+        pkcs12: bytes = None,
+        password: str = None,
+        test_set_id: str = None,
+        build_jobs: int = 1,
+        send_jobs: int = 4,
+        queue_size: int = 16,
+        validate: bool = True,
+        resume: bool = True,
+        compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+        signing_socket: str = None
+    ):
+        if build_jobs < 1 or send_jobs < 1:
+            raise ValueError("build_jobs y send_jobs deben ser mayores a 0")
+        if queue_size < 1:
+            raise ValueError("queue_size debe ser mayor a 0")
+
+        self.client = client
+        self.tracker = tracker
+        self.test_set_id = test_set_id
+        self.build_jobs = build_jobs
+        self.send_jobs = send_jobs
+        self.queue_size = queue_size
+        self.resume = resume
+        self.doc_type = TRACKER_DOC_TYPES.get(
+            builder_class.SPEC.root_element, 'factura'
+        )
+        self._processor_args = (
+            config, builder_class, pkcs12, password, True, validate,
+            compression_level, signing_socket,
+        )
+        self.metrics: Dict[str, StageMetrics] = {}
+        self.elapsed = 0.0
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self.metrics = {name: StageMetrics(name) for name in PIPELINE_STAGES}
+        self.elapsed = 0.0
+
+    def _sent_numbers(self) -> Set[str]:
+        """Numeros que el tracker ya tiene enviados (para reanudar)."""
+        if self.tracker is None or not self.resume:
+            return set()
+        documents = (
+            self.tracker.get_invoices()
+            + self.tracker.get_credit_notes()
+            + self.tracker.get_debit_notes()
+        )
+        return {
+            doc.number for doc in documents
+            if doc.zip_key or doc.is_valid
+        }
+
+    def run(self, documents: Iterable[Any]) -> Iterator[PipelineResult]:
+        """
+        Procesar documentos.
+
+        Los resultados se entregan a medida que terminan, no
+        necesariamente en el orden de entrada.
+
+        Args:
+            documents: Datos de los documentos (InvoiceData, ...)
+
+        Yields:
+            PipelineResult por documento
+        """
+        self._reset_metrics()
+        started = time.perf_counter()
+        skip = self._sent_numbers()
+        stop = threading.Event()
+        built: 'queue.Queue' = queue.Queue(maxsize=self.queue_size)
+        done: 'queue.Queue' = queue.Queue(maxsize=self.queue_size)
+        errors = []
+
+        pool = None
+        if self.build_jobs > 1:
+            pool = ProcessPoolExecutor(
+                max_workers=self.build_jobs,
+                initializer=_init_build_worker,
+                initargs=self._processor_args
+            )
+
+        producer = threading.Thread(
+            target=self._produce,
+            args=(documents, skip, pool, built, done, stop, errors),
+            name='facho-pipeline-build',
+            daemon=True
+        )
+        senders = [
+            threading.Thread(
+                target=self._send_loop,
+                args=(built, done, stop),
+                name=f'facho-pipeline-send-{i}',
+                daemon=True
+            )
+            for i in range(self.send_jobs)
+        ]
+        producer.start()
+        for sender in senders:
+            sender.start()
+
+        try:
+            finished = 0
+            while finished < self.send_jobs:
+                item = done.get()
+                if item is _DONE:
+                    finished += 1
+                    continue
+                yield self._track(*item)
+        finally:
+            stop.set()
+            for q in (built, done):
+                _drain(q)
+            producer.join()
+            for sender in senders:
+                sender.join()
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            self.elapsed = time.perf_counter() - started
+
+        if errors:
+            raise errors[0]
+
+    def _produce(self, documents, skip, pool, built, done, stop, errors):
+        """Hilo productor: construye (o encola en el pool) cada documento."""
+        processor = None if pool else DocumentProcessor(*self._processor_args)
+        try:
+            for data in documents:
+                if stop.is_set():
+                    break
+                number = str(data.number)
+                if number in skip:
+                    _put(done, (PipelineResult(number, STATUS_SKIPPED), None), stop)
+                    continue
+                if pool is not None:
+                    future = pool.submit(_build_in_worker, data)
+                else:
+                    future = Future()
+                    future.set_result(processor.process(data))
+                # El numero viaja con el future por si la construccion falla
+                _put(built, (number, future), stop)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            for _ in range(self.send_jobs):
+                _put(built, _DONE, stop)
+
+    def _send_loop(self, built, done, stop):
+        """Hilo de envio: toma documentos construidos y los envia."""
+        while True:
+            item = _get(built, stop)
+            if item is _DONE:
+                _put(done, _DONE, stop)
+                return
+            _put(done, self._send(*item), stop)
+
+    def _send(
+        self,
+        number: str,
+        future: Future
+    ) -> Tuple[PipelineResult, Optional[BulkResult]]:
+        try:
+            built = future.result()
+        except Exception as e:
+            # Ej: el pool de procesos se rompio o el documento no se
+            # pudo enviar al proceso
+            failed = PipelineResult(number, STATUS_FAILED, stage='build', error=str(e))
+            return failed, None
+
+        result = PipelineResult(
+            number=built.number,
+            status=STATUS_FAILED,
+            uuid=built.uuid,
+            timings=dict(built.timings),
+        )
+        if not built.ok:
+            result.stage = 'build'
+            result.error = built.error
+            return result, built
+
+        start = time.perf_counter()
+        try:
+            if self.test_set_id:
+                response = self.client.send_test_set_async(
+                    built.zip_name, built.zip_content, self.test_set_id
+                )
+            else:
+                response = self.client.send_bill_async(
+                    built.zip_name, built.zip_content
+                )
+        except Exception as e:
+            result.stage = 'send'
+            result.error = str(e)
+            return result, built
+        finally:
+            result.timings['send'] = time.perf_counter() - start
+
+        if response.zip_key:
+            result.status = STATUS_SENT
+            result.zip_key = response.zip_key
+        else:
+            result.stage = 'send'
+            result.error = (
+                '; '.join(response.error_messages or [])
+                or response.status_description
+                or 'DIAN no devolvio ZipKey'
+            )
+        return result, built
+
+    def _track(
+        self,
+        result: PipelineResult,
+        built: Optional[BulkResult]
+    ) -> PipelineResult:
+        """Registrar el resultado en el tracker y en las metricas."""
+        if result.status == STATUS_SENT and self.tracker is not None:
+            start = time.perf_counter()
+            self.tracker.add_document(TrackedDocument(
+                doc_type=self.doc_type,
+                number=result.number,
+                uuid=result.uuid,
+                issue_date=built.issue_date,
+                issue_time=built.issue_time or '',
+                zip_key=result.zip_key,
+                total=built.total,
+            ))
+            result.timings['track'] = time.perf_counter() - start
+
+        for stage, seconds in result.timings.items():
+            self.metrics[stage].record(seconds)
+        if result.status == STATUS_FAILED and result.stage in self.metrics:
+            self.metrics[result.stage].errors += 1
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Resumen de la ultima ejecucion.
+
+        Returns:
+            Diccionario con la duracion total y las metricas por etapa
+        """
+        return {
+            'elapsed_seconds': self.elapsed,
+            'stages': {
+                name: metrics.as_dict(self.elapsed)
+                for name, metrics in self.metrics.items()
+            },
+        }
+
+
+def _put(q: 'queue.Queue', item: Any, stop: threading.Event):
+    """Encolar respetando la senal de parada (evita bloqueos al cancelar)."""
+    while True:
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            if stop.is_set():
+                return
+
+
+def _get(q: 'queue.Queue', stop: threading.Event) -> Any:
+    """Desencolar; devuelve _DONE si se cancela la ejecucion."""
+    while True:
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            if stop.is_set():
+                return _DONE
+
+
+def _drain(q: 'queue.Queue'):
+    while True:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            return
@@ -0,0 +1,415 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Servicio HTTP local de larga duracion.
+
+Cada invocacion de la CLI paga el arranque del interprete, los imports,
+el descifrado del PKCS#12 y la creacion del builder. FachoService carga
+todo eso una vez (firmador, builder por hilo con sus caches de
+fragmentos, cliente DIAN con su pool de conexiones) y lo expone por HTTP
+con JSON:
+
+    POST /build      documento (encabezado con 'lines', como una linea
+                     JSONL de BulkInvoiceFactory)  ?sign=0 ?zip=1
+    POST /sign       {"xml": <b64>}
+    POST /zip        {"xml": <b64>, "file_name": "fvSETP1.xml"}
+    POST /send       {"file_name": "z.zip", "zip": <b64>, "test_set_id": ...}
+                     ?sync=1 usa SendBillSync
+    POST /status     {"track_id": "..."}  ?zip=1 usa GetStatusZip
+    GET  /health     contadores del servicio
+
+Cada operacion tiene su variante /<operacion>/batch con cuerpo
+{"items": [...]}; los elementos se procesan en un pool de `jobs` hilos y
+la respuesta trae {"results": [...]} en el mismo orden (un elemento con
+error responde {"error": ..., "status": <codigo HTTP>} sin afectar a los
+demas). Los binarios viajan en base64.
+
+El servicio no tiene autenticacion: escucha en 127.0.0.1 por defecto y
+no debe exponerse fuera de la maquina.
+
+Ejemplo:
+    service = FachoService(signer=XAdESSigner.from_pkcs12('cert.p12', 'clave'),
+                           client=client, config=config, supplier=supplier)
+    service.serve_forever()
+
+Desde la linea de comandos:
+    facho serve --cert cert.p12 --password clave --settings facturacion.json
+"""
+
+import base64
+import binascii
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from lxml import etree
+
+from .builders.bulk import DEFAULT_KEY_COLUMN, DocumentProcessor, row_to_party
+from .builders.exceptions import (
+    CircuitOpenError,
+    FachoError,
+    NetworkError,
+    RateLimitedError,
+)
+from .builders.invoice_builder import InvoiceBuilder, InvoiceConfig, Party
+from .instrumentation import count, span
+from .packaging import DEFAULT_COMPRESSION_LEVEL, package_xml
+
+
+# Tamano maximo del cuerpo de una solicitud
+MAX_BODY_BYTES = 256 * 1024 * 1024
+
+OPERATIONS = ('build', 'sign', 'zip', 'send', 'status')
+
+
+class ServiceError(Exception):
+    """Error de la solicitud HTTP (responde `status` con `message`)."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _b64decode(item: Dict[str, Any], key: str) -> bytes:
+    try:
+        return base64.b64decode(item[key], validate=True)
+    except KeyError:
+        raise ServiceError(400, f"Campo requerido: {key}")
+    except (binascii.Error, TypeError):
+        raise ServiceError(400, f"Base64 invalido en '{key}'")
+
+
+def _b64(data: Optional[bytes]) -> Optional[str]:
+    return base64.b64encode(data).decode('ascii') if data is not None else None
+
+
+def _flag(query: Dict[str, list], name: str, default: bool) -> bool:
+    values = query.get(name)
+    if not values:
+        return default
+    return values[-1].lower() in ('1', 'true', 'yes', 'si')
+
+
+def _error_payload(error: Exception) -> Tuple[int, Dict[str, Any]]:
+    """Codigo HTTP y cuerpo para una excepcion de una operacion."""
+    if isinstance(error, ServiceError):
+        return error.status, {'error': {'message': error.message}}
+    if isinstance(error, (CircuitOpenError, RateLimitedError)):
+        return 503, {'error': error.to_dict()}
+    if isinstance(error, NetworkError):
+        return 502, {'error': error.to_dict()}
+    if isinstance(error, FachoError):
+        return 422, {'error': error.to_dict()}
+    if isinstance(error, KeyError):
+        return 400, {'error': {'message': f"Campo requerido: {error.args[0]}"}}
+    if isinstance(error, (ValueError, etree.XMLSyntaxError)):
+        return 400, {'error': {'message': str(error)}}
+    if isinstance(error, OSError):
+        # Errores de conexion de requests (RequestException es OSError)
+        return 502, {'error': {'type': type(error).__name__, 'message': str(error)}}
+    return 500, {'error': {'type': type(error).__name__, 'message': str(error)}}
+
+
+class FachoService:
+    """Construccion, firma, empaquetado y envio expuestos por HTTP local."""
+
+    def __init__(
+        self,
+        signer: Any = None,
+        client: Any = None,
+        config: InvoiceConfig = None,
+        supplier: Party = None,
+        builder_class: type = InvoiceBuilder,
+        jobs: int = 8,
+        compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+        host: str = '127.0.0.1',
+        port: int = 0
+    ):
+        """
+        Args:
+            signer: XAdESSigner (o remote_signer) para /sign y /build
+            client: DianSimpleClient para /send y /status
+            config: Configuracion de facturacion para /build
+            supplier: Emisor de los documentos de /build
+            builder_class: Clase del builder para /build
+            jobs: Hilos del pool de las operaciones batch
+            compression_level: Nivel de compresion de los ZIP (0-9)
+            host: Interfaz donde escuchar
+            port: Puerto (0 = puerto libre asignado por el sistema)
+        """
+        if jobs < 1:
+            raise ValueError("jobs debe ser mayor a 0")
+        self.signer = signer
+        self.client = client
+        self.config = config
+        self.supplier = supplier
+        self.builder_class = builder_class
+        self.jobs = jobs
+        self.compression_level = compression_level
+        self.host = host
+        self.port = port
+        self.stats: Dict[str, int] = {}
+        self.started_at: Optional[float] = None
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any], **options: Any) -> 'FachoService':
+        """
+        Crear el servicio desde un diccionario de configuracion.
+
+        Claves: 'config' (campos de InvoiceConfig), 'supplier' (campos de
+        Party y de su direccion, planos como las columnas customer_* sin
+        prefijo). Las demas opciones (signer, client, jobs, ...) se pasan
+        como argumentos.
+        """
+        config = InvoiceConfig(**settings['config']) if settings.get('config') else None
+        supplier = row_to_party(settings['supplier'], prefix='') if settings.get('supplier') else None
+        return cls(config=config, supplier=supplier, **options)
+
+    # -------------------------------------------------------------------------
+    # Ciclo de vida
+    # -------------------------------------------------------------------------
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    def start(self) -> 'FachoService':
+        """Iniciar el servidor en un hilo."""
+
+        class Handler(_ServiceHandler):
+            pass
+        Handler.service = self
+
+        self._pool = ThreadPoolExecutor(self.jobs, thread_name_prefix='facho-service')
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Iniciar el servidor en el hilo actual (bloquea)."""
+        self.start()
+        try:
+            self._thread.join()
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Detener el servidor y el pool."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self) -> 'FachoService':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    # -------------------------------------------------------------------------
+    # Despacho
+    # -------------------------------------------------------------------------
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def handle(self, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        """
+        Responder una solicitud POST.
+
+        Returns:
+            Tupla (codigo HTTP, cuerpo JSON)
+        """
+        url = urlsplit(path)
+        query = parse_qs(url.query)
+        parts = url.path.strip('/').split('/')
+        operation = parts[0]
+        batch = parts[1:] == ['batch']
+        if operation not in OPERATIONS or not (len(parts) == 1 or batch):
+            return 404, {'error': {'message': f"Ruta desconocida: {url.path}"}}
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError as e:
+            return 400, {'error': {'message': f"JSON invalido: {e}"}}
+
+        self._count(url.path)
+        method = getattr(self, f'_op_{operation}')
+        with span('service.request', path=url.path):
+            if not batch:
+                return self._call(method, payload, query)
+            items = payload.get('items') if isinstance(payload, dict) else None
+            if not isinstance(items, list):
+                return 400, {'error': {'message': "Se requiere 'items' (lista)"}}
+            results = list(self._pool.map(
+                lambda item: self._batch_item(method, item, query), items
+            ))
+            return 200, {'results': results}
+
+    def _call(self, method: Callable, item: Any, query) -> Tuple[int, Dict[str, Any]]:
+        try:
+            if not isinstance(item, dict):
+                raise ServiceError(400, "Se esperaba un objeto JSON")
+            return 200, method(item, query)
+        except Exception as e:
+            status, payload = _error_payload(e)
+            self._count('errors')
+            count('service.errors', status=status)
+            return status, payload
+
+    def _batch_item(self, method: Callable, item: Any, query) -> Dict[str, Any]:
+        status, payload = self._call(method, item, query)
+        if status != 200:
+            payload['status'] = status
+        return payload
+
+    def health(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {
+            'status': 'ok',
+            'uptime': time.time() - self.started_at if self.started_at else 0.0,
+            'signer': self.signer is not None,
+            'client': self.client is not None,
+            'build': self.config is not None and self.supplier is not None,
+            'jobs': self.jobs,
+            'requests': stats,
+        }
+
+    # -------------------------------------------------------------------------
+    # Operaciones
+    # -------------------------------------------------------------------------
+
+    def _require(self, name: str, value: Any) -> Any:
+        if value is None:
+            raise ServiceError(501, f"Servicio sin {name} configurado")
+        return value
+
+    def _processor(self) -> DocumentProcessor:
+        """DocumentProcessor del hilo (el builder no es thread-safe)."""
+        processor = getattr(self._local, 'processor', None)
+        if processor is None:
+            processor = DocumentProcessor(
+                self.config, self.builder_class,
+                compression_level=self.compression_level,
+            )
+            self._local.processor = processor
+        return processor
+
+    def _op_build(self, item: Dict[str, Any], query) -> Dict[str, Any]:
+        self._require('config', self.config)
+        self._require('supplier', self.supplier)
+        sign = _flag(query, 'sign', self.signer is not None)
+        if sign:
+            self._require('firmador', self.signer)
+        if DEFAULT_KEY_COLUMN not in item:
+            raise ServiceError(400, f"Campo requerido: {DEFAULT_KEY_COLUMN}")
+
+        processor = self._processor()
+        processor.signer = self.signer if sign else None
+        processor.zip_output = _flag(query, 'zip', False)
+        result = processor.process_rows(item, item.get('lines') or [], self.supplier)
+        if not result.ok:
+            raise ServiceError(422, result.error)
+        return {
+            'number': result.number,
+            'uuid': result.uuid,
+            'total': result.total,
+            'xml': _b64(result.xml),
+            'zip_name': result.zip_name,
+            'zip': _b64(result.zip_content),
+            'timings': result.timings,
+        }
+
+    def _op_sign(self, item: Dict[str, Any], query) -> Dict[str, Any]:
+        signer = self._require('firmador', self.signer)
+        doc = etree.fromstring(_b64decode(item, 'xml'))
+        signed = signer.sign(doc)
+        return {'xml': _b64(etree.tostring(signed, encoding='UTF-8', xml_declaration=True))}
+
+    def _op_zip(self, item: Dict[str, Any], query) -> Dict[str, Any]:
+        xml_name = item.get('file_name')
+        if not xml_name:
+            raise ServiceError(400, "Campo requerido: file_name")
+        package = package_xml(_b64decode(item, 'xml'), xml_name, item.get('zip_name'),
+                              self.compression_level)
+        return {'zip_name': package.file_name, 'zip': _b64(package.content)}
+
+    def _op_send(self, item: Dict[str, Any], query) -> Dict[str, Any]:
+        client = self._require('cliente DIAN', self.client)
+        file_name = item.get('file_name')
+        if not file_name:
+            raise ServiceError(400, "Campo requerido: file_name")
+        content = _b64decode(item, 'zip')
+        if item.get('test_set_id'):
+            response = client.send_test_set_async(file_name, content, item['test_set_id'])
+        elif _flag(query, 'sync', False):
+            response = client.send_bill_sync(file_name, content)
+        else:
+            response = client.send_bill_async(file_name, content)
+        return asdict(response)
+
+    def _op_status(self, item: Dict[str, Any], query) -> Dict[str, Any]:
+        client = self._require('cliente DIAN', self.client)
+        track_id = item.get('track_id')
+        if not track_id:
+            raise ServiceError(400, "Campo requerido: track_id")
+        if _flag(query, 'zip', False):
+            return asdict(client.get_status_zip(track_id))
+        return asdict(client.get_status(track_id))
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    """Adaptador HTTP con conexiones persistentes (HTTP/1.1)."""
+
+    service: FachoService = None
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode('utf-8')
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self):
+        if urlsplit(self.path).path.rstrip('/') == '/health':
+            self._reply(200, self.service.health())
+        else:
+            self._reply(404, {'error': {'message': f"Ruta desconocida: {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._reply(413, {'error': {'message': f"Cuerpo demasiado grande: {length} bytes"}})
+            return
+        body = self.rfile.read(length)
+        status, payload = self.service.handle(self.path, body)
+        self._reply(status, payload)
+
+    def log_message(self, *args: Any):
+        pass
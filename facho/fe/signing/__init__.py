@@ -10,6 +10,7 @@ Basado en implementacion funcional aprobada por DIAN.
 from .xades import XAdESSigner, sign_invoice_xades
 from .certificate import load_certificate, cert_to_base64, cert_digest, get_issuer_dn
 from .utils import sha256_digest, sign_data
+from .daemon import SigningDaemon, SigningClient, RemoteSigningKey, remote_signer
 
 __all__ = [
     'XAdESSigner',
@@ -20,4 +21,8 @@ __all__ = [
     'get_issuer_dn',
     'sha256_digest',
     'sign_data',
+    'SigningDaemon',
+    'SigningClient',
+    'RemoteSigningKey',
+    'remote_signer',
 ]
@@ -0,0 +1,352 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Servicio local de firma sobre un socket Unix.
+
+Cargar el PKCS#12 ejecuta su derivacion de clave (lenta a proposito) y
+deja la clave descifrada en cada proceso que firma. SigningDaemon carga
+el certificado una vez y firma por peticion los bytes canonicalizados
+(SignedInfo C14N) que le envian los workers; la clave nunca sale del
+proceso del daemon.
+
+Los workers usan RemoteSigningKey, que expone el mismo `sign(data,
+padding, algorithm)` que una clave RSA de cryptography, de modo que
+sign_invoice_xades, build_wssec_soap y sign_data funcionan sin cambios:
+
+    # Proceso del daemon (o: facho signing-daemon --cert ... --socket ...)
+    daemon = SigningDaemon.from_pkcs12('cert.p12', 'clave', '/run/facho/sign.sock')
+    daemon.serve_forever()
+
+    # Workers
+    signer = remote_signer('/run/facho/sign.sock')        # XAdESSigner
+    client = DianSimpleClient(signing_socket='/run/facho/sign.sock')
+
+Protocolo: cada mensaje es un JSON precedido por su longitud (4 bytes
+big-endian). Peticiones:
+
+    {"op": "certificate"}
+        -> {"certificate": <DER b64>, "chain": [<DER b64>, ...]}
+    {"op": "sign", "algorithm": "rsa-sha256", "data": [<b64>, ...]}
+        -> {"signatures": [<b64>, ...]}
+
+Una peticion 'sign' lleva varios bloques: firmar un lote cuesta un solo
+viaje. Los errores responden {"error": "..."}. El socket se crea con
+permisos 0600: solo el usuario del daemon (y root) puede firmar.
+"""
+
+import base64
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+
+from ..builders.exceptions import SignatureError
+from ..instrumentation import count, span
+from .certificate import load_certificate
+from .xades import XAdESSigner
+
+
+SIGN_ALGORITHM = 'rsa-sha256'
+
+# Tamano maximo de un mensaje del protocolo
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+_LENGTH = struct.Struct('>I')
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode('ascii')
+
+
+def _der(cert) -> str:
+    return _b64(cert.public_bytes(serialization.Encoding.DER))
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_message(sock: socket.socket) -> Optional[dict]:
+    """Leer un mensaje; None si la conexion se cerro."""
+    header = _recv_exact(sock, _LENGTH.size)
+    if header is None:
+        return None
+    (size,) = _LENGTH.unpack(header)
+    if size > MAX_MESSAGE_BYTES:
+        raise SignatureError(f"Mensaje de firma demasiado grande: {size} bytes")
+    body = _recv_exact(sock, size)
+    if body is None:
+        return None
+    return json.loads(body)
+
+
+def send_message(sock: socket.socket, message: dict):
+    """Escribir un mensaje con su longitud."""
+    body = json.dumps(message).encode('utf-8')
+    sock.sendall(_LENGTH.pack(len(body)) + body)
+
+
+# =============================================================================
+# DAEMON
+# =============================================================================
+
+class _SigningHandler(socketserver.BaseRequestHandler):
+    """Atiende una conexion persistente: varias peticiones por socket."""
+
+    def handle(self):
+        daemon = self.server.signing_daemon
+        while True:
+            try:
+                request = recv_message(self.request)
+            except (ValueError, SignatureError) as e:
+                send_message(self.request, {'error': str(e)})
+                return
+            if request is None:
+                return
+            try:
+                response = daemon.handle(request)
+            except Exception as e:
+                response = {'error': f'{type(e).__name__}: {e}'}
+            send_message(self.request, response)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class SigningDaemon:
+    """Mantiene la clave privada y firma para los workers locales."""
+
+    def __init__(
+        self,
+        private_key,
+        certificate,
+        chain: Sequence = (),
+        socket_path: str = None,
+        cpus: Iterable[int] = None
+    ):
+        """
+        Args:
+            private_key: Clave privada RSA (cryptography)
+            certificate: Certificado x509 del firmante
+            chain: Cadena de certificados
+            socket_path: Ruta del socket Unix
+            cpus: Nucleos a los que fijar el proceso al servir (Linux)
+        """
+        self.private_key = private_key
+        self.certificate = certificate
+        self.chain = list(chain)
+        self.socket_path = socket_path
+        self.cpus = set(cpus) if cpus else None
+        self.stats = {'requests': 0, 'signatures': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+        self._server: Optional[_UnixServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_pkcs12(cls, pfx_path: str, password: str, socket_path: str,
+                    cpus: Iterable[int] = None) -> 'SigningDaemon':
+        """Cargar el certificado .p12/.pfx (una sola vez) y crear el daemon."""
+        private_key, certificate, chain = load_certificate(pfx_path, password)
+        return cls(private_key, certificate, chain, socket_path, cpus)
+
+    def _count(self, **increments: int):
+        with self._stats_lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def handle(self, request: dict) -> dict:
+        """Responder una peticion del protocolo."""
+        op = request.get('op')
+        if op == 'certificate':
+            self._count(requests=1)
+            return {
+                'certificate': _der(self.certificate),
+                'chain': [_der(cert) for cert in self.chain],
+            }
+        if op == 'sign':
+            if request.get('algorithm', SIGN_ALGORITHM) != SIGN_ALGORITHM:
+                self._count(requests=1, errors=1)
+                return {'error': f"Algoritmo no soportado: {request.get('algorithm')}"}
+            blocks = [base64.b64decode(data) for data in request.get('data', [])]
+            with span('sign.daemon'):
+                signatures = [
+                    self.private_key.sign(block, padding.PKCS1v15(), hashes.SHA256())
+                    for block in blocks
+                ]
+            self._count(requests=1, signatures=len(blocks))
+            return {'signatures': [_b64(signature) for signature in signatures]}
+        self._count(requests=1, errors=1)
+        return {'error': f'Operacion no soportada: {op}'}
+
+    def start(self) -> 'SigningDaemon':
+        """Crear el socket (0600) y atender en un hilo."""
+        if self.socket_path is None:
+            raise ValueError("Se requiere socket_path")
+        if os.path.exists(self.socket_path):
+            # Socket de una ejecucion anterior que no se cerro
+            os.unlink(self.socket_path)
+        old_umask = os.umask(0o177)
+        try:
+            self._server = _UnixServer(self.socket_path, _SigningHandler)
+        finally:
+            os.umask(old_umask)
+        self._server.signing_daemon = self
+        if self.cpus and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, self.cpus)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='facho-signing-daemon', daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Atender hasta KeyboardInterrupt."""
+        self.start()
+        try:
+            self._thread.join()
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Detener el servidor y borrar el socket."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def __enter__(self) -> 'SigningDaemon':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# =============================================================================
+# CLIENTE
+# =============================================================================
+
+class SigningClient:
+    """
+    Cliente del daemon de firma.
+
+    Cada hilo usa su propia conexion persistente al socket.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _request(self, message: dict) -> dict:
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError as e:
+                sock.close()
+                raise SignatureError(
+                    f"No se pudo conectar al daemon de firma {self.socket_path}: {e}"
+                )
+            self._local.sock = sock
+        try:
+            send_message(sock, message)
+            response = recv_message(sock)
+        except OSError as e:
+            self.close()
+            raise SignatureError(f"Error de comunicacion con el daemon de firma: {e}")
+        if response is None:
+            self.close()
+            raise SignatureError("El daemon de firma cerro la conexion")
+        if 'error' in response:
+            raise SignatureError(f"Daemon de firma: {response['error']}")
+        return response
+
+    def close(self):
+        """Cerrar la conexion del hilo actual."""
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def certificate(self) -> Tuple[object, List]:
+        """Certificado y cadena del daemon."""
+        response = self._request({'op': 'certificate'})
+        certificate = x509.load_der_x509_certificate(base64.b64decode(response['certificate']))
+        chain = [x509.load_der_x509_certificate(base64.b64decode(der))
+                 for der in response['chain']]
+        return certificate, chain
+
+    def sign_many(self, blocks: Sequence[bytes]) -> List[bytes]:
+        """Firmar varios bloques en una sola peticion (RSA-SHA256 PKCS#1 v1.5)."""
+        response = self._request({
+            'op': 'sign',
+            'algorithm': SIGN_ALGORITHM,
+            'data': [_b64(block) for block in blocks],
+        })
+        count('sign.remote', len(blocks))
+        return [base64.b64decode(signature) for signature in response['signatures']]
+
+    def sign(self, data: bytes) -> bytes:
+        return self.sign_many([data])[0]
+
+
+class RemoteSigningKey:
+    """
+    Adaptador con la interfaz de firma de RSAPrivateKey que delega en el
+    daemon. Solo admite PKCS#1 v1.5 con SHA-256, lo unico que usan la
+    firma XAdES y WS-Security.
+    """
+
+    def __init__(self, client: SigningClient, certificate):
+        self.client = client
+        self.certificate = certificate
+
+    @property
+    def key_size(self) -> int:
+        return self.certificate.public_key().key_size
+
+    def public_key(self):
+        return self.certificate.public_key()
+
+    def sign(self, data: bytes, pad, algorithm) -> bytes:
+        if not isinstance(pad, padding.PKCS1v15) or not isinstance(algorithm, hashes.SHA256):
+            raise SignatureError("El daemon de firma solo soporta RSA-SHA256 con PKCS#1 v1.5")
+        return self.client.sign(data)
+
+
+def connect(socket_path: str, timeout: float = 30.0) -> Tuple[RemoteSigningKey, object, List]:
+    """
+    Conectarse al daemon.
+
+    Returns:
+        Tupla (private_key remota, certificate, chain), la misma forma
+        que load_certificate
+    """
+    client = SigningClient(socket_path, timeout)
+    certificate, chain = client.certificate()
+    return RemoteSigningKey(client, certificate), certificate, chain
+
+
+def remote_signer(socket_path: str, timeout: float = 30.0) -> XAdESSigner:
+    """XAdESSigner que firma a traves del daemon."""
+    return XAdESSigner(*connect(socket_path, timeout))
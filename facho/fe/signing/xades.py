@@ -16,6 +16,7 @@ from lxml import etree
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import padding
 
+from ..instrumentation import span, timed
 from .certificate import cert_to_base64, cert_digest, get_issuer_dn
 from .utils import sha256_digest
 
@@ -147,6 +148,7 @@ class XAdESSigner:
         return True
 
 
+@timed('sign')
 def sign_invoice_xades(
     invoice: etree._Element,
     private_key,
@@ -184,7 +186,8 @@ def sign_invoice_xades(
     # =========================================================================
     # PASO 1: CALCULAR DIGEST DEL DOCUMENTO (antes de insertar firma)
     # =========================================================================
-    doc_c14n = etree.tostring(invoice, method='c14n', exclusive=False, with_comments=False)
+    with span('sign.c14n', part='document'):
+        doc_c14n = etree.tostring(invoice, method='c14n', exclusive=False, with_comments=False)
     doc_digest = sha256_digest(doc_c14n)
 
     # =========================================================================
@@ -291,28 +294,32 @@ def sign_invoice_xades(
     # =========================================================================
     # PASO 3: CALCULAR DIGEST DE KEYINFO usando C14N directo
     # =========================================================================
-    keyinfo_c14n = etree.tostring(ki, method='c14n', exclusive=False, with_comments=False)
+    with span('sign.c14n', part='key_info'):
+        keyinfo_c14n = etree.tostring(ki, method='c14n', exclusive=False, with_comments=False)
     keyinfo_digest = sha256_digest(keyinfo_c14n)
     ref2_dv.text = keyinfo_digest
 
     # =========================================================================
     # PASO 4: CALCULAR DIGEST DE SIGNEDPROPERTIES usando C14N directo
     # =========================================================================
-    signedprops_c14n = etree.tostring(sp, method='c14n', exclusive=False, with_comments=False)
+    with span('sign.c14n', part='signed_properties'):
+        signedprops_c14n = etree.tostring(sp, method='c14n', exclusive=False, with_comments=False)
     signedprops_digest = sha256_digest(signedprops_c14n)
     ref3_dv.text = signedprops_digest
 
     # =========================================================================
     # PASO 5: FIRMAR SIGNEDINFO usando C14N directo
     # =========================================================================
-    signedinfo_c14n = etree.tostring(si, method='c14n', exclusive=False, with_comments=False)
+    with span('sign.c14n', part='signed_info'):
+        signedinfo_c14n = etree.tostring(si, method='c14n', exclusive=False, with_comments=False)
 
     # Firmar
-    sig_bytes = private_key.sign(
-        signedinfo_c14n,
-        padding.PKCS1v15(),
-        hashes.SHA256()
-    )
+    with span('sign.rsa'):
+        sig_bytes = private_key.sign(
+            signedinfo_c14n,
+            padding.PKCS1v15(),
+            hashes.SHA256()
+        )
     signature_value = base64.b64encode(sig_bytes).decode('ascii')
     sig_val.text = signature_value
 
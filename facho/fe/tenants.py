@@ -0,0 +1,374 @@
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Registro de emisores (multi-tenant) para proveedores tecnologicos.
+
+Un proveedor firma y envia por cientos de emisores, cada uno con su
+PKCS#12. TenantRegistry carga por NIT, al primer uso, las credenciales
+de una fuente (directorio, base de datos, vault...) y arma un
+XAdESSigner y un DianSimpleClient que comparten la clave ya descifrada
+y el certificado en base64. Los emisores usados recientemente quedan en
+un LRU de tamano configurable; todos los clientes comparten una
+requests.Session (un solo pool de conexiones a DIAN) y cada emisor tiene
+un limite de operaciones concurrentes, asi un emisor grande no acapara
+los hilos de los demas.
+
+Uso:
+    registry = TenantRegistry(DirectoryCredentialSource('/etc/facho/certs'),
+                              max_tenants=200, max_concurrency=4)
+
+    with registry.use('900373115') as tenant:
+        signed = tenant.signer.sign(xml)
+        tenant.client.send_bill_async(name, package)
+
+    registry.expiring(days=30)      # certificados por renovar
+
+Una fuente de credenciales es cualquier callable que recibe el NIT y
+devuelve TenantCredentials (o None si el emisor no existe).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .builders.exceptions import CertificateExpiredError, ConfigurationError, RateLimitedError
+from .client.dian_simple import DianSimpleClient
+from .instrumentation import count, span
+from .signing.certificate import load_certificate, load_certificate_from_bytes
+from .signing.xades import XAdESSigner
+
+
+@dataclass
+class TenantCredentials:
+    """
+    Credenciales de un emisor.
+
+    Attributes:
+        nit: NIT del emisor
+        pfx_data: Bytes del PKCS#12
+        pfx_path: Ruta del PKCS#12 (alternativa a pfx_data)
+        password: Contrasena del PKCS#12
+        signing_socket: Socket de un SigningDaemon con la clave del emisor
+            (alternativa al PKCS#12)
+        environment: 'habilitacion' o 'produccion' (por defecto el del
+            registro)
+        max_concurrency: Operaciones simultaneas del emisor (por defecto
+            el del registro)
+    """
+    nit: str
+    pfx_data: Optional[bytes] = None
+    pfx_path: Optional[str] = None
+    password: str = ''
+    signing_socket: Optional[str] = None
+    environment: Optional[str] = None
+    max_concurrency: Optional[int] = None
+
+
+class DirectoryCredentialSource:
+    """
+    Credenciales en un directorio: `<nit>.p12` (o `.pfx`) con la
+    contrasena en `<nit>.password` (sin archivo, contrasena vacia).
+    """
+
+    def __init__(self, directory: str, environment: str = None):
+        self.directory = directory
+        self.environment = environment
+
+    def __call__(self, nit: str) -> Optional[TenantCredentials]:
+        for extension in ('.p12', '.pfx'):
+            pfx_path = os.path.join(self.directory, nit + extension)
+            if os.path.exists(pfx_path):
+                break
+        else:
+            return None
+        password = ''
+        password_path = os.path.join(self.directory, nit + '.password')
+        if os.path.exists(password_path):
+            with open(password_path, encoding='utf-8') as f:
+                password = f.read().strip()
+        return TenantCredentials(nit, pfx_path=pfx_path, password=password,
+                                 environment=self.environment)
+
+
+@dataclass
+class Tenant:
+    """
+    Emisor cargado.
+
+    Attributes:
+        nit: NIT del emisor
+        signer: Firmador XAdES con la clave del emisor
+        client: Cliente DIAN con el mismo certificado
+        not_after: Fin de validez del certificado (UTC)
+        max_concurrency: Operaciones simultaneas permitidas
+    """
+    nit: str
+    signer: XAdESSigner
+    client: DianSimpleClient
+    not_after: datetime
+    max_concurrency: int
+
+    @property
+    def certificate(self):
+        return self.signer.certificate
+
+
+class TenantRegistry:
+    """Firmadores y clientes DIAN por NIT, cargados bajo demanda con LRU."""
+
+    def __init__(
+        self,
+        source: Callable[[str], Optional[TenantCredentials]],
+        max_tenants: int = 128,
+        max_concurrency: int = 4,
+        environment: str = 'habilitacion',
+        expiry_margin_days: float = 0,
+        session: Any = None,
+        pool_size: int = 32,
+        client_options: Dict[str, Any] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            source: Fuente de credenciales (NIT -> TenantCredentials)
+            max_tenants: Emisores cargados a la vez; al superarlo se
+                descarta el usado hace mas tiempo
+            max_concurrency: Operaciones simultaneas por emisor
+            environment: Ambiente DIAN por defecto
+            expiry_margin_days: Dias antes del vencimiento del certificado
+                a partir de los cuales se deja de usar el emisor
+            session: requests.Session compartida (por defecto se crea una
+                con `pool_size` conexiones)
+            pool_size: Conexiones del pool de la sesion creada
+            client_options: Argumentos extra de DianSimpleClient (ej:
+                call_guard compartido)
+            clock: Reloj epoch (inyectable para tests)
+        """
+        if max_tenants < 1:
+            raise ValueError("max_tenants debe ser mayor a 0")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency debe ser mayor a 0")
+        self.source = source
+        self.max_tenants = max_tenants
+        self.max_concurrency = max_concurrency
+        self.environment = environment
+        self.expiry_margin = timedelta(days=expiry_margin_days)
+        self.pool_size = pool_size
+        self.client_options = client_options or {}
+        self._session = session
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tenants: 'OrderedDict[str, Tenant]' = OrderedDict()
+        self._loading: Dict[str, threading.Lock] = {}
+        # Los semaforos sobreviven al LRU: descartar un emisor en uso no
+        # reinicia su limite
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'loads': 0, 'evictions': 0}
+
+    # -------------------------------------------------------------------------
+    # Carga
+    # -------------------------------------------------------------------------
+
+    @property
+    def session(self):
+        """Sesion HTTP compartida por los clientes de todos los emisores."""
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def _now(self) -> datetime:
+        return datetime.fromtimestamp(self._clock(), timezone.utc)
+
+    def _check_expiry(self, nit: str, not_after: datetime):
+        if self._now() + self.expiry_margin >= not_after:
+            raise CertificateExpiredError(
+                f"Certificado del emisor {nit} vencido o por vencer: {not_after.isoformat()}",
+                expiry_date=not_after.isoformat(),
+            )
+
+    def _load(self, nit: str) -> Tenant:
+        try:
+            credentials = self.source(nit)
+        except KeyError:
+            credentials = None
+        if credentials is None:
+            raise ConfigurationError(f"Sin credenciales para el emisor {nit}", config_key=nit)
+
+        with span('tenants.load'):
+            if credentials.signing_socket:
+                from .signing.daemon import connect
+                loaded = connect(credentials.signing_socket)
+            elif credentials.pfx_data:
+                loaded = load_certificate_from_bytes(credentials.pfx_data, credentials.password)
+            elif credentials.pfx_path:
+                loaded = load_certificate(credentials.pfx_path, credentials.password)
+            else:
+                raise ConfigurationError(
+                    f"Credenciales del emisor {nit} sin PKCS#12 ni signing_socket",
+                    config_key=nit,
+                )
+            not_after = loaded[1].not_valid_after_utc
+            self._check_expiry(nit, not_after)
+
+            client = DianSimpleClient(
+                credentials=loaded,
+                environment=credentials.environment or self.environment,
+                session=self.session,
+                **self.client_options
+            )
+        count('tenants.loads')
+        return Tenant(
+            nit=nit,
+            signer=XAdESSigner(*loaded),
+            client=client,
+            not_after=not_after,
+            max_concurrency=credentials.max_concurrency or self.max_concurrency,
+        )
+
+    def _cached(self, nit: str) -> Optional[Tenant]:
+        """Emisor del LRU (con el lock tomado)."""
+        tenant = self._tenants.get(nit)
+        if tenant is not None:
+            self._tenants.move_to_end(nit)
+            self.stats['hits'] += 1
+        return tenant
+
+    def get(self, nit: str) -> Tenant:
+        """
+        Emisor por NIT, cargandolo si no esta en el LRU.
+
+        Raises:
+            ConfigurationError: La fuente no tiene credenciales del NIT
+            CertificateExpiredError: El certificado vencio (o vence dentro
+                de expiry_margin_days); el emisor se descarta del LRU
+        """
+        with self._lock:
+            tenant = self._cached(nit)
+            if tenant is None:
+                loading = self._loading.setdefault(nit, threading.Lock())
+        if tenant is None:
+            # Un solo hilo descifra el PKCS#12; los demas esperan su resultado
+            with loading:
+                with self._lock:
+                    tenant = self._cached(nit)
+                if tenant is None:
+                    # El lock de carga se suelta despues de guardar el
+                    # emisor, para que nadie lo encuentre sin ninguno de
+                    # los dos y lo vuelva a cargar
+                    try:
+                        tenant = self._load(nit)
+                        self._store(tenant)
+                    finally:
+                        with self._lock:
+                            self._loading.pop(nit, None)
+                    return tenant
+        try:
+            self._check_expiry(nit, tenant.not_after)
+        except CertificateExpiredError:
+            self.evict(nit)
+            raise
+        return tenant
+
+    def _store(self, tenant: Tenant):
+        with self._lock:
+            self.stats['misses'] += 1
+            self.stats['loads'] += 1
+            self._tenants[tenant.nit] = tenant
+            self._tenants.move_to_end(tenant.nit)
+            while len(self._tenants) > self.max_tenants:
+                self._tenants.popitem(last=False)
+                self.stats['evictions'] += 1
+                count('tenants.evictions')
+
+    def signer(self, nit: str) -> XAdESSigner:
+        return self.get(nit).signer
+
+    def client(self, nit: str) -> DianSimpleClient:
+        return self.get(nit).client
+
+    # -------------------------------------------------------------------------
+    # Concurrencia por emisor
+    # -------------------------------------------------------------------------
+
+    @contextmanager
+    def use(self, nit: str, timeout: float = None) -> Iterator[Tenant]:
+        """
+        Tomar un cupo del emisor mientras dura el bloque.
+
+        Args:
+            nit: NIT del emisor
+            timeout: Segundos a esperar un cupo (None: sin limite)
+
+        Raises:
+            RateLimitedError: No hubo cupo dentro de `timeout`
+        """
+        tenant = self.get(nit)
+        with self._lock:
+            slots = self._slots.get(nit)
+            if slots is None:
+                slots = self._slots[nit] = threading.BoundedSemaphore(tenant.max_concurrency)
+        if not slots.acquire(timeout=timeout):
+            count('tenants.busy', nit=nit)
+            raise RateLimitedError(f'tenant {nit}', wait_seconds=timeout)
+        try:
+            yield tenant
+        finally:
+            slots.release()
+
+    # -------------------------------------------------------------------------
+    # Administracion
+    # -------------------------------------------------------------------------
+
+    def evict(self, nit: str) -> bool:
+        """Descartar un emisor (ej: tras renovar su certificado)."""
+        with self._lock:
+            return self._tenants.pop(nit, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._tenants.clear()
+
+    def loaded(self) -> List[str]:
+        """NITs cargados, del usado hace mas tiempo al mas reciente."""
+        with self._lock:
+            return list(self._tenants)
+
+    def expiring(self, days: float = 30) -> List[Tuple[str, datetime]]:
+        """Emisores cargados cuyo certificado vence dentro de `days` dias."""
+        limit = self._now() + timedelta(days=days)
+        with self._lock:
+            tenants = list(self._tenants.values())
+        return sorted(
+            ((t.nit, t.not_after) for t in tenants if t.not_after <= limit),
+            key=lambda item: item[1],
+        )
+
+    def __contains__(self, nit: str) -> bool:
+        with self._lock:
+            return nit in self._tenants
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tenants)
+
+    def close(self):
+        """Descartar los emisores y cerrar la sesion HTTP."""
+        self.clear()
+        with self._lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
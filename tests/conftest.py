@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Fixtures compartidos: emulador DIAN, cliente, reloj y ZIP firmados.
+
+La configuracion del emulador se indica por test (o por modulo con
+pytestmark) con el marcador `emulator`:
+
+    @pytest.mark.emulator(processing_delay=60)
+    def test_algo(self, client, emulator):
+        ...
+"""
+
+import os
+
+import pytest
+
+from facho.fe.client import DianSimpleClient
+from facho.fe.client.emulator import DianEmulator, EmulatorConfig
+from facho.fe.packaging import package_documents
+
+
+P12_PATH = os.path.join(os.path.dirname(__file__), 'example.p12')
+
+NS_UBL = (
+    'xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2" '
+    'xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2" '
+    'xmlns:ds="http://www.w3.org/2000/09/xmldsig#"'
+)
+
+
+class FakeClock:
+    """Reloj que solo avanza cuando el test cambia `now`."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def p12():
+    with open(P12_PATH, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def signed_zip():
+    """Funcion cufe -> ZIP con un XML (firma vacia) de ese CUFE."""
+    def signed_zip(cufe):
+        xml = (f'<Invoice {NS_UBL}><cbc:UUID>{cufe}</cbc:UUID><ds:Signature/></Invoice>').encode()
+        return package_documents([(f'fv-{cufe}.xml', xml)], f'z-{cufe}.zip')
+    return signed_zip
+
+
+@pytest.fixture
+def emulator(request):
+    marker = request.node.get_closest_marker('emulator')
+    config = EmulatorConfig(**(marker.kwargs if marker else {}))
+    with DianEmulator(config) as emulator:
+        yield emulator
+
+
+@pytest.fixture
+def make_client(p12):
+    """Funcion (endpoint, **opciones) -> DianSimpleClient con el certificado de pruebas."""
+    def make_client(endpoint, **options):
+        client = DianSimpleClient(certificate_bytes=p12, certificate_password='', **options)
+        client.endpoint = endpoint
+        return client
+    return make_client
+
+
+@pytest.fixture
+def client_options():
+    """Opciones adicionales del cliente (los modulos lo redefinen)."""
+    return {}
+
+
+@pytest.fixture
+def client(emulator, make_client, client_options):
+    return make_client(emulator.endpoint, **client_options)
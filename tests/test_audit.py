@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para la auditoria de CUFE/CUDE/CUDS sobre archivos firmados.
+"""
+
+import os
+import zipfile
+
+import pytest
+from lxml import etree
+
+from facho.fe.audit import (
+    CufeAuditor,
+    STATUS_ERROR,
+    STATUS_MISMATCH,
+    STATUS_OK,
+    extract_archived_document,
+    iter_audit_tasks,
+)
+from facho.fe.builders.credit_note_builder import CreditNoteBuilder, CreditNoteData
+from facho.fe.builders.exceptions import CufeError
+from facho.fe.builders.invoice_builder import (
+    InvoiceBuilder,
+    InvoiceConfig,
+    InvoiceData,
+    InvoiceLine,
+    Party,
+    Address,
+)
+from facho.fe.builders.support_document_builder import (
+    SupportDocumentBuilder,
+    SupportDocumentData,
+)
+from facho.fe.builders.taxes import Tax
+from facho.fe.signing import XAdESSigner
+
+
+P12_PATH = os.path.join(os.path.dirname(__file__), 'example.p12')
+
+
+@pytest.fixture(scope='module')
+def config():
+    return InvoiceConfig(
+        software_id='1e3fa8f4-1a91-4028-9293-a9817406100f',
+        software_pin='12345',
+        technical_key='fc8eac422eba16e22ffd8c6f94b3f40a6e38162c',
+        nit='1001186599',
+        company_name='EMPRESA DE PRUEBA',
+        resolution_number='18760000001',
+        resolution_date='2019-01-19',
+        resolution_end_date='2030-01-19',
+        prefix='SETP',
+        range_from='990000000',
+        range_to='995000000',
+    )
+
+
+@pytest.fixture(scope='module')
+def signed_documents(config):
+    """Factura, nota credito y documento soporte firmados."""
+    address = Address(
+        city_code='68081',
+        city_name='Bucaramanga',
+        postal_zone='680001',
+        country_subentity='Santander',
+        country_subentity_code='68',
+        address_line='Calle 123 # 45-67',
+    )
+    supplier = Party(
+        nit='1001186599', name='EMPRESA', legal_name='EMPRESA SAS',
+        organization_code='1', tax_level_code='R-99-PN',
+        address=address, email='empresa@test.com',
+    )
+    customer = Party(
+        nit='222222222222', name='Cliente', legal_name='Cliente',
+        organization_code='2', tax_level_code='R-99-PN', scheme_name='13',
+        address=address, email='cliente@test.com',
+    )
+    lines = [
+        InvoiceLine('Producto', 2, '94', 12345.67, tax_percent=19.0),
+        InvoiceLine('Servicio', 1, '94', 5000.0,
+                    taxes=[Tax.iva_5(5000.0), Tax.inc_8(5000.0)]),
+    ]
+    common = dict(
+        issue_date='2024-01-15', issue_time='10:30:00-05:00', lines=lines,
+    )
+    with open(P12_PATH, 'rb') as f:
+        signer = XAdESSigner.from_pkcs12_bytes(f.read(), '')
+
+    documents = {
+        'fvSETP990000001.xml': InvoiceBuilder(config).build(InvoiceData(
+            number='SETP990000001', supplier=supplier, customer=customer,
+            **common)),
+        'ncNC1.xml': CreditNoteBuilder(config).build(CreditNoteData(
+            number='NC1', supplier=supplier, customer=customer,
+            billing_reference_id='SETP990000001',
+            billing_reference_uuid='a' * 96,
+            billing_reference_date='2024-01-10',
+            discrepancy_description='Ajuste', **common), validate=False),
+        'dsSETP990000002.xml': SupportDocumentBuilder(config).build(
+            SupportDocumentData(number='SETP990000002', buyer=supplier,
+                                seller=customer, **common)),
+    }
+    return {
+        name: etree.tostring(signer.sign(doc), encoding='UTF-8',
+                             xml_declaration=True)
+        for name, doc in documents.items()
+    }
+
+
+@pytest.fixture
+def archive(tmp_path, signed_documents):
+    """Directorio con XML sueltos y un ZIP con los mismos documentos."""
+    for name, xml in signed_documents.items():
+        (tmp_path / name).write_bytes(xml)
+    with zipfile.ZipFile(tmp_path / 'lote.zip', 'w') as zf:
+        for name, xml in signed_documents.items():
+            zf.writestr(name, xml)
+        zf.writestr('LEEME.txt', 'no es un documento')
+    return tmp_path
+
+
+def auditor_for(config, **kwargs):
+    return CufeAuditor(
+        technical_key=config.technical_key,
+        software_pin=config.software_pin,
+        **kwargs
+    )
+
+
+class TestExtractArchivedDocument:
+    """Tests para la extraccion de campos del CUFE."""
+
+    def test_invoice_fields(self, signed_documents):
+        doc = extract_archived_document(signed_documents['fvSETP990000001.xml'])
+
+        assert doc.root == 'Invoice'
+        assert doc.number == 'SETP990000001'
+        assert doc.scheme_name == 'CUFE-SHA384'
+        assert doc.issue_date == '2024-01-15'
+        assert doc.supplier_nit == '1001186599'
+        assert doc.customer_nit == '222222222222'
+        assert doc.environment == '2'
+        assert doc.authorization == '18760000001'
+        assert set(doc.taxes) == {'01', '04'}
+        assert doc.subtotal == 29691.34
+
+    def test_credit_note_uses_requested_total(self, signed_documents):
+        doc = extract_archived_document(signed_documents['ncNC1.xml'])
+        assert doc.root == 'CreditNote'
+        assert doc.uses_software_pin
+        assert doc.total > doc.subtotal
+
+    def test_invalid_documents(self):
+        with pytest.raises(CufeError):
+            extract_archived_document(b'<no-cerrado>')
+        with pytest.raises(CufeError):
+            extract_archived_document(b'<Otro/>')
+
+
+class TestCufeAuditor:
+    """Tests para CufeAuditor."""
+
+    def test_archive_is_valid(self, config, archive):
+        auditor = auditor_for(config)
+        results = list(auditor.audit(str(archive)))
+
+        assert len(results) == 6
+        assert all(r.status == STATUS_OK for r in results)
+        assert {r.scheme_name for r in results} == {
+            'CUFE-SHA384', 'CUDE-SHA384', 'CUDS-SHA384'
+        }
+        assert any(r.source.endswith('lote.zip:ncNC1.xml') for r in results)
+        assert auditor.summary()['ok'] == 6
+
+    def test_tampered_amount(self, config, signed_documents, tmp_path):
+        xml = signed_documents['fvSETP990000001.xml']
+        payable = xml.index(b'PayableAmount')
+        tampered = xml[:payable] + xml[payable:].replace(b'>3', b'>4', 1)
+        (tmp_path / 'alterada.xml').write_bytes(tampered)
+
+        result, = auditor_for(config).audit(str(tmp_path))
+        assert result.status == STATUS_MISMATCH
+        assert result.found != result.expected
+        assert not result.ok
+
+    def test_missing_key_is_an_error(self, config, signed_documents):
+        auditor = CufeAuditor(technical_key=config.technical_key)
+        result = auditor.verify_xml(signed_documents['ncNC1.xml'], 'ncNC1.xml')
+        assert result.status == STATUS_ERROR
+        assert result.number == 'NC1'
+
+    def test_keys_by_resolution(self, config, signed_documents):
+        auditor = CufeAuditor(
+            technical_key='otra',
+            technical_keys={'18760000001': config.technical_key},
+        )
+        result = auditor.verify_xml(signed_documents['fvSETP990000001.xml'])
+        assert result.ok
+
+    def test_process_pool_and_progress(self, config, archive):
+        progress = []
+        auditor = auditor_for(config, jobs=2, chunk_size=2, progress=progress.append)
+        results = list(auditor.audit(str(archive)))
+
+        sources = [path if member is None else f'{path}:{member}'
+                   for path, member in iter_audit_tasks(str(archive))]
+        assert [r.source for r in results] == sources
+        assert all(r.ok for r in results)
+        assert [p.done for p in progress] == [2, 4, 6]
+
+    def test_corrupt_zip_does_not_stop_the_audit(self, config, archive):
+        (archive / 'a-roto.zip').write_bytes(b'PK\x03\x04 no es un zip')
+        # Enlace roto: open() falla con OSError
+        os.symlink(str(archive / 'no-existe.xml'), str(archive / 'z-enlace.xml'))
+
+        auditor = auditor_for(config)
+        results = list(auditor.audit(str(archive)))
+
+        errors = [r for r in results if r.status == STATUS_ERROR]
+        assert [os.path.basename(r.source) for r in errors] == ['a-roto.zip', 'z-enlace.xml']
+        assert all('No se pudo leer' in r.error for r in errors)
+        assert auditor.summary()['ok'] == 6
+
+    def test_invalid_jobs(self):
+        with pytest.raises(ValueError):
+            CufeAuditor(jobs=0)
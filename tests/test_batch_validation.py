@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para la validacion entre documentos de un lote.
+"""
+
+import pytest
+
+from facho.fe.builders.batch_validation import BatchValidator
+from facho.fe.builders.credit_note_builder import CreditNoteData
+from facho.fe.builders.debit_note_builder import DebitNoteData
+from facho.fe.builders.invoice_builder import InvoiceConfig, InvoiceData
+from facho.fe.client.tracker import DocumentTracker, TrackedDocument
+
+
+CUFE = 'a' * 96
+
+
+@pytest.fixture
+def config():
+    return InvoiceConfig(
+        software_id='1e3fa8f4-1a91-4028-9293-a9817406100f',
+        software_pin='12345',
+        technical_key='fc8eac422eba16e22ffd8c6f94b3f40a6e38162c',
+        nit='1001186599',
+        company_name='EMPRESA DE PRUEBA',
+        resolution_number='18760000001',
+        resolution_date='2019-01-19',
+        resolution_end_date='2030-01-19',
+        prefix='SETP',
+        range_from='990000000',
+        range_to='990000010',
+    )
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    tracker = DocumentTracker(str(tmp_path / 'tracking.json'))
+    tracker.add_document(TrackedDocument(
+        'factura', 'SETP990000001', CUFE, '2024-01-10', is_valid=True))
+    tracker.add_document(TrackedDocument(
+        'factura', 'SETP990000002', 'b' * 96, '2024-01-10'))
+    tracker.add_document(TrackedDocument(
+        'credito', 'NC1', 'c' * 96, '2024-01-11', is_valid=True))
+    return tracker
+
+
+def invoice(number):
+    return InvoiceData(number=number, issue_date='2024-01-15',
+                       issue_time='10:30:00-05:00')
+
+
+def credit_note(number, reference, uuid=CUFE, date='2024-01-10'):
+    return CreditNoteData(
+        number=number, issue_date='2024-01-15', issue_time='10:30:00-05:00',
+        billing_reference_id=reference, billing_reference_uuid=uuid,
+        billing_reference_date=date,
+    )
+
+
+def codes(report):
+    return [[v.code for v in errors] for errors in report.violations]
+
+
+class TestNumbers:
+    """Numeros repetidos y rango de la resolucion."""
+
+    def test_valid_batch(self, config, tracker):
+        report = BatchValidator(config, tracker).validate([
+            invoice('SETP990000003'), invoice('SETP990000004'),
+            credit_note('NC2', 'SETP990000001'),
+        ])
+
+        assert report.is_valid
+        assert report.remaining_in_range == 6
+
+    def test_duplicates(self, config, tracker):
+        report = BatchValidator(config, tracker).validate([
+            invoice('SETP990000003'),
+            invoice('SETP990000003'),
+            invoice('SETP990000001'),
+            credit_note('NC1', 'SETP990000001'),
+        ])
+
+        assert codes(report) == [[], ['FAN01'], ['FAN01'], ['FAN01']]
+        assert 'documento 1' in report.violations[1][0].message
+        assert report.invalid_indexes() == [1, 2, 3]
+
+    def test_range(self, config):
+        report = BatchValidator(config).validate([
+            invoice('SETP990000009'),
+            invoice('SETP990000010'),
+            invoice('SETP990000011'),
+            invoice('SETP1'),
+        ])
+
+        assert codes(report) == [[], [], ['FAN02'], ['FAN02']]
+        assert 'mayor que rango maximo' in report.violations[2][0].message
+        assert report.remaining_in_range == 0
+        assert report.summary() == {'FAN02': 2}
+
+
+class TestReferences:
+    """Referencias de notas credito y debito."""
+
+    def test_reference_states(self, config, tracker):
+        report = BatchValidator(config, tracker).validate([
+            credit_note('NC2', 'SETP990000002', uuid='b' * 96),
+            credit_note('NC3', 'SETP990000999'),
+            credit_note('NC4', 'SETP990000001', uuid='f' * 96, date='2024-01-11'),
+            DebitNoteData(
+                number='ND1', issue_date='2024-01-15', issue_time='10:30:00-05:00',
+                billing_reference_id='SETP990000001',
+                billing_reference_uuid='f' * 96,
+            ),
+        ])
+
+        assert codes(report) == [
+            ['NCB01'], ['NCB01'], ['NCB02', 'NCB03'], ['NDB02'],
+        ]
+        assert 'pendiente' in report.violations[0][0].message
+        assert 'no existe' in report.violations[1][0].message
+
+    def test_reference_in_same_batch(self, config):
+        documents = [
+            credit_note('NC1', 'SETP990000004'),
+            invoice('SETP990000003'),
+            invoice('SETP990000004'),
+            credit_note('NC2', 'SETP990000003'),
+        ]
+
+        report = BatchValidator(config).validate(documents)
+        assert codes(report) == [['NCB01'], [], [], ['NCB01']]
+
+        report = BatchValidator(config, allow_pending_in_batch=True).validate(documents)
+        assert codes(report) == [['NCB01'], [], [], []]
+
+    def test_without_tracker(self, config):
+        report = BatchValidator(config).validate([credit_note('NC1', 'SETP990000001')])
+        assert report.is_valid
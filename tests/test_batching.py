@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para el envio de varios documentos por ZIP.
+"""
+
+import base64
+import io
+import os
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from lxml import etree
+
+from facho.fe.client import (
+    BatchDocument,
+    DianSimpleClient,
+    DocumentTracker,
+    TrackedDocument,
+    ZipBatchSender,
+    plan_batches,
+)
+from facho.fe.client.batching import DocumentBatch, match_statuses
+from facho.fe.client.dian_simple import GetStatusZipResponse
+from facho.fe.packaging import ZipPackage
+
+
+P12_PATH = os.path.join(os.path.dirname(__file__), 'example.p12')
+
+NS_WCF = 'http://wcf.dian.colombia'
+
+
+def xml_for(number, size=0):
+    return (b'<?xml version="1.0"?><Invoice><ID>' + number.encode() + b'</ID>'
+            + os.urandom(size) + b'</Invoice>')
+
+
+def status_xml(name, valid, processing=False):
+    code = '98' if processing else '00' if valid else '99'
+    return (
+        '<b:DianResponse>'
+        '<b:ErrorMessage xmlns:c="http://schemas.microsoft.com/2003/10/Serialization/Arrays">'
+        + ('' if valid else '<c:string>Regla: FAD06, Rechazo</c:string>')
+        + '</b:ErrorMessage>'
+        f'<b:IsValid>{"true" if valid and not processing else "false"}</b:IsValid>'
+        f'<b:StatusCode>{code}</b:StatusCode>'
+        f'<b:StatusDescription>{"Procesado Correctamente." if valid else "Documento con errores"}'
+        '</b:StatusDescription>'
+        f'<b:XmlDocumentKey>cufe-{name}</b:XmlDocumentKey>'
+        f'<b:XmlFileName>{name}</b:XmlFileName>'
+        '</b:DianResponse>'
+    )
+
+
+class DianHandler(BaseHTTPRequestHandler):
+    """Servidor local: recibe ZIP y responde el estado de cada XML."""
+
+    zips = {}
+    actions = []
+    # Responder IsValid false / 98 (en proceso) para todos los documentos
+    processing = False
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        action = self.headers['SOAPAction'].rsplit('/', 1)[-1]
+        self.actions.append(action)
+        doc = etree.fromstring(body)
+
+        if action in ('SendBillAsync', 'SendTestSetAsync'):
+            content = base64.b64decode(doc.find('.//{%s}contentFile' % NS_WCF).text)
+            with zipfile.ZipFile(io.BytesIO(content)) as zf:
+                names = zf.namelist()
+            zip_key = 'key-%d' % (len(self.zips) + 1)
+            self.zips[zip_key] = names
+            result = f'<ZipKey>{zip_key}</ZipKey>'
+        else:
+            names = self.zips[doc.find('.//{%s}trackId' % NS_WCF).text]
+            result = (
+                '<GetStatusZipResult xmlns:b="http://schemas.datacontract.org/2004/07/DianResponse">'
+                + ''.join(status_xml(n[:-4], not n.startswith('fvBAD'), self.processing)
+                          for n in names)
+                + '</GetStatusZipResult>'
+            )
+
+        response = (
+            '<s:Envelope xmlns:s="http://www.w3.org/2003/05/soap-envelope"><s:Body>'
+            f'<{action}Response xmlns="{NS_WCF}">{result}</{action}Response>'
+            '</s:Body></s:Envelope>'
+        ).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def client():
+    DianHandler.zips = {}
+    DianHandler.actions = []
+    DianHandler.processing = False
+    httpd = HTTPServer(('127.0.0.1', 0), DianHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    with open(P12_PATH, 'rb') as f:
+        client = DianSimpleClient(certificate_bytes=f.read(), certificate_password='')
+    client.endpoint = f'http://127.0.0.1:{httpd.server_port}/'
+    yield client
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    return DocumentTracker(str(tmp_path / 'tracking.json'))
+
+
+def documents(numbers, size=0):
+    return [BatchDocument(f'fv{n}.xml', xml_for(n, size), number=n) for n in numbers]
+
+
+class TestPlanBatches:
+    """Tests para la agrupacion de documentos en ZIP."""
+
+    def test_count_limit(self):
+        batches = plan_batches(documents(['SETP%d' % i for i in range(7)]),
+                               max_documents=3)
+
+        assert [len(b.documents) for b in batches] == [3, 3, 1]
+        assert [b.package.file_name for b in batches] == [
+            'lote0001.zip', 'lote0002.zip', 'lote0003.zip'
+        ]
+        with zipfile.ZipFile(io.BytesIO(batches[1].package.content)) as zf:
+            assert zf.namelist() == ['fvSETP3.xml', 'fvSETP4.xml', 'fvSETP5.xml']
+
+    @pytest.mark.parametrize('level', [0, 6])
+    def test_size_limit(self, level):
+        # Contenido aleatorio: practicamente no se comprime
+        batches = plan_batches(documents(['SETP%d' % i for i in range(10)], 1000),
+                               max_zip_bytes=3500, compression_level=level)
+
+        assert sum(len(b.documents) for b in batches) == 10
+        assert len(batches) > 1
+        assert all(len(b.package.content) <= 3500 for b in batches)
+
+    def test_document_too_large(self):
+        with pytest.raises(ValueError):
+            plan_batches(documents(['SETP1'], 5000), max_zip_bytes=1000)
+
+    def test_zip_name(self):
+        batch, = plan_batches(documents(['SETP1']), zip_name='z{:03d}.zip'.format)
+        assert batch.package.file_name == 'z001.zip'
+
+
+class TestMatchStatuses:
+    """Tests para la asociacion de estados por documento."""
+
+    def test_zip_level_status(self):
+        batch = DocumentBatch(ZipPackage('a.zip', b''), documents(['A', 'B']))
+        response = GetStatusZipResponse(
+            is_valid=False, status_code='99', status_description='ZIP invalido'
+        )
+
+        statuses = match_statuses(batch, response)
+        assert sorted(statuses) == [0, 1]
+        assert statuses[0].status_description == 'ZIP invalido'
+        assert match_statuses(batch, GetStatusZipResponse()) == {}
+
+    def test_processing_zip_is_not_final(self):
+        # DIAN responde IsValid false con StatusCode 98 mientras procesa
+        batch = DocumentBatch(ZipPackage('a.zip', b''), documents(['A', 'B']))
+        response = GetStatusZipResponse(
+            is_valid=False, status_code='98', status_description='En proceso de validacion.'
+        )
+
+        assert match_statuses(batch, response) == {}
+
+
+class TestZipBatchSender:
+    """Tests para ZipBatchSender contra un servidor local."""
+
+    def test_send_and_verify(self, client, tracker):
+        numbers = ['SETP1', 'SETP2', 'BAD3', 'SETP4', 'SETP5']
+        for n in numbers:
+            tracker.add_document(TrackedDocument('factura', n, 'cufe-' + n, '2024-01-15'))
+
+        sender = ZipBatchSender(client, tracker=tracker, max_documents=3)
+        batches = sender.send(documents(numbers))
+
+        assert [b.zip_key for b in batches] == ['key-1', 'key-2']
+        assert DianHandler.actions == ['SendBillAsync', 'SendBillAsync']
+        assert tracker.get_document('SETP4').zip_key == 'key-2'
+
+        statuses = sender.verify(batches)
+
+        assert DianHandler.actions[2:] == ['GetStatusZip', 'GetStatusZip']
+        assert len(statuses) == 5
+        assert statuses['fvBAD3.xml'].error_messages == ['Regla: FAD06, Rechazo']
+        assert tracker.get_document('SETP1').is_valid is True
+        assert tracker.get_document('SETP5').status_code == '00'
+        bad = tracker.get_document('BAD3')
+        assert bad.is_valid is False
+        assert bad.status_description == 'Documento con errores'
+        assert bad.zip_key == 'key-1'
+
+    def test_test_set_and_uuid_lookup(self, client, tracker):
+        tracker.add_document(TrackedDocument('factura', 'SETP1', 'cufe-1', '2024-01-15'))
+        sender = ZipBatchSender(client, tracker=tracker)
+
+        batches = sender.send(
+            [BatchDocument('fvSETP1.xml', xml_for('SETP1'), uuid='cufe-1')],
+            test_set_id='set-1',
+        )
+
+        assert DianHandler.actions == ['SendTestSetAsync']
+        assert tracker.get_document('SETP1').zip_key == batches[0].zip_key
+
+    def test_processing_documents_stay_pending(self, client, tracker):
+        DianHandler.processing = True
+        tracker.add_document(TrackedDocument('factura', 'SETP1', 'cufe-SETP1', '2024-01-15'))
+        sender = ZipBatchSender(client, tracker=tracker)
+        batches = sender.send(documents(['SETP1', 'SETP2']))
+
+        assert sender.verify(batches) == {}
+        assert tracker.get_document('SETP1').is_valid is None
+        # SETP2 no estaba en el tracker: se agrega con su ZipKey
+        assert [d.number for d in tracker.get_pending_documents()] == ['SETP1', 'SETP2']
+        assert tracker.get_document('SETP2').zip_key == batches[0].zip_key
+
+    def test_untracked_documents_are_added(self, client, tmp_path):
+        class CountingTracker(DocumentTracker):
+            writes = 0
+
+            def _write(self):
+                CountingTracker.writes += 1
+                super()._write()
+
+        tracker = CountingTracker(str(tmp_path / 'tracking.json'))
+        tracker.add_document(TrackedDocument('factura', 'SETP1', 'cufe-SETP1', '2024-01-15'))
+        CountingTracker.writes = 0
+        sender = ZipBatchSender(client, tracker=tracker)
+
+        batch, = sender.send(documents(['SETP1', 'SETP2', 'SETP3'])
+                             + [BatchDocument('sin-numero.xml', b'<x/>')])
+        assert CountingTracker.writes == 1
+        assert batch.untracked == ['sin-numero.xml']
+        assert [d.zip_key for d in tracker.get_invoices()] == ['key-1'] * 3
+
+        sender.verify([batch])
+        assert CountingTracker.writes == 2
+        assert tracker.get_document('SETP3').is_valid is True
+        assert batch.untracked == ['sin-numero.xml']
+
+    def test_send_error(self, tracker):
+        with open(P12_PATH, 'rb') as f:
+            client = DianSimpleClient(certificate_bytes=f.read(), certificate_password='')
+        client.endpoint = 'http://127.0.0.1:9/'
+        client.timeout = 1
+
+        batch, = ZipBatchSender(client, tracker=tracker).send(documents(['SETP1']))
+
+        assert batch.zip_key is None
+        assert batch.error
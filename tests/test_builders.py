@@ -1129,3 +1129,238 @@ class TestInvoiceBuilderMultipleTaxes:
         # Debe tener WithholdingTaxTotal
         wh_totals = xml.findall('.//{urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2}WithholdingTaxTotal')
         assert len(wh_totals) == 2  # ReteFte y ReteIVA
+
+
+# =============================================================================
+# TESTS DE FRAGMENTOS CACHEADOS
+# =============================================================================
+
+class TestFragmentCache:
+    """Tests para fragmentos XML precalculados por configuracion."""
+
+    STS = '{dian:gov:co:facturaelectronica:Structures-2-1}'
+
+    def test_repeated_builds_are_identical(self, sample_config, sample_invoice_data):
+        """Un builder reutilizado produce el mismo XML que uno nuevo."""
+        builder = InvoiceBuilder(sample_config)
+        builder.build(sample_invoice_data)
+        reused = etree.tostring(builder.build(sample_invoice_data))
+        fresh = etree.tostring(InvoiceBuilder(sample_config).build(sample_invoice_data))
+        assert reused == fresh
+
+    def test_fragments_are_independent_copies(self, sample_config, sample_invoice_data):
+        """Modificar un documento no altera los siguientes."""
+        builder = InvoiceBuilder(sample_config)
+        first = builder.build(sample_invoice_data)
+        first.find('.//%sInvoiceAuthorization' % self.STS).text = 'MODIFICADO'
+
+        second = builder.build(sample_invoice_data)
+        assert second.find('.//%sInvoiceAuthorization' % self.STS).text == '18760000001'
+
+    def test_config_change_invalidates(self, sample_config, sample_invoice_data):
+        """Cambiar la configuracion en sitio invalida los fragmentos."""
+        builder = InvoiceBuilder(sample_config)
+        builder.build(sample_invoice_data)
+
+        sample_config.resolution_number = '18760000002'
+        sample_config.software_id = 'otro-software'
+        xml = builder.build(sample_invoice_data)
+
+        assert xml.find('.//%sInvoiceAuthorization' % self.STS).text == '18760000002'
+        assert xml.find('.//%sSoftwareID' % self.STS).text == 'otro-software'
+
+    def test_supplier_change_rebuilds_fragment(self, sample_config, sample_invoice_data):
+        """Un proveedor distinto genera su propio fragmento."""
+        builder = InvoiceBuilder(sample_config)
+        builder.build(sample_invoice_data)
+
+        sample_invoice_data.supplier.name = 'OTRO NOMBRE'
+        xml = builder.build(sample_invoice_data)
+
+        cac = '{urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2}'
+        cbc = '{urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2}'
+        name = xml.find(f'{cac}AccountingSupplierParty/{cac}Party/{cac}PartyName/{cbc}Name')
+        assert name.text == 'OTRO NOMBRE'
+
+
+    def test_supplier_cache_is_bounded(self, sample_config, sample_invoice_data):
+        """Los proveedores se guardan en un LRU acotado."""
+        builder = InvoiceBuilder(sample_config, supplier_cache_size=2)
+        for name in ['EMISOR A', 'EMISOR B', 'EMISOR C']:
+            sample_invoice_data.supplier.name = name
+            builder.build(sample_invoice_data)
+
+        assert len(builder.supplier_cache) == 2
+        assert builder.supplier_cache.stats()['misses'] == 3
+
+
+class TestCustomerCache:
+    """Tests para la cache LRU de clientes."""
+
+    def test_hits_and_misses(self, sample_config, sample_invoice_data):
+        """Clientes recurrentes se sirven desde la cache."""
+        builder = InvoiceBuilder(sample_config)
+        builder.build(sample_invoice_data)
+        builder.build(sample_invoice_data)
+        builder.build(sample_invoice_data)
+
+        stats = builder.customer_cache.stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 2
+        assert stats['size'] == 1
+
+    def test_lru_eviction(self, sample_config, sample_invoice_data):
+        """Se respeta el tamano maximo configurado."""
+        builder = InvoiceBuilder(sample_config, customer_cache_size=2)
+        for nit in ['111', '222', '333']:
+            sample_invoice_data.customer.nit = nit
+            builder.build(sample_invoice_data)
+
+        assert len(builder.customer_cache) == 2
+        sample_invoice_data.customer.nit = '111'
+        builder.build(sample_invoice_data)
+        assert builder.customer_cache.hits == 0
+
+    def test_cached_customer_matches_fresh(self, sample_config, sample_invoice_data):
+        """El XML con cache es identico al XML sin cache."""
+        cached = InvoiceBuilder(sample_config)
+        cached.build(sample_invoice_data)
+        uncached = InvoiceBuilder(sample_config, customer_cache_size=0)
+
+        assert etree.tostring(cached.build(sample_invoice_data)) == \
+            etree.tostring(uncached.build(sample_invoice_data))
+        assert len(uncached.customer_cache) == 0
+
+    def test_customer_change_is_detected(self, sample_config, sample_invoice_data):
+        """Modificar el cliente produce una entrada nueva."""
+        builder = InvoiceBuilder(sample_config)
+        builder.build(sample_invoice_data)
+        sample_invoice_data.customer.email = 'nuevo@test.com'
+        xml = builder.build(sample_invoice_data)
+
+        cbc = '{urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2}'
+        assert xml.find(f'.//{cbc}ElectronicMail[.="nuevo@test.com"]') is not None
+        assert builder.customer_cache.misses == 2
+
+    def test_notes_use_customer_cache(self, sample_config, sample_supplier, sample_customer, sample_lines):
+        """Las notas credito y debito comparten el mecanismo de cache."""
+        data = CreditNoteData(
+            number='NC990000001',
+            issue_date='2024-01-15',
+            issue_time='10:30:00-05:00',
+            supplier=sample_supplier,
+            customer=sample_customer,
+            lines=sample_lines,
+            billing_reference_id='SETP990000001',
+            billing_reference_uuid='a' * 96,
+            billing_reference_date='2024-01-10',
+        )
+        builder = CreditNoteBuilder(sample_config, customer_cache_size=10)
+        builder.build(data, validate=False)
+        builder.build(data, validate=False)
+        assert builder.customer_cache.stats()['hits'] == 1
+
+
+# =============================================================================
+# TESTS DEL NUCLEO COMUN DE EMISION
+# =============================================================================
+
+class TestDocumentCore:
+    """Tests para DocumentSpec y el calculo de totales en una pasada."""
+
+    def test_totals_match_legacy_functions(self):
+        """compute_document_totals coincide con las funciones de taxes."""
+        from facho.fe.builders.document_core import compute_document_totals
+
+        lines = [
+            InvoiceLine(
+                description='Item', quantity=3, unit_code='94', unit_price=1234.567,
+                taxes=[Tax.iva_19(3703.7), Tax.inc_8(3703.7), Tax.rete_fte(2.5, 3703.7)]
+            )
+            for i in range(1, 4)
+        ]
+        totals = compute_document_totals(lines)
+
+        all_taxes = [t for line in lines for t in line.taxes]
+        impuestos, retenciones = separar_impuestos_retenciones(all_taxes)
+        legacy = calcular_totales_impuestos(impuestos)
+
+        assert totals.subtotal == truncar(sum(l.get_line_total() for l in lines))
+        assert totals.tax_amounts == legacy
+        assert totals.total_impuestos == truncar(sum(legacy.values()))
+        assert set(totals.impuestos) == set(agrupar_impuestos(impuestos))
+        assert set(totals.retenciones) == set(agrupar_impuestos(retenciones))
+        assert totals.total == truncar(totals.subtotal + totals.total_impuestos)
+
+    def test_builders_declare_spec(self):
+        """Cada builder declara su especificacion."""
+        from facho.fe.builders import (
+            DocumentSpec,
+            SupportDocumentBuilder,
+            ExportInvoiceBuilder,
+            ContingencyInvoiceBuilder,
+            PosDocumentBuilder,
+        )
+        builders = [
+            InvoiceBuilder, CreditNoteBuilder, DebitNoteBuilder,
+            SupportDocumentBuilder, ExportInvoiceBuilder,
+            ContingencyInvoiceBuilder, PosDocumentBuilder,
+        ]
+        for cls in builders:
+            assert isinstance(cls.SPEC, DocumentSpec)
+            for step in cls.SPEC.steps:
+                assert hasattr(cls, '_emit_' + step), (cls, step)
+
+    def test_debit_note_spec_elements(self, sample_config, sample_supplier, sample_customer, sample_lines):
+        """La nota debito usa RequestedMonetaryTotal y DebitedQuantity."""
+        data = DebitNoteData(
+            number='SETP990000003',
+            issue_date='2024-01-17',
+            issue_time='12:00:00-05:00',
+            supplier=sample_supplier,
+            customer=sample_customer,
+            lines=sample_lines,
+            billing_reference_id='SETP990000001',
+            billing_reference_uuid='a' * 96,
+            billing_reference_date='2024-01-15',
+        )
+        xml = DebitNoteBuilder(sample_config).build(data, validate=False)
+
+        cac = '{urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2}'
+        cbc = '{urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2}'
+        total = xml.find(f'{cac}RequestedMonetaryTotal')
+        assert total is not None
+        assert total.find(f'{cbc}PrepaidAmount') is None
+        assert xml.find(f'{cac}LegalMonetaryTotal') is None
+        assert xml.find(f'{cac}DebitNoteLine/{cbc}DebitedQuantity') is not None
+
+    def test_credit_note_multiple_taxes(self, sample_config, sample_supplier, sample_customer):
+        """Las notas emiten todos los impuestos y retenciones de sus lineas."""
+        lines = [
+            InvoiceLine(
+                description='Item', quantity=1, unit_code='94', unit_price=10000,
+                taxes=[Tax.iva_19(10000), Tax.inc_8(10000), Tax.rete_fte(2.5, 10000)]
+            )
+        ]
+        data = CreditNoteData(
+            number='SETP990000002',
+            issue_date='2024-01-16',
+            issue_time='11:00:00-05:00',
+            supplier=sample_supplier,
+            customer=sample_customer,
+            lines=lines,
+            billing_reference_id='SETP990000001',
+            billing_reference_uuid='a' * 96,
+            billing_reference_date='2024-01-15',
+        )
+        xml = CreditNoteBuilder(sample_config).build(data, validate=False)
+
+        cac = '{urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2}'
+        cbc = '{urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2}'
+        codes = [
+            el.text for el in xml.findall(f'{cac}TaxTotal/{cac}TaxSubtotal/{cac}TaxCategory/{cac}TaxScheme/{cbc}ID')
+        ]
+        assert codes == ['01', '04']
+        assert xml.find(f'{cac}WithholdingTaxTotal') is not None
+        assert xml.find(f'{cac}RequestedMonetaryTotal') is None
+        assert xml.find(f'{cac}LegalMonetaryTotal/{cbc}PayableAmount').text == '12700.00'
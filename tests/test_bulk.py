@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para la construccion masiva de facturas.
+"""
+
+import io
+import json
+import os
+import zipfile
+
+import pytest
+from lxml import etree
+
+from facho.fe.builders.invoice_builder import (
+    InvoiceBuilder,
+    InvoiceConfig,
+    Party,
+    Address,
+)
+from facho.fe.builders.bulk import (
+    BulkInvoiceFactory,
+    group_rows,
+    parse_taxes,
+    read_csv_rows,
+    rows_to_invoice_data,
+)
+from facho.fe.builders.exceptions import BulkInputError
+
+
+P12_PATH = os.path.join(os.path.dirname(__file__), 'example.p12')
+
+HEADER_COLUMNS = (
+    'number,issue_date,issue_time,customer_nit,customer_name,'
+    'customer_organization_code,customer_tax_level_code,customer_scheme_name,'
+    'customer_email,customer_city_code,customer_city_name,customer_postal_zone,'
+    'customer_country_subentity,customer_country_subentity_code,'
+    'customer_address_line'
+)
+CUSTOMER_VALUES = (
+    '2024-01-15,10:30:00-05:00,{nit},CLIENTE {nit},2,R-99-PN,13,'
+    'c@test.com,68081,Bucaramanga,680001,Santander,68,Calle 1'
+)
+
+HEADERS_CSV = HEADER_COLUMNS + '\n' + '\n'.join(
+    f'SETP99000000{i},' + CUSTOMER_VALUES.format(nit=1000 + i)
+    for i in range(1, 4)
+) + '\n'
+
+LINES_CSV = """number,description,quantity,unit_code,unit_price,tax_percent,taxes
+SETP990000001,Producto A,2,94,50000,19,
+SETP990000001,Producto B,1,94,10000,,01:5;04:8
+SETP990000002,Producto C,1,94,20000,19,
+SETP990000003,Producto D,3,94,1000,0,
+"""
+
+
+@pytest.fixture
+def config():
+    return InvoiceConfig(
+        software_id='1e3fa8f4-1a91-4028-9293-a9817406100f',
+        software_pin='12345',
+        technical_key='fc8eac422eba16e22ffd8c6f94b3f40a6e38162c',
+        nit='1001186599',
+        company_name='EMPRESA DE PRUEBA',
+        resolution_number='18760000001',
+        resolution_date='2019-01-19',
+        resolution_end_date='2030-01-19',
+        prefix='SETP',
+        range_from='990000000',
+        range_to='995000000',
+    )
+
+
+@pytest.fixture
+def supplier():
+    return Party(
+        nit='1001186599',
+        name='EMPRESA DE PRUEBA',
+        legal_name='EMPRESA DE PRUEBA S.A.S',
+        organization_code='1',
+        tax_level_code='R-99-PN',
+        address=Address(
+            city_code='68081',
+            city_name='Bucaramanga',
+            postal_zone='680001',
+            country_subentity='Santander',
+            country_subentity_code='68',
+            address_line='Calle 123 # 45-67',
+        ),
+        email='empresa@test.com',
+    )
+
+
+def csv_sources():
+    return io.StringIO(HEADERS_CSV), io.StringIO(LINES_CSV)
+
+
+class TestGroupRows:
+    """Tests para la agrupacion de filas por documento."""
+
+    def test_merge_headers_and_lines(self):
+        headers, lines = csv_sources()
+        groups = list(group_rows(read_csv_rows(headers), read_csv_rows(lines)))
+
+        assert [h['number'] for h, _ in groups] == [
+            'SETP990000001', 'SETP990000002', 'SETP990000003'
+        ]
+        assert [len(l) for _, l in groups] == [2, 1, 1]
+
+    def test_denormalized_rows(self):
+        rows = [
+            {'number': 'A', 'description': 'x'},
+            {'number': 'A', 'description': 'y'},
+            {'number': 'B', 'description': 'z'},
+        ]
+        groups = list(group_rows(rows))
+        assert [(h['number'], len(l)) for h, l in groups] == [('A', 2), ('B', 1)]
+
+    def test_embedded_lines(self):
+        rows = [{'number': 'A', 'lines': [{'description': 'x'}]}]
+        groups = list(group_rows(rows))
+        assert groups[0][1] == [{'description': 'x'}]
+
+    def test_lines_out_of_order(self):
+        headers = [{'number': 'A'}, {'number': 'B'}]
+        lines = [{'number': 'B'}, {'number': 'A'}]
+        with pytest.raises(BulkInputError):
+            list(group_rows(headers, lines))
+
+    def test_orphan_lines(self):
+        headers = [{'number': 'A'}]
+        lines = [{'number': 'A'}, {'number': 'Z'}]
+        with pytest.raises(BulkInputError) as exc:
+            list(group_rows(headers, lines))
+        assert exc.value.document_number == 'Z'
+
+
+class TestRowConversion:
+    """Tests para la conversion de filas a datos de factura."""
+
+    def test_parse_taxes(self):
+        taxes = parse_taxes('01:19;06:2.5', 1000.0)
+        assert [t.code for t in taxes] == ['01', '06']
+        assert taxes[0].amount == 190.0
+        assert taxes[1].is_withholding
+
+    def test_rows_to_invoice_data(self, supplier):
+        headers, lines = csv_sources()
+        header, line_rows = next(
+            group_rows(read_csv_rows(headers), read_csv_rows(lines))
+        )
+        data = rows_to_invoice_data(header, line_rows, supplier)
+
+        assert data.customer.nit == '1001'
+        assert data.customer.legal_name == 'CLIENTE 1001'
+        assert data.customer.address.city_code == '68081'
+        assert data.lines[0].quantity == 2.0
+        assert [t.code for t in data.lines[1].taxes] == ['01', '04']
+
+
+class TestBulkInvoiceFactory:
+    """Tests para BulkInvoiceFactory."""
+
+    def test_build_csv_matches_builder(self, config, supplier):
+        headers, lines = csv_sources()
+        factory = BulkInvoiceFactory(config, supplier)
+        results = list(factory.build_csv(headers, lines))
+
+        assert [r.ok for r in results] == [True, True, True]
+        assert all(len(r.uuid) == 96 for r in results)
+
+        headers, lines = csv_sources()
+        header, line_rows = next(
+            group_rows(read_csv_rows(headers), read_csv_rows(lines))
+        )
+        expected = InvoiceBuilder(config).build(
+            rows_to_invoice_data(header, line_rows, supplier)
+        )
+        assert results[0].xml == etree.tostring(
+            expected, encoding='UTF-8', xml_declaration=True
+        )
+
+    def test_build_jsonl(self, config, supplier, tmp_path):
+        path = tmp_path / 'facturas.jsonl'
+        header = dict(zip(
+            HEADER_COLUMNS.split(','),
+            ('SETP990000001,' + CUSTOMER_VALUES.format(nit=1001)).split(',')
+        ))
+        header['lines'] = [
+            {'description': 'Item', 'quantity': 1, 'unit_price': 1000,
+             'taxes': [{'code': '01', 'percent': 19}]},
+        ]
+        path.write_text(json.dumps(header) + '\n')
+
+        results = list(BulkInvoiceFactory(config, supplier).build_jsonl(str(path)))
+        assert len(results) == 1
+        assert results[0].ok
+
+    def test_invalid_row_reports_error(self, config, supplier):
+        headers, _ = csv_sources()
+        lines = io.StringIO(LINES_CSV.replace('Producto C,1,', 'Producto C,abc,'))
+        results = list(BulkInvoiceFactory(config, supplier).build_csv(headers, lines))
+
+        assert [r.ok for r in results] == [True, False, True]
+        assert 'quantity' in results[1].error
+
+    def test_process_pool_keeps_order(self, config, supplier):
+        headers, lines = csv_sources()
+        factory = BulkInvoiceFactory(config, supplier, jobs=2, max_pending=2)
+        results = list(factory.build_csv(headers, lines))
+
+        assert [r.number for r in results] == [
+            'SETP990000001', 'SETP990000002', 'SETP990000003'
+        ]
+        assert all(r.ok for r in results)
+
+    def test_signed_and_zipped(self, config, supplier):
+        headers, lines = csv_sources()
+        with open(P12_PATH, 'rb') as f:
+            pkcs12 = f.read()
+        factory = BulkInvoiceFactory(
+            config, supplier, pkcs12=pkcs12, password='', zip_output=True
+        )
+        result = next(iter(factory.build_csv(headers, lines)))
+
+        assert result.zip_name == 'fvSETP990000001.zip'
+        with zipfile.ZipFile(io.BytesIO(result.zip_content)) as zf:
+            assert zf.namelist() == ['fvSETP990000001.xml']
+            assert zf.read('fvSETP990000001.xml') == result.xml
+        assert b'SignatureValue' in result.xml
+
+    def test_invalid_jobs(self, config, supplier):
+        with pytest.raises(ValueError):
+            BulkInvoiceFactory(config, supplier, jobs=0)
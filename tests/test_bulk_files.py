@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para las operaciones masivas sobre archivos.
+"""
+
+import os
+
+import pytest
+from lxml import etree
+
+from facho.fe.builders.bulk import DocumentProcessor
+from facho.fe.builders.invoice_builder import Address, InvoiceConfig, Party
+from facho.fe.bulk_files import (
+    check_statuses, iter_files, pending_track_ids, send_files, sign_files,
+)
+from facho.fe.client.dian_simple import DocumentStatus, GetStatusZipResponse
+from facho.fe.client.tracker import DocumentTracker, TrackedDocument
+from facho.fe.signing import XAdESSigner
+
+
+P12_PATH = os.path.join(os.path.dirname(__file__), 'example.p12')
+
+with open(P12_PATH, 'rb') as f:
+    P12_DATA = f.read()
+
+CONFIG = InvoiceConfig(
+    software_id='1e3fa8f4-1a91-4028-9293-a9817406100f',
+    software_pin='12345',
+    technical_key='fc8eac422eba16e22ffd8c6f94b3f40a6e38162c',
+    nit='1001186599',
+    company_name='EMPRESA DE PRUEBA',
+    resolution_number='18760000001',
+    resolution_date='2019-01-19',
+    resolution_end_date='2030-01-19',
+    prefix='SETP',
+    range_from='990000000',
+    range_to='995000000',
+)
+
+ADDRESS = Address(
+    city_code='68081',
+    city_name='Bucaramanga',
+    postal_zone='680001',
+    country_subentity='Santander',
+    country_subentity_code='68',
+    address_line='Calle 123 # 45-67',
+)
+
+SUPPLIER = Party(
+    nit='1001186599',
+    name='EMPRESA DE PRUEBA',
+    legal_name='EMPRESA DE PRUEBA S.A.S',
+    organization_code='1',
+    tax_level_code='R-99-PN',
+    address=ADDRESS,
+    email='empresa@test.com',
+)
+
+
+def header(number):
+    return {
+        'number': number,
+        'issue_date': '2024-01-15',
+        'issue_time': '10:30:00-05:00',
+        'customer_nit': '1001',
+        'customer_name': 'CLIENTE 1001',
+        'customer_organization_code': '2',
+        'customer_tax_level_code': 'R-99-PN',
+        'customer_city_code': '68081',
+        'customer_city_name': 'Bucaramanga',
+        'customer_postal_zone': '680001',
+        'customer_country_subentity': 'Santander',
+        'customer_country_subentity_code': '68',
+        'customer_address_line': 'Calle 1',
+    }
+
+
+LINES = [{'description': 'Producto A', 'quantity': 2, 'unit_price': 50000}]
+
+
+def write_documents(directory, numbers, pkcs12=None, zip_output=False):
+    processor = DocumentProcessor(CONFIG, pkcs12=pkcs12, password='', zip_output=zip_output)
+    os.makedirs(directory, exist_ok=True)
+    for number in numbers:
+        result = processor.process_rows(header(number), LINES, SUPPLIER)
+        if zip_output:
+            with open(os.path.join(directory, result.zip_name), 'wb') as f:
+                f.write(result.zip_content)
+        else:
+            with open(os.path.join(directory, f'fv{number}.xml'), 'wb') as f:
+                f.write(result.xml)
+
+
+class TestIterFiles:
+
+    def test_directories_globs_and_lists(self, tmp_path):
+        for name in ('a/2.xml', 'a/b/1.xml', 'a/nota.txt', 'c.xml'):
+            path = tmp_path / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text('<x/>')
+        listing = tmp_path / 'lista.txt'
+        listing.write_text(f"{tmp_path / 'c.xml'}\n\n# comentario\n")
+
+        files = list(iter_files([str(tmp_path / 'a'), str(tmp_path / '*.xml'),
+                                 '@' + str(listing)], ('.xml',)))
+
+        assert [name for _, name in files] == ['2.xml', os.path.join('b', '1.xml'),
+                                               'c.xml', 'c.xml']
+        with pytest.raises(FileNotFoundError):
+            list(iter_files([str(tmp_path / 'no-existe')], ('.xml',)))
+
+
+class TestSignFiles:
+
+    def test_sign_in_process_pool_and_resume(self, tmp_path):
+        numbers = [f'SETP99000000{n}' for n in range(1, 5)]
+        write_documents(str(tmp_path / 'in'), numbers)
+        (tmp_path / 'in' / 'roto.xml').write_text('<Invoice')
+        output = str(tmp_path / 'out')
+
+        files = iter_files([str(tmp_path / 'in')], ('.xml',))
+        results = list(sign_files(files, P12_DATA, '', output, jobs=2))
+
+        assert [r['status'] for r in results] == ['signed'] * 4 + ['failed']
+        signer = XAdESSigner.from_pkcs12(P12_PATH, '')
+        assert signer.verify(etree.parse(results[0]['output']).getroot())
+
+        again = sign_files(iter_files([str(tmp_path / 'in')], ('.xml',)), P12_DATA, '', output)
+        assert [r['status'] for r in again] == ['skipped'] * 4 + ['failed']
+
+
+class TestSendFiles:
+
+    def test_send_with_tracker_resume_and_status(self, tmp_path, client, emulator):
+        numbers = [f'SETP99000000{n}' for n in range(1, 4)]
+        write_documents(str(tmp_path / 'zips'), numbers, pkcs12=P12_DATA, zip_output=True)
+        tracker = DocumentTracker(str(tmp_path / 'tracking.json'))
+
+        def send():
+            files = iter_files([str(tmp_path / 'zips')], ('.zip',))
+            return list(send_files(files, client, jobs=3, tracker=tracker))
+
+        first = send()
+        assert [r['status'] for r in first] == ['sent'] * 3
+        assert [r['number'] for r in first] == numbers
+        assert tracker.get_document('SETP990000002').zip_key == first[1]['zip_key']
+
+        assert [r['status'] for r in send()] == ['skipped'] * 3
+        assert emulator.stats['SendBillAsync'] == 3
+
+        statuses = list(check_statuses([r['zip_key'] for r in first] + ['desconocido'],
+                                       client, jobs=2, tracker=tracker))
+        assert [s['status_code'] for s in statuses] == ['00', '00', '00', '66']
+        assert statuses[0]['number'] == 'SETP990000001'
+        assert tracker.get_pending_documents() == []
+        assert tracker.get_document('SETP990000003').is_valid is True
+
+    def test_status_per_document_and_processing(self, tmp_path):
+        tracker = DocumentTracker(str(tmp_path / 'tracking.json'))
+        for number, zip_key in (('SETP1', 'zk-1'), ('SETP2', 'zk-2'), ('SETP3', 'zk-2')):
+            tracker.add_document(TrackedDocument(
+                'factura', number, f'cufe-{number}', '2024-01-15', zip_key=zip_key))
+
+        class Client:
+            responses = {
+                # En proceso: DIAN responde IsValid false con 98
+                'zk-1': GetStatusZipResponse(is_valid=False, status_code='98'),
+                'zk-2': GetStatusZipResponse(is_valid=True, status_code='00', documents=[
+                    DocumentStatus(document_key='cufe-SETP2', is_valid=True, status_code='00'),
+                    DocumentStatus(document_key='cufe-SETP3', is_valid=False, status_code='99'),
+                ]),
+            }
+
+            def get_status_zip(self, track_id):
+                return self.responses[track_id]
+
+        statuses = list(check_statuses(['zk-1', 'zk-2'], Client(), tracker=tracker))
+
+        assert statuses[1]['numbers'] == ['SETP2', 'SETP3']
+        assert tracker.get_document('SETP1').is_valid is None
+        assert list(pending_track_ids(tracker)) == ['zk-1']
+        assert tracker.get_document('SETP2').is_valid is True
+        assert (tracker.get_document('SETP3').is_valid,
+                tracker.get_document('SETP3').status_code) == (False, '99')
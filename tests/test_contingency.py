@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para el controlador de contingencia.
+"""
+
+import threading
+
+import pytest
+
+from facho.fe.client.outbox import DocumentOutbox, OutboxWorker
+from facho.fe.client.resilience import DianCallGuard, ResilienceConfig
+from facho.fe.contingency import ContingencyController
+
+
+# DIAN caida: todas las solicitudes al emulador fallan
+pytestmark = pytest.mark.emulator(error_rate=1.0)
+
+
+@pytest.fixture
+def guard():
+    return DianCallGuard(ResilienceConfig(failure_threshold=2, reset_timeout=60,
+                                          upload_rate=1000, upload_burst=1000,
+                                          status_rate=1000, status_burst=1000))
+
+
+@pytest.fixture
+def client_options(guard):
+    return {'call_guard': guard}
+
+
+@pytest.fixture
+def outbox_path(tmp_path):
+    return str(tmp_path / 'outbox.sqlite3')
+
+
+WORKER_OPTIONS = {'retry_delay': 0, 'poll_interval': 0}
+
+
+class TestContingencyController:
+
+    def test_outage_buffer_and_replay(self, emulator, guard, client, outbox_path, signed_zip):
+        outbox = DocumentOutbox(outbox_path)
+        changes, reports = [], []
+        controller = ContingencyController(
+            outbox, client, guard, replay_jobs=4, progress_interval=0.01,
+            on_mode_change=lambda *c: changes.append(c), on_progress=reports.append,
+            worker_options=WORKER_OPTIONS,
+        )
+
+        # DIAN caida: dos envios fallidos abren el circuito
+        for n in range(2):
+            controller.submit(f'cufe-{n}', f'z{n}.zip', signed_zip(f'cufe-{n}'))
+        OutboxWorker(outbox, client, **WORKER_OPTIONS).run_once()
+        assert controller.in_contingency
+        assert controller.status['reason'] == 'Circuito upload abierto'
+
+        for n in range(2, 30):
+            controller.submit(f'cufe-{n}', f'z{n}.zip', signed_zip(f'cufe-{n}'))
+        assert controller.probe() is False
+
+        emulator.config.error_rate = 0.0
+        assert controller.probe() is True
+        progress = controller.replay()
+
+        assert controller.mode == 'normal'
+        assert changes == [('normal', 'contingency'), ('contingency', 'replaying'),
+                           ('replaying', 'normal')]
+        assert (progress.total, progress.remaining, progress.failed) == (30, 0, 0)
+        assert progress.on_track
+        assert reports[-1] is progress
+        assert outbox.counts() == {'uploaded': 30}
+
+    def test_mode_survives_restart(self, guard, client, outbox_path):
+        ContingencyController(DocumentOutbox(outbox_path), client, guard).enter('Corte de red')
+
+        restarted = ContingencyController(DocumentOutbox(outbox_path), client)
+
+        assert restarted.in_contingency
+        assert restarted.status['reason'] == 'Corte de red'
+
+    def test_interrupted_replay_keeps_deadline(self, emulator, client, outbox_path, signed_zip):
+        emulator.config.error_rate = 0.0
+        outbox = DocumentOutbox(outbox_path)
+        controller = ContingencyController(outbox, client, deadline_hours=1)
+        controller.enter()
+        outbox.enqueue('cufe-1', 'z1.zip', signed_zip('cufe-1'))
+        stop = threading.Event()
+        stop.set()
+
+        first = controller.replay(stop)
+        restarted = ContingencyController(DocumentOutbox(outbox_path), client,
+                                          worker_options=WORKER_OPTIONS)
+        second = restarted.replay()
+
+        assert first.remaining == 1 and restarted.mode == 'normal'
+        assert second.deadline_at == first.deadline_at
+        assert second.deadline_at - second.started_at <= 3600
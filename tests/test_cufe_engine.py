@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests de propiedades para el motor unico de CUFE/CUDE/CUDS.
+
+Los casos se generan con una semilla fija: cada propiedad se verifica
+sobre cientos de documentos aleatorios pero reproducibles.
+"""
+
+import hashlib
+import random
+from decimal import Decimal
+
+import pytest
+
+import dian_fe.utils
+from facho.fe.builders.cufe import (
+    CufeBatch,
+    CufeInput,
+    calculate_cude,
+    calculate_cufe,
+    calculate_cufe_from_taxes,
+    calculate_software_security_code,
+    compute_uuid,
+    format_amount,
+    uuid_string,
+)
+from facho.fe.builders.taxes import truncar
+from facho.fe.client import dian_simple
+
+
+CASES = 500
+
+
+def legacy_string(numero, fecha, hora, subtotal, iva, inc, ica, total,
+                  nit_emisor, nit_adquiriente, clave, ambiente):
+    """Cadena tal como la armaban las funciones calcular_* originales."""
+    return (
+        f"{numero}{fecha}{hora}"
+        f"{subtotal:.2f}01{iva:.2f}04{inc:.2f}03{ica:.2f}"
+        f"{total:.2f}{nit_emisor}{nit_adquiriente}"
+        f"{clave}{ambiente}"
+    )
+
+
+def sha384(text):
+    return hashlib.sha384(text.encode('utf-8')).hexdigest()
+
+
+def random_amount(rng, decimals=2):
+    """Monto no negativo con el numero de decimales indicado."""
+    return rng.randint(0, 10 ** 11) / 10 ** decimals
+
+
+def random_document(rng, decimals=2):
+    subtotal = random_amount(rng, decimals)
+    return CufeInput(
+        number='%s%d' % (rng.choice(['SETP', 'NC', 'ND', 'FE', '']),
+                         rng.randint(1, 10 ** 10)),
+        issue_date='20%02d-%02d-%02d' % (
+            rng.randint(19, 30), rng.randint(1, 12), rng.randint(1, 28)),
+        issue_time='%02d:%02d:%02d-05:00' % (
+            rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59)),
+        subtotal=subtotal,
+        iva_amount=random_amount(rng, decimals),
+        inc_amount=random_amount(rng, decimals) if rng.random() < 0.5 else 0.0,
+        ica_amount=random_amount(rng, decimals) if rng.random() < 0.3 else 0.0,
+        total=random_amount(rng, decimals),
+        supplier_nit=str(rng.randint(800000000, 999999999)),
+        customer_nit=rng.choice(['222222222222', str(rng.randint(1, 10 ** 10))]),
+        technical_key='%040x' % rng.getrandbits(160),
+        environment=rng.choice(['1', '2']),
+    )
+
+
+def documents(seed, decimals=2, count=CASES):
+    rng = random.Random(seed)
+    return [random_document(rng, decimals) for _ in range(count)]
+
+
+def row_of(doc):
+    """Componentes de la cadena en el orden de uuid_string."""
+    return (doc.number, doc.issue_date, doc.issue_time, doc.subtotal,
+            doc.iva_amount, doc.inc_amount, doc.ica_amount, doc.total,
+            doc.supplier_nit, doc.customer_nit, doc.technical_key,
+            doc.environment)
+
+
+def taxes_of(doc):
+    return {'01': doc.iva_amount, '04': doc.inc_amount, '03': doc.ica_amount}
+
+
+class TestEntryPointsAgree:
+    """Todas las entradas publicas producen el mismo codigo."""
+
+    def test_cufe_with_all_taxes(self):
+        for doc in documents(1):
+            expected = calculate_cufe(doc)
+            assert calculate_cufe_from_taxes(
+                doc.number, doc.issue_date, doc.issue_time, doc.subtotal,
+                taxes_of(doc), doc.total, doc.supplier_nit, doc.customer_nit,
+                doc.technical_key, doc.environment,
+            ) == expected
+            # Las funciones calcular_* formatean con ':.2f' (sin truncar)
+            legacy = compute_uuid(*row_of(doc), truncate=False)
+            assert dian_simple.calcular_cufe_flexible(
+                doc.number, doc.issue_date, doc.issue_time, doc.subtotal,
+                taxes_of(doc), doc.total, doc.supplier_nit, doc.customer_nit,
+                doc.technical_key, doc.environment,
+            ) == legacy
+            assert dian_simple.calcular_cude_flexible(
+                doc.number, doc.issue_date, doc.issue_time, doc.subtotal,
+                taxes_of(doc), doc.total, doc.supplier_nit, doc.customer_nit,
+                doc.technical_key, doc.environment,
+            ) == legacy
+
+    def test_iva_only_entry_points(self):
+        """calcular_cufe/calcular_cude (dian_simple y dian_fe) solo usan IVA."""
+        for doc in documents(2):
+            doc.inc_amount = doc.ica_amount = 0.0
+            args = (
+                doc.number, doc.issue_date, doc.issue_time, doc.subtotal,
+                doc.iva_amount, doc.total, doc.supplier_nit, doc.customer_nit,
+                doc.technical_key, doc.environment,
+            )
+            expected = compute_uuid(*row_of(doc), truncate=False)
+            assert dian_simple.calcular_cufe(*args) == expected
+            assert dian_simple.calcular_cude(*args) == expected
+            assert dian_fe.utils.calcular_cufe(*args) == expected
+            assert dian_fe.utils.calcular_cude(*args) == expected
+
+    def test_cude_with_software_pin(self):
+        for doc in documents(3):
+            pin = doc.technical_key[:5]
+            row = row_of(doc)[:-2] + (pin, doc.environment)
+            assert calculate_cude(doc, pin) == compute_uuid(*row)
+            assert dian_simple.calcular_cude_flexible(
+                doc.number, doc.issue_date, doc.issue_time, doc.subtotal,
+                taxes_of(doc), doc.total, doc.supplier_nit, doc.customer_nit,
+                pin, doc.environment,
+            ) == compute_uuid(*row, truncate=False)
+
+    def test_batch(self):
+        docs = documents(4)
+        assert CufeBatch().compute(docs) == [calculate_cufe(d) for d in docs]
+
+    def test_software_security_code(self):
+        rng = random.Random(5)
+        for _ in range(CASES):
+            args = ('%032x' % rng.getrandbits(128), str(rng.randint(1, 99999)),
+                    'SETP%d' % rng.randint(1, 10 ** 9))
+            expected = calculate_software_security_code(*args)
+            assert dian_simple.calcular_software_security_code(*args) == expected
+            assert dian_fe.utils.calcular_software_security_code(*args) == expected
+            assert expected == sha384(''.join(args))
+
+
+class TestLegacyOutputPreserved:
+    """Las funciones calcular_* conservan su formato ':.2f' original."""
+
+    @pytest.mark.parametrize('decimals', [2, 3, 6])
+    def test_calcular_matches_original_formula(self, decimals):
+        for doc in documents(10 + decimals, decimals):
+            original = sha384(legacy_string(
+                doc.number, doc.issue_date, doc.issue_time, doc.subtotal,
+                doc.iva_amount, doc.inc_amount, doc.ica_amount, doc.total,
+                doc.supplier_nit, doc.customer_nit, doc.technical_key,
+                doc.environment,
+            ))
+            assert dian_simple.calcular_cufe_flexible(
+                doc.number, doc.issue_date, doc.issue_time, doc.subtotal,
+                taxes_of(doc), doc.total, doc.supplier_nit, doc.customer_nit,
+                doc.technical_key, doc.environment,
+            ) == original
+
+    def test_truncate_flag(self):
+        args = ('F1', '2024-01-15', '10:30:00-05:00', 100.999, 0, 0, 0,
+                100.999, '900373076', '222222222222', 'clave', '2')
+        assert '100.9901' in uuid_string(*args)
+        assert '101.0001' in uuid_string(*args, truncate=False)
+        assert compute_uuid(*args) == sha384(uuid_string(*args))
+
+
+class TestTruncation:
+    """format_amount conserva el truncamiento original (taxes.truncar)."""
+
+    EDGE_VALUES = [0.29, 1.9999996, 1.15, -0.001, -0.29, 0.285, 2.675,
+                   1e-9, 123456789.999, 0, 5, Decimal('1.015')]
+
+    @pytest.mark.parametrize('decimals', [2, 3, 4])
+    def test_matches_truncar(self, decimals):
+        rng = random.Random(20 + decimals)
+        for _ in range(CASES):
+            value = rng.randint(-10 ** 9, 10 ** 9) / 10 ** decimals
+            assert format_amount(value) == f"{truncar(value, 2):.2f}"
+
+    def test_regression_vectors(self):
+        # 0.29 * 100 == 28.999999999999996: la formula original da 0.28
+        # y los CUFE ya emitidos dependen de ese valor
+        assert format_amount(0.29) == '0.28'
+        assert format_amount(1.9999996) == '1.99'
+        assert format_amount(1.15) == '1.14'
+        assert format_amount(-0.001) == '0.00'
+        assert format_amount(123.456, 0) == '123'
+        assert format_amount(1.23456, 3) == '1.234'
+        assert sha384(uuid_string(
+            'SETP1', '2024-01-15', '10:30:00-05:00', 0.29, 1.9999996, 0, 0,
+            2.2899996, '900373076', '222222222222', 'clave', '2',
+        )) == sha384(
+            'SETP12024-01-1510:30:00-05:000.28011.99040.00030.002.28'
+            '900373076222222222222clave2'
+        )
+
+    def test_batch_rows_match_uuid_string(self):
+        rows = [
+            ('SETP%d' % i, '2024-01-15', '10:30:00-05:00', value, value, 0,
+             value, value, '900373076', 222222222222, 'clave', '2')
+            for i, value in enumerate(self.EDGE_VALUES)
+        ]
+        assert list(CufeBatch().iter_rows(rows)) == [
+            sha384(uuid_string(*row)) for row in rows
+        ]
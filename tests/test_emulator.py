@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para el emulador local de los servicios web DIAN.
+"""
+
+import time
+
+import pytest
+import requests
+from lxml import etree
+
+from facho.fe.builders.exceptions import SignatureError
+from facho.fe.builders.soap_client import (
+    SOAP_ACTIONS,
+    build_get_numbering_range_body,
+    build_wssec_soap,
+)
+from facho.fe.client.emulator import (
+    NumberingRange,
+    verify_wssec_envelope,
+)
+from facho.fe.packaging import package_documents
+
+
+NS_UBL = (
+    'xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2" '
+    'xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2" '
+    'xmlns:ds="http://www.w3.org/2000/09/xmldsig#"'
+)
+
+
+def signed_xml(key):
+    return (f'<Invoice {NS_UBL}><cbc:ID>{key}</cbc:ID><cbc:UUID>{key}</cbc:UUID>'
+            '<ds:Signature/></Invoice>').encode()
+
+
+def package(*entries):
+    return package_documents(entries, 'z.zip')
+
+
+class TestOperations:
+    """Operaciones WCF contra el emulador."""
+
+    @pytest.mark.emulator(processing_delay=0.2)
+    def test_async_send_and_status(self, client, emulator):
+        sent = client.send_bill_async('z.zip', package(
+            ('fv1.xml', signed_xml('cufe-1')),
+            ('fv2.xml', b'<Invoice'),
+            ('fv3.xml', f'<Invoice {NS_UBL}><cbc:UUID>cufe-3</cbc:UUID></Invoice>'.encode()),
+        ))
+        assert sent.zip_key
+
+        pending = client.get_status_zip(sent.zip_key)
+        assert pending.is_valid is None
+        assert pending.status_code == '98'
+
+        time.sleep(0.25)
+        status = client.get_status_zip(sent.zip_key)
+        assert [(d.xml_file_name, d.is_valid) for d in status.documents] == [
+            ('fv1', True), ('fv2', False), ('fv3', False),
+        ]
+        assert status.documents[1].error_messages == ['Regla: ZB01, Rechazo: XML mal formado']
+        assert 'ZE02' in status.documents[2].error_messages[0]
+
+        assert client.get_status('cufe-1').is_valid is True
+        assert client.get_status('no-existe').status_code == '66'
+        assert emulator.stats['GetStatusZip'] == 2
+
+    def test_sync_and_duplicates(self, client):
+        first = client.send_bill_sync('z.zip', package(('fv1.xml', signed_xml('cufe-1'))))
+        second = client.send_test_set_async('z.zip', package(('fv1.xml', signed_xml('cufe-1'))),
+                                            'set-1')
+
+        assert first.is_valid is True
+        assert first.status_code == '00'
+        status = client.get_status_zip(second.zip_key)
+        assert status.documents[0].error_messages == [
+            'Regla: 90, Rechazo: Documento procesado anteriormente.'
+        ]
+
+    @pytest.mark.emulator(numbering_ranges={'soft-1': [NumberingRange(
+        '18760000001', '2019-01-19', 'SETP', 990000000, 995000000,
+        '2019-01-19', '2030-01-19', 'fc8eac422eba16e22ffd8c6f94b3f40a6e38162c',
+    )]})
+    def test_numbering_range(self, client, emulator):
+        body = build_get_numbering_range_body('900373076', 'soft-1')
+        soap = build_wssec_soap(body, SOAP_ACTIONS['GetNumberingRange'], emulator.endpoint,
+                                client.private_key, client.cert_b64)
+
+        response = requests.post(emulator.endpoint, data=soap.encode('utf-8'))
+
+        doc = etree.fromstring(response.content)
+        values = {etree.QName(e).localname: e.text for e in doc.iter() if len(e) == 0}
+        assert values['OperationCode'] == '100'
+        assert values['Prefix'] == 'SETP'
+        assert values['ToNumber'] == '995000000'
+
+
+class TestFailures:
+    """Fallas simuladas y firmas invalidas."""
+
+    @pytest.mark.emulator(error_rate=1.0)
+    def test_server_errors(self, client, emulator):
+        assert client.get_status('cufe-1').status_code is None
+        assert emulator.stats['simulated_errors'] == 1
+
+    @pytest.mark.emulator(hang_rate=1.0, hang_seconds=0.5)
+    def test_hang_triggers_client_timeout(self, client):
+        client.timeout = 0.1
+        with pytest.raises(requests.Timeout):
+            client.get_status('cufe-1')
+
+    @pytest.mark.emulator(processing_rate=10)
+    def test_processing_backlog(self, client):
+        small = client.send_bill_async('a.zip', package(
+            *[(f'a{i}.xml', signed_xml(f'a{i}')) for i in range(2)]))
+        large = client.send_bill_async('b.zip', package(
+            *[(f'b{i}.xml', signed_xml(f'b{i}')) for i in range(10)]))
+
+        time.sleep(0.35)
+        assert client.get_status_zip(small.zip_key).is_valid is True
+        assert client.get_status_zip(large.zip_key).status_code == '98'
+
+    def test_signature_verification(self, client, emulator):
+        soap = build_wssec_soap('<wcf:GetStatus xmlns:wcf="http://wcf.dian.colombia"/>',
+                                SOAP_ACTIONS['GetStatus'], emulator.endpoint,
+                                client.private_key, client.cert_b64)
+        envelope = etree.fromstring(soap.encode('utf-8'))
+        verify_wssec_envelope(envelope)
+
+        to = envelope.find('.//{http://www.w3.org/2005/08/addressing}To')
+        to.text = 'https://otro.example'
+        with pytest.raises(SignatureError):
+            verify_wssec_envelope(envelope)
+
+        response = requests.post(emulator.endpoint, data=etree.tostring(envelope))
+        assert response.status_code == 500
+        assert b'InvalidSecurity' in response.content
+        assert emulator.stats['signature_errors'] == 1
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para las exportaciones diferidas y el tiempo de importacion.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import facho.fe
+import facho.fe.builders
+import facho.fe.client
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def importtime(statement):
+    """
+    Ejecutar `statement` en un interprete nuevo con -X importtime.
+
+    Returns:
+        Diccionario modulo -> microsegundos acumulados
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+class TestImportTime:
+    """Importar el paquete no carga builders, cliente ni requests."""
+
+    def test_import_package(self):
+        modules = importtime('import facho.fe')
+
+        assert 'facho.fe' in modules
+        loaded = {m for m in modules if m.startswith('facho.fe.')}
+        assert loaded == {'facho.fe._lazy'}
+        assert 'requests' not in modules
+        assert 'lxml.etree' not in modules
+        # Presupuesto amplio: antes de las exportaciones diferidas
+        # 'import facho.fe' tomaba cerca de 300 ms
+        assert modules['facho.fe'] < 100000
+
+    def test_cufe_only(self):
+        modules = importtime('from facho.fe.builders import calculate_cufe')
+
+        assert 'facho.fe.builders.cufe' in modules
+        assert 'facho.fe.builders.invoice_builder' not in modules
+        assert 'facho.fe.client' not in modules
+        assert 'requests' not in modules
+
+    def test_build_does_not_load_http_client(self):
+        modules = importtime('from facho.fe.builders import InvoiceBuilder')
+
+        assert 'facho.fe.builders.invoice_builder' in modules
+        assert 'facho.fe.builders.credit_note_builder' not in modules
+        assert 'requests' not in modules
+
+
+class TestLazyExports:
+    """Los nombres exportados siguen disponibles."""
+
+    @pytest.mark.parametrize('package', [facho.fe, facho.fe.builders, facho.fe.client])
+    def test_all_names_resolve(self, package):
+        for name in package.__all__:
+            assert getattr(package, name) is not None, name
+        assert set(package.__all__) <= set(dir(package))
+
+    def test_submodules_and_alias(self):
+        from facho.fe.builders import TAX_CODES_FULL
+        from facho.fe.builders.taxes import TAX_CODES
+
+        assert TAX_CODES_FULL is TAX_CODES
+        assert facho.fe.client.tracker.DocumentTracker is facho.fe.client.DocumentTracker
+        assert 'instrumentation' in dir(facho.fe)
+
+    def test_star_import_exports_submodules(self):
+        namespace = {}
+        exec('from facho.fe import *', namespace)
+
+        assert {'signing', 'builders', 'client'} <= set(namespace)
+        assert 'install' not in namespace
+
+    def test_unknown_name(self):
+        with pytest.raises(AttributeError):
+            facho.fe.builders.NoExiste
+        with pytest.raises(ImportError):
+            from facho.fe.client import NoExiste  # noqa: F401
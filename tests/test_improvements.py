@@ -123,6 +123,88 @@ class TestCufeCalculator:
         assert get_uuid_type('92') == 'CUDE-SHA384'  # Nota debito
 
 
+class TestCufeBatch:
+    """Tests para el calculo de CUFE en lote."""
+
+    @staticmethod
+    def _inputs(count=50):
+        from facho.fe.builders.cufe import CufeInput
+
+        return [
+            CufeInput(
+                number=f'SETP{990000000 + i}',
+                issue_date='2026-01-18',
+                issue_time='10:30:00-05:00',
+                subtotal=1234.567 * i,
+                iva_amount=0.29 * i,
+                inc_amount=0.0,
+                ica_amount=9.999,
+                total=1500.005 * i,
+                supplier_nit=['900373076', '123456789'][i % 2],
+                customer_nit=str(1000 + i),
+                technical_key=['key_a', 'key_b'][i % 3 == 0],
+                environment=['1', '2'][i % 2],
+            )
+            for i in range(count)
+        ]
+
+    def test_matches_calculate_cufe(self):
+        """El lote produce los mismos codigos que calculate_cufe."""
+        from facho.fe.builders.cufe import CufeBatch, calculate_cufe
+
+        inputs = self._inputs()
+        assert CufeBatch(chunk_size=7).compute(inputs) == [
+            calculate_cufe(d) for d in inputs
+        ]
+
+    def test_software_pin_matches_cude(self):
+        """Con software_pin coincide con calculate_cude."""
+        from facho.fe.builders.cufe import CufeBatch, calculate_cude
+
+        inputs = self._inputs(10)
+        assert CufeBatch(software_pin='12345').compute(inputs) == [
+            calculate_cude(d, '12345') for d in inputs
+        ]
+
+    def test_columns(self):
+        """Tabla por columnas con impuestos opcionales."""
+        from dataclasses import asdict
+        from facho.fe.builders.cufe import CufeBatch
+
+        inputs = self._inputs(10)
+        for d in inputs:
+            d.inc_amount = d.ica_amount = 0.0
+        rows = [asdict(d) for d in inputs]
+        columns = {
+            name: [r[name] for r in rows]
+            for name in rows[0] if name not in ('inc_amount', 'ica_amount')
+        }
+        batch = CufeBatch()
+        assert batch.compute_columns(columns) == batch.compute(inputs)
+
+        del columns['total']
+        with pytest.raises(ValueError):
+            batch.compute_columns(columns)
+
+    def test_process_pool(self):
+        """El pool de procesos conserva el orden."""
+        from facho.fe.builders.cufe import CufeBatch
+
+        inputs = self._inputs(40)
+        assert CufeBatch(jobs=2, chunk_size=5).compute(inputs) == \
+            CufeBatch().compute(inputs)
+
+    def test_verify(self):
+        """verify marca los codigos incorrectos."""
+        from facho.fe.builders.cufe import CufeBatch
+
+        inputs = self._inputs(3)
+        codes = CufeBatch().compute(inputs)
+        codes[1] = 'invalid'
+        codes[2] = codes[2].upper()
+        assert CufeBatch().verify(inputs, codes) == [True, False, True]
+
+
 class TestTaxMethods:
     """Tests para metodos de conveniencia de Tax."""
 
@@ -326,6 +408,20 @@ class TestPosDocument:
 
         assert max_value == 5 * uvt_2024
 
+    def test_use_generic_consumer(self):
+        """Sin cliente se usa el consumidor final generico."""
+        from facho.fe.builders.pos_document_builder import PosDocumentData
+
+        data = PosDocumentData(
+            number='POS001',
+            issue_date='2024-01-15',
+            issue_time='10:30:00-05:00'
+        )
+        data.use_generic_consumer()
+
+        assert data.customer.nit == '222222222222'
+        assert data.customer.tax_level_code == 'R-99-PN'
+
 
 class TestValidations:
     """Tests para validaciones de produccion."""
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para la instrumentacion opcional de las rutas criticas.
+"""
+
+import logging
+import os
+
+import pytest
+
+from facho.fe import instrumentation
+from facho.fe.builders.invoice_builder import (
+    Address,
+    InvoiceBuilder,
+    InvoiceConfig,
+    InvoiceData,
+    InvoiceLine,
+    Party,
+)
+from facho.fe.builders.soap_client import build_wssec_soap
+from facho.fe.client.tracker import DocumentTracker, TrackedDocument
+from facho.fe.instrumentation import (
+    Histogram,
+    HistogramSink,
+    LoggingSink,
+    PrometheusFileSink,
+    instrumented,
+    span,
+)
+from facho.fe.signing import XAdESSigner
+from facho.fe.signing.certificate import cert_to_base64
+
+
+P12_PATH = os.path.join(os.path.dirname(__file__), 'example.p12')
+
+
+@pytest.fixture(autouse=True)
+def no_sinks():
+    instrumentation.clear_sinks()
+    yield
+    instrumentation.clear_sinks()
+
+
+@pytest.fixture
+def signer():
+    with open(P12_PATH, 'rb') as f:
+        return XAdESSigner.from_pkcs12_bytes(f.read(), '')
+
+
+@pytest.fixture
+def invoice():
+    config = InvoiceConfig(
+        software_id='1e3fa8f4-1a91-4028-9293-a9817406100f',
+        software_pin='12345',
+        technical_key='fc8eac422eba16e22ffd8c6f94b3f40a6e38162c',
+        nit='1001186599',
+        company_name='EMPRESA DE PRUEBA',
+        resolution_number='18760000001',
+        resolution_date='2019-01-19',
+        resolution_end_date='2030-01-19',
+        prefix='SETP',
+        range_from='990000000',
+        range_to='995000000',
+    )
+    address = Address(
+        city_code='68081', city_name='Bucaramanga', postal_zone='680001',
+        country_subentity='Santander', country_subentity_code='68',
+        address_line='Calle 123 # 45-67',
+    )
+    data = InvoiceData(
+        number='SETP990000001',
+        issue_date='2024-01-15',
+        issue_time='10:30:00-05:00',
+        supplier=Party(
+            nit='1001186599', name='EMPRESA', legal_name='EMPRESA SAS',
+            organization_code='1', tax_level_code='R-99-PN', address=address,
+        ),
+        customer=Party(
+            nit='222222', name='Cliente', legal_name='Cliente',
+            organization_code='2', tax_level_code='R-99-PN', scheme_name='13',
+            address=address,
+        ),
+        lines=[InvoiceLine('Producto', 2, '94', 1000.0)],
+    )
+    return InvoiceBuilder(config), data
+
+
+class TestSpans:
+    """Tests para los puntos de medicion."""
+
+    def test_disabled_is_shared_noop(self):
+        assert not instrumentation.enabled()
+        assert span('a') is span('b', x='1')
+        instrumentation.count('a')
+
+    def test_span_error_label(self):
+        with instrumented(HistogramSink()) as (sink,):
+            with pytest.raises(KeyError):
+                with span('stage', part='x'):
+                    raise KeyError('x')
+            with span('stage', part='x'):
+                pass
+
+        assert sink.histogram('stage', part='x').count == 1
+        assert sink.histogram('stage', part='x', error='KeyError').count == 1
+        assert not instrumentation.enabled()
+
+    def test_hot_paths(self, signer, invoice, tmp_path):
+        builder, data = invoice
+        tracker = DocumentTracker(str(tmp_path / 'tracking.json'))
+
+        with instrumented(HistogramSink()) as (sink,):
+            signer.sign(builder.build(data))
+            build_wssec_soap('<x/>', 'urn:a/GetStatus', 'https://localhost',
+                             signer.private_key, cert_to_base64(signer.certificate))
+            tracker.add_document(TrackedDocument('factura', 'SETP1', 'a', '2024-01-15'))
+
+        snapshot = sink.snapshot()['histograms']
+        assert snapshot['build'][0][0] == {'builder': 'InvoiceBuilder'}
+        assert sorted(labels['part'] for labels, _ in snapshot['sign.c14n']) == [
+            'document', 'key_info', 'signed_info', 'signed_properties'
+        ]
+        for name in ('sign', 'sign.rsa', 'soap.envelope', 'tracker.save'):
+            assert sink.histogram(name).count == 1, name
+
+
+class TestSinks:
+    """Tests para los sinks incluidos."""
+
+    def test_histogram(self):
+        histogram = Histogram((0.01, 0.1, 1.0))
+        for seconds in (0.005, 0.05, 0.05, 0.5, 2.0):
+            histogram.observe(seconds)
+
+        assert histogram.counts == [1, 2, 1, 1]
+        assert histogram.quantile(0.5) == 0.1
+        assert histogram.quantile(1.0) == 2.0
+        assert histogram.as_dict()['mean'] == pytest.approx(0.521)
+        assert Histogram().quantile(0.5) == 0.0
+
+    def test_logging(self, caplog):
+        with caplog.at_level(logging.DEBUG, logger='facho.metrics'):
+            with instrumented(LoggingSink()):
+                with span('sign.rsa'):
+                    pass
+                instrumentation.count('dian.requests', action='GetStatus')
+
+        assert caplog.records[0].getMessage().startswith('sign.rsa ')
+        assert caplog.records[1].getMessage() == 'dian.requests +1 action=GetStatus'
+
+    def test_prometheus_file(self, tmp_path):
+        path = str(tmp_path / 'facho.prom')
+        sink = PrometheusFileSink(path, interval=None, buckets=(0.1, 1.0))
+        sink.observe('sign.c14n', 0.05, {'part': 'document'})
+        sink.observe('sign.c14n', 0.5, {'part': 'document'})
+        sink.increment('dian.requests', 1, {'action': 'Get"Status'})
+        assert not os.path.exists(path)
+
+        sink.write()
+
+        with open(path) as f:
+            lines = f.read().splitlines()
+        assert lines == [
+            '# TYPE facho_sign_c14n_seconds histogram',
+            'facho_sign_c14n_seconds_bucket{part="document",le="0.1"} 1',
+            'facho_sign_c14n_seconds_bucket{part="document",le="1.0"} 2',
+            'facho_sign_c14n_seconds_bucket{part="document",le="+Inf"} 2',
+            'facho_sign_c14n_seconds_sum{part="document"} 0.55',
+            'facho_sign_c14n_seconds_count{part="document"} 2',
+            '# TYPE facho_dian_requests_total counter',
+            'facho_dian_requests_total{action="Get\\"Status"} 1',
+        ]
+
+    def test_prometheus_interval(self, tmp_path):
+        path = str(tmp_path / 'facho.prom')
+        sink = PrometheusFileSink(path, interval=0)
+        sink.increment('tracker.saves', 1, {})
+
+        with open(path) as f:
+            assert 'facho_tracker_saves_total 1' in f.read()
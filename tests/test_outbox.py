@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para el outbox durable de envios a DIAN.
+"""
+
+import pytest
+
+from facho.fe.builders.exceptions import CircuitOpenError
+from facho.fe.client import GetStatusZipResponse, SendTestSetResponse
+from facho.fe.client.outbox import DocumentOutbox, OutboxWorker
+
+
+class GuardedClient:
+    """Cliente cuyo guard rechaza todos los envios."""
+
+    def send_bill_async(self, file_name, content):
+        raise CircuitOpenError('upload', retry_after=12.0)
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    with DocumentOutbox(str(tmp_path / 'outbox.sqlite3')) as outbox:
+        yield outbox
+
+
+class TestDocumentOutbox:
+
+    def test_enqueue_is_idempotent(self, outbox, signed_zip):
+        first = outbox.enqueue('cufe-1', 'z1.zip', signed_zip('cufe-1'), number='SETP1')
+        again = outbox.enqueue('cufe-1', 'otro.zip', b'otro')
+
+        assert again.id == first.id
+        assert again.file_name == 'z1.zip'
+        assert outbox.counts() == {'queued': 1}
+
+    def test_leases_are_exclusive_and_expire(self, tmp_path, clock):
+        outbox = DocumentOutbox(str(tmp_path / 'o.sqlite3'), lease_seconds=60, clock=clock)
+        for n in range(3):
+            outbox.enqueue(f'cufe-{n}', f'z{n}.zip', b'zip')
+
+        a = outbox.lease('a', limit=2)
+        b = outbox.lease('b', limit=2)
+        assert [i.document_key for i in a] == ['cufe-0', 'cufe-1']
+        assert [i.document_key for i in b] == ['cufe-2']
+        assert outbox.lease('c', limit=5) == []
+
+        clock.now += 61
+        stolen = outbox.lease('c', limit=1)
+        assert stolen[0].document_key == 'cufe-0'
+        assert outbox.transition(a[0], 'a', 'uploading') is False
+        assert outbox.transition(stolen[0], 'c', 'uploading', attempts=1) is True
+        assert outbox.get('cufe-0').lease_owner is None
+        outbox.close()
+
+    def test_state_survives_reopen(self, tmp_path):
+        path = str(tmp_path / 'o.sqlite3')
+        with DocumentOutbox(path) as outbox:
+            item = outbox.enqueue('cufe-1', 'z1.zip', b'zip')
+            outbox.lease('a')
+            outbox.transition(item, 'a', 'uploading', keep_lease=True, attempts=1)
+
+        with DocumentOutbox(path) as outbox:
+            assert outbox.release_leases() == 1
+            item = outbox.get('cufe-1')
+            assert (item.state, item.attempts, item.lease_owner) == ('uploading', 1, None)
+
+
+class TestOutboxWorker:
+
+    def test_drain_until_verified(self, outbox, client, emulator, signed_zip):
+        for n in range(3):
+            outbox.enqueue(f'cufe-{n}', f'z{n}.zip', signed_zip(f'cufe-{n}'))
+
+        worker = OutboxWorker(outbox, client, poll_interval=0)
+        worker.drain()
+
+        assert outbox.counts() == {'verified': 3}
+        item = outbox.get('cufe-0')
+        assert item.zip_key and item.status_code == '00' and item.attempts == 1
+        assert emulator.stats['SendBillAsync'] == 3
+
+    def test_reconcile_after_crash_does_not_resend(self, outbox, client, emulator, signed_zip):
+        # El proceso anterior envio cufe-1 y murio antes de guardar el ZipKey;
+        # cufe-2 quedo en 'uploading' pero nunca llego a DIAN
+        for cufe in ('cufe-1', 'cufe-2'):
+            item = outbox.enqueue(cufe, f'{cufe}.zip', signed_zip(cufe))
+            outbox.lease('muerto', limit=1)
+            outbox.transition(item, 'muerto', 'uploading', keep_lease=True, attempts=1)
+        client.send_bill_async('cufe-1.zip', signed_zip('cufe-1'))
+        outbox.release_leases()
+
+        worker = OutboxWorker(outbox, client, poll_interval=0)
+        assert worker.reconcile() == 2
+        assert outbox.get('cufe-1').state == 'verified'
+        assert outbox.get('cufe-2').state == 'queued'
+
+        worker.drain()
+        assert outbox.counts() == {'verified': 2}
+        assert emulator.stats['SendBillAsync'] == 2
+
+    def test_guard_rejection_requeues_without_attempt(self, outbox):
+        outbox.enqueue('cufe-1', 'z1.zip', b'zip')
+
+        OutboxWorker(outbox, GuardedClient()).run_once()
+
+        item = outbox.get('cufe-1')
+        assert (item.state, item.attempts) == ('queued', 0)
+        assert 'CIRCUIT_OPEN' in item.error
+        # Vuelve a estar disponible despues de retry_after
+        assert outbox.lease('otro') == []
+
+    def test_attempts_exhausted(self, outbox, emulator, client):
+        class NoZipKey:
+            def send_bill_async(self, file_name, content):
+                return SendTestSetResponse(error_messages=['Regla: ZB01'])
+
+            get_status = client.get_status
+
+        outbox.enqueue('cufe-1', 'z1.zip', b'zip')
+        OutboxWorker(outbox, NoZipKey(), retry_delay=0, max_attempts=2).drain(idle_sleep=0)
+
+        item = outbox.get('cufe-1')
+        assert (item.state, item.attempts) == ('failed', 2)
+        assert item.error == '["Regla: ZB01"]'
+
+    def test_processing_status_is_not_a_rejection(self, outbox):
+        class Processing:
+            # DIAN responde IsValid false con 98 mientras procesa el ZIP
+            responses = [GetStatusZipResponse(is_valid=False, status_code='98'),
+                         GetStatusZipResponse(is_valid=True, status_code='00')]
+
+            def get_status_zip(self, zip_key):
+                return self.responses.pop(0)
+
+        item = outbox.enqueue('cufe-1', 'z1.zip', b'zip')
+        outbox.lease('a')
+        outbox.transition(item, 'a', 'uploaded', zip_key='zk-1', attempts=1)
+        worker = OutboxWorker(outbox, Processing(), poll_interval=0)
+
+        worker.run_once()
+        item = outbox.get('cufe-1')
+        assert (item.state, item.status_code) == ('uploaded', '98')
+
+        worker.run_once()
+        assert outbox.get('cufe-1').state == 'verified'
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para el empaquetado ZIP/base64 y el envio en un solo buffer.
+"""
+
+import base64
+import io
+import os
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from lxml import etree
+
+from facho.fe.client.dian_simple import DianSimpleClient
+from facho.fe.packaging import (
+    ZipPackage,
+    assemble,
+    b64encode_into,
+    base64_size,
+    package_documents,
+    package_xml,
+)
+
+
+P12_PATH = os.path.join(os.path.dirname(__file__), 'example.p12')
+
+XML = b'<?xml version="1.0"?><Invoice>' + b'<Line>Producto</Line>' * 500 + b'</Invoice>'
+
+NS_WCF = 'http://wcf.dian.colombia'
+
+RESPONSE = (
+    '<s:Envelope xmlns:s="http://www.w3.org/2003/05/soap-envelope"><s:Body>'
+    '<SendBillAsyncResponse xmlns="http://wcf.dian.colombia">'
+    '<ZipKey>zip-123</ZipKey></SendBillAsyncResponse></s:Body></s:Envelope>'
+)
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    """Servidor HTTP local que guarda la ultima solicitud."""
+
+    requests = []
+
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        self.requests.append((dict(self.headers), self.rfile.read(length)))
+        body = RESPONSE.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/soap+xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    RecordingHandler.requests = []
+    httpd = HTTPServer(('127.0.0.1', 0), RecordingHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}/', RecordingHandler.requests
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestPackage:
+    """Tests para package_xml y package_documents."""
+
+    def test_package_xml(self):
+        package = package_xml(XML, 'fvSETP990000001.xml')
+
+        assert package.file_name == 'fvSETP990000001.zip'
+        with zipfile.ZipFile(io.BytesIO(package.content)) as zf:
+            assert zf.namelist() == ['fvSETP990000001.xml']
+            assert zf.getinfo('fvSETP990000001.xml').compress_type == zipfile.ZIP_DEFLATED
+            assert zf.read('fvSETP990000001.xml') == XML
+
+    def test_compression_levels(self):
+        stored = package_xml(XML, 'a.xml', compression_level=0)
+        fast = package_xml(XML, 'a.xml', compression_level=1)
+        best = package_xml(XML, 'a.xml', compression_level=9)
+
+        with zipfile.ZipFile(io.BytesIO(stored.content)) as zf:
+            assert zf.getinfo('a.xml').compress_type == zipfile.ZIP_STORED
+            assert zf.read('a.xml') == XML
+        assert len(best.content) <= len(fast.content) < len(stored.content)
+
+        with pytest.raises(ValueError):
+            package_xml(XML, 'a.xml', compression_level=10)
+
+    def test_several_documents(self):
+        package = package_documents(
+            [('fv1.xml', XML), ('fv2.xml', XML)], 'lote.zip'
+        )
+        with zipfile.ZipFile(io.BytesIO(package.content)) as zf:
+            assert zf.namelist() == ['fv1.xml', 'fv2.xml']
+
+
+class TestBase64:
+    """Tests para la codificacion base64 por bloques."""
+
+    @pytest.mark.parametrize('size', [0, 1, 2, 3, 4, 47, 48, 49, 100, 1000])
+    def test_matches_b64encode(self, size):
+        data = os.urandom(size)
+        out = bytearray(base64_size(size) + 4)
+        end = b64encode_into(data, out, offset=2, chunk_size=48)
+
+        assert end == 2 + base64_size(size)
+        assert bytes(out[2:end]) == base64.b64encode(data)
+
+    def test_invalid_chunk_size(self):
+        with pytest.raises(ValueError):
+            b64encode_into(b'abc', bytearray(4), chunk_size=10)
+
+    def test_assemble(self):
+        package = ZipPackage('a.zip', os.urandom(5000))
+        payload = assemble([b'<a>', package, b'</a>'])
+
+        assert isinstance(payload, bytearray)
+        assert payload == b'<a>' + base64.b64encode(package.content) + b'</a>'
+        assert package.base64() == base64.b64encode(package.content)
+
+
+class TestClientPayload:
+    """El cliente envia el sobre SOAP con el ZIP en un solo buffer."""
+
+    def client(self, endpoint):
+        with open(P12_PATH, 'rb') as f:
+            client = DianSimpleClient(
+                certificate_bytes=f.read(), certificate_password=''
+            )
+        client.endpoint = endpoint
+        return client
+
+    def test_send_bill_async(self, server):
+        endpoint, requests = server
+        package = package_xml(XML, 'fvSETP990000001.xml', compression_level=9)
+
+        response = self.client(endpoint).send_bill_async(package.file_name, package)
+
+        assert response.zip_key == 'zip-123'
+        headers, body = requests[0]
+        assert headers['SOAPAction'].endswith('/SendBillAsync')
+        assert int(headers['Content-Length']) == len(body)
+
+        doc = etree.fromstring(body)
+        content = doc.find('.//{%s}contentFile' % NS_WCF).text
+        assert base64.b64decode(content) == package.content
+        assert doc.find('.//{%s}fileName' % NS_WCF).text == 'fvSETP990000001.zip'
+        assert doc.find('.//{http://www.w3.org/2000/09/xmldsig#}SignatureValue').text
+
+    def test_send_test_set_with_bytes(self, server):
+        endpoint, requests = server
+        package = package_xml(XML, 'fv1.xml')
+
+        self.client(endpoint).send_test_set_async('fv1.zip', package.content, 'set-1')
+
+        doc = etree.fromstring(requests[0][1])
+        assert doc.find('.//{%s}testSetId' % NS_WCF).text == 'set-1'
+        content = doc.find('.//{%s}contentFile' % NS_WCF).text
+        assert base64.b64decode(content) == package.content
+
+    def test_string_body_uses_same_envelope(self, server):
+        endpoint, requests = server
+        client = self.client(endpoint)
+        client.get_status('cufe-1')
+
+        doc = etree.fromstring(requests[0][1])
+        assert doc.find('.//{%s}trackId' % NS_WCF).text == 'cufe-1'
+        assert b'FACHO-SOAP-BODY' not in requests[0][1]
+        assert 'cufe-1' in client._build_wssec_soap(
+            '<wcf:GetStatus xmlns:wcf="http://wcf.dian.colombia">'
+            '<wcf:trackId>cufe-1</wcf:trackId></wcf:GetStatus>',
+            'accion',
+        )
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para el pipeline construir -> firmar -> enviar -> registrar.
+"""
+
+import io
+import os
+import threading
+import zipfile
+
+import pytest
+
+from facho.fe.builders.invoice_builder import (
+    InvoiceConfig,
+    InvoiceData,
+    InvoiceLine,
+    Party,
+    Address,
+)
+from facho.fe.client.dian_simple import SendTestSetResponse
+from facho.fe.client.tracker import DocumentTracker, TrackedDocument
+from facho.fe.pipeline import DocumentPipeline, STATUS_SENT, STATUS_FAILED, STATUS_SKIPPED
+
+
+P12_PATH = os.path.join(os.path.dirname(__file__), 'example.p12')
+
+
+class RecordingClient:
+    """Cliente DIAN de prueba que registra los envios."""
+
+    def __init__(self, reject=()):
+        self.sent = []
+        self.reject = set(reject)
+        self._lock = threading.Lock()
+
+    def send_bill_async(self, file_name, content_file):
+        with self._lock:
+            self.sent.append((file_name, content_file))
+        if file_name in self.reject:
+            return SendTestSetResponse(error_messages=['Regla: rechazado'])
+        return SendTestSetResponse(zip_key=f'key-{file_name}')
+
+    def send_test_set_async(self, file_name, content_file, test_set_id):
+        return self.send_bill_async(file_name, content_file)
+
+
+@pytest.fixture
+def config():
+    return InvoiceConfig(
+        software_id='1e3fa8f4-1a91-4028-9293-a9817406100f',
+        software_pin='12345',
+        technical_key='fc8eac422eba16e22ffd8c6f94b3f40a6e38162c',
+        nit='1001186599',
+        company_name='EMPRESA DE PRUEBA',
+        resolution_number='18760000001',
+        resolution_date='2019-01-19',
+        resolution_end_date='2030-01-19',
+        prefix='SETP',
+        range_from='990000000',
+        range_to='995000000',
+    )
+
+
+@pytest.fixture
+def documents():
+    address = Address(
+        city_code='68081',
+        city_name='Bucaramanga',
+        postal_zone='680001',
+        country_subentity='Santander',
+        country_subentity_code='68',
+        address_line='Calle 123 # 45-67',
+    )
+    supplier = Party(
+        nit='1001186599', name='EMPRESA', legal_name='EMPRESA SAS',
+        organization_code='1', tax_level_code='R-99-PN',
+        address=address, email='empresa@test.com',
+    )
+    customer = Party(
+        nit='222222222222', name='Cliente', legal_name='Cliente',
+        organization_code='2', tax_level_code='R-99-PN', scheme_name='13',
+        address=address, email='cliente@test.com',
+    )
+    return [
+        InvoiceData(
+            number=f'SETP99000000{i}',
+            issue_date='2024-01-15',
+            issue_time='10:30:00-05:00',
+            supplier=supplier,
+            customer=customer,
+            lines=[InvoiceLine('Producto', 1, '94', 10000.0 * i)],
+        )
+        for i in range(1, 6)
+    ]
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    return DocumentTracker(str(tmp_path / 'tracking.json'))
+
+
+@pytest.fixture
+def pkcs12():
+    with open(P12_PATH, 'rb') as f:
+        return f.read()
+
+
+class TestDocumentPipeline:
+    """Tests para DocumentPipeline."""
+
+    def test_sends_and_tracks(self, config, documents, tracker, pkcs12):
+        client = RecordingClient()
+        pipeline = DocumentPipeline(
+            config, client, tracker, pkcs12=pkcs12, password='',
+            send_jobs=3, queue_size=2,
+        )
+        results = list(pipeline.run(documents))
+
+        assert sorted(r.number for r in results) == [d.number for d in documents]
+        assert all(r.status == STATUS_SENT for r in results)
+        assert len(client.sent) == 5
+
+        file_name, content = client.sent[0]
+        with zipfile.ZipFile(io.BytesIO(content)) as zf:
+            assert b'SignatureValue' in zf.read(file_name.replace('.zip', '.xml'))
+
+        tracked = tracker.get_document('SETP990000002')
+        assert tracked.zip_key == 'key-fvSETP990000002.zip'
+        assert len(tracked.uuid) == 96
+        assert tracked.total == 23800.0
+
+    def test_metrics(self, config, documents, tracker):
+        pipeline = DocumentPipeline(config, RecordingClient(), tracker)
+        list(pipeline.run(documents))
+        summary = pipeline.summary()
+
+        for stage in ('validate', 'build', 'zip', 'send', 'track'):
+            assert summary['stages'][stage]['count'] == 5
+        assert summary['stages']['sign']['count'] == 0
+        assert summary['elapsed_seconds'] > 0
+
+    def test_resume_skips_sent_documents(self, config, documents, tracker):
+        tracker.add_document(TrackedDocument(
+            doc_type='factura', number='SETP990000001', uuid='x',
+            issue_date='2024-01-15', zip_key='previo',
+        ))
+        client = RecordingClient()
+        results = list(DocumentPipeline(config, client, tracker).run(documents))
+
+        statuses = {r.number: r.status for r in results}
+        assert statuses['SETP990000001'] == STATUS_SKIPPED
+        assert len(client.sent) == 4
+        assert len(tracker.get_invoices()) == 5
+
+    def test_failures_are_reported(self, config, documents, tracker):
+        documents[0].customer = None
+        client = RecordingClient(reject={'fvSETP990000002.zip'})
+        pipeline = DocumentPipeline(config, client, tracker)
+        results = {r.number: r for r in pipeline.run(documents)}
+
+        assert results['SETP990000001'].stage == 'build'
+        assert results['SETP990000002'].status == STATUS_FAILED
+        assert results['SETP990000002'].stage == 'send'
+        assert 'rechazado' in results['SETP990000002'].error
+        assert tracker.get_document('SETP990000002') is None
+        assert pipeline.summary()['stages']['send']['errors'] == 1
+
+    def test_process_pool(self, config, documents, tracker):
+        client = RecordingClient()
+        pipeline = DocumentPipeline(config, client, tracker, build_jobs=2)
+        results = list(pipeline.run(documents))
+
+        assert all(r.ok for r in results)
+        assert len(tracker.get_invoices()) == 5
+
+    def test_pool_failure_keeps_document_number(self, config, documents):
+        # No se puede enviar al proceso: el future falla
+        documents[0].notes = threading.Lock()
+        pipeline = DocumentPipeline(config, RecordingClient(), build_jobs=2)
+        results = {r.number: r for r in pipeline.run(documents)}
+
+        failed = results['SETP990000001']
+        assert (failed.status, failed.stage) == (STATUS_FAILED, 'build')
+        assert all(results[f'SETP99000000{i}'].ok for i in range(2, 6))
+
+    def test_early_stop(self, config, documents):
+        pipeline = DocumentPipeline(config, RecordingClient(), queue_size=1)
+        run = pipeline.run(documents)
+        next(run)
+        run.close()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para el limitador de tasa y el circuit breaker del cliente DIAN.
+"""
+
+import os
+
+import pytest
+import requests
+
+from facho.fe.builders.exceptions import CircuitOpenError, RateLimitedError
+from facho.fe.client import DianSimpleClient
+from facho.fe.client.emulator import DianEmulator, EmulatorConfig
+from facho.fe.client.resilience import (
+    CircuitBreaker,
+    DianCallGuard,
+    ResilienceConfig,
+    TokenBucket,
+)
+
+
+P12_PATH = os.path.join(os.path.dirname(__file__), 'example.p12')
+
+
+class FakeClock:
+    """Reloj manual: sleep avanza el tiempo."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b''):
+        self.status_code = status_code
+        self.content = content
+
+
+def sender_fault():
+    return (b'<s:Envelope xmlns:s="http://www.w3.org/2003/05/soap-envelope"><s:Body>'
+            b'<s:Fault><s:Code><s:Value>s:Sender</s:Value></s:Code></s:Fault>'
+            b'</s:Body></s:Envelope>')
+
+
+class TestTokenBucket:
+
+    def test_burst_then_spacing(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+
+        assert bucket.acquire() and bucket.acquire()
+        assert clock.slept == []
+        assert bucket.acquire()
+        assert clock.slept == [0.5]
+
+    def test_timeout_does_not_consume(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+
+        assert bucket.acquire(timeout=0.5) is False
+        assert bucket.tokens == 0
+        assert bucket.acquire(timeout=1.0) is True
+        assert clock.slept == [1.0]
+
+
+class TestCircuitBreaker:
+
+    def test_open_half_open_close(self):
+        clock = FakeClock()
+        changes = []
+        breaker = CircuitBreaker('upload', failure_threshold=2, reset_timeout=10,
+                                 clock=clock, on_state_change=lambda *a: changes.append(a[1:]))
+
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        with pytest.raises(CircuitOpenError) as e:
+            breaker.before_call()
+        assert e.value.retry_after == 10
+
+        clock.now += 10
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+
+        assert breaker.state == 'closed'
+        assert changes == [('closed', 'open'), ('open', 'half_open'), ('half_open', 'closed')]
+        assert breaker.stats == {'successes': 1, 'failures': 2, 'rejected': 2, 'opened': 1}
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker('status', failure_threshold=1, reset_timeout=5, clock=clock)
+        breaker.record_failure()
+        clock.now += 5
+
+        breaker.before_call()
+        breaker.record_failure()
+
+        assert breaker.state == 'open'
+        assert breaker.retry_after() == 5
+
+
+class TestDianCallGuard:
+
+    def make_guard(self, **kwargs):
+        clock = FakeClock()
+        config = ResilienceConfig(**kwargs)
+        return DianCallGuard(config, clock=clock, sleep=clock.sleep), clock
+
+    def test_failure_classification(self):
+        guard, _ = self.make_guard(failure_threshold=1)
+
+        guard.execute('SendBillAsync', lambda: FakeResponse(500, sender_fault()))
+        guard.execute('SendBillAsync', lambda: FakeResponse(200))
+        assert guard.available('SendBillAsync')
+
+        guard.execute('SendBillAsync', lambda: FakeResponse(503, b'Service Unavailable'))
+        assert not guard.available('SendBillSync')
+        assert guard.available('GetStatusZip')
+
+    def test_exceptions_count_as_failures(self):
+        guard, _ = self.make_guard(failure_threshold=2)
+
+        def timeout():
+            raise requests.Timeout()
+
+        for _ in range(2):
+            with pytest.raises(requests.Timeout):
+                guard.execute('GetStatus', timeout)
+
+        with pytest.raises(CircuitOpenError):
+            guard.execute('GetStatus', timeout)
+        assert guard.metrics()['status']['rejected'] == 1
+
+    def test_rate_limited_and_fallback(self):
+        guard, clock = self.make_guard(upload_rate=1, upload_burst=1, max_wait=0.5)
+        guard.execute('SendBillAsync', lambda: FakeResponse(200))
+
+        with pytest.raises(RateLimitedError):
+            guard.execute('SendBillAsync', lambda: FakeResponse(200))
+        result = guard.execute('SendBillAsync', lambda: FakeResponse(200),
+                               fallback=lambda e: ('contingencia', e.code))
+
+        assert result == ('contingencia', 'RATE_LIMITED')
+        assert guard.metrics()['upload']['rate_limited'] == 2
+        assert clock.slept == []
+
+
+class TestClientIntegration:
+
+    def test_circuit_stops_requests_to_degraded_service(self):
+        with open(P12_PATH, 'rb') as f:
+            p12 = f.read()
+        guard = DianCallGuard(ResilienceConfig(failure_threshold=3, reset_timeout=60))
+        client = DianSimpleClient(certificate_bytes=p12, certificate_password='',
+                                  call_guard=guard)
+
+        with DianEmulator(EmulatorConfig(error_rate=1.0)) as emulator:
+            client.endpoint = emulator.endpoint
+            for _ in range(3):
+                assert client.get_status('cufe-1').status_code is None
+            with pytest.raises(CircuitOpenError):
+                client.get_status('cufe-1')
+            assert emulator.stats['requests'] == 3
+
+        metrics = guard.metrics()
+        assert metrics['status']['state'] == 'open'
+        assert metrics['upload']['state'] == 'closed'
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para GetNumberingRange y el registro de resoluciones.
+"""
+
+import pytest
+
+from facho.fe.builders.exceptions import RangeError, ResolutionExpiredError, ResolutionNotFoundError
+from facho.fe.builders.invoice_builder import InvoiceConfig
+from facho.fe.client import ResolutionRegistry
+from facho.fe.client.emulator import DianEmulator, EmulatorConfig, NumberingRange
+from facho.fe.client.tracker import DocumentTracker, TrackedDocument
+
+
+SOFTWARE_ID = '1e3fa8f4-1a91-4028-9293-a9817406100f'
+
+RANGES = {SOFTWARE_ID: [
+    NumberingRange('18760000001', '2019-01-19', 'SETP', 990000000, 990000002,
+                   '2019-01-19', '2030-01-19', 'fc8eac422eba16e22ffd8c6f94b3f40a6e38162c'),
+    NumberingRange('18760000002', '2020-03-01', 'NC', 1, 5000,
+                   '2020-03-01', '2021-03-01', 'aa11'),
+]}
+
+# Configuracion con datos de resolucion desactualizados
+CONFIG = InvoiceConfig(
+    software_id=SOFTWARE_ID,
+    software_pin='12345',
+    technical_key='vieja',
+    nit='1001186599',
+    company_name='EMPRESA DE PRUEBA',
+    resolution_number='0',
+    resolution_date='2000-01-01',
+    resolution_end_date='2000-12-31',
+    prefix='SETP',
+    range_from='1',
+    range_to='2',
+)
+
+pytestmark = pytest.mark.emulator(numbering_ranges=RANGES)
+
+
+class TestGetNumberingRange:
+
+    def test_parses_ranges(self, client):
+        response = client.get_numbering_range('1001186599', SOFTWARE_ID)
+
+        assert response.is_valid is True and response.status_code == '100'
+        assert [r.prefix for r in response.ranges] == ['SETP', 'NC']
+        assert response.ranges[0].to_number == 990000002
+        assert response.ranges[0].technical_key == 'fc8eac422eba16e22ffd8c6f94b3f40a6e38162c'
+
+    def test_unknown_software(self, client):
+        response = client.get_numbering_range('1001186599', 'otro')
+
+        assert response.status_code == '301' and response.is_valid is False
+        assert response.ranges == []
+
+
+class TestResolutionRegistry:
+
+    def test_lookups_hit_dian_once_per_ttl(self, client, emulator, clock):
+        registry = ResolutionRegistry(client, ttl=60, clock=clock)
+
+        config = registry.apply(CONFIG)
+        for day in ('2024-01-15', '2024-01-16'):
+            registry.check(config, 'SETP990000001', day)
+        assert registry.validate_issue_date(config, '2031-01-01')
+        assert not registry.is_expiring_soon(config, days_warning=30)
+        assert emulator.stats['GetNumberingRange'] == 1
+
+        assert config.technical_key == 'fc8eac422eba16e22ffd8c6f94b3f40a6e38162c'
+        assert (config.range_from, config.range_to) == ('990000000', '990000002')
+        assert config.resolution_end_date == '2030-01-19'
+
+        clock.now += 61
+        registry.ranges(CONFIG.nit, SOFTWARE_ID)
+        assert emulator.stats['GetNumberingRange'] == 2
+
+    def test_check_errors(self, client):
+        registry = ResolutionRegistry(client)
+        config = registry.apply(CONFIG)
+
+        with pytest.raises(RangeError):
+            registry.check(config, 'SETP990000003')
+        with pytest.raises(ResolutionExpiredError):
+            registry.check(config, 'SETP990000001', '2031-01-01')
+        with pytest.raises(ResolutionNotFoundError):
+            registry.get(CONFIG.nit, SOFTWARE_ID, 'FE')
+        with pytest.raises(ResolutionNotFoundError):
+            registry.get(CONFIG.nit, 'otro', 'SETP')
+        assert registry.ranges(CONFIG.nit, 'otro') == []
+
+    def test_stale_ranges_survive_failures(self, tmp_path, clock, make_client):
+        with DianEmulator(EmulatorConfig(numbering_ranges=RANGES)) as emulator:
+            client = make_client(emulator.endpoint)
+            registry = ResolutionRegistry(client, ttl=60, clock=clock)
+            resolution = registry.for_config(CONFIG)
+
+        # Emulador detenido: se sigue usando el rango en memoria
+        clock.now += 120
+        assert registry.for_config(CONFIG) == resolution
+
+        tracker = DocumentTracker(str(tmp_path / 'tracking.json'))
+        numbers = [tracker.get_next_document_number(resolution) for _ in range(3)]
+        assert numbers == ['SETP990000000', 'SETP990000001', 'SETP990000002']
+        with pytest.raises(RangeError):
+            tracker.get_next_document_number(resolution)
+
+    def test_each_range_has_its_own_consecutive(self, client, tmp_path):
+        registry = ResolutionRegistry(client)
+        invoices = registry.get(CONFIG.nit, SOFTWARE_ID, 'SETP')
+        notes = registry.get(CONFIG.nit, SOFTWARE_ID, 'NC')
+        path = str(tmp_path / 'tracking.json')
+
+        tracker = DocumentTracker(path)
+        numbers = [tracker.get_next_document_number(r) for r in (invoices, notes, invoices, notes)]
+        assert numbers == ['SETP990000000', 'NC1', 'SETP990000001', 'NC2']
+
+        # El consecutivo de cada rango se conserva al reabrir
+        tracker = DocumentTracker(path)
+        assert tracker.get_next_document_number(notes) == 'NC3'
+        assert tracker.get_next_document_number(invoices) == 'SETP990000002'
+
+    def test_consecutive_resumes_from_tracked_documents(self, client, tmp_path):
+        registry = ResolutionRegistry(client)
+        notes = registry.get(CONFIG.nit, SOFTWARE_ID, 'NC')
+        # Tracker sin consecutivos por resolucion (formato anterior)
+        tracker = DocumentTracker(str(tmp_path / 'tracking.json'))
+        tracker.add_document(TrackedDocument('credito', 'NC7', 'cude-7', '2020-06-01'))
+        tracker.add_document(TrackedDocument('factura', 'SETP990000001', 'cufe-1', '2020-06-01'))
+
+        assert tracker.get_next_document_number(notes) == 'NC8'
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para el motor de reglas de validacion compiladas.
+"""
+
+import copy
+
+import pytest
+
+from facho.fe.builders.exceptions import DIAN_ERROR_CODES
+from facho.fe.builders.invoice_builder import (
+    Address,
+    InvoiceConfig,
+    InvoiceData,
+    InvoiceLine,
+    Party,
+)
+from facho.fe.builders.rules import (
+    CONFIG_RULES,
+    DOCUMENT_RULES,
+    PRODUCTION_RULES,
+    InvoiceRuleChecker,
+    Rule,
+    RuleSet,
+)
+from facho.fe.builders.validators import (
+    InvoiceLineValidator,
+    InvoiceValidator,
+    PartyValidator,
+    ProductionValidator,
+)
+
+
+@pytest.fixture
+def config():
+    return InvoiceConfig(
+        software_id='1e3fa8f4-1a91-4028-9293-a9817406100f',
+        software_pin='12345',
+        technical_key='fc8eac422eba16e22ffd8c6f94b3f40a6e38162c',
+        nit='1001186599',
+        company_name='EMPRESA DE PRUEBA',
+        resolution_number='18760000001',
+        resolution_date='2019-01-19',
+        resolution_end_date='2030-01-19',
+        prefix='SETP',
+        range_from='990000000',
+        range_to='995000000',
+    )
+
+
+@pytest.fixture
+def data():
+    address = Address(
+        city_code='68081', city_name='Bucaramanga', postal_zone='680001',
+        country_subentity='Santander', country_subentity_code='68',
+        address_line='Calle 123 # 45-67',
+    )
+    return InvoiceData(
+        number='SETP990000001',
+        issue_date='2024-01-15',
+        issue_time='10:30:00-05:00',
+        supplier=Party(
+            nit='1001186599', name='EMPRESA', legal_name='EMPRESA SAS',
+            organization_code='1', tax_level_code='R-99-PN', address=address,
+        ),
+        customer=Party(
+            nit='222222', name='Cliente', legal_name='Cliente',
+            organization_code='2', tax_level_code='R-99-PN', scheme_name='13',
+            address=address,
+        ),
+        lines=[
+            InvoiceLine('Producto', 2, '94', 1000.0),
+            InvoiceLine('Servicio', 1, '94', 500.0),
+        ],
+    )
+
+
+def codes(violations):
+    return [(v.code, v.field) for v in violations]
+
+
+class TestRuleSet:
+    """Tests para la compilacion y evaluacion de reglas."""
+
+    def test_valid_document(self, data, config):
+        assert InvoiceRuleChecker().validate(data, config) == []
+
+    def test_short_circuit_by_cost(self):
+        rules = RuleSet([
+            Rule('issue_date', 'date', 'FAD01', 'Fecha'),
+            Rule('issue_date', 'pattern', 'FAD01', 'Fecha', r'^\d{4}-\d{2}-\d{2}$'),
+            Rule('issue_date', 'non_empty', 'FAD01', 'Fecha'),
+        ])
+
+        class Doc:
+            issue_date = None
+
+        violation, = rules.check(Doc())
+        assert violation.message == 'Fecha es requerido'
+        Doc.issue_date = '15/01/2024'
+        violation, = rules.check(Doc())
+        assert 'formato invalido' in violation.message
+        Doc.issue_date = '2024-02-30'
+        violation, = rules.check(Doc())
+        assert violation.message == 'Fecha no es una fecha valida: 2024-02-30'
+
+    def test_unknown_check(self):
+        with pytest.raises(ValueError):
+            RuleSet([Rule('number', 'no_existe', 'FAB03')])
+
+    def test_missing_parent_skips_rules(self, data, config):
+        data.customer = None
+        assert codes(DOCUMENT_RULES.check(data, config)) == [('FAK01', 'customer')]
+
+    def test_codes_are_dian_codes(self):
+        rules = CONFIG_RULES.rules + PRODUCTION_RULES.rules
+        assert {rule.code for rule in rules} <= set(DIAN_ERROR_CODES)
+
+
+class TestInvoiceRuleChecker:
+    """Tests para los errores estructurados."""
+
+    def test_structured_errors(self, data, config):
+        data.issue_time = '10:30'
+        data.supplier.nit = '123'
+        data.lines[1].quantity = 0
+        config.environment = '3'
+
+        violations = InvoiceRuleChecker().validate(data, config)
+
+        assert codes(violations) == [
+            ('FAB04', 'config.environment'),
+            ('FAD03', 'issue_time'),
+            ('FAB04', 'supplier.nit'),
+            ('FAL01', 'lines[2].quantity'),
+        ]
+        assert violations[3].message == \
+            'Linea 2 cantidad debe ser mayor que cero (recibido: 0)'
+        assert violations[0].is_config
+        assert violations[2].as_dict()['code'] == 'FAB04'
+
+    def test_scheme_name_conditions(self, data, config):
+        data.customer.nit = ''
+        violation, = InvoiceRuleChecker().validate(data, config)
+        assert violation.message == 'Documento Adquiriente es requerido'
+
+        data.customer.scheme_name = '31'
+        violation, = InvoiceRuleChecker().validate(data, config)
+        assert violation.message == 'NIT Adquiriente es requerido'
+
+    def test_validate_many(self, data, config):
+        documents = [copy.deepcopy(data) for _ in range(5)]
+        documents[1].number = 'SETP1'
+        documents[3].lines = []
+
+        report = InvoiceRuleChecker().validate_many(documents, config)
+
+        assert [len(v) for v in report] == [0, 1, 0, 1, 0]
+        assert report[1][0].code == 'FAN02'
+        assert report[1][0].message == 'Consecutivo 1 fuera de rango [990000000-995000000]'
+        assert report[3][0].message == 'Factura debe tener al menos una linea'
+
+        config.software_pin = ''
+        report = InvoiceRuleChecker().validate_many(documents[:2], config)
+        assert all(v[0].code == 'SFT02' for v in report)
+
+
+class TestValidators:
+    """Los validadores existentes usan las reglas compiladas."""
+
+    def test_messages(self, data, config):
+        data.supplier.address = None
+        config.nit = ''
+
+        errors = InvoiceValidator().validate(data, config)
+
+        assert errors == [
+            'Config: NIT empresa es requerido',
+            'Direccion Emisor es requerida',
+        ]
+
+    def test_party_and_lines(self, data):
+        assert PartyValidator().validate(None, 'Emisor') == ['Emisor es requerido']
+        data.supplier.organization_code = '9'
+        assert PartyValidator().validate(data.supplier, 'Emisor') == [
+            "Tipo organizacion Emisor debe ser '1' (juridica) o '2' (natural)"
+        ]
+        assert InvoiceLineValidator().validate([]) == [
+            'Factura debe tener al menos una linea'
+        ]
+
+    def test_production_does_not_repeat_checks(self, data, config):
+        validator = ProductionValidator()
+        assert validator.validate_invoice_for_production(data, config) == []
+
+        data.issue_date = '2031-01-01'
+        assert validator.validate_invoice_for_production(data, config) == [
+            'Fecha emision 2031-01-01 posterior a fin de resolucion 2030-01-19'
+        ]
+
+        # Una fecha invalida se reporta una sola vez
+        data.issue_date = '2031-13-01'
+        errors = validator.validate_invoice_for_production(data, config)
+        assert errors == ['Fecha emision no es una fecha valida: 2031-13-01']
+
+        report = validator.validate_many_for_production([data], config)
+        assert report[0][0].code == 'FAD01'
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para el servicio HTTP local.
+"""
+
+import base64
+import http.client
+import io
+import json
+import os
+import zipfile
+
+import pytest
+from lxml import etree
+
+from facho.fe.client import DianSimpleClient
+from facho.fe.service import FachoService
+from facho.fe.signing import XAdESSigner
+
+
+P12_PATH = os.path.join(os.path.dirname(__file__), 'example.p12')
+
+SETTINGS = {
+    'config': {
+        'software_id': '1e3fa8f4-1a91-4028-9293-a9817406100f',
+        'software_pin': '12345',
+        'technical_key': 'fc8eac422eba16e22ffd8c6f94b3f40a6e38162c',
+        'nit': '1001186599',
+        'company_name': 'EMPRESA DE PRUEBA',
+        'resolution_number': '18760000001',
+        'resolution_date': '2019-01-19',
+        'resolution_end_date': '2030-01-19',
+        'prefix': 'SETP',
+        'range_from': '990000000',
+        'range_to': '995000000',
+    },
+    'supplier': {
+        'nit': '1001186599',
+        'name': 'EMPRESA DE PRUEBA',
+        'organization_code': '1',
+        'tax_level_code': 'R-99-PN',
+        'email': 'empresa@test.com',
+        'city_code': '68081',
+        'city_name': 'Bucaramanga',
+        'postal_zone': '680001',
+        'country_subentity': 'Santander',
+        'country_subentity_code': '68',
+        'address_line': 'Calle 123 # 45-67',
+    },
+}
+
+
+def document(number, quantity=2):
+    return {
+        'number': number,
+        'issue_date': '2024-01-15',
+        'issue_time': '10:30:00-05:00',
+        'customer_nit': '1001',
+        'customer_name': 'CLIENTE 1001',
+        'customer_organization_code': '2',
+        'customer_tax_level_code': 'R-99-PN',
+        'customer_scheme_name': '13',
+        'customer_email': 'c@test.com',
+        'customer_city_code': '68081',
+        'customer_city_name': 'Bucaramanga',
+        'customer_postal_zone': '680001',
+        'customer_country_subentity': 'Santander',
+        'customer_country_subentity_code': '68',
+        'customer_address_line': 'Calle 1',
+        'lines': [{'description': 'Producto A', 'quantity': quantity, 'unit_price': 50000}],
+    }
+
+
+def b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+class ServiceConnection:
+    """Conexion persistente al servicio."""
+
+    def __init__(self, service):
+        self.conn = http.client.HTTPConnection(service.host, service.port, timeout=30)
+
+    def post(self, path, payload):
+        self.conn.request('POST', path, body=json.dumps(payload),
+                          headers={'Content-Type': 'application/json'})
+        response = self.conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    def get(self, path):
+        self.conn.request('GET', path)
+        response = self.conn.getresponse()
+        return response.status, json.loads(response.read())
+
+
+@pytest.fixture(scope='module')
+def signer():
+    return XAdESSigner.from_pkcs12(P12_PATH, '')
+
+
+@pytest.fixture
+def service(signer, emulator):
+    client = DianSimpleClient(credentials=(signer.private_key, signer.certificate, signer.chain))
+    client.endpoint = emulator.endpoint
+    with FachoService.from_settings(SETTINGS, signer=signer, client=client, jobs=4) as service:
+        yield service
+
+
+class TestFachoService:
+
+    def test_build_signed_zip(self, service, signer):
+        status, body = ServiceConnection(service).post('/build?zip=1', document('SETP990000001'))
+
+        assert status == 200
+        assert len(body['uuid']) == 96 and body['total'] == 119000.0
+        assert signer.verify(etree.fromstring(base64.b64decode(body['xml'])))
+        with zipfile.ZipFile(io.BytesIO(base64.b64decode(body['zip']))) as zf:
+            assert zf.namelist() == ['fvSETP990000001.xml']
+        assert body['zip_name'] == 'fvSETP990000001.zip'
+
+    def test_batch_keeps_order_and_item_errors(self, service):
+        items = [document(f'SETP99000000{n}') for n in range(1, 5)]
+        items[2] = document('SETP990000003', quantity='muchos')
+
+        status, body = ServiceConnection(service).post('/build/batch?sign=0', {'items': items})
+
+        assert status == 200
+        results = body['results']
+        assert [r.get('number') for r in results] == [
+            'SETP990000001', 'SETP990000002', None, 'SETP990000004']
+        assert results[2]['status'] == 422
+        assert 'quantity' in results[2]['error']['message']
+
+    def test_sign_zip_send_status(self, service, emulator):
+        conn = ServiceConnection(service)
+        _, built = conn.post('/build?sign=0', document('SETP990000001'))
+
+        _, signed = conn.post('/sign', {'xml': built['xml']})
+        _, packaged = conn.post('/zip', {'xml': signed['xml'], 'file_name': 'fv1.xml'})
+        _, sent = conn.post('/send', {'file_name': packaged['zip_name'], 'zip': packaged['zip']})
+        status, checked = conn.post('/status/batch?zip=1', {'items': [
+            {'track_id': sent['zip_key']}, {'track_id': 'desconocido'}]})
+
+        assert sent['zip_key']
+        assert status == 200
+        assert checked['results'][0]['documents'][0]['status_code'] == '00'
+        assert emulator.stats['SendBillAsync'] == 1
+        _, health = conn.get('/health')
+        assert health['requests']['/sign'] == 1 and health['build']
+
+    def test_errors(self, service):
+        conn = ServiceConnection(service)
+
+        assert conn.post('/firmar', {})[0] == 404
+        assert conn.post('/sign', {'xml': 'no es base64!'})[0] == 400
+        assert conn.post('/zip', {'xml': b64(b'<a/>')})[0] == 400
+        assert conn.post('/sign/batch', {'items': 'x'})[0] == 400
+
+        with FachoService() as bare:
+            status, body = ServiceConnection(bare).post('/status', {'track_id': 'x'})
+        assert status == 501
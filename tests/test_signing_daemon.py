@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para el daemon local de firma.
+"""
+
+import os
+import stat
+
+import pytest
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from lxml import etree
+
+from facho.fe.builders.exceptions import SignatureError
+from facho.fe.client import DianSimpleClient
+from facho.fe.client.emulator import DianEmulator
+from facho.fe.signing import XAdESSigner
+from facho.fe.signing.daemon import SigningClient, SigningDaemon, remote_signer
+from facho.fe.signing.utils import verify_signature
+
+
+P12_PATH = os.path.join(os.path.dirname(__file__), 'example.p12')
+
+INVOICE = b'''<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2"
+ xmlns:ext="urn:oasis:names:specification:ubl:schema:xsd:CommonExtensionComponents-2"
+ xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2">
+<ext:UBLExtensions><ext:UBLExtension><ext:ExtensionContent/></ext:UBLExtension>
+<ext:UBLExtension><ext:ExtensionContent/></ext:UBLExtension></ext:UBLExtensions>
+<cbc:ID>SETP990000001</cbc:ID></Invoice>'''
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    with SigningDaemon.from_pkcs12(P12_PATH, '', str(tmp_path / 's.sock')) as daemon:
+        yield daemon
+
+
+class TestSigningDaemon:
+
+    def test_socket_is_private(self, daemon):
+        mode = stat.S_IMODE(os.stat(daemon.socket_path).st_mode)
+        assert mode == 0o600
+
+    def test_batch_signatures_verify(self, daemon):
+        client = SigningClient(daemon.socket_path)
+        certificate, chain = client.certificate()
+
+        blocks = [b'uno', b'dos', b'tres']
+        signatures = client.sign_many(blocks)
+
+        assert certificate == daemon.certificate
+        assert all(verify_signature(certificate.public_key(), sig, block)
+                   for sig, block in zip(signatures, blocks))
+        assert daemon.stats == {'requests': 2, 'signatures': 3, 'errors': 0}
+
+    def test_xades_with_remote_key(self, daemon):
+        signer = remote_signer(daemon.socket_path)
+
+        signed = signer.sign(etree.fromstring(INVOICE))
+
+        local = XAdESSigner.from_pkcs12(P12_PATH, '')
+        assert local.verify(signed)
+        assert daemon.stats['signatures'] == 1
+
+    def test_wssec_with_remote_key(self, daemon):
+        client = DianSimpleClient(signing_socket=daemon.socket_path)
+
+        with DianEmulator() as emulator:
+            client.endpoint = emulator.endpoint
+            response = client.get_status('cufe-1')
+
+        assert response.status_code == '66'
+        assert emulator.stats.get('signature_errors', 0) == 0
+
+    def test_errors(self, daemon, tmp_path):
+        signer = remote_signer(daemon.socket_path)
+        with pytest.raises(SignatureError):
+            signer.private_key.sign(b'x', padding.PSS(padding.MGF1(hashes.SHA256()), 32),
+                                    hashes.SHA256())
+
+        client = SigningClient(daemon.socket_path)
+        with pytest.raises(SignatureError, match='Operacion no soportada'):
+            client._request({'op': 'decrypt'})
+
+        with pytest.raises(SignatureError, match='No se pudo conectar'):
+            SigningClient(str(tmp_path / 'no.sock')).sign(b'x')
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para la cache de estados de DIAN.
+"""
+
+import pytest
+import requests
+from lxml import etree
+
+from facho.fe.client.emulator import DianEmulator, EmulatorConfig
+from facho.fe.client.status_cache import StatusCache
+from facho.fe.client.tracker import DocumentTracker, TrackedDocument
+
+
+NS_CBC = 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2'
+
+
+class TestStatusCache:
+
+    def test_terminal_status_served_from_disk(self, tmp_path, signed_zip, make_client):
+        path = str(tmp_path / 'estados.sqlite3')
+        with DianEmulator() as emulator:
+            client = make_client(emulator.endpoint, status_cache=StatusCache(path))
+            zip_key = client.send_bill_async('z.zip', signed_zip('cufe-1')).zip_key
+
+            first = client.get_status_zip(zip_key)
+            # Otro proceso con la misma cache
+            again = make_client(emulator.endpoint, status_cache=StatusCache(path)).get_status_zip(zip_key)
+
+        assert emulator.stats['GetStatusZip'] == 1
+        assert again == first
+        assert again.is_valid is True and again.documents[0].document_key == 'cufe-1'
+        application_response = etree.fromstring(again.documents[0].application_response)
+        assert application_response.findtext(f'.//{{{NS_CBC}}}ResponseCode') == '02'
+
+    def test_pending_status_refreshes_after_ttl(self, tmp_path, signed_zip, clock, make_client):
+        cache = StatusCache(str(tmp_path / 'estados.sqlite3'), pending_ttl=30, clock=clock)
+        with DianEmulator(EmulatorConfig(processing_delay=60)) as emulator:
+            client = make_client(emulator.endpoint, status_cache=cache)
+            zip_key = client.send_bill_async('z.zip', signed_zip('cufe-1')).zip_key
+
+            assert client.get_status_zip(zip_key).status_code == '98'
+            client.get_status_zip(zip_key)
+            assert emulator.stats['GetStatusZip'] == 1
+
+            clock.now += 31
+            client.get_status_zip(zip_key)
+            assert emulator.stats['GetStatusZip'] == 2
+
+            # Sin TTL un estado no definitivo ni siquiera se guarda
+            cache.pending_ttl = 0
+            cache.purge_pending()
+            client.get_status('cufe-1')
+            client.get_status('cufe-1')
+            assert emulator.stats['GetStatus'] == 2
+            assert len(cache) == 0
+
+    def test_pending_status_is_refreshed_while_verifying(self, tmp_path, signed_zip, clock, make_client):
+        cache = StatusCache(str(tmp_path / 'estados.sqlite3'), pending_ttl=300, clock=clock)
+        with DianEmulator(EmulatorConfig(processing_delay=60)) as emulator:
+            client = make_client(emulator.endpoint, status_cache=cache)
+            zip_key = client.send_bill_async('z.zip', signed_zip('cufe-1')).zip_key
+            assert client.get_status_zip(zip_key).status_code == '98'
+
+            # Los reintentos no se quedan con el 98 guardado
+            response = client.verify_status_with_retry(zip_key, wait_seconds=0, max_retries=2)
+            assert response.status_code == '98'
+            assert emulator.stats['GetStatusZip'] == 3
+
+            client.verify_pending_batch([zip_key], wait_seconds=0)
+            assert emulator.stats['GetStatusZip'] == 4
+
+    def test_tracker_verified_documents_are_not_polled(self, tmp_path, make_client):
+        tracker = DocumentTracker(str(tmp_path / 'tracking.json'))
+        tracker.add_document(TrackedDocument(
+            doc_type='factura', number='SETP1', uuid='cufe-1', issue_date='2024-01-15',
+            zip_key='zk-1', is_valid=True, status_code='00',
+            application_response='<ApplicationResponse/>',
+        ))
+        cache = StatusCache(str(tmp_path / 'estados.sqlite3'), tracker=tracker)
+        # Puerto cerrado: cualquier consulta real fallaria
+        client = make_client('http://127.0.0.1:9/WcfDianCustomerServices.svc', status_cache=cache)
+
+        results = client.verify_pending_batch(['zk-1'], wait_seconds=30)
+
+        assert results['zk-1'].is_valid is True
+        assert results['zk-1'].documents[0].application_response == '<ApplicationResponse/>'
+        assert client.get_status('cufe-1').documents[0].document_key == 'cufe-1'
+        with pytest.raises(requests.ConnectionError):
+            client.get_status_zip('zk-otro')
+
+    def test_tracker_answers_only_when_whole_zip_is_final(self, tmp_path, make_client):
+        tracker = DocumentTracker(str(tmp_path / 'tracking.json'))
+        for n, is_valid in ((1, True), (2, None)):
+            tracker.add_document(TrackedDocument(
+                doc_type='factura', number=f'SETP{n}', uuid=f'cufe-{n}', issue_date='2024-01-15',
+                zip_key='zk-1', is_valid=is_valid, status_code='00' if is_valid else None,
+                application_response='<ApplicationResponse/>' if is_valid else None,
+            ))
+        cache = StatusCache(str(tmp_path / 'estados.sqlite3'), tracker=tracker)
+        client = make_client('http://127.0.0.1:9/WcfDianCustomerServices.svc', status_cache=cache)
+
+        # cufe-2 sigue en proceso: hay que preguntarle a DIAN
+        with pytest.raises(requests.ConnectionError):
+            client.get_status_zip('zk-1')
+
+        # Sin ApplicationResponse tampoco se arma la respuesta
+        tracker.update_status('SETP2', is_valid=True, status_code='00')
+        with pytest.raises(requests.ConnectionError):
+            client.get_status_zip('zk-1')
+
+        tracker.update_status('SETP2', application_response='<ApplicationResponse/>')
+        response = client.get_status_zip('zk-1')
+        assert [d.document_key for d in response.documents] == ['cufe-1', 'cufe-2']
+        assert response.is_valid is True and response.application_response
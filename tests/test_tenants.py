@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This file is part of facho.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+
+"""
+Tests para el registro de emisores por NIT.
+"""
+
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from facho.fe.builders.exceptions import (
+    CertificateExpiredError,
+    ConfigurationError,
+    RateLimitedError,
+)
+from facho.fe.client.emulator import DianEmulator
+from facho.fe.tenants import DirectoryCredentialSource, TenantCredentials, TenantRegistry
+
+
+P12_PATH = os.path.join(os.path.dirname(__file__), 'example.p12')
+
+with open(P12_PATH, 'rb') as f:
+    P12_DATA = f.read()
+
+
+class CountingSource:
+    def __init__(self, nits, **options):
+        self.nits = nits
+        self.options = options
+        self.calls = []
+
+    def __call__(self, nit):
+        self.calls.append(nit)
+        if nit not in self.nits:
+            return None
+        return TenantCredentials(nit, pfx_data=P12_DATA, **self.options)
+
+
+class TestTenantRegistry:
+
+    def test_lazy_load_and_lru(self):
+        source = CountingSource({'800', '900', '901'})
+        registry = TenantRegistry(source, max_tenants=2)
+
+        first = registry.get('800')
+        assert registry.get('800') is first
+        registry.get('900')
+        registry.get('800')
+        registry.get('901')
+
+        assert registry.loaded() == ['800', '901']
+        assert source.calls == ['800', '900', '901']
+        assert registry.stats == {'hits': 2, 'misses': 3, 'loads': 3, 'evictions': 1}
+        assert first.client.session is registry.get('901').client.session
+
+        with pytest.raises(ConfigurationError):
+            registry.get('999')
+
+    def test_concurrent_first_use_loads_once(self):
+        source = CountingSource({'800'})
+        registry = TenantRegistry(source)
+
+        threads = [threading.Thread(target=registry.get, args=('800',)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert source.calls == ['800']
+
+    def test_no_reload_while_storing(self):
+        source = CountingSource({'800'})
+        others = []
+
+        class Registry(TenantRegistry):
+            def _store(self, tenant):
+                # Otro hilo llega justo entre la carga y el guardado
+                other = threading.Thread(target=self.get, args=('800',))
+                other.start()
+                other.join(timeout=0.5)
+                others.append(other)
+                super()._store(tenant)
+
+        registry = Registry(source)
+        registry.get('800')
+        others[0].join()
+
+        assert source.calls == ['800']
+
+    def test_certificate_expiry(self):
+        # El certificado de prueba vence el 2047-05-21
+        now = datetime(2047, 5, 1, tzinfo=timezone.utc).timestamp()
+        registry = TenantRegistry(CountingSource({'800'}), clock=lambda: now)
+
+        tenant = registry.get('800')
+        assert registry.expiring(days=30) == [('800', tenant.not_after)]
+        assert registry.expiring(days=10) == []
+
+        strict = TenantRegistry(CountingSource({'800'}), expiry_margin_days=30,
+                                clock=lambda: now)
+        with pytest.raises(CertificateExpiredError):
+            strict.get('800')
+        assert '800' not in strict
+
+    def test_per_tenant_concurrency(self):
+        registry = TenantRegistry(CountingSource({'800', '900'}, max_concurrency=1))
+
+        with registry.use('800'):
+            with pytest.raises(RateLimitedError):
+                with registry.use('800', timeout=0.01):
+                    pass
+            with registry.use('900', timeout=0.01) as tenant:
+                assert tenant.nit == '900'
+
+    def test_directory_source_and_client(self, tmp_path):
+        shutil.copy(P12_PATH, str(tmp_path / '800.p12'))
+        (tmp_path / '800.password').write_text('\n')
+        registry = TenantRegistry(DirectoryCredentialSource(str(tmp_path)))
+
+        with DianEmulator() as emulator, registry.use('800') as tenant:
+            tenant.client.endpoint = emulator.endpoint
+            response = tenant.client.get_status('cufe-1')
+
+        assert response.status_code == '66'
+        assert tenant.signer.certificate is tenant.client.certificate
+        registry.close()
@@ -377,6 +377,18 @@ class TestDocumentTrackerOperations:
         assert summary['total_documentos'] == 0
         assert summary['prefix'] == 'SETP'  # Se mantiene config
 
+    def test_batch_writes_once(self, tracker, temp_tracking_file, sample_invoice):
+        """Test varios cambios con una sola escritura."""
+        with tracker.batch():
+            tracker.add_document(sample_invoice)
+            with tracker.batch():
+                tracker.update_status(sample_invoice.number, is_valid=True)
+            # Nada escrito todavia
+            assert DocumentTracker(temp_tracking_file).get_invoices() == []
+
+        reloaded = DocumentTracker(temp_tracking_file)
+        assert reloaded.get_document(sample_invoice.number).is_valid is True
+
     def test_export_to_dict(self, tracker, sample_invoice):
         """Test exportar a diccionario."""
         tracker.set_config(prefix='SETP', nit='123')